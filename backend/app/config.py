@@ -1,3 +1,4 @@
+import importlib.util
 import os
 from dotenv import load_dotenv
 
@@ -32,10 +33,220 @@ class Config:
     @property
     def GEMINI_RPD(self):
         return int(os.getenv("GEMINI_RPD", "200"))
+    @property
+    def CHUNKING_THRESHOLD(self):
+        return int(os.getenv("CHUNKING_THRESHOLD", "10000"))
+    @property
+    def MAX_CHUNK_SIZE(self):
+        return int(os.getenv("MAX_CHUNK_SIZE", "8000"))
+    @property
+    def CHUNK_OVERLAP(self):
+        return int(os.getenv("CHUNK_OVERLAP", "200"))
+    @property
+    def MAX_SUMMARY_SIZE(self):
+        return int(os.getenv("MAX_SUMMARY_SIZE", "8000"))
+    @property
+    def CHUNK_FANOUT(self):
+        return int(os.getenv("CHUNK_FANOUT", "4"))
+    @property
+    def CONTENT_TYPE_SAMPLE_CHARS(self):
+        return int(os.getenv("CONTENT_TYPE_SAMPLE_CHARS", "0"))
+    @property
+    def GEMINI_STREAM(self):
+        return os.getenv("GEMINI_STREAM", "true").lower() in ("1", "true", "yes")
+    @property
+    def CACHE_BACKEND(self):
+        return os.getenv("CACHE_BACKEND", "memory")
+    @property
+    def CACHE_PATH(self):
+        return os.getenv("CACHE_PATH", "cache/results.sqlite3")
+    @property
+    def CACHE_MAX_BYTES(self):
+        return int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    @property
+    def CACHE_TTL(self):
+        return int(os.getenv("CACHE_TTL", str(7 * 24 * 3600)))
+    @property
+    def TASK_STORE_BACKEND(self):
+        return os.getenv("TASK_STORE_BACKEND", "sqlite")
+    @property
+    def TASK_STORE_PATH(self):
+        return os.getenv("TASK_STORE_PATH", "data/tasks.sqlite3")
+    @property
+    def TASK_STORE_URL(self):
+        return os.getenv("TASK_STORE_URL", "redis://localhost:6379/0")
+    @property
+    def TASK_TTL(self):
+        return int(os.getenv("TASK_TTL", str(24 * 3600)))
+    @property
+    def TASK_PURGE_INTERVAL(self):
+        return int(os.getenv("TASK_PURGE_INTERVAL", "600"))
+    @property
+    def TASK_STALE_SECONDS(self):
+        return float(os.getenv("TASK_STALE_SECONDS", "3600"))
+    @property
+    def SSE_HEARTBEAT_SECONDS(self):
+        return float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    @property
+    def SSE_POLL_INTERVAL(self):
+        return float(os.getenv("SSE_POLL_INTERVAL", "0.5"))
+    @property
+    def WORKER_CONCURRENCY(self):
+        return int(os.getenv("WORKER_CONCURRENCY", "2"))
+    @property
+    def JOB_QUEUE_MAX_SIZE(self):
+        return int(os.getenv("JOB_QUEUE_MAX_SIZE", "20"))
+    @property
+    def JOB_PRIORITY_AGING(self):
+        return float(os.getenv("JOB_PRIORITY_AGING", "174763"))
+    @property
+    def BATCH_MAX_ITEMS(self):
+        return int(os.getenv("BATCH_MAX_ITEMS", "50"))
+    @property
+    def AUDIO_PREPROCESS(self):
+        return os.getenv("AUDIO_PREPROCESS", "true").lower() in ("1", "true", "yes")
+    @property
+    def AUDIO_FORMAT(self):
+        return os.getenv("AUDIO_FORMAT", "opus")
+    @property
+    def AUDIO_SAMPLE_RATE(self):
+        return int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+    @property
+    def AUDIO_BITRATE(self):
+        return os.getenv("AUDIO_BITRATE", "24k")
+    @property
+    def FFMPEG_PATH(self):
+        return os.getenv("FFMPEG_PATH", "ffmpeg")
+    @property
+    def AUDIO_SEGMENT_SECONDS(self):
+        return int(os.getenv("AUDIO_SEGMENT_SECONDS", "600"))
+    @property
+    def AUDIO_SEGMENT_OVERLAP(self):
+        return int(os.getenv("AUDIO_SEGMENT_OVERLAP", "2"))
+    @property
+    def AUDIO_SEGMENT_CONCURRENCY(self):
+        return int(os.getenv("AUDIO_SEGMENT_CONCURRENCY", "4"))
+    @property
+    def SILENCE_NOISE_DB(self):
+        return int(os.getenv("SILENCE_NOISE_DB", "-30"))
+    @property
+    def SILENCE_MIN_SECONDS(self):
+        return float(os.getenv("SILENCE_MIN_SECONDS", "0.5"))
+    @property
+    def HTTP_POOL_SIZE(self):
+        return int(os.getenv("HTTP_POOL_SIZE", "10"))
+    @property
+    def HTTP_KEEPALIVE_SECONDS(self):
+        return float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+    @property
+    def HTTP_CONNECT_TIMEOUT(self):
+        return float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    @property
+    def WHISPER_TIMEOUT(self):
+        return float(os.getenv("WHISPER_TIMEOUT", "300"))
+    @property
+    def GEMINI_TIMEOUT(self):
+        return float(os.getenv("GEMINI_TIMEOUT", "30"))
+    @property
+    def HTTP2(self):
+        return os.getenv("HTTP2", "false").lower() in ("1", "true", "yes")
+    @property
+    def YT_DLP_PATH(self):
+        return os.getenv("YT_DLP_PATH", "yt-dlp")
+    @property
+    def YT_DLP_TIMEOUT(self):
+        return int(os.getenv("YT_DLP_TIMEOUT", "600"))
+    @property
+    def YOUTUBE_CAPTIONS(self):
+        return os.getenv("YOUTUBE_CAPTIONS", "true").lower() in ("1", "true", "yes")
+    @property
+    def YT_CAPTIONS_TIMEOUT(self):
+        return int(os.getenv("YT_CAPTIONS_TIMEOUT", "60"))
+    @property
+    def CPU_POOL_WORKERS(self):
+        return int(os.getenv("CPU_POOL_WORKERS", "2"))
+    @property
+    def CPU_INLINE_THRESHOLD(self):
+        return int(os.getenv("CPU_INLINE_THRESHOLD", "100000"))
+    @property
+    def CPU_SHARED_MEMORY_THRESHOLD(self):
+        return int(os.getenv("CPU_SHARED_MEMORY_THRESHOLD", "1000000"))
+    @property
+    def TRANSCRIPTION_BACKEND(self):
+        return os.getenv("TRANSCRIPTION_BACKEND", "http")
+    @property
+    def LOCAL_WHISPER_MODEL(self):
+        return os.getenv("LOCAL_WHISPER_MODEL", "small")
+    @property
+    def LOCAL_WHISPER_COMPUTE_TYPE(self):
+        return os.getenv("LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+    @property
+    def LOCAL_WHISPER_WORKERS(self):
+        return int(os.getenv("LOCAL_WHISPER_WORKERS", "0"))
+    @property
+    def LOCAL_WHISPER_THREADS(self):
+        return int(os.getenv("LOCAL_WHISPER_THREADS", "2"))
+    @property
+    def LOCAL_WHISPER_MODEL_DIR(self):
+        return os.getenv("LOCAL_WHISPER_MODEL_DIR", "")
+    @property
+    def LOCAL_WHISPER_BEAM_SIZE(self):
+        return int(os.getenv("LOCAL_WHISPER_BEAM_SIZE", "1"))
+    @property
+    def TRACING_EXPORTER(self):
+        return os.getenv("TRACING_EXPORTER", "file")
+    @property
+    def TRACING_FILE(self):
+        return os.getenv("TRACING_FILE", "traces/spans.jsonl")
+    @property
+    def TRACING_FILE_MAX_BYTES(self):
+        return int(os.getenv("TRACING_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+    @property
+    def TRACING_OTLP_ENDPOINT(self):
+        return os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318")
+    @property
+    def TRACING_SERVICE_NAME(self):
+        return os.getenv("TRACING_SERVICE_NAME", "meeting-summarizer")
+    @property
+    def METRICS_GAUGE_TTL(self):
+        return float(os.getenv("METRICS_GAUGE_TTL", "5"))
+    @property
+    def RETRY_MAX_ATTEMPTS(self):
+        return int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    @property
+    def RETRY_BASE_DELAY(self):
+        return float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+    @property
+    def RETRY_MAX_DELAY(self):
+        return float(os.getenv("RETRY_MAX_DELAY", "30"))
+    @property
+    def RETRY_DEADLINE(self):
+        return float(os.getenv("RETRY_DEADLINE", "600"))
+    @property
+    def CIRCUIT_FAILURE_THRESHOLD(self):
+        return int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    @property
+    def CIRCUIT_RESET_TIMEOUT(self):
+        return float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    @property
+    def LOG_LEVEL(self):
+        return os.getenv("LOG_LEVEL", "INFO").upper()
+    @property
+    def LOG_FORMAT(self):
+        return os.getenv("LOG_FORMAT", "json")
+    @property
+    def LOG_PAYLOAD_MAX_CHARS(self):
+        return int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+    @property
+    def LOG_PAYLOAD_SAMPLE_RATE(self):
+        return float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
 
     @classmethod
     def validate_config(cls):
-        if not os.getenv("WHISPER_API_KEY"):
+        if cls().TRANSCRIPTION_BACKEND.lower() == "local":
+            if importlib.util.find_spec("faster_whisper") is None:
+                raise ValueError("TRANSCRIPTION_BACKEND=local membutuhkan paket faster-whisper (pip install faster-whisper)")
+        elif not os.getenv("WHISPER_API_KEY"):
             raise ValueError("WHISPER_API_KEY tidak ditemukan di environment variables")
         if not os.getenv("GEMINI_API_KEY"):
             print("[WARNING] GEMINI_API_KEY tidak ditemukan di environment variables")
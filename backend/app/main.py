@@ -1,15 +1,41 @@
 import os
+import asyncio
 import logging
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.routes.summarize import router as summarize_router
-from app.utils.logger import log_request, log_response
+from app.routes.summarize import fail_interrupted_tasks, router as summarize_router
+from app.routes.batch import router as batch_router
+from app.utils.logger import RequestLoggingMiddleware, configure_logging
 from app.config import Config
+from app.services.task_store import close_task_store, get_task_store
+from app.services.job_queue import get_job_queue
+from app.services.http_clients import HttpClients, set_http_clients
+from app.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, get_metrics
+from app.services.tracing import TracingMiddleware, get_tracer
+from app.services.transcription import close_transcription_backend
+from app.services.cpu_executor import close_cpu_executor
+from app.services.cache import get_result_cache
 
-# Konfigurasi logging level via environment variable
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=LOG_LEVEL)
+async def purge_expired_entries(interval: int):
+    """Hapus task final yang sudah melewati TASK_TTL dan entri cache kedaluwarsa secara berkala."""
+    while True:
+        try:
+            purged = await asyncio.to_thread(get_task_store().purge_expired)
+            if purged:
+                logging.info(f"🧹 {purged} task kedaluwarsa dihapus dari task store")
+        except Exception as e:
+            logging.warning(f"⚠️ Gagal membersihkan task store: {str(e)}")
+        try:
+            purged = await asyncio.to_thread(get_result_cache().purge_expired)
+            if purged:
+                logging.info(f"🧹 {purged} entri cache kedaluwarsa dihapus")
+        except Exception as e:
+            logging.warning(f"⚠️ Gagal membersihkan cache: {str(e)}")
+        await asyncio.sleep(interval)
+
+# Logging terstruktur non-blocking (LOG_LEVEL, LOG_FORMAT, LOG_PAYLOAD_* di Config)
+configure_logging()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -27,9 +53,32 @@ async def lifespan(app: FastAPI):
     # Pastikan folder temp ada
     os.makedirs(Config().TEMP_FOLDER, exist_ok=True)
     logging.info(f"✅ Folder temp siap: {Config().TEMP_FOLDER}")
+
+    # Task yang terputus karena proses sebelumnya mati tidak akan pernah selesai
+    interrupted = await asyncio.to_thread(fail_interrupted_tasks)
+    if interrupted:
+        logging.warning(f"⚠️ {interrupted} task yang terputus ditandai gagal")
+    
+    # Client HTTP pooled (keep-alive) untuk Whisper dan Gemini
+    http_clients = HttpClients()
+    set_http_clients(http_clients)
+    app.state.http_clients = http_clients
+    logging.info(f"✅ Pool koneksi HTTP siap (HTTP/2: {http_clients.http2})")
+    
+    purge_task = asyncio.create_task(purge_expired_entries(Config().TASK_PURGE_INTERVAL))
     
     yield
     
+    purge_task.cancel()
+    await get_job_queue().stop()
+    await http_clients.aclose()
+    close_transcription_backend()
+    close_cpu_executor()
+    # Penulisan status yang masih antre diselesaikan dulu
+    await asyncio.to_thread(close_task_store)
+    set_http_clients(None)
+    # Span yang belum diekspor ditulis sebelum proses berhenti
+    await asyncio.to_thread(get_tracer().flush)
     logging.info("🛑 Aplikasi FastAPI Ditutup.")
 
 app = FastAPI(
@@ -58,13 +107,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware for logging requests and responses
-# @app.middleware("http")
-# async def log_requests_responses(request: Request, call_next):
-#     await log_request(request)
-#     response = await call_next(request)
-#     await log_response(response)
-#     return response
+# Correlation id dan satu baris log per request; body tidak dibaca ulang dan
+# hanya cuplikan request tersampel yang dicatat
+app.add_middleware(RequestLoggingMiddleware)
+
+# Satu span per request HTTP; span route, job, Whisper dan Gemini menjadi anaknya.
+# Ditambahkan setelah logging agar menjadi lapisan luar dan log request membawa trace_id
+app.add_middleware(TracingMiddleware)
 
 @app.get("/api/health")
 async def health():
@@ -74,8 +123,16 @@ async def health():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metric format Prometheus: durasi per tahap, request upstream, cache, antrean dan kuota Gemini."""
+    metrics = get_metrics()
+    await metrics.refresh()
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 # Include summarize router
 app.include_router(summarize_router, prefix="/api")
+app.include_router(batch_router, prefix="/api")
 
 # Graceful shutdown event
 @app.on_event("shutdown")
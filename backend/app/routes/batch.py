@@ -0,0 +1,359 @@
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from app.config import Config
+from app.routes.summarize import (
+    MAX_FILE_SIZE, MAX_TEXT_SIZE, dropped_job, get_task_status, process_text_job, process_upload_job, process_youtube_job,
+    raise_queue_full, traced_job, validate_youtube_url, youtube_job_priority,
+)
+from app.services.content_type import CONTENT_TYPES
+from app.services.events import TERMINAL_EVENTS, get_event_broker
+from app.services.job_queue import QueueFull, get_job_queue
+from app.services.rate_limiter import rate_limit_group
+from app.services.task_store import StageTimer, TaskStore, get_task_store, worker_id
+from app.services.upload import UploadError, UploadResult, receive_multipart, receive_text, remove_uploads
+
+router = APIRouter()
+
+class BatchItem(BaseModel):
+    youtube_url: Optional[str] = None
+    text: Optional[str] = None
+    content_type: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+BATCH_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": BatchRequest.model_json_schema()},
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                        "youtube_url": {"type": "array", "items": {"type": "string"}},
+                        "transcript": {"type": "array", "items": {"type": "string"}},
+                        "content_type": {"type": "string", "enum": list(CONTENT_TYPES)}
+                    }
+                }
+            }
+        }
+    }
+}
+
+def item_spec(item: BatchItem) -> Dict[str, Any]:
+    """Ubah satu item JSON menjadi spesifikasi job; item harus berisi tepat satu sumber."""
+    if (item.youtube_url is None) == (item.text is None):
+        raise HTTPException(status_code=422, detail="Setiap item harus berisi tepat satu dari 'youtube_url' atau 'text'")
+    if item.youtube_url is not None:
+        return {"kind": "youtube", "youtube_url": item.youtube_url.strip()}
+    return {"kind": "text", "text": item.text, "content_type": item.content_type}
+
+async def receive_batch_json(request: Request, max_items: int) -> List[Dict[str, Any]]:
+    """Body JSON dibaca streaming dengan batas ukuran `max_items` transkrip maksimum."""
+    max_size = MAX_TEXT_SIZE * max_items
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(status_code=413, detail=f"Body batch melebihi batas {max_size // (1024 * 1024)}MB")
+    try:
+        body = await receive_text(request.stream(), max_size)
+    except UploadError as e:
+        logging.warning(f"⚠️ Batch ditolak: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    try:
+        batch = BatchRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return [item_spec(item) for item in batch.items]
+
+async def receive_batch_form(request: Request, batch_id: str, max_items: int) -> List[Dict[str, Any]]:
+    """
+    Form multipart: part `files` (boleh berulang) disimpan streaming seperti
+    upload tunggal, `youtube_url` dan `transcript` (boleh berulang) menjadi
+    item tersendiri, `content_type` berlaku untuk semua transkrip.
+    """
+    os.makedirs(Config().TEMP_FOLDER, exist_ok=True)
+    try:
+        form = await receive_multipart(
+            request.headers.get("content-type", ""),
+            request.stream(),
+            Config().TEMP_FOLDER,
+            MAX_FILE_SIZE,
+            file_fields=("files", "file"),
+            max_files=max_items,
+            text_fields=("youtube_url", "transcript", "content_type"),
+            max_text_size=MAX_TEXT_SIZE,
+            filename_prefix=f"{batch_id}_",
+        )
+    except UploadError as e:
+        logging.warning(f"⚠️ Upload batch ditolak: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    content_type = (form.fields.get("content_type") or [None])[0]
+    specs: List[Dict[str, Any]] = [{"kind": "upload", "upload": upload} for upload in form.files]
+    specs += [{"kind": "youtube", "youtube_url": url.strip()} for url in form.fields.get("youtube_url", [])]
+    specs += [{"kind": "text", "text": text, "content_type": content_type} for text in form.fields.get("transcript", [])]
+    return specs
+
+def uploads_of(specs: List[Dict[str, Any]]) -> List[UploadResult]:
+    return [spec["upload"] for spec in specs if spec["kind"] == "upload"]
+
+def validate_specs(specs: List[Dict[str, Any]], max_items: int):
+    if not specs:
+        raise HTTPException(status_code=422, detail="Batch harus berisi minimal satu item")
+    if len(specs) > max_items:
+        raise HTTPException(status_code=413, detail=f"Batch maksimal {max_items} item")
+    for index, spec in enumerate(specs):
+        if spec["kind"] == "youtube" and not validate_youtube_url(spec["youtube_url"]):
+            raise HTTPException(status_code=400, detail=f"Item {index}: URL YouTube tidak valid.")
+        if spec["kind"] == "text":
+            if not spec["text"].strip():
+                raise HTTPException(status_code=422, detail=f"Item {index}: teks kosong")
+            if len(spec["text"].encode("utf-8")) > MAX_TEXT_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Item {index}: teks melebihi batas {MAX_TEXT_SIZE // (1024 * 1024)}MB"
+                )
+            if spec["content_type"] and spec["content_type"] not in CONTENT_TYPES:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Item {index}: content_type harus salah satu dari {', '.join(CONTENT_TYPES)}"
+                )
+
+def item_source(spec: Dict[str, Any]) -> Optional[str]:
+    if spec["kind"] == "upload":
+        return spec["upload"].filename
+    if spec["kind"] == "youtube":
+        return spec["youtube_url"]
+    return None
+
+def batch_finisher(task_store: TaskStore, batch_id: str) -> Callable[[Dict[str, Any]], Awaitable[None]]:
+    """
+    Dipanggil setiap job item selesai: kirim event `item` ke stream batch lalu
+    periksa apakah semua item sudah final (lihat `get_batch_status`).
+    """
+    async def on_item_finished(item: Dict[str, Any]):
+        record = await task_store.aget(item["task_id"]) or {}
+        task_store.publish(batch_id, "item", {**item, "status": record.get("status", "failed")})
+        await get_batch_status(batch_id)
+    return on_item_finished
+
+def batch_item_job(batch_id: str, item: Dict[str, Any], factory, on_finished):
+    """Jalankan job item di grup rate limit batch agar seluruh batch berbagi satu giliran Gemini."""
+    async def run():
+        try:
+            with rate_limit_group(batch_id):
+                await factory()
+        finally:
+            await on_finished(item)
+    return run
+
+async def item_job(spec: Dict[str, Any], task_id: str, timer: StageTimer):
+    if spec["kind"] == "upload":
+        upload = spec["upload"]
+        return lambda: process_upload_job(task_id, upload.path, upload.sha256, timer), upload.size
+    if spec["kind"] == "youtube":
+        youtube_url = spec["youtube_url"]
+        return lambda: process_youtube_job(task_id, youtube_url, timer), await youtube_job_priority(youtube_url)
+    # Transkrip hanya butuh ringkasan, jadi didahulukan seperti transkripsi yang ada di cache
+    return lambda: process_text_job(task_id, spec["text"], spec["content_type"], timer), 0
+
+async def submit_batch(batch_id: str, specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Setiap item menjadi task biasa (status, SSE dan hasilnya bisa dipantau
+    sendiri-sendiri) yang dijadwalkan di antrean job bersama.
+    """
+    task_store = get_task_store()
+    job_queue = get_job_queue()
+    items = []
+    jobs = []
+    for index, spec in enumerate(specs):
+        task_id = str(uuid.uuid4())
+        record = {
+            "status": "queued",
+            "stage": "queued",
+            "message": "Menunggu giliran diproses...",
+            "batch_id": batch_id,
+            "batch_index": index,
+            "worker": worker_id()
+        }
+        if spec["kind"] == "youtube":
+            record["youtube_url"] = spec["youtube_url"]
+        await task_store.aset(task_id, record)
+        items.append({"index": index, "task_id": task_id, "kind": spec["kind"], "source": item_source(spec)})
+        jobs.append(await item_job(spec, task_id, StageTimer(task_store, task_id)))
+    await task_store.aset(batch_id, {
+        "status": "processing", "items": items, "total": len(items), "created_at": time.time(), "worker": worker_id()
+    })
+    # Slot antrean bisa terpakai request lain selama record ditulis
+    if len(items) > job_queue.free_slots():
+        for item in items:
+            await task_store.adelete(item["task_id"])
+        await task_store.adelete(batch_id)
+        raise QueueFull(job_queue.retry_after())
+
+    on_finished = batch_finisher(task_store, batch_id)
+    for item, spec, (job, priority) in zip(items, specs, jobs):
+        task_id = item["task_id"]
+        # Tidak ada await sejak kapasitas antrean diperiksa ulang, jadi semua item muat
+        paths = [spec["upload"].path] if spec["kind"] == "upload" else []
+        job_queue.submit(
+            task_id, traced_job(task_id, spec["kind"], batch_item_job(batch_id, item, job, on_finished)),
+            priority=priority, on_drop=dropped_job(task_store, task_id, paths)
+        )
+    return items
+
+@router.post("/summarize/batch", openapi_extra=BATCH_OPENAPI)
+async def create_batch(request: Request):
+    """
+    Terima beberapa file MP3, link YouTube dan/atau transkrip sekaligus dan
+    jadwalkan semuanya dengan satu batch id. Body JSON `{"items": [...]}` atau
+    multipart (`files`, `youtube_url`, `transcript`, `content_type`).
+    """
+    try:
+        Config.validate_config()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    job_queue = get_job_queue()
+    if job_queue.is_full():
+        raise_queue_full(job_queue.retry_after())
+
+    batch_id = str(uuid.uuid4())
+    max_items = Config().BATCH_MAX_ITEMS
+    if "multipart/form-data" in request.headers.get("content-type", ""):
+        specs = await receive_batch_form(request, batch_id, max_items)
+    else:
+        specs = await receive_batch_json(request, max_items)
+
+    try:
+        validate_specs(specs, max_items)
+        # Batch diterima utuh atau ditolak utuh
+        if len(specs) > job_queue.free_slots():
+            raise_queue_full(job_queue.retry_after())
+    except HTTPException:
+        remove_uploads(uploads_of(specs))
+        raise
+
+    try:
+        items = await submit_batch(batch_id, specs)
+    except QueueFull as e:
+        remove_uploads(uploads_of(specs))
+        raise_queue_full(e.retry_after)
+    logging.info(f"📦 Batch {batch_id}: {len(items)} item dijadwalkan")
+    return {
+        "batch_id": batch_id,
+        "status": "processing",
+        "total": len(items),
+        "items": [{**item, "queue_position": job_queue.position(item["task_id"])} for item in items]
+    }
+
+async def get_batch_status(batch_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Gabungan status semua item batch: jumlah per status, persen selesai dan
+    status per item. Batch ditandai selesai (event final `completed`) begitu
+    record semua item final, siapa pun yang memeriksanya, sehingga tidak
+    bergantung pada proses yang menerima batch (item bisa gagal saat restart).
+    """
+    task_store = get_task_store()
+    record = await task_store.aget(batch_id)
+    if not record or "items" not in record:
+        return None
+    counts: Dict[str, int] = {}
+    items = []
+    for item in record["items"]:
+        task = await get_task_status(item["task_id"]) or {"status": "not_found"}
+        entry = {**item, "status": task["status"], "stage": task.get("stage")}
+        for field in ("error", "queue_position", "eta_seconds"):
+            if task.get(field) is not None:
+                entry[field] = task[field]
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        items.append(entry)
+    finished = sum(counts.get(status, 0) for status in TERMINAL_EVENTS)
+    total = len(items)
+    if finished == total and record["status"] not in TERMINAL_EVENTS:
+        record.update(status="completed", finished_at=time.time())
+        await task_store.aupdate(batch_id, status="completed", finished_at=record["finished_at"])
+    return {
+        "batch_id": batch_id,
+        "status": record["status"],
+        "total": total,
+        "counts": counts,
+        "progress": {"finished": finished, "percent": round(finished / total * 100, 1) if total else 100.0},
+        "created_at": record.get("created_at"),
+        "finished_at": record.get("finished_at"),
+        "items": items
+    }
+
+@router.get("/summarize/batch/{batch_id}")
+async def check_batch_status(batch_id: str):
+    """Status agregat batch beserta status, tahap dan error tiap item."""
+    status = await get_batch_status(batch_id)
+    if status is None:
+        return {"status": "not_found"}
+    return status
+
+def ndjson(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+async def item_result(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Baris hasil satu item: metadata item ditambah record task (tanpa transkripsi lengkap)."""
+    record = await get_task_store().aget(item["task_id"]) or {"status": "not_found"}
+    return {"type": "item", **record, "index": item["index"], "task_id": item["task_id"], "kind": item["kind"], "source": item["source"]}
+
+@router.get("/summarize/batch/{batch_id}/results")
+async def stream_batch_results(batch_id: str):
+    """
+    Stream NDJSON hasil batch: satu baris `{"type": "item", ...}` per item begitu
+    item itu selesai (urutan selesai, bukan urutan input), lalu satu baris
+    `{"type": "batch", ...}` berisi status agregat. Baris kosong dikirim sebagai
+    keep-alive setiap SSE_HEARTBEAT_SECONDS tanpa hasil baru.
+    """
+    config = Config()
+
+    async def results():
+        sent: Set[int] = set()
+        events = get_event_broker().stream(
+            batch_id, snapshot=lambda: get_batch_status(batch_id), heartbeat=config.SSE_HEARTBEAT_SECONDS,
+            log=get_task_store(), poll_interval=config.SSE_POLL_INTERVAL
+        )
+        async for event in events:
+            if event is None:
+                yield "\n"
+                continue
+            if event.event == "not_found":
+                yield ndjson({"type": "batch", "batch_id": batch_id, "status": "not_found"})
+                return
+            if event.event == "status" or event.event in TERMINAL_EVENTS:
+                # Snapshot (awal stream, setelah tertinggal atau saat heartbeat): kirim item yang sudah selesai
+                finished = [item for item in event.data.get("items", []) if item.get("status") in TERMINAL_EVENTS]
+            elif event.event == "item":
+                finished = [event.data]
+            else:
+                finished = []
+            for item in finished:
+                if item["index"] not in sent:
+                    sent.add(item["index"])
+                    yield ndjson(await item_result(item))
+        status = await get_batch_status(batch_id)
+        if status is not None:
+            # Item yang event-nya tidak sempat diterima dikirim dari status akhir
+            for item in status.pop("items"):
+                if item["status"] in TERMINAL_EVENTS and item["index"] not in sent:
+                    sent.add(item["index"])
+                    yield ndjson(await item_result(item))
+            yield ndjson({"type": "batch", **status})
+
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
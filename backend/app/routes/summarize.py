@@ -1,4 +1,5 @@
 import os
+import glob
 import time
 import logging
 import shutil
@@ -8,15 +9,32 @@ import hashlib
 import json
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
-from fastapi import APIRouter, UploadFile, File, HTTPException, Body
-from fastapi.responses import FileResponse
-from app.services.whisper import transcribe_audio
-from app.services.gemini import summarize_with_gemini, detect_content_type
+from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, StreamingResponse
+from app.services.transcription import get_transcription_backend, transcribe_with_backend
+from app.services.audio import preprocess_audio
+from app.services.segmentation import transcribe_segmented
+from app.services.youtube import download_youtube_audio_async, fetch_youtube_captions_async
+from app.services.gemini import PROMPT_VERSION, detect_content_type_async, format_summary_async
+from app.services.cache import extract_youtube_video_id, get_result_cache
+from app.services.content_type import CONTENT_TYPES
+from app.services.chunking import summarize_transcript_async
+from app.services.rate_limiter import get_gemini_limiter
+from app.services.resilience import circuit_breaker_stats
+from app.services.task_store import StageTimer, TaskStore, get_task_store, worker_alive, worker_id
+from app.services.events import get_event_broker
+from app.services.job_queue import QueueFull, get_job_queue
+from app.services.http_clients import get_http_stats
+from app.services.cpu_executor import get_cpu_executor
+from app.services.upload import MULTIPART_OVERHEAD, UploadError, receive_text, receive_upload
+from app.services.tracing import get_tracer
+from multipart.multipart import parse_options_header
+from app.utils.logger import correlation_scope, get_correlation_id
 from app.config import Config
 import asyncio
 import tempfile
-import subprocess
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 # Konfigurasi logging
 logging.basicConfig(
@@ -24,21 +42,23 @@ logging.basicConfig(
     level=logging.INFO,
 )
 
-# Advanced chunking configuration
-MAX_CHUNK_SIZE = 1000  # Maksimal ukuran chunk yang akan dikirim ke API
-MAX_SUMMARY_SIZE = 2000  # Maksimal ukuran ringkasan akhir
-CHUNK_OVERLAP = 100  # Overlap antar chunks untuk menjaga konteks
+# Konfigurasi chunking (MAX_CHUNK_SIZE, CHUNK_OVERLAP, MAX_SUMMARY_SIZE, ...) ada di Config
 MAX_RETRIES = 5  # Maksimum jumlah retry untuk API request
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB max file size
+MAX_TEXT_SIZE = 20 * 1024 * 1024  # 20MB max transkrip teks
+INTERRUPTED_ERROR = "Pemrosesan terhenti karena server dimatikan. Silakan kirim ulang."
 
 router = APIRouter()
 
-# In-memory storage untuk tasks
-tasks = {}
+# Status task disimpan di task store (SQLite/Redis), lihat app/services/task_store.py
 
 class YouTubeRequest(BaseModel):
     youtube_url: str
 
+class TextRequest(BaseModel):
+    text: str
+    content_type: Optional[str] = None
+
 def validate_youtube_url(url: str) -> bool:
     """Validasi URL YouTube."""
     youtube_patterns = [
@@ -55,180 +75,451 @@ def validate_youtube_url(url: str) -> bool:
             return True
     return False
 
-def download_youtube_audio(youtube_url: str, output_dir: str) -> str:
+def raise_queue_full(retry_after: int):
+    raise HTTPException(
+        status_code=503,
+        detail="Server sedang sibuk, antrean pemrosesan penuh. Coba lagi nanti.",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+def traced_job(task_id: str, source: str, factory):
+    """
+    Bungkus job agar berjalan di span `summarize.job` yang menjadi anak span
+    request saat ini dan memakai correlation id request, sehingga request dan
+    pemrosesan background satu trace dan log-nya bisa digabungkan.
+    """
+    request_span = get_tracer().current_span()
+    request_span.set_attribute("task_id", task_id)
+    correlation_id = get_correlation_id()
+
+    async def run():
+        with correlation_scope(correlation_id):
+            with get_tracer().span("summarize.job", {"task_id": task_id, "source": source}, parent=request_span):
+                await factory()
+    return run
+
+def remove_temp_paths(paths: List[str]):
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"⚠️ Gagal menghapus file sementara {path}: {str(e)}")
+
+def dropped_job(task_store: TaskStore, task_id: str, paths: Optional[List[str]] = None):
+    """`on_drop` antrean: job yang belum sempat berjalan saat server berhenti ditandai gagal."""
+    async def on_drop():
+        await task_store.aupdate(task_id, status="failed", error=INTERRUPTED_ERROR)
+        remove_temp_paths(paths or [])
+    return on_drop
+
+def fail_interrupted_tasks() -> int:
     """
-    Download audio from YouTube using yt-dlp and return the file path.
+    Dijalankan saat startup: task yang belum final tetapi proses pemiliknya
+    sudah mati (server crash/restart) ditandai gagal dan file sementaranya
+    (diberi prefix task id) dihapus. Task milik host lain baru dianggap mati
+    jika record-nya tidak ditulis selama TASK_STALE_SECONDS. Mengembalikan
+    jumlah task yang ditandai.
     """
+    task_store = get_task_store()
+    config = Config()
+    interrupted = 0
+    for task_id, record, updated_at in task_store.unfinished():
+        if worker_alive(record.get("worker"), updated_at, config.TASK_STALE_SECONDS, task_store.clock):
+            continue
+        task_store.update(task_id, status="failed", error=INTERRUPTED_ERROR)
+        remove_temp_paths(glob.glob(os.path.join(glob.escape(config.TEMP_FOLDER), f"*{task_id}_*")))
+        interrupted += 1
+    return interrupted
+
+def partial_transcript_publisher(task_store: TaskStore, task_id: str):
+    """Callback segmentasi yang mengirim teks tiap segmen sebagai event `transcript`."""
+    done = 0
+
+    def on_segment(index: int, total: int, text: str):
+        nonlocal done
+        done += 1
+        task_store.publish(task_id, "transcript", {
+            "segment": index,
+            "segments": total,
+            "text": text,
+            "percent": round(done / total * 100, 1)
+        })
+    return on_segment
+
+async def transcribe_audio_file(audio_path: str, language: str = "id", on_segment=None) -> str:
+    """
+    Audio panjang dipecah di titik hening dan ditranskripsi paralel per segmen;
+    audio pendek di-pre-process (mono, 16 kHz, bitrate rendah) lalu dikirim
+    utuh. Keduanya lewat backend dari TRANSCRIPTION_BACKEND (API HTTP atau
+    Whisper lokal).
+    """
+    transcription = await transcribe_segmented(
+        audio_path, language=language, transcribe=transcribe_with_backend, on_segment=on_segment
+    )
+    if transcription is not None:
+        return transcription
+
     try:
-        logging.info(f"🎬 Starting download for: {youtube_url}")
-        logging.info(f"📁 Output directory: {output_dir}")
-        
-        # Path absolut ke yt-dlp.exe
-        yt_dlp_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../venv/Scripts/yt-dlp.exe'))
-        logging.info(f"🔎 Menggunakan yt-dlp path: {yt_dlp_path}")
-        
-        # Output file path
-        output_path = os.path.join(output_dir, '%(id)s.%(ext)s')
-        logging.info(f"📄 Output path pattern: {output_path}")
-        
-        # Download command dengan optimasi untuk kecepatan
-        command = [
-            yt_dlp_path,
-            '-f', 'bestaudio',  # Ambil kualitas audio terbaik
-            '--extract-audio',
-            '--audio-format', 'mp3',
-            '--audio-quality', '64K',  # Kualitas lebih baik
-            '--max-downloads', '1',
-            '--no-playlist',
-            '--no-check-certificates',  # Skip SSL check untuk kecepatan
-            '--no-warnings',
-            '--quiet',
-            '-o', output_path,
-            youtube_url
-        ]
-        
-        logging.info(f"🔧 Command: {' '.join(command)}")
-        logging.info(f"🎬 Downloading: {youtube_url}")
-        
-        # Run dengan timeout 3 menit (lebih pendek)
-        result = subprocess.run(command, timeout=180, capture_output=True, text=True)
-        logging.info(f"🔚 yt-dlp exited with code: {result.returncode}")
-        logging.info(f"📤 yt-dlp stdout: {result.stdout}")
-        logging.info(f"📥 yt-dlp stderr: {result.stderr}")
-        
-        # Find the downloaded file
-        files = os.listdir(output_dir)
-        logging.info(f"📁 Files in output dir: {files}")
-        
-        for file in files:
-            if file.endswith('.mp3'):
-                file_path = os.path.join(output_dir, file)
-                file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-                logging.info(f"✅ Downloaded: {file} ({file_size:.1f} MB)")
-                return file_path
-        
-        logging.error(f"❌ No audio file found after download. All files: {files}")
-        raise Exception(f'Audio file not found after download. yt-dlp exit code: {result.returncode}, stdout: {result.stdout}, stderr: {result.stderr}')
-        
-    except subprocess.TimeoutExpired:
-        logging.error("❌ Download timeout - video terlalu panjang atau koneksi lambat")
-        raise Exception('Download timeout - video terlalu panjang atau koneksi lambat')
+        prepared = await preprocess_audio(audio_path)
     except Exception as e:
-        logging.error(f"❌ Download error: {str(e)}")
-        raise Exception(f'Download error: {str(e)}')
+        logging.warning(f"⚠️ Pre-processing audio dilewati: {str(e)}")
+        prepared = None
+    try:
+        return await transcribe_with_backend(prepared.path if prepared else audio_path, language=language)
+    finally:
+        if prepared and prepared.applied and os.path.exists(prepared.path):
+            os.remove(prepared.path)
 
-@router.post("/summarize/youtube/")
-async def summarize_youtube(request: YouTubeRequest):
+async def transcribe_with_cache(audio_path: str, source_hash: Optional[str], language: str = "id", on_segment=None) -> Tuple[str, bool]:
+    """
+    Transkripsi audio, memakai cache jika hash sumber (audio/ID video) sudah pernah diproses.
+    Mengembalikan (transkripsi, cache_hit).
+    """
+    cache = get_result_cache()
+    if source_hash:
+        cached = await cache.aget_transcript(source_hash, language)
+        if cached:
+            logging.info(f"♻️ Transkripsi diambil dari cache ({source_hash[:16]}...)")
+            return cached, True
+    transcription = await transcribe_audio_file(audio_path, language, on_segment=on_segment)
+    if source_hash and transcription.strip():
+        await cache.aset_transcript(source_hash, language, transcription)
+    return transcription, False
+
+def summary_delta_publisher(task_store: TaskStore, task_id: str):
+    """
+    Callback streaming Gemini yang meneruskan potongan ringkasan sebagai event
+    `summary_delta`. None jika GEMINI_STREAM dimatikan.
+    """
+    if not Config().GEMINI_STREAM:
+        return None
+
+    def on_delta(text: str):
+        task_store.publish(task_id, "summary_delta", {"text": text})
+    return on_delta
+
+async def summarize_with_cache(transcription: str, content_type: str, task_id: str = None, on_delta=None) -> Tuple[object, bool]:
     """
-    Terima link YouTube, download audio, transcribe, dan summarize.
+    Ringkas transkripsi, memakai cache berdasarkan hash transkripsi + content type + versi prompt.
+    Mengembalikan (ringkasan, cache_hit).
     """
+    cache = get_result_cache()
+    cached = await cache.aget_summary(transcription, content_type, PROMPT_VERSION)
+    if cached is not None:
+        logging.info("♻️ Ringkasan diambil dari cache")
+        return cached, True
+    summary = await summarize_transcript_async(transcription, content_type=content_type, task_id=task_id, on_delta=on_delta)
+    await cache.aset_summary(transcription, content_type, PROMPT_VERSION, summary)
+    return summary, False
+
+async def process_youtube_job(task_id: str, youtube_url: str, timer: StageTimer):
+    """Job background link YouTube: download (kecuali transkripsi ada di cache), transkripsi, ringkasan."""
+    task_store = timer.store
+    video_id = extract_youtube_video_id(youtube_url)
+    source_hash = f"youtube:{video_id}" if video_id else None
+    timer.record("queued", timer.clock() - timer.started)
+    await task_store.aupdate(task_id, status="processing")
+    os.makedirs(Config().TEMP_FOLDER, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix=f"yt_{task_id}_", dir=Config().TEMP_FOLDER)
+
+    def report_download_progress(percent, downloaded, total, eta):
+        task_store.update_nowait(task_id, progress={
+            "percent": percent,
+            "downloaded_bytes": downloaded,
+            "total_bytes": total,
+            "eta_seconds": eta
+        })
+
     try:
-        youtube_url = request.youtube_url.strip()
-        
-        logging.info(f"🎬 ===== START YOUTUBE PROCESSING =====")
-        logging.info(f"🎬 URL: {youtube_url}")
-        
-        # Validasi URL
-        if not validate_youtube_url(youtube_url):
-            logging.error(f"❌ Invalid YouTube URL: {youtube_url}")
-            raise HTTPException(status_code=400, detail="URL YouTube tidak valid. Pastikan URL berasal dari YouTube.")
-        
-        logging.info("✅ URL validation passed")
-        
-        # Validasi config
-        try:
-            Config.validate_config()
-            logging.info("✅ Config validation passed")
-        except ValueError as e:
-            logging.error(f"❌ Config validation failed: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
-        
-        temp_dir = tempfile.mkdtemp(prefix="yt_", dir="temp")
-        logging.info(f"📁 Created temp directory: {temp_dir}")
-        
-        try:
-            logging.info(f"🎬 Memulai proses YouTube: {youtube_url}")
-            
-            # 1. Download audio
-            logging.info("📥 ===== STEP 1: DOWNLOADING AUDIO =====")
-            audio_path = download_youtube_audio(youtube_url, temp_dir)
-            logging.info(f"✅ Audio downloaded successfully: {audio_path}")
-            
-            # 2. Transcribe audio
-            logging.info("🎤 ===== STEP 2: TRANSCRIBING AUDIO =====")
-            transcription = transcribe_audio(audio_path, language="id")
-            
-            if not transcription.strip():
-                logging.error("❌ Transcription is empty or failed")
-                raise HTTPException(status_code=400, detail="Transkripsi kosong atau gagal. Pastikan video memiliki audio yang jelas.")
-            
-            logging.info(f"✅ Transkripsi selesai: {len(transcription)} karakter")
-            
-            # 3. Summarize dengan progress detail
-            logging.info("📝 ===== STEP 3: SUMMARIZING =====")
-            content_type = detect_content_type(transcription)
-            logging.info(f"🔍 Content type detected: {content_type}")
-            
-            # Optimasi berdasarkan panjang transkripsi
-            if len(transcription) > 10000:  # Transkripsi panjang
-                logging.info("📊 Transkripsi panjang terdeteksi, menggunakan chunking...")
-                summary = summarize_with_gemini(transcription, content_type=content_type)
-            else:  # Transkripsi pendek, langsung summarize
-                logging.info("📊 Transkripsi pendek, langsung summarize...")
-                summary = summarize_with_gemini(transcription, content_type=content_type)
-            
-            logging.info("✅ Summarization selesai!")
-
-            # Pastikan summary dikirim sebagai object (dict), bukan string JSON
-            summary_obj = summary
-            if isinstance(summary, str):
-                try:
-                    summary_obj = json.loads(summary)
-                except Exception:
-                    summary_obj = summary
-
-            # 4. Cleanup audio
-            logging.info("🧹 ===== STEP 4: CLEANUP =====")
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-                logging.info(f"🗑️ Deleted audio file: {audio_path}")
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            logging.info(f"🗑️ Deleted temp directory: {temp_dir}")
-            
-            # 5. Return result
-            logging.info("🎉 ===== YOUTUBE PROCESSING COMPLETED =====")
-            return {
-                "summary": summary_obj,
+        logging.info(f"🎬 Task {task_id}: Memulai proses YouTube {youtube_url}")
+        transcription = await get_result_cache().aget_transcript(source_hash, "id") if source_hash else None
+        transcript_cached = bool(transcription)
+        captions = None
+        if transcript_cached:
+            logging.info(f"♻️ Transkripsi video {video_id} diambil dari cache, skip download")
+            transcript_source = "cache"
+        else:
+            # Subtitle (jika ada) jauh lebih cepat dari download audio + Whisper
+            if Config().YOUTUBE_CAPTIONS:
+                with timer.stage("captions", "Mengambil subtitle YouTube..."):
+                    captions = await fetch_youtube_captions_async(youtube_url, temp_dir, language="id")
+            if captions is not None:
+                transcription = captions.text
+                transcript_source = "captions"
+            else:
+                with timer.stage("downloading", "Mengunduh audio YouTube..."):
+                    audio_path = await download_youtube_audio_async(youtube_url, temp_dir, on_progress=report_download_progress)
+                logging.info(f"✅ Task {task_id}: Audio downloaded ({audio_path})")
+
+                with timer.stage("transcribing", "Transkripsi sedang berjalan..."):
+                    transcription = await transcribe_audio_file(
+                        audio_path, language="id", on_segment=partial_transcript_publisher(task_store, task_id)
+                    )
+                transcript_source = "audio"
+            if source_hash and transcription.strip():
+                await get_result_cache().aset_transcript(source_hash, "id", transcription)
+
+        if not transcription.strip():
+            await task_store.aupdate(
+                task_id,
+                status="failed",
+                error="Transkripsi kosong atau gagal. Pastikan video memiliki audio yang jelas.",
+                timings=timer.finish()
+            )
+            return
+
+        logging.info(f"✅ Task {task_id}: Transkripsi selesai ({len(transcription)} karakter)")
+        with timer.stage("summarizing", "Transkripsi selesai. Memulai proses ringkasan..."):
+            with timer.measure("content_detection"):
+                content_type = await detect_content_type_async(transcription)
+            summary, summary_cached = await summarize_with_cache(
+                transcription, content_type, task_id=task_id,
+                on_delta=summary_delta_publisher(task_store, task_id)
+            )
+
+        # Pastikan summary dikirim sebagai object (dict), bukan string JSON
+        summary_obj = summary
+        if isinstance(summary, str):
+            try:
+                summary_obj = json.loads(summary)
+            except Exception:
+                summary_obj = summary
+
+        with timer.measure("formatting"):
+            formatted_summary = await format_summary_async(summary_obj, transcription, content_type)
+
+        logging.info(f"🎉 Task {task_id}: YouTube processing completed")
+        await task_store.aupdate(
+            task_id,
+            status="completed",
+            stage="completed",
+            message="Ringkasan selesai!",
+            task_id=task_id,
+            summary=summary_obj,
+            formatted_summary=formatted_summary,
+            transcription=transcription,
+            content_type=content_type,
+            transcription_length=len(transcription),
+            timings=timer.finish(),
+            processing_info={
+                "transcription_chars": len(transcription),
+                "summary_chars": len(str(summary_obj)),
+                "compression_ratio": f"{round(len(str(summary_obj)) / len(transcription) * 100, 2) if transcription else 0}%",
                 "content_type": content_type,
-                "transcription_length": len(transcription),
-                "youtube_url": youtube_url,
-                "status": "completed",
-                "processing_info": {
-                    "transcription_chars": len(transcription),
-                    "summary_chars": len(str(summary_obj)),
-                    "compression_ratio": f"{round(len(str(summary_obj)) / len(transcription) * 100, 2) if transcription else 0}%",
-                    "content_type": content_type
+                "transcript_source": transcript_source,
+                "captions": {"language": captions.language, "format": captions.format} if captions else None,
+                "cache_hit": {
+                    "transcription": transcript_cached,
+                    "summary": summary_cached
                 }
             }
-            
-        except HTTPException:
-            # Re-raise HTTP exceptions
-            logging.error("❌ HTTP Exception occurred, cleaning up...")
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            raise
-            
-        except Exception as e:
-            logging.error(f"❌ Unexpected error during processing: {str(e)}")
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            logging.error(f"❌ YouTube processing failed: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Gagal memproses YouTube: {str(e)}")
-            
-    except HTTPException:
-        # Re-raise HTTP exceptions from outer scope
+        )
+    except asyncio.CancelledError:
+        await task_store.aupdate(task_id, status="failed", error=INTERRUPTED_ERROR, timings=timer.finish())
+        raise
+    except Exception as e:
+        logging.error(f"❌ Task {task_id}: YouTube processing failed: {str(e)}")
+        await task_store.aupdate(task_id, status="failed", error=str(e), timings=timer.finish())
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# Durasi video belum diketahui sebelum diunduh, jadi diperlakukan seperti file besar
+YOUTUBE_JOB_PRIORITY = MAX_FILE_SIZE
+
+async def youtube_job_priority(youtube_url: str) -> float:
+    """Transkripsi yang sudah ada di cache hanya butuh ringkasan, jadi didahulukan."""
+    video_id = extract_youtube_video_id(youtube_url)
+    if video_id and await get_result_cache().aget_transcript(f"youtube:{video_id}", "id"):
+        return 0
+    return YOUTUBE_JOB_PRIORITY
+
+async def process_text_job(task_id: str, text: str, content_type: Optional[str], timer: StageTimer):
+    """Job background untuk transkrip yang sudah ada: langsung ke deteksi content type dan ringkasan."""
+    task_store = timer.store
+    timer.record("queued", timer.clock() - timer.started)
+    await task_store.aupdate(task_id, status="processing")
+    try:
+        if not text.strip():
+            await task_store.aupdate(task_id, status="failed", error="Teks kosong.", timings=timer.finish())
+            return
+        with timer.stage("summarizing", "Memulai proses ringkasan..."):
+            content_type_detected = not content_type
+            if content_type_detected:
+                with timer.measure("content_detection"):
+                    content_type = await detect_content_type_async(text)
+            summary, summary_cached = await summarize_with_cache(
+                text, content_type, task_id=task_id,
+                on_delta=summary_delta_publisher(task_store, task_id)
+            )
+
+        with timer.measure("formatting"):
+            formatted_summary = await format_summary_async(summary, text, content_type)
+
+        await task_store.aupdate(
+            task_id,
+            status="completed",
+            stage="completed",
+            message="Ringkasan selesai!",
+            task_id=task_id,
+            summary=summary,
+            formatted_summary=formatted_summary,
+            transcription=text,
+            content_type=content_type,
+            transcription_length=len(text),
+            timings=timer.finish(),
+            processing_info={
+                "transcription_chars": len(text),
+                "summary_chars": len(str(summary)),
+                "compression_ratio": f"{round(len(str(summary)) / len(text) * 100, 2)}%",
+                "content_type": content_type,
+                "content_type_detected": content_type_detected,
+                "cache_hit": {"summary": summary_cached}
+            }
+        )
+    except asyncio.CancelledError:
+        await task_store.aupdate(task_id, status="failed", error=INTERRUPTED_ERROR, timings=timer.finish())
         raise
     except Exception as e:
-        logging.error(f"❌ Critical error in summarize_youtube: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error kritis: {str(e)}")
+        logging.error(f"❌ Task {task_id}: Gagal meringkas teks: {str(e)}")
+        await task_store.aupdate(task_id, status="failed", error=str(e), timings=timer.finish())
+
+@router.post("/summarize/youtube/")
+async def summarize_youtube(request: YouTubeRequest):
+    """
+    Terima link YouTube dan jadwalkan download, transkripsi dan ringkasan
+    sebagai job di background. Progress dipantau lewat /summarize/status/{task_id}.
+    """
+    youtube_url = request.youtube_url.strip()
+    logging.info(f"🎬 URL: {youtube_url}")
+    
+    # Validasi URL
+    if not validate_youtube_url(youtube_url):
+        logging.error(f"❌ Invalid YouTube URL: {youtube_url}")
+        raise HTTPException(status_code=400, detail="URL YouTube tidak valid. Pastikan URL berasal dari YouTube.")
+    
+    # Validasi config
+    try:
+        Config.validate_config()
+    except ValueError as e:
+        logging.error(f"❌ Config validation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    job_queue = get_job_queue()
+    if job_queue.is_full():
+        raise_queue_full(job_queue.retry_after())
+
+    task_id = str(uuid.uuid4())
+    task_store = get_task_store()
+    await task_store.aset(task_id, {
+        "status": "queued",
+        "stage": "queued",
+        "message": "Menunggu giliran diproses...",
+        "youtube_url": youtube_url,
+        "worker": worker_id()
+    })
+    timer = StageTimer(task_store, task_id)
+    priority = await youtube_job_priority(youtube_url)
+
+    try:
+        job = lambda: process_youtube_job(task_id, youtube_url, timer)
+        position = job_queue.submit(
+            task_id, traced_job(task_id, "youtube", job), priority=priority,
+            on_drop=dropped_job(task_store, task_id)
+        )
+    except QueueFull as e:
+        await task_store.adelete(task_id)
+        raise_queue_full(e.retry_after)
+
+    return {
+        "task_id": task_id,
+        "status": "queued",
+        "queue_position": position,
+        "eta_seconds": job_queue.eta(task_id)
+    }
+
+TEXT_OPENAPI = {
+    "parameters": [{
+        "name": "content_type",
+        "in": "query",
+        "required": False,
+        "schema": {"type": "string", "enum": list(CONTENT_TYPES)}
+    }],
+    "requestBody": {
+        "required": True,
+        "content": {
+            "text/plain": {"schema": {"type": "string"}},
+            "application/json": {"schema": TextRequest.model_json_schema()}
+        }
+    }
+}
+
+async def receive_text_request(request: Request) -> Tuple[str, Optional[str]]:
+    """
+    Body `text/plain` dibaca streaming (content type dari query), body JSON
+    `{"text", "content_type"}` untuk transkrip kecil. Mengembalikan (teks, content_type).
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_TEXT_SIZE:
+        raise HTTPException(status_code=413, detail=f"Teks melebihi batas {MAX_TEXT_SIZE // (1024 * 1024)}MB")
+    mime, options = parse_options_header(request.headers.get("content-type", ""))
+    charset = options.get(b"charset", b"utf-8").decode("latin-1")
+    if mime == b"application/json":
+        try:
+            body = TextRequest.model_validate_json(await receive_text(request.stream(), MAX_TEXT_SIZE, encoding=charset))
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        return body.text, body.content_type or request.query_params.get("content_type")
+    if mime not in (b"", b"text/plain"):
+        raise HTTPException(status_code=415, detail="Gunakan text/plain atau application/json")
+    return await receive_text(request.stream(), MAX_TEXT_SIZE, encoding=charset), request.query_params.get("content_type")
+
+@router.post("/summarize/text", openapi_extra=TEXT_OPENAPI)
+async def summarize_text(request: Request):
+    """
+    Ringkas transkrip yang sudah ada tanpa Whisper: langsung ke deteksi content
+    type (jika `content_type` tidak diisi), chunking dan Gemini sebagai job di
+    background. Body `text/plain` dibaca streaming sehingga transkrip berukuran
+    beberapa MB tidak perlu dikirim sebagai satu string JSON.
+    """
+    job_queue = get_job_queue()
+    if job_queue.is_full():
+        raise_queue_full(job_queue.retry_after())
+
+    try:
+        text, content_type = await receive_text_request(request)
+    except UploadError as e:
+        logging.warning(f"⚠️ Teks ditolak: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if content_type and content_type not in CONTENT_TYPES:
+        raise HTTPException(status_code=422, detail=f"content_type harus salah satu dari {', '.join(CONTENT_TYPES)}")
+    if not text.strip():
+        raise HTTPException(status_code=422, detail="Teks tidak boleh kosong")
+
+    task_id = str(uuid.uuid4())
+    task_store = get_task_store()
+    await task_store.aset(task_id, {
+        "status": "queued", "stage": "queued", "message": "Menunggu giliran diproses...", "worker": worker_id()
+    })
+    timer = StageTimer(task_store, task_id)
+
+    try:
+        # Tanpa transkripsi, jadi didahulukan seperti transkripsi yang ada di cache
+        job = lambda: process_text_job(task_id, text, content_type, timer)
+        position = job_queue.submit(task_id, traced_job(task_id, "text", job), priority=0, on_drop=dropped_job(task_store, task_id))
+    except QueueFull as e:
+        await task_store.adelete(task_id)
+        raise_queue_full(e.retry_after)
+
+    return {
+        "task_id": task_id,
+        "status": "queued",
+        "queue_position": position,
+        "eta_seconds": job_queue.eta(task_id)
+    }
 
 @router.post("/summarize/youtube/test")
 async def test_youtube_endpoint(request: YouTubeRequest):
@@ -251,100 +542,247 @@ async def test_youtube_endpoint(request: YouTubeRequest):
         "test_mode": True
     }
 
-@router.post("/summarize/")
-async def summarize(file: UploadFile = File(...)):
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+@router.post("/summarize/", openapi_extra=UPLOAD_OPENAPI)
+async def summarize(request: Request):
     """
     Endpoint untuk mengunggah file MP3 dan memproses ringkasan.
+    Body multipart dibaca secara streaming: file ditulis per chunk, di-hash dan
+    divalidasi header MP3-nya dalam satu kali lewat, dan upload dihentikan
+    begitu ukurannya melebihi MAX_FILE_SIZE.
     """
-    # Validasi file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Nama file tidak valid")
-    
-    if not file.filename.lower().endswith('.mp3'):
-        raise HTTPException(status_code=400, detail="Hanya file MP3 yang didukung")
-    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"Ukuran file melebihi batas {MAX_FILE_SIZE // (1024 * 1024)}MB")
+
     # Validasi config
     try:
         Config.validate_config()
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    # Tolak lebih awal saat antrean penuh, sebelum file ditulis ke disk
+    job_queue = get_job_queue()
+    if job_queue.is_full():
+        raise_queue_full(job_queue.retry_after())
+
     task_id = str(uuid.uuid4())
-    unique_filename = f"{task_id}_{file.filename}"
-    temp_file_path = os.path.join(Config().TEMP_FOLDER, unique_filename)
     
     # Pastikan folder temp ada
     os.makedirs(Config().TEMP_FOLDER, exist_ok=True)
 
+    upload_started = time.monotonic()
     try:
-        with open(temp_file_path, "wb") as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
+        upload = await receive_upload(
+            request.headers.get("content-type", ""),
+            request.stream(),
+            Config().TEMP_FOLDER,
+            MAX_FILE_SIZE,
+            filename_prefix=f"{task_id}_",
+        )
+    except UploadError as e:
+        logging.warning(f"⚠️ Upload ditolak: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logging.error(f"❌ Gagal menyimpan file: {str(e)}")
         raise HTTPException(status_code=500, detail="Gagal menyimpan file")
+    temp_file_path = upload.path
+    audio_hash = upload.sha256
 
-    tasks[task_id] = {"status": "processing", "message": "Transkripsi sedang berjalan..."}
+    task_store = get_task_store()
+    await task_store.aset(task_id, {
+        "status": "queued", "stage": "queued", "message": "Menunggu giliran diproses...", "worker": worker_id()
+    })
+    timer = StageTimer(task_store, task_id)
+    timer.record("uploading", timer.started - upload_started)
 
-    async def process_task():
-        try:
-            logging.info(f"🔍 Task {task_id}: Memulai transkripsi...")
-            transcription = transcribe_audio(temp_file_path, language="id")
+    try:
+        # File kecil (lebih cepat diproses) mendapat prioritas lebih tinggi
+        job = lambda: process_upload_job(task_id, temp_file_path, audio_hash, timer)
+        position = job_queue.submit(
+            task_id, traced_job(task_id, "upload", job), priority=upload.size,
+            on_drop=dropped_job(task_store, task_id, [temp_file_path])
+        )
+    except QueueFull as e:
+        await task_store.adelete(task_id)
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise_queue_full(e.retry_after)
+
+    return {
+        "task_id": task_id,
+        "status": "queued",
+        "queue_position": position,
+        "eta_seconds": job_queue.eta(task_id)
+    }
+
+async def process_upload_job(task_id: str, temp_file_path: str, audio_hash: str, timer: StageTimer):
+    """Job background file upload: transkripsi lalu ringkasan; file sementara dihapus setelahnya."""
+    task_store = timer.store
+    try:
+        timer.record("queued", timer.clock() - timer.started)
+        await task_store.aupdate(task_id, status="processing")
+        logging.info(f"🔍 Task {task_id}: Memulai transkripsi...")
+        with timer.stage("transcribing", "Transkripsi sedang berjalan..."):
+            transcription, transcript_cached = await transcribe_with_cache(
+                temp_file_path, audio_hash, language="id",
+                on_segment=partial_transcript_publisher(task_store, task_id)
+            )
+
+        if not transcription.strip():
+            await task_store.aupdate(task_id, status="failed", error="Transkripsi kosong atau gagal.", timings=timer.finish())
+            return
 
-            if not transcription.strip():
-                tasks[task_id] = {"status": "failed", "error": "Transkripsi kosong atau gagal."}
-                return
+        logging.info(f"✅ Task {task_id}: Transkripsi selesai ({len(transcription)} karakter).")
 
-            tasks[task_id]["message"] = "Transkripsi selesai. Memulai proses ringkasan..."
-            logging.info(f"✅ Task {task_id}: Transkripsi selesai ({len(transcription)} karakter).")
-            
+        with timer.stage("summarizing", "Transkripsi selesai. Memulai proses ringkasan..."):
             # Langkah 1: Summarization dengan content type detection
-            content_type = detect_content_type(transcription)
+            with timer.measure("content_detection"):
+                content_type = await detect_content_type_async(transcription)
             logging.info(f"🔍 Content type detected for task {task_id}: {content_type}")
-            
-            final_summary = summarize_with_gemini(transcription, content_type=content_type)
-            
-            tasks[task_id] = {
-                "status": "completed",
-                "transcription": transcription,
-                "summary": final_summary,
-                "task_id": task_id,
+            final_summary, summary_cached = await summarize_with_cache(
+                transcription, content_type, task_id=task_id,
+                on_delta=summary_delta_publisher(task_store, task_id)
+            )
+
+        with timer.measure("formatting"):
+            formatted_summary = await format_summary_async(final_summary, transcription, content_type)
+
+        # aupdate, bukan aset: field dari submit (mis. batch_id, batch_index, worker) tetap ada
+        await task_store.aupdate(
+            task_id,
+            status="completed",
+            stage="completed",
+            message="Ringkasan selesai!",
+            timings=timer.finish(),
+            transcription=transcription,
+            summary=final_summary,
+            formatted_summary=formatted_summary,
+            task_id=task_id,
+            content_type=content_type,
+            metadata={
+                "original_length": len(transcription),
+                # str(): ringkasan terstruktur berupa dict, samakan dengan job YouTube dan teks
+                "summary_length": len(str(final_summary)),
+                "compression_ratio": f"{round(len(str(final_summary)) / len(transcription) * 100, 2) if transcription else 0}%",
+                "generated_at": datetime.now().isoformat(),
                 "content_type": content_type,
-                "metadata": {
-                    "original_length": len(transcription),
-                    "summary_length": len(final_summary),
-                    "compression_ratio": f"{round(len(final_summary) / len(transcription) * 100, 2) if transcription else 0}%",
-                    "generated_at": datetime.now().isoformat(),
-                    "content_type": content_type,
-                    "content_type_detected": True
+                "content_type_detected": True,
+                "cache_hit": {
+                    "transcription": transcript_cached,
+                    "summary": summary_cached
                 }
             }
+        )
 
-        except Exception as e:
-            logging.error(f"❌ Task {task_id}: Error - {str(e)}")
-            tasks[task_id] = {"status": "failed", "error": str(e)}
-        finally:
-            # Hapus file audio sementara
-            if os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logging.info(f"🗑️ Task {task_id}: File audio sementara dihapus.")
-                except Exception as e:
-                    logging.warning(f"⚠️ Task {task_id}: Gagal menghapus file audio sementara: {str(e)}")
-
-    asyncio.create_task(process_task())
-    return {"task_id": task_id, "status": "processing"}
+    except asyncio.CancelledError:
+        await task_store.aupdate(task_id, status="failed", error=INTERRUPTED_ERROR, timings=timer.finish())
+        raise
+    except Exception as e:
+        logging.error(f"❌ Task {task_id}: Error - {str(e)}")
+        await task_store.aupdate(task_id, status="failed", error=str(e), timings=timer.finish())
+    finally:
+        # Hapus file audio sementara
+        if os.path.exists(temp_file_path):
+            try:
+                os.remove(temp_file_path)
+                logging.info(f"🗑️ Task {task_id}: File audio sementara dihapus.")
+            except Exception as e:
+                logging.warning(f"⚠️ Task {task_id}: Gagal menghapus file audio sementara: {str(e)}")
+
+
+async def get_task_status(request_id: str, include_transcription: bool = False) -> Optional[Dict]:
+    task_status = await get_task_store().aget(request_id, include_transcription=include_transcription)
+    if task_status and task_status.get("status") == "queued":
+        job_queue = get_job_queue()
+        task_status["queue_position"] = job_queue.position(request_id)
+        task_status["eta_seconds"] = job_queue.eta(request_id)
+    return task_status
 
 @router.get("/summarize/status/{request_id}")
-async def check_status(request_id: str):
+async def check_status(request_id: str, include_transcription: bool = False):
     """
     Endpoint untuk memeriksa status pemrosesan berdasarkan task_id.
+    Transkripsi lengkap hanya disertakan jika include_transcription=true.
     """
     if not request_id:
         raise HTTPException(status_code=400, detail="Task ID tidak valid")
     
-    task_status = tasks.get(request_id, {"status": "not_found"})
+    task_status = await get_task_status(request_id, include_transcription=include_transcription)
+    if not task_status:
+        return {"status": "not_found"}
     return task_status
 
+# Jeda reconnect (ms) yang disarankan ke EventSource
+SSE_RETRY_MS = 3000
+
+@router.get("/summarize/events/{request_id}")
+async def stream_events(request_id: str, request: Request, last_event_id: Optional[int] = None):
+    """
+    Stream Server-Sent Events untuk satu task: perubahan tahap, progress,
+    potongan transkripsi dan hasil akhir, sehingga klien tidak perlu polling.
+    Resume memakai header Last-Event-ID (dikirim otomatis oleh EventSource)
+    atau query `last_event_id`.
+    """
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            last_event_id = None
+    config = Config()
+
+    async def event_stream():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        events = get_event_broker().stream(
+            request_id,
+            snapshot=lambda: get_task_status(request_id),
+            last_event_id=last_event_id,
+            heartbeat=config.SSE_HEARTBEAT_SECONDS,
+            log=get_task_store(),
+            poll_interval=config.SSE_POLL_INTERVAL
+        )
+        async for event in events:
+            # Komentar SSE sebagai heartbeat menjaga koneksi tetap hidup di proxy
+            yield ": ping\n\n" if event is None else event.encode()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/summarize/stats")
+async def summarize_stats():
+    """
+    Statistik runtime: level bucket rate limit Gemini, kedalaman antrean, status
+    circuit breaker upstream, dan hit/miss cache.
+    """
+    return {
+        "gemini_rate_limit": get_gemini_limiter().stats(),
+        "circuit_breakers": circuit_breaker_stats(),
+        "job_queue": get_job_queue().stats(),
+        "http": get_http_stats(),
+        "cpu_pool": get_cpu_executor().stats(),
+        "transcription": get_transcription_backend().stats(),
+        "event_subscribers": get_event_broker().subscriber_count(),
+        "cache": await get_result_cache().astats()
+    }
+
 @router.get("/health")
 async def health_check():
     """
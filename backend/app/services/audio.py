@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from app.config import Config
+
+# Pre-processing dilewati untuk file yang sudah sangat kecil
+MIN_PREPROCESS_BYTES = 256 * 1024
+FFMPEG_TIMEOUT = 300
+
+# Codec dan ekstensi output per format yang diterima Whisper API
+AUDIO_FORMATS = {
+    "opus": ("libopus", ".ogg"),
+    "mp3": ("libmp3lame", ".mp3"),
+}
+
+@dataclass
+class PreprocessResult:
+    path: str
+    original_bytes: int
+    processed_bytes: int
+    seconds: float
+    applied: bool
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+def ffmpeg_available(ffmpeg_path: str = "ffmpeg") -> bool:
+    return shutil.which(ffmpeg_path) is not None
+
+def build_ffmpeg_command(input_path: str, output_path: str, audio_format: str, sample_rate: int, bitrate: str, ffmpeg_path: str = "ffmpeg") -> List[str]:
+    """Downmix ke mono, resample dan kompres ulang; stream video/cover art dibuang."""
+    codec, _ = AUDIO_FORMATS[audio_format]
+    command = [
+        ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+        "-i", input_path,
+        "-vn", "-map_metadata", "-1",
+        "-ac", "1", "-ar", str(sample_rate),
+        "-c:a", codec, "-b:a", bitrate,
+    ]
+    if audio_format == "opus":
+        # Profil VoIP Opus dioptimalkan untuk ucapan
+        command += ["-application", "voip"]
+    return command + [output_path]
+
+async def preprocess_audio(input_path: str, output_dir: Optional[str] = None) -> PreprocessResult:
+    """
+    Ubah audio menjadi mono, sample rate rendah dan bitrate rendah sebelum
+    dikirim ke Whisper. Jika pre-processing dimatikan, ffmpeg tidak tersedia,
+    gagal, atau hasilnya tidak lebih kecil, file asli yang dipakai.
+    """
+    config = Config()
+    if not config.AUDIO_PREPROCESS:
+        return PreprocessResult(input_path, 0, 0, 0.0, False)
+    original_bytes = os.path.getsize(input_path)
+    unchanged = PreprocessResult(input_path, original_bytes, original_bytes, 0.0, False)
+    if original_bytes < MIN_PREPROCESS_BYTES:
+        return unchanged
+    audio_format = config.AUDIO_FORMAT.lower()
+    if audio_format not in AUDIO_FORMATS:
+        logging.warning(f"⚠️ AUDIO_FORMAT '{audio_format}' tidak dikenal, pre-processing dilewati")
+        return unchanged
+    if not ffmpeg_available(config.FFMPEG_PATH):
+        logging.warning("⚠️ ffmpeg tidak ditemukan, audio dikirim tanpa pre-processing")
+        return unchanged
+
+    _, extension = AUDIO_FORMATS[audio_format]
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(output_dir or os.path.dirname(input_path), f"{base_name}.whisper{extension}")
+    command = build_ffmpeg_command(
+        input_path, output_path, audio_format, config.AUDIO_SAMPLE_RATE, config.AUDIO_BITRATE, config.FFMPEG_PATH
+    )
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=FFMPEG_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        stderr = b"timeout"
+    seconds = time.perf_counter() - started
+
+    if process.returncode != 0 or not os.path.exists(output_path):
+        logging.warning(f"⚠️ Pre-processing audio gagal, memakai file asli: {stderr.decode(errors='replace')[-300:]}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return unchanged
+
+    processed_bytes = os.path.getsize(output_path)
+    if processed_bytes >= original_bytes:
+        os.remove(output_path)
+        return PreprocessResult(input_path, original_bytes, original_bytes, seconds, False)
+
+    logging.info(
+        f"🎛️ Audio diproses dalam {seconds:.2f}s: {original_bytes / 1024 / 1024:.1f}MB → "
+        f"{processed_bytes / 1024 / 1024:.1f}MB ({audio_format}, {config.AUDIO_SAMPLE_RATE}Hz mono)"
+    )
+    return PreprocessResult(output_path, original_bytes, processed_bytes, seconds, True)
@@ -0,0 +1,326 @@
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from app.config import Config
+from app.services.metrics import get_metrics
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+YOUTUBE_ID_PATTERN = re.compile(r'(?:v=|youtu\.be/|embed/|/v/|shorts/)([\w-]{6,})')
+
+def extract_youtube_video_id(url: str) -> Optional[str]:
+    match = YOUTUBE_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+class CacheBackend(abc.ABC):
+    """Antarmuka backend cache. Nilai harus bisa di-serialize ke JSON."""
+    # True jika operasinya melakukan I/O yang tidak boleh dijalankan di event loop
+    blocking_io = False
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Nilai tersimpan, None jika tidak ada atau kedaluwarsa."""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Simpan nilai; `ttl` dalam detik, None berarti tanpa kedaluwarsa."""
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        """Hapus satu entri."""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Hapus semua entri."""
+
+    def size_bytes(self) -> int:
+        return 0
+
+    def purge_expired(self) -> int:
+        return 0
+
+class NullCache(CacheBackend):
+    """Backend yang tidak menyimpan apa pun (CACHE_BACKEND=none)."""
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+    def clear(self):
+        pass
+
+class MemoryCache(CacheBackend):
+    """
+    LRU in-process dengan batas total ukuran (byte JSON) dan TTL per entri.
+    """
+
+    def __init__(self, max_bytes: int, clock=time.time):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= self.clock():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        expires_at = self.clock() + ttl if ttl else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def purge_expired(self) -> int:
+        now = self.clock()
+        with self._lock:
+            expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+
+    def size_bytes(self) -> int:
+        return self._size
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache persisten di file SQLite, bertahan setelah restart dan bisa dipakai
+    bersama beberapa worker pada host yang sama. Seperti MemoryCache, total
+    ukuran dibatasi `max_bytes`: entri yang paling lama tidak dipakai
+    (`last_used`) dibuang lebih dulu.
+    """
+    blocking_io = True
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, size INTEGER NOT NULL, last_used REAL)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(cache)")]
+            if "last_used" not in columns:
+                # File cache dari versi sebelum ada batas ukuran
+                conn.execute("ALTER TABLE cache ADD COLUMN last_used REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache (last_used)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Satu koneksi per cache, dipakai bergantian oleh thread pemanggil
+        with self._lock:
+            with self._conn:
+                yield self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = self.clock()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = self.clock()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, data, now + ttl if ttl else None, size, now),
+            )
+            # Sisakan entri terbaru selama total ukurannya masih muat
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS total FROM cache) "
+                "WHERE total > ?)",
+                (self.max_bytes,),
+            )
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (self.clock(),))
+            return cursor.rowcount
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def size_bytes(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+class ResultCache:
+    """
+    Cache dua level untuk pipeline ringkasan:
+    - transkripsi, dengan key hash audio (atau ID video YouTube) + bahasa
+    - ringkasan, dengan key hash transkripsi + content type + versi prompt
+    Mencatat hit/miss per level. Kode di event loop memakai varian async
+    (`aget_transcript`, ...) agar backend SQLite dibaca di thread lain.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: Optional[float] = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.counters: Dict[str, Dict[str, int]] = {
+            "transcript": {"hits": 0, "misses": 0},
+            "summary": {"hits": 0, "misses": 0},
+        }
+
+    def _get(self, level: str, key: str) -> Optional[Any]:
+        try:
+            value = self.backend.get(f"{level}:{key}")
+        except Exception as e:
+            logging.warning(f"⚠️ Cache {level} gagal dibaca: {str(e)}")
+            value = None
+        self.counters[level]["hits" if value is not None else "misses"] += 1
+        get_metrics().cache_lookups.inc(level=level, result="hit" if value is not None else "miss")
+        return value
+
+    def _set(self, level: str, key: str, value: Any):
+        try:
+            self.backend.set(f"{level}:{key}", value, self.ttl)
+        except Exception as e:
+            logging.warning(f"⚠️ Cache {level} gagal ditulis: {str(e)}")
+
+    @staticmethod
+    def transcript_key(source_hash: str, language: str) -> str:
+        return f"{source_hash}:{language}"
+
+    @staticmethod
+    def summary_key(transcription: str, content_type: str, prompt_version: str) -> str:
+        return f"{hash_text(transcription)}:{content_type}:{prompt_version}"
+
+    def get_transcript(self, source_hash: str, language: str) -> Optional[str]:
+        return self._get("transcript", self.transcript_key(source_hash, language))
+
+    def set_transcript(self, source_hash: str, language: str, transcription: str):
+        self._set("transcript", self.transcript_key(source_hash, language), transcription)
+
+    def get_summary(self, transcription: str, content_type: str, prompt_version: str) -> Optional[Any]:
+        return self._get("summary", self.summary_key(transcription, content_type, prompt_version))
+
+    def set_summary(self, transcription: str, content_type: str, prompt_version: str, summary: Any):
+        self._set("summary", self.summary_key(transcription, content_type, prompt_version), summary)
+
+    async def _call(self, func, *args):
+        if not self.backend.blocking_io:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def aget_transcript(self, source_hash: str, language: str) -> Optional[str]:
+        return await self._call(self.get_transcript, source_hash, language)
+
+    async def aset_transcript(self, source_hash: str, language: str, transcription: str):
+        await self._call(self.set_transcript, source_hash, language, transcription)
+
+    async def aget_summary(self, transcription: str, content_type: str, prompt_version: str) -> Optional[Any]:
+        # Hash transkripsi (bisa beberapa MB) juga dihitung di thread
+        return await self._call(self.get_summary, transcription, content_type, prompt_version)
+
+    async def aset_summary(self, transcription: str, content_type: str, prompt_version: str, summary: Any):
+        await self._call(self.set_summary, transcription, content_type, prompt_version, summary)
+
+    def purge_expired(self) -> int:
+        return self.backend.purge_expired()
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            size = self.backend.size_bytes()
+        except Exception:
+            size = None
+        return {
+            "backend": type(self.backend).__name__,
+            "size_bytes": size,
+            "ttl_seconds": self.ttl,
+            **self.counters,
+        }
+
+    async def astats(self) -> Dict[str, Any]:
+        return await self._call(self.stats)
+
+def create_cache_backend(config: Config) -> CacheBackend:
+    backend = config.CACHE_BACKEND.lower()
+    if backend == "sqlite":
+        return SQLiteCache(config.CACHE_PATH, config.CACHE_MAX_BYTES)
+    if backend == "none":
+        return NullCache()
+    if backend != "memory":
+        logging.warning(f"⚠️ CACHE_BACKEND '{backend}' tidak dikenal, menggunakan memory")
+    return MemoryCache(config.CACHE_MAX_BYTES)
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_settings: Optional[Tuple] = None
+
+def get_result_cache() -> ResultCache:
+    """Cache hasil bersama untuk proses ini, dibuat ulang jika konfigurasi cache berubah."""
+    global _result_cache, _result_cache_settings
+    config = Config()
+    settings = (config.CACHE_BACKEND, config.CACHE_PATH, config.CACHE_MAX_BYTES, config.CACHE_TTL)
+    if _result_cache is None or settings != _result_cache_settings:
+        _result_cache = ResultCache(create_cache_backend(config), ttl=config.CACHE_TTL or None)
+        _result_cache_settings = settings
+    return _result_cache
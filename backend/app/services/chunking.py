@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import re
+from typing import Callable, List, Optional
+from app.config import Config
+from app.services.cpu_executor import run_cpu_bound
+from app.services.gemini import (
+    create_chunk_summary_prompt,
+    create_combine_summary_prompt,
+    detect_content_type_async,
+    summarize_with_gemini_async,
+    summarize_with_gemini_stream,
+)
+
+# Batas level reduce hierarkis, untuk mencegah loop jika ringkasan tidak menyusut
+MAX_REDUCE_DEPTH = 3
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+
+def split_sentences(text: str) -> List[str]:
+    """Pecah teks menjadi kalimat berdasarkan tanda baca akhir dan baris baru."""
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def _split_long_sentence(sentence: str, chunk_size: int) -> List[str]:
+    """Potong kalimat yang lebih panjang dari chunk_size di batas spasi terdekat."""
+    pieces = []
+    while len(sentence) > chunk_size:
+        cut = sentence.rfind(' ', 0, chunk_size)
+        if cut <= 0:
+            cut = chunk_size
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+def split_text_into_chunks(text: str, chunk_size: int, overlap: int = 0) -> List[str]:
+    """
+    Bagi teks menjadi chunk maksimal `chunk_size` karakter tanpa memotong kalimat.
+    Setiap chunk diawali kalimat-kalimat terakhir chunk sebelumnya (maksimal
+    `overlap` karakter) agar konteks antar chunk tetap terjaga.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size harus lebih besar dari 0")
+    overlap = max(0, min(overlap, chunk_size // 2))
+
+    sentences = []
+    for sentence in split_sentences(text):
+        sentences.extend(_split_long_sentence(sentence, chunk_size))
+
+    chunks = []
+    current: List[str] = []
+    current_len = 0
+    for sentence in sentences:
+        added_len = len(sentence) + (1 if current else 0)
+        if current and current_len + added_len > chunk_size:
+            chunks.append(" ".join(current))
+            # Bawa ekor chunk sebelumnya sebagai overlap
+            tail: List[str] = []
+            tail_len = 0
+            for previous in reversed(current):
+                if tail_len + len(previous) + 1 > overlap:
+                    break
+                tail.insert(0, previous)
+                tail_len += len(previous) + 1
+            if tail_len + len(sentence) > chunk_size:
+                tail, tail_len = [], 0
+            current = tail
+            current_len = max(tail_len - 1, 0)
+            added_len = len(sentence) + (1 if current else 0)
+        current.append(sentence)
+        current_len += added_len
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def _summary_to_text(summary) -> str:
+    if isinstance(summary, dict):
+        return json.dumps(summary, ensure_ascii=False)
+    return str(summary)
+
+async def _map_chunks(chunks: List[str], content_type: str, task_id: str, fanout: int) -> List[str]:
+    """
+    Ringkas semua chunk secara paralel (dibatasi fanout dan rate limiter Gemini).
+    Chunk yang gagal membatalkan chunk lain yang masih berjalan atau mengantre.
+    """
+    semaphore = asyncio.Semaphore(max(1, fanout))
+    total = len(chunks)
+
+    async def summarize_chunk(index: int, chunk: str) -> str:
+        async with semaphore:
+            logging.info(f"🧩 Meringkas chunk {index}/{total} ({len(chunk)} karakter)")
+            prompt = create_chunk_summary_prompt(chunk, index, total, content_type)
+            summary = await summarize_with_gemini_async(chunk, system_prompt=prompt, content_type=content_type, task_id=task_id)
+            return _summary_to_text(summary)
+
+    tasks = [asyncio.ensure_future(summarize_chunk(i, chunk)) for i, chunk in enumerate(chunks, 1)]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                logging.warning(f"⚠️ Chunk gagal, {len(pending)} chunk lain dibatalkan: {str(task.exception())}")
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        # Jangan habiskan kuota Gemini untuk job yang sudah gagal atau dibatalkan
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _summarize_final(text: str, content_type: str, task_id: str, on_delta: Optional[Callable[[str], None]], system_prompt: str = None):
+    """Request yang menghasilkan ringkasan akhir; di-stream jika `on_delta` diberikan."""
+    if on_delta is None:
+        return await summarize_with_gemini_async(text, system_prompt=system_prompt, content_type=content_type, task_id=task_id)
+    return await summarize_with_gemini_stream(text, system_prompt=system_prompt, content_type=content_type, task_id=task_id, on_delta=on_delta)
+
+async def summarize_transcript_async(text: str, content_type: str = None, task_id: str = None, on_delta: Optional[Callable[[str], None]] = None):
+    """
+    Ringkas transkripsi dengan map-reduce. Transkripsi pendek langsung dikirim
+    ke Gemini; transkripsi panjang dipecah menjadi chunk, diringkas paralel,
+    lalu digabung. Jika gabungan ringkasan masih melebihi MAX_SUMMARY_SIZE,
+    proses diulang secara hierarkis sebelum reduce terakhir. Dengan `on_delta`,
+    hanya request akhir (langsung atau reduce) yang di-stream.
+    """
+    config = Config()
+    if not content_type:
+        content_type = await detect_content_type_async(text)
+
+    if len(text) <= config.CHUNKING_THRESHOLD:
+        return await _summarize_final(text, content_type, task_id, on_delta)
+
+    level_text = text
+    for depth in range(1, MAX_REDUCE_DEPTH + 1):
+        chunks = await run_cpu_bound("chunking", split_text_into_chunks, level_text, config.MAX_CHUNK_SIZE, config.CHUNK_OVERLAP)
+        logging.info(f"📊 Map-reduce level {depth}: {len(chunks)} chunk dari {len(level_text)} karakter")
+        partials = await _map_chunks(chunks, content_type, task_id, config.CHUNK_FANOUT)
+        combined = "\n\n".join(f"[Bagian {i}] {partial}" for i, partial in enumerate(partials, 1))
+        if len(combined) <= config.MAX_SUMMARY_SIZE or len(chunks) == 1 or len(combined) >= len(level_text):
+            break
+        level_text = combined
+
+    prompt = create_combine_summary_prompt(combined, content_type)
+    return await _summarize_final(combined, content_type, task_id, on_delta, system_prompt=prompt)
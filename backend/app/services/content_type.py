@@ -0,0 +1,242 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Keyword per jenis konten. Urutan kategori menentukan pemenang jika skor sama.
+CONTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'meeting': (
+        'meeting', 'rapat', 'diskusi', 'presentasi', 'agenda', 'peserta',
+        'moderator', 'ketua', 'sekretaris', 'notulen', 'keputusan', 'action item',
+        'deadline', 'timeline', 'follow up', 'next meeting', 'meeting berikutnya'
+    ),
+    'document': (
+        'dokumen', 'laporan', 'artikel', 'paper', 'research', 'studi', 'analisis',
+        'penelitian', 'survey', 'data', 'statistik', 'hasil', 'kesimpulan'
+    ),
+    'presentation': (
+        'slide', 'presentasi', 'demo', 'pitch', 'proposal', 'overview',
+        'introduction', 'background', 'objectives', 'conclusion'
+    ),
+    'interview': (
+        'interview', 'wawancara', 'pertanyaan', 'jawaban', 'responden',
+        'interviewee', 'interviewer', 'question', 'answer', 'response'
+    ),
+    'lecture': (
+        'kuliah', 'lecture', 'materi', 'pembelajaran', 'education', 'training',
+        'workshop', 'seminar', 'tutorial', 'course', 'lesson'
+    ),
+    'youtube': (
+        'youtube', 'video', 'channel', 'subscriber', 'view', 'like', 'comment',
+        'upload', 'stream', 'live', 'podcast', 'vlog', 'tutorial', 'review',
+        'unboxing', 'gaming', 'music', 'entertainment', 'content creator',
+        'youtuber', 'streamer', 'influencer', 'viral', 'trending'
+    ),
+}
+
+# Semua jenis konten yang punya prompt; 'general' dipakai jika tidak ada keyword yang cocok
+CONTENT_TYPES: Tuple[str, ...] = (*CONTENT_KEYWORDS, 'general')
+
+# Pola kalimat "A ... B" pada baris yang sama: (kategori, bobot, token A, token B)
+SEQUENCE_RULES = (
+    ('meeting', 3, ('selamat', 'good', 'hello', 'hi'), ('pagi', 'siang', 'sore', 'malam')),
+    ('youtube', 2, ('welcome', 'hello', 'hi'), ('channel', 'video')),
+    ('youtube', 3, ("don't forget", 'jangan lupa'), ('subscribe', 'like')),
+    ('youtube', 2, ('thanks', 'terima kasih'), ('watching', 'menonton')),
+)
+# Token yang cukup muncul sekali: (kategori, bobot, token)
+PRESENCE_RULES = (
+    ('presentation', 3, ('slide',)),
+    ('youtube', 3, ('subscribe', 'like', 'comment', 'share')),
+)
+# Token diikuti angka di baris yang sama, mis. "pertanyaan nomor 3"
+DIGIT_AFTER_RULES = (
+    ('interview', 2, ('pertanyaan', 'question')),
+)
+# Token diikuti spasi lalu angka, mis. "bab 2"
+NUMBERED_RULES = (
+    ('document', 2, ('bab', 'chapter', 'section')),
+)
+
+DIGIT = re.compile(r'\d')
+WHITESPACE_DIGIT = re.compile(r'\s+\d')
+
+# Jumlah hasil klasifikasi transkripsi yang di-cache
+CACHE_SIZE = 128
+
+def build_trie_pattern(tokens: Iterable[str]) -> str:
+    """
+    Gabungkan token menjadi satu regex berbentuk trie (prefix bersama
+    difaktorkan) sehingga tiap posisi teks hanya mencoba satu cabang per huruf.
+    Token terpanjang diutamakan.
+    """
+    trie: dict = {}
+    for token in tokens:
+        node = trie
+        for char in token:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+class ContentTypeClassifier:
+    """
+    Klasifikasi jenis konten dalam satu kali lewat teks. Semua keyword dan
+    token pola digabung menjadi satu regex trie; setiap kemunculan (termasuk
+    yang tumpang tindih) dipakai untuk menghitung skor keyword sekaligus aturan
+    pola kalimat, dengan hasil yang sama seperti pemindaian per keyword.
+    """
+
+    def __init__(self, keywords: Dict[str, Tuple[str, ...]] = CONTENT_KEYWORDS):
+        self.keywords = keywords
+        tokens = {keyword for words in keywords.values() for keyword in words}
+        for _, _, first, second in SEQUENCE_RULES:
+            tokens.update(first + second)
+        for rules in (PRESENCE_RULES, DIGIT_AFTER_RULES, NUMBERED_RULES):
+            for _, _, words in rules:
+                tokens.update(words)
+        # Baris baru ikut dipindai karena pola "A ... B" tidak melewati baris
+        tokens.add('\n')
+        self._pattern = re.compile(build_trie_pattern(tokens))
+        # Token yang merupakan prefix dari token lain muncul di posisi yang sama
+        self._prefixes: Dict[str, List[str]] = {
+            token: [other for other in tokens if token.startswith(other)] for token in tokens
+        }
+        # Peran token dalam aturan pola; token tanpa peran cukup dicatat kemunculannya
+        self._roles: Dict[str, List[Tuple[str, int]]] = {}
+        for index, (_, _, first, second) in enumerate(SEQUENCE_RULES):
+            for token in first:
+                self._roles.setdefault(token, []).append(('first', index))
+            for token in second:
+                self._roles.setdefault(token, []).append(('second', index))
+        for kind, rules in (('digit', DIGIT_AFTER_RULES), ('numbered', NUMBERED_RULES)):
+            for index, (_, _, words) in enumerate(rules):
+                for token in words:
+                    self._roles.setdefault(token, []).append((kind, index))
+
+    def scores(self, text: str) -> Dict[str, int]:
+        text = text.lower()
+        found = set()
+        # Aturan pola yang terpenuhi, per (jenis aturan, indeks)
+        hits = set()
+        # Akhir kemunculan token A paling awal di baris ini, per aturan "A ... B"
+        first_ends: Dict[int, int] = {}
+        # Posisi sampai mana baris sudah diperiksa tanpa angka, per aturan angka
+        digit_checked: Dict[int, int] = {}
+        roles = self._roles
+        prefixes = self._prefixes
+        search = self._pattern.search
+        pos = 0
+        while True:
+            match = search(text, pos)
+            if match is None:
+                break
+            start = match.start()
+            # Lanjut dari karakter berikutnya agar kemunculan tumpang tindih ikut terhitung
+            pos = start + 1
+            for token in prefixes[match.group()]:
+                if token == '\n':
+                    first_ends.clear()
+                    continue
+                found.add(token)
+                if token in roles:
+                    self._apply_roles(text, roles[token], start, start + len(token), hits, first_ends, digit_checked)
+
+        scores = {
+            category: sum(1 for keyword in words if keyword in found)
+            for category, words in self.keywords.items()
+        }
+        for category, weight, words in PRESENCE_RULES:
+            if found.intersection(words):
+                scores[category] += weight
+        for kind, rules in (('sequence', SEQUENCE_RULES), ('digit', DIGIT_AFTER_RULES), ('numbered', NUMBERED_RULES)):
+            for index, rule in enumerate(rules):
+                if (kind, index) in hits:
+                    category, weight = rule[0], rule[1]
+                    scores[category] += weight
+        return scores
+
+    @staticmethod
+    def _apply_roles(text, token_roles, start, end, hits, first_ends, digit_checked):
+        for role, index in token_roles:
+            if role == 'first':
+                if index not in first_ends or end < first_ends[index]:
+                    first_ends[index] = end
+            elif role == 'second':
+                if index in first_ends and start >= first_ends[index]:
+                    hits.add(('sequence', index))
+            elif role == 'digit':
+                # Sisa baris setelah kemunculan sebelumnya sudah diperiksa tanpa hasil
+                if ('digit', index) in hits or end < digit_checked.get(index, 0):
+                    continue
+                line_end = text.find('\n', end)
+                line_end = len(text) if line_end == -1 else line_end
+                digit_checked[index] = line_end
+                if DIGIT.search(text, end, line_end):
+                    hits.add(('digit', index))
+            elif ('numbered', index) not in hits and WHITESPACE_DIGIT.match(text, end):
+                hits.add(('numbered', index))
+
+    def classify(self, text: str) -> str:
+        scores = self.scores(text)
+        content_type = max(scores, key=scores.get)
+        return content_type if scores[content_type] > 0 else 'general'
+
+def sample_text(text: str, max_chars: int, windows: int = 4) -> str:
+    """
+    Ambil sampel terbatas dari transkripsi panjang: `windows` potongan yang
+    tersebar merata (awal, tengah, akhir) dengan total sekitar `max_chars`.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    windows = max(1, windows)
+    size = max_chars // windows
+    stride = (len(text) - size) / max(1, windows - 1)
+    # Dipisah baris baru agar pola "A ... B" tidak menyambung antar potongan
+    return "\n".join(text[int(i * stride):int(i * stride) + size] for i in range(windows))
+
+_classifier: Optional[ContentTypeClassifier] = None
+_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_classifier() -> ContentTypeClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = ContentTypeClassifier()
+    return _classifier
+
+def cached_content_type(text: str, sample_chars: int = 0) -> Optional[str]:
+    """
+    Jenis konten dari cache. Kunci cache memakai hash string Python (dihitung
+    sekali per objek string) dan panjang teks.
+    """
+    key = (len(text), hash(text), sample_chars)
+    with _cache_lock:
+        content_type = _cache.get(key)
+        if content_type is not None:
+            _cache.move_to_end(key)
+        return content_type
+
+def remember_content_type(text: str, sample_chars: int, content_type: str):
+    with _cache_lock:
+        _cache[(len(text), hash(text), sample_chars)] = content_type
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def classify_content_type(text: str, sample_chars: int = 0) -> str:
+    """
+    Jenis konten transkripsi, di-cache per teks, jadi pemanggilan berulang
+    untuk transkripsi yang sama tidak memindai ulang.
+    """
+    content_type = cached_content_type(text, sample_chars)
+    if content_type is None:
+        content_type = get_classifier().classify(sample_text(text, sample_chars))
+        remember_content_type(text, sample_chars, content_type)
+    return content_type
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import Config
+from app.services.metrics import get_metrics
+
+@dataclass(frozen=True)
+class SharedText:
+    """Referensi teks UTF-8 di shared memory; hanya nama segmen dan ukurannya yang di-pickle."""
+    name: str
+    size: int
+
+def share_text(text: str) -> Tuple[SharedText, SharedMemory]:
+    data = text.encode("utf-8")
+    segment = SharedMemory(create=True, size=max(1, len(data)))
+    segment.buf[:len(data)] = data
+    return SharedText(segment.name, len(data)), segment
+
+def load_shared_text(ref: SharedText) -> str:
+    segment = SharedMemory(name=ref.name)
+    try:
+        return str(segment.buf[:ref.size], "utf-8")
+    finally:
+        segment.close()
+
+def release_segments(segments: List[SharedMemory]):
+    for segment in segments:
+        segment.close()
+        segment.unlink()
+
+def _run_in_worker(func: Callable, args: tuple) -> Tuple[Any, float]:
+    """Dijalankan di proses worker. Mengembalikan (hasil, detik proses)."""
+    started = time.perf_counter()
+    args = tuple(load_shared_text(arg) if isinstance(arg, SharedText) else arg for arg in args)
+    return func(*args), time.perf_counter() - started
+
+def text_size(args: tuple) -> int:
+    return sum(len(arg) for arg in args if isinstance(arg, str))
+
+class CpuExecutor:
+    """
+    Menjalankan pekerjaan teks yang berat CPU (deteksi content type, chunking,
+    formatting) di pool proses agar event loop tetap melayani request lain.
+    Argumen teks di bawah `inline_threshold` karakter tetap diproses langsung
+    di loop karena ongkos kirim ke proses lain lebih mahal dari pekerjaannya;
+    teks di atas `shared_memory_threshold` dikirim lewat shared memory, bukan
+    di-pickle melalui pipe. Fungsi yang dikirim harus fungsi level modul.
+    """
+
+    def __init__(self, workers: int = 2, inline_threshold: int = 100_000, shared_memory_threshold: int = 1_000_000):
+        self.workers = max(0, workers)
+        self.inline_threshold = inline_threshold
+        self.shared_memory_threshold = shared_memory_threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: worker tidak mewarisi thread/lock proses server
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                logging.info(f"🧮 Pool proses CPU siap: {self.workers} worker")
+            return self._executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, task: str, func: Callable, *args, size: Optional[int] = None) -> Any:
+        """
+        Jalankan `func(*args)` di loop atau di pool proses; `task` dipakai sebagai
+        label metric. `size` menggantikan total panjang argumen teks sebagai ukuran
+        pekerjaan jika ongkos CPU-nya tidak sebanding dengan teks yang dikirim.
+        """
+        metrics = get_metrics()
+        if self.workers == 0 or (text_size(args) if size is None else size) < self.inline_threshold:
+            return self._run_inline(task, func, args)
+
+        started = time.perf_counter()
+        segments: List[SharedMemory] = []
+        shared_bytes = 0
+        try:
+            sent = []
+            for arg in args:
+                if isinstance(arg, str) and len(arg) >= self.shared_memory_threshold:
+                    ref, segment = share_text(arg)
+                    segments.append(segment)
+                    shared_bytes += ref.size
+                    arg = ref
+                sent.append(arg)
+            executor = self._get_executor()
+            future = executor.submit(_run_in_worker, func, tuple(sent))
+        except BaseException:
+            release_segments(segments)
+            raise
+        # Segmen baru dilepas setelah worker selesai membacanya, juga jika pemanggil
+        # dibatalkan lebih dulu (job yang sudah berjalan di worker tidak ikut berhenti)
+        future.add_done_callback(lambda _: release_segments(segments))
+        # Menyalin teks ke shared memory dan mengirim job tetap memakai waktu loop
+        metrics.cpu_seconds.inc(time.perf_counter() - started, task=task, placement="on_loop")
+        try:
+            result, seconds = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            logging.warning(f"⚠️ Pool proses CPU rusak saat menjalankan {task}, dijalankan di loop")
+            self._reset_executor(executor)
+            return self._run_inline(task, func, args)
+        metrics.cpu_seconds.inc(seconds, task=task, placement="off_loop")
+        metrics.cpu_tasks.inc(task=task, placement="off_loop")
+        if shared_bytes:
+            metrics.cpu_shared_memory_bytes.inc(shared_bytes, task=task)
+        return result
+
+    def _run_inline(self, task: str, func: Callable, args: tuple) -> Any:
+        metrics = get_metrics()
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            metrics.cpu_seconds.inc(time.perf_counter() - started, task=task, placement="on_loop")
+            metrics.cpu_tasks.inc(task=task, placement="on_loop")
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "started": self._executor is not None,
+            "inline_threshold": self.inline_threshold,
+            "shared_memory_threshold": self.shared_memory_threshold,
+        }
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+_cpu_executor: Optional[CpuExecutor] = None
+_cpu_executor_settings: Optional[Tuple] = None
+
+def get_cpu_executor() -> CpuExecutor:
+    """Executor CPU bersama untuk proses ini, dibuat ulang jika konfigurasinya berubah."""
+    global _cpu_executor, _cpu_executor_settings
+    config = Config()
+    settings = (config.CPU_POOL_WORKERS, config.CPU_INLINE_THRESHOLD, config.CPU_SHARED_MEMORY_THRESHOLD)
+    if _cpu_executor is None or settings != _cpu_executor_settings:
+        if _cpu_executor is not None:
+            _cpu_executor.close()
+        _cpu_executor = CpuExecutor(*settings)
+        _cpu_executor_settings = settings
+    return _cpu_executor
+
+def close_cpu_executor():
+    global _cpu_executor, _cpu_executor_settings
+    if _cpu_executor is not None:
+        _cpu_executor.close()
+    _cpu_executor = None
+    _cpu_executor_settings = None
+
+async def run_cpu_bound(task: str, func: Callable, *args, size: Optional[int] = None) -> Any:
+    return await get_cpu_executor().run(task, func, *args, size=size)
@@ -0,0 +1,300 @@
+import asyncio
+import inspect
+import json
+import logging
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Union
+
+# Jumlah event terakhir per task yang disimpan untuk resume (Last-Event-ID)
+EVENT_HISTORY = 200
+# Jumlah task yang riwayat event-nya disimpan di memori (LRU)
+MAX_TASKS = 1000
+# Event yang belum dibaca subscriber lambat sebelum ia dianggap tertinggal
+SUBSCRIBER_QUEUE_SIZE = 256
+# Event penutup stream; sama dengan status final di task store
+TERMINAL_EVENTS = ("completed", "failed")
+# Jeda default antar pembacaan log event bersama (detik)
+POLL_INTERVAL = 0.5
+
+@dataclass
+class TaskEvent:
+    id: int
+    event: str
+    data: Dict[str, Any]
+
+    def encode(self) -> str:
+        """Format Server-Sent Events."""
+        return f"id: {self.id}\nevent: {self.event}\ndata: {json.dumps(self.data, ensure_ascii=False)}\n\n"
+
+def record_events(record: Dict[str, Any], fields: Dict[str, Any]) -> List[tuple]:
+    """
+    Turunkan event dari perubahan record task: `fields` adalah field yang baru
+    ditulis, `record` adalah record lengkap setelah perubahan.
+    """
+    status = record.get("status")
+    if "status" in fields and status in TERMINAL_EVENTS:
+        return [(status, record)]
+    events = []
+    if "stage" in fields:
+        events.append(("stage", {
+            "stage": record.get("stage"),
+            "status": status,
+            "message": record.get("message"),
+            "timings": record.get("timings"),
+        }))
+    if "progress" in fields:
+        events.append(("progress", {"stage": record.get("stage"), **(record.get("progress") or {})}))
+    if not events and "status" in fields:
+        events.append(("status", {"status": status, "message": record.get("message")}))
+    return events
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False
+
+    def deliver(self, event: TaskEvent):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Event dibuang; stream akan mengirim ulang snapshot status terkini
+            self.lagged = True
+
+class TaskEventBroker:
+    """
+    Pub/sub event task di dalam proses. Task store mempublikasikan event setiap
+    kali record berubah sehingga klien SSE tidak perlu polling. Setiap task
+    punya nomor event yang naik terus dan riwayat pendek untuk resume. Event
+    job di worker lain dibaca dari log bersama task store oleh satu poller per
+    task di proses ini, lalu diteruskan ke semua subscriber lokalnya.
+    """
+
+    def __init__(self, history: int = EVENT_HISTORY, max_tasks: int = MAX_TASKS):
+        self.history = history
+        self.max_tasks = max_tasks
+        self._lock = threading.Lock()
+        self._logs: "OrderedDict[str, Deque[TaskEvent]]" = OrderedDict()
+        self._sequences: Dict[str, int] = {}
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+
+    def publish(self, task_id: str, event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> TaskEvent:
+        """`event_id` diisi jika event sudah mendapat id dari log bersama."""
+        with self._lock:
+            sequence = self._sequences.get(task_id, 0) + 1 if event_id is None else event_id
+            self._sequences[task_id] = max(sequence, self._sequences.get(task_id, 0))
+            task_event = TaskEvent(sequence, event, data)
+            log = self._logs.get(task_id)
+            if log is None:
+                log = self._logs[task_id] = deque(maxlen=self.history)
+            log.append(task_event)
+            self._logs.move_to_end(task_id)
+            self._evict()
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for subscriber in subscribers:
+            self._deliver(subscriber, task_event)
+        return task_event
+
+    def _evict(self):
+        excess = len(self._logs) - self.max_tasks
+        if excess <= 0:
+            return
+        # Task terlama dibuang lebih dulu, kecuali yang sedang ditonton klien
+        idle = [task_id for task_id in self._logs if task_id not in self._subscribers]
+        for task_id in idle[:excess]:
+            self._logs.pop(task_id)
+            self._sequences.pop(task_id, None)
+
+    @staticmethod
+    def _deliver(subscriber: _Subscriber, task_event: TaskEvent):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is subscriber.loop:
+            subscriber.deliver(task_event)
+            return
+        try:
+            subscriber.loop.call_soon_threadsafe(subscriber.deliver, task_event)
+        except RuntimeError:
+            # Loop subscriber sudah ditutup
+            pass
+
+    def forget(self, task_id: str):
+        with self._lock:
+            self._logs.pop(task_id, None)
+            self._sequences.pop(task_id, None)
+
+    def last_event_id(self, task_id: str) -> int:
+        with self._lock:
+            return self._sequences.get(task_id, 0)
+
+    def replay(self, task_id: str, after: int) -> Optional[List[TaskEvent]]:
+        """
+        Event setelah id `after`. None berarti riwayat tidak lengkap (terpotong,
+        dibuang, atau server restart) sehingga klien perlu snapshot status.
+        """
+        with self._lock:
+            sequence = self._sequences.get(task_id, 0)
+            if after > sequence:
+                return None
+            if after == sequence:
+                return []
+            log = self._logs.get(task_id)
+            if not log or log[0].id > after + 1:
+                return None
+            return [task_event for task_event in log if task_event.id > after]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _subscribe(self, task_id: str) -> _Subscriber:
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscriber)
+        return subscriber
+
+    def _unsubscribe(self, task_id: str, subscriber: _Subscriber):
+        poller = None
+        with self._lock:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(task_id, None)
+                    poller = self._pollers.pop(task_id, None)
+        if poller is not None:
+            poller.cancel()
+
+    def _start_poller(self, task_id: str, log, after: int, interval: float):
+        """Jalankan poller log bersama untuk `task_id` jika belum ada di proses ini."""
+        with self._lock:
+            poller = self._pollers.get(task_id)
+            # Subscriber yang sudah terdaftar menerima semua event setelah posisinya
+            # sendiri dibaca, jadi poller yang sedang berjalan bisa dipakai bersama
+            if poller is not None and not poller.done() and poller.get_loop() is asyncio.get_running_loop():
+                return
+            self._pollers[task_id] = asyncio.get_running_loop().create_task(self._poll(task_id, log, after, interval))
+
+    async def _poll(self, task_id: str, log, after: int, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                task_events = await log.aevents_after(task_id, after)
+            except Exception as e:
+                logging.warning(f"⚠️ Gagal membaca log event task {task_id}: {str(e)}")
+                continue
+            if not task_events:
+                continue
+            after = task_events[-1].id
+            with self._lock:
+                subscribers = list(self._subscribers.get(task_id, ()))
+            for task_event in task_events:
+                for subscriber in subscribers:
+                    subscriber.deliver(task_event)
+
+    async def stream(
+        self,
+        task_id: str,
+        snapshot: Callable[[], Union[Optional[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]],
+        last_event_id: Optional[int] = None,
+        heartbeat: float = 15.0,
+        log=None,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> AsyncIterator[Optional[TaskEvent]]:
+        """
+        Stream event task sampai event final. Koneksi baru (atau resume yang
+        riwayatnya sudah hilang) diawali event `status` berisi snapshot record;
+        resume dengan `last_event_id` memutar ulang event yang terlewat.
+        `snapshot` boleh berupa fungsi async (mis. membaca task store di thread I/O).
+        None di-yield setiap `heartbeat` detik tanpa event.
+
+        `log` adalah task store dengan log event bersama (`shared_events`):
+        riwayat resume dibaca dari sana, dan jika job task berjalan di worker
+        lain log diperiksa setiap `poll_interval` detik oleh satu poller per
+        task (bukan per stream). Di setiap heartbeat snapshot diambil ulang dan
+        stream ditutup jika task ternyata sudah final.
+        """
+        if log is not None and not log.shared_events:
+            log = None
+        subscriber = self._subscribe(task_id)
+        try:
+            last_sent = 0
+            backlog = None
+            if last_event_id is not None:
+                backlog = await log.aevents_after(task_id, last_event_id) if log else self.replay(task_id, last_event_id)
+            if backlog is None:
+                snapshot_event = await self._snapshot(task_id, snapshot, log)
+                yield snapshot_event
+                if self._is_final(snapshot_event):
+                    return
+                last_sent = snapshot_event.id
+            else:
+                for task_event in backlog:
+                    yield task_event
+                    if task_event.event in TERMINAL_EVENTS:
+                        return
+                last_sent = last_event_id if not backlog else backlog[-1].id
+
+            if log and await log.aowned_elsewhere(task_id):
+                self._start_poller(task_id, log, last_sent, poll_interval)
+            while True:
+                try:
+                    pending = [await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)]
+                except asyncio.TimeoutError:
+                    pending = None
+                if subscriber.lagged:
+                    subscriber.lagged = False
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    snapshot_event = await self._snapshot(task_id, snapshot, log)
+                    yield snapshot_event
+                    if self._is_final(snapshot_event):
+                        return
+                    last_sent = snapshot_event.id
+                    continue
+                if pending is not None:
+                    # Event yang sudah terkirim (mis. lewat snapshot) dilewati
+                    for task_event in pending:
+                        if task_event.id > last_sent:
+                            yield task_event
+                            last_sent = task_event.id
+                            if task_event.event in TERMINAL_EVENTS:
+                                return
+                else:
+                    yield None
+                    # Event final bisa terlewat (mis. job di worker lain tanpa log bersama)
+                    snapshot_event = await self._snapshot(task_id, snapshot, log)
+                    if self._is_final(snapshot_event):
+                        status = snapshot_event.data["status"]
+                        event = status if status in TERMINAL_EVENTS else snapshot_event.event
+                        yield TaskEvent(snapshot_event.id, event, snapshot_event.data)
+                        return
+        finally:
+            self._unsubscribe(task_id, subscriber)
+
+    @staticmethod
+    def _is_final(snapshot_event: TaskEvent) -> bool:
+        return snapshot_event.event != "status" or snapshot_event.data.get("status") in TERMINAL_EVENTS
+
+    async def _snapshot(self, task_id: str, snapshot: Callable, log=None) -> TaskEvent:
+        # Nomor event dibaca sebelum record agar event sesudahnya tidak terlewat
+        sequence = await log.alast_event_id(task_id) if log else self.last_event_id(task_id)
+        record = snapshot()
+        if inspect.isawaitable(record):
+            record = await record
+        if record is None:
+            return TaskEvent(sequence, "not_found", {"status": "not_found"})
+        return TaskEvent(sequence, "status", record)
+
+_event_broker: Optional[TaskEventBroker] = None
+
+def get_event_broker() -> TaskEventBroker:
+    global _event_broker
+    if _event_broker is None:
+        _event_broker = TaskEventBroker()
+    return _event_broker
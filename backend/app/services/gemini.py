@@ -1,91 +1,38 @@
+import httpx
 import requests
 import logging
 import json
-import re
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional
 from app.config import Config
-import time
+from app.services.content_type import cached_content_type, classify_content_type, remember_content_type
+from app.services.cpu_executor import run_cpu_bound
+from app.services.http_clients import get_http_client
+from app.services.metrics import get_metrics
+from app.services.tracing import get_tracer
+from app.services.rate_limiter import RateLimitExceeded, estimate_tokens, get_gemini_limiter, rate_limit_key
+from app.services.resilience import RetryBudget, retry_async, retry_sync
+
+GEMINI_TIMEOUT = 30
+# Naikkan setiap kali prompt berubah agar ringkasan lama di cache tidak dipakai lagi
+PROMPT_VERSION = "1"
 
 def detect_content_type(text: str) -> str:
     """
-    Mendeteksi jenis konten berdasarkan analisis teks.
+    Mendeteksi jenis konten berdasarkan analisis teks (satu kali lewat,
+    hasil di-cache per transkripsi; lihat app/services/content_type.py).
     """
-    text_lower = text.lower()
-    
-    # Keywords untuk berbagai jenis konten
-    meeting_keywords = [
-        'meeting', 'rapat', 'diskusi', 'presentasi', 'agenda', 'peserta', 
-        'moderator', 'ketua', 'sekretaris', 'notulen', 'keputusan', 'action item',
-        'deadline', 'timeline', 'follow up', 'next meeting', 'meeting berikutnya'
-    ]
-    
-    document_keywords = [
-        'dokumen', 'laporan', 'artikel', 'paper', 'research', 'studi', 'analisis',
-        'penelitian', 'survey', 'data', 'statistik', 'hasil', 'kesimpulan'
-    ]
-    
-    presentation_keywords = [
-        'slide', 'presentasi', 'demo', 'pitch', 'proposal', 'overview',
-        'introduction', 'background', 'objectives', 'conclusion'
-    ]
-    
-    interview_keywords = [
-        'interview', 'wawancara', 'pertanyaan', 'jawaban', 'responden',
-        'interviewee', 'interviewer', 'question', 'answer', 'response'
-    ]
-    
-    lecture_keywords = [
-        'kuliah', 'lecture', 'materi', 'pembelajaran', 'education', 'training',
-        'workshop', 'seminar', 'tutorial', 'course', 'lesson'
-    ]
-    
-    youtube_keywords = [
-        'youtube', 'video', 'channel', 'subscriber', 'view', 'like', 'comment',
-        'upload', 'stream', 'live', 'podcast', 'vlog', 'tutorial', 'review',
-        'unboxing', 'gaming', 'music', 'entertainment', 'content creator',
-        'youtuber', 'streamer', 'influencer', 'viral', 'trending'
-    ]
-    
-    # Hitung kemunculan keywords
-    scores = {
-        'meeting': sum(1 for keyword in meeting_keywords if keyword in text_lower),
-        'document': sum(1 for keyword in document_keywords if keyword in text_lower),
-        'presentation': sum(1 for keyword in presentation_keywords if keyword in text_lower),
-        'interview': sum(1 for keyword in interview_keywords if keyword in text_lower),
-        'lecture': sum(1 for keyword in lecture_keywords if keyword in text_lower),
-        'youtube': sum(1 for keyword in youtube_keywords if keyword in text_lower)
-    }
-    
-    # Deteksi berdasarkan pola kalimat
-    if re.search(r'(selamat|good|hello|hi).*(pagi|siang|sore|malam)', text_lower):
-        scores['meeting'] += 3
-    
-    if re.search(r'(pertanyaan|question).*\d+', text_lower):
-        scores['interview'] += 2
-    
-    if re.search(r'(slide|slide\s+\d+)', text_lower):
-        scores['presentation'] += 3
-    
-    if re.search(r'(bab|chapter|section)\s+\d+', text_lower):
-        scores['document'] += 2
-    
-    # YouTube-specific patterns
-    if re.search(r'(subscribe|like|comment|share)', text_lower):
-        scores['youtube'] += 3
-    
-    if re.search(r'(welcome|hello|hi).*(channel|video)', text_lower):
-        scores['youtube'] += 2
-    
-    if re.search(r'(don\'t forget|jangan lupa).*(subscribe|like)', text_lower):
-        scores['youtube'] += 3
-    
-    if re.search(r'(thanks|terima kasih).*(watching|menonton)', text_lower):
-        scores['youtube'] += 2
-    
-    # Return jenis dengan score tertinggi
-    content_type = max(scores, key=scores.get)
-    return content_type if scores[content_type] > 0 else 'general'
+    return classify_content_type(text, Config().CONTENT_TYPE_SAMPLE_CHARS)
+
+async def detect_content_type_async(text: str) -> str:
+    """detect_content_type untuk handler async: transkripsi besar dipindai di pool proses CPU."""
+    sample_chars = Config().CONTENT_TYPE_SAMPLE_CHARS
+    content_type = cached_content_type(text, sample_chars)
+    if content_type is None:
+        content_type = await run_cpu_bound("content_detection", classify_content_type, text, sample_chars)
+        # Cache di proses worker tidak terlihat dari sini
+        remember_content_type(text, sample_chars, content_type)
+    return content_type
 
 def create_meeting_summary_prompt(text: str) -> str:
     return f"""
@@ -162,6 +109,40 @@ FORMAT OUTPUT:
 Ringkasan naratif dalam 1-3 paragraf.
 """
 
+CONTENT_LABELS = {
+    'meeting': 'meeting',
+    'document': 'dokumen',
+    'presentation': 'presentasi',
+    'interview': 'wawancara',
+    'lecture': 'materi pembelajaran',
+    'youtube': 'video YouTube',
+    'general': 'teks'
+}
+
+def create_chunk_summary_prompt(text: str, part: int, total: int, content_type: str = 'general') -> str:
+    label = CONTENT_LABELS.get(content_type, 'teks')
+    return f"""
+TUGAS: Berikut adalah bagian {part} dari {total} sebuah {label}. Ringkas bagian ini dalam bentuk paragraf narasi yang padat. Pertahankan semua poin penting, keputusan, nama, angka, dan tindak lanjut yang disebutkan. Jangan gunakan format JSON atau bullet point.
+
+BAGIAN {part}/{total}:
+{text}
+
+FORMAT OUTPUT:
+Ringkasan naratif bagian ini dalam 1-2 paragraf.
+"""
+
+def create_combine_summary_prompt(text: str, content_type: str = 'general') -> str:
+    label = CONTENT_LABELS.get(content_type, 'teks')
+    return f"""
+TUGAS: Berikut adalah kumpulan ringkasan per bagian dari sebuah {label}, disusun berurutan. Gabungkan menjadi satu ringkasan akhir dalam bentuk paragraf narasi yang jelas, singkat, dan mudah dipahami. Hilangkan pengulangan antar bagian. Jangan gunakan format JSON atau bullet point.
+
+RINGKASAN PER BAGIAN:
+{text}
+
+FORMAT OUTPUT:
+Ringkasan naratif dalam 1-3 paragraf.
+"""
+
 def create_content_specific_prompt(text: str, content_type: str = None) -> str:
     """
     Membuat prompt berdasarkan jenis konten yang terdeteksi.
@@ -698,18 +679,10 @@ def parse_gemini_response(summary_text: str):
         # Fallback: kembalikan format text sederhana
         return {"format": "text", "content": summary_text}
 
-def summarize_with_gemini(text: str, system_prompt: str = None, content_type: str = None):
+def build_gemini_payload(text: str, system_prompt: str = None, content_type: str = None) -> Dict[str, Any]:
     """
-    Kirim permintaan ringkasan ke Google Gemini 2.0 Flash API dengan output yang terstruktur.
-    Return dict jika Gemini mengembalikan JSON, string jika tidak bisa di-parse.
+    Membangun payload request generateContent untuk teks yang akan diringkas.
     """
-    if not Config.GEMINI_API_KEY:
-        raise Exception("GEMINI_API_KEY tidak tersedia di environment variables")
-
-    url = f"{Config.GEMINI_API_URL}?key={Config.GEMINI_API_KEY}"
-    headers = {"Content-Type": "application/json"}
-    max_retries = 3
-    backoff = 2
     if not content_type:
         content_type = detect_content_type(text)
         logging.info(f"🔍 Content type detected: {content_type}")
@@ -717,47 +690,220 @@ def summarize_with_gemini(text: str, system_prompt: str = None, content_type: st
         prompt = system_prompt
     else:
         prompt = create_content_specific_prompt(text, content_type)
-    payload = {
+    return {
         "contents": [
             {"role": "user", "parts": [{"text": prompt}]}
         ]
     }
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+
+def extract_gemini_text(data: Dict[str, Any]) -> str:
+    """Ambil teks kandidat pertama dari response Gemini."""
+    return data["candidates"][0]["content"]["parts"][0]["text"]
+
+def summary_from_text(summary_text: str):
+    """Hasil akhir ringkasan: dict jika Gemini mengembalikan JSON, string jika tidak."""
+    parsed_data = parse_gemini_response(summary_text)
+    if isinstance(parsed_data, dict) and parsed_data.get("format") != "text":
+        return parsed_data
+    return summary_text
+
+def format_summary(summary, original_text: str, content_type: str) -> str:
+    """Ubah ringkasan (dict/string) menjadi teks siap tampil dengan format_*_output."""
+    parsed_data = summary if isinstance(summary, dict) else parse_gemini_response(str(summary))
+    if not isinstance(parsed_data, dict):
+        parsed_data = {"format": "text", "content": str(summary)}
+    try:
+        return format_content_specific_output(parsed_data, original_text, content_type or "general")
+    except Exception as e:
+        logging.warning(f"[Gemini] Gagal memformat ringkasan: {e}")
+        return summary if isinstance(summary, str) else json.dumps(summary, ensure_ascii=False, indent=2)
+
+async def format_summary_async(summary, original_text: str, content_type: str) -> str:
+    """
+    format_summary untuk handler async. Ongkosnya sebanding dengan ukuran
+    ringkasan (transkripsi hanya dihitung panjangnya), jadi hanya ringkasan
+    yang sangat besar yang dikirim ke pool proses CPU.
+    """
+    size = len(summary) if isinstance(summary, str) else len(str(summary))
+    return await run_cpu_bound("formatting", format_summary, summary, original_text, content_type, size=size)
+
+def gemini_stream_url(api_url: str) -> str:
+    """Endpoint streamGenerateContent (format SSE) untuk model yang sama dengan GEMINI_API_URL."""
+    if api_url.endswith(":generateContent"):
+        api_url = api_url[:-len(":generateContent")] + ":streamGenerateContent"
+    return f"{api_url}?alt=sse"
+
+def parse_gemini_stream_line(line: str) -> Optional[str]:
+    """Ambil potongan teks dari satu baris `data:` stream SSE Gemini."""
+    if not line.startswith("data:"):
+        return None
+    data = json.loads(line[len("data:"):].strip())
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return None
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts) or None
+
+def gemini_span_attributes(prompt_tokens: int, content_type: Optional[str], task_id: Optional[str]) -> Dict[str, Any]:
+    attributes: Dict[str, Any] = {"prompt_tokens": prompt_tokens, "content_type": content_type or "auto"}
+    if task_id:
+        attributes["task_id"] = task_id
+    return attributes
+
+def summarize_with_gemini(text: str, system_prompt: str = None, content_type: str = None):
+    """
+    Kirim permintaan ringkasan ke Google Gemini 2.0 Flash API dengan output yang terstruktur.
+    Return dict jika Gemini mengembalikan JSON, string jika tidak bisa di-parse.
+    Setiap percobaan mengirim tepat satu request; retry diatur app.services.resilience.
+    """
+    if not Config.GEMINI_API_KEY:
+        raise Exception("GEMINI_API_KEY tidak tersedia di environment variables")
+
+    url = f"{Config.GEMINI_API_URL}?key={Config.GEMINI_API_KEY}"
+    headers = {"Content-Type": "application/json"}
+    payload = build_gemini_payload(text, system_prompt, content_type)
+
+    def attempt(number: int):
+        response = requests.post(url, headers=headers, json=payload, timeout=GEMINI_TIMEOUT)
+        response.raise_for_status()
+        return summary_from_text(extract_gemini_text(response.json()))
+
+    try:
+        return retry_sync("gemini", attempt)
+    except Exception as e:
+        logging.error(f"[Gemini] Error: {e}")
+        raise Exception(f"Gemini API error: {e}")
+
+async def summarize_with_gemini_async(text: str, system_prompt: str = None, content_type: str = None, task_id: str = None, client: Optional[httpx.AsyncClient] = None):
+    """
+    Versi async dari summarize_with_gemini. Request dan backoff retry berjalan
+    tanpa memblokir event loop, dan setiap percobaan antre di rate limiter
+    bersama (GEMINI_RPM / GEMINI_TPM / GEMINI_RPD) dengan giliran per task_id.
+    Request memakai client pooled bersama (keep-alive).
+    """
+    config = Config()
+    client = client or get_http_client("gemini")
+    if not config.GEMINI_API_KEY:
+        raise Exception("GEMINI_API_KEY tidak tersedia di environment variables")
+
+    url = f"{config.GEMINI_API_URL}?key={config.GEMINI_API_KEY}"
+    headers = {"Content-Type": "application/json"}
+    payload = build_gemini_payload(text, system_prompt, content_type)
+    limiter = get_gemini_limiter()
+    metrics = get_metrics()
+    tracer = get_tracer()
+    prompt_tokens = estimate_tokens(payload["contents"][0]["parts"][0]["text"])
+
+    async def attempt(number: int):
+        with tracer.span("gemini.rate_limit_wait"):
+            await limiter.acquire(prompt_tokens, key=rate_limit_key(task_id))
+        with tracer.span("gemini.attempt", {"attempt": number}) as span:
+            with metrics.upstream_attempt("gemini") as tracked:
+                response = await client.post(url, headers=headers, json=payload)
+                tracked.status = response.status_code
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code == 429:
+                limiter.report_throttled()
             response.raise_for_status()
-            data = response.json()
-            summary_text = data["candidates"][0]["content"]["parts"][0]["text"]
-            parsed_data = parse_gemini_response(summary_text)
-            # Jika hasil parse adalah dict dan bukan fallback format text, return dict
-            if isinstance(parsed_data, dict) and parsed_data.get("format") != "text":
-                return parsed_data
-            # Jika fallback, return string plain
-            return summary_text
-        except json.JSONDecodeError as e:
-            logging.warning(f"[Gemini] JSON parsing failed, using simple format: {e}")
-            fallback_prompt = create_simple_summary_prompt(text)
-            payload["contents"][0]["parts"][0]["text"] = fallback_prompt
+        return summary_from_text(extract_gemini_text(response.json()))
+
+    with tracer.span("gemini.generate", gemini_span_attributes(prompt_tokens, content_type, task_id)):
+        try:
+            return await retry_async("gemini", attempt)
+        except RateLimitExceeded as e:
+            logging.error(f"[Gemini] {e}")
+            raise
+        except Exception as e:
+            logging.error(f"[Gemini] Error: {e}")
+            raise Exception(f"Gemini API error: {e}")
+
+async def stream_gemini_deltas(text: str, system_prompt: str = None, content_type: str = None, task_id: str = None, client: Optional[httpx.AsyncClient] = None) -> AsyncIterator[str]:
+    """
+    Async generator potongan teks ringkasan dari endpoint streamGenerateContent.
+    Rate limiter, retry dan circuit breaker sama dengan summarize_with_gemini_async,
+    tetapi retry hanya dilakukan sebelum potongan pertama diterima agar teks
+    tidak terduplikasi.
+    """
+    config = Config()
+    client = client or get_http_client("gemini")
+    if not config.GEMINI_API_KEY:
+        raise Exception("GEMINI_API_KEY tidak tersedia di environment variables")
+
+    url = f"{gemini_stream_url(config.GEMINI_API_URL)}&key={config.GEMINI_API_KEY}"
+    headers = {"Content-Type": "application/json"}
+    payload = build_gemini_payload(text, system_prompt, content_type)
+    limiter = get_gemini_limiter()
+    metrics = get_metrics()
+    tracer = get_tracer()
+    budget = RetryBudget("gemini")
+    prompt_tokens = estimate_tokens(payload["contents"][0]["parts"][0]["text"])
+    # Span yang melewati `yield` tidak diaktifkan (activate=False): context-nya milik
+    # pemanggil, dan generator bisa ditutup dari context lain
+    with tracer.span("gemini.stream", gemini_span_attributes(prompt_tokens, content_type, task_id), activate=False) as stream_span:
+        attempt = 1
+        while True:
+            received = False
+            budget.before_attempt()
             try:
-                response = requests.post(url, headers=headers, json=payload, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-                summary_text = data["candidates"][0]["content"]["parts"][0]["text"]
-                return summary_text
-            except Exception as e2:
-                logging.warning(f"[Gemini] Fallback request failed: {e2}")
-                if attempt < max_retries - 1:
-                    time.sleep(backoff ** attempt)
-                else:
-                    logging.error(f"[Gemini] Error: {e2}")
-                    raise Exception(f"Gemini API error: {e2}")
-        except (requests.exceptions.RequestException, Exception) as e:
-            logging.warning(f"[Gemini] API request failed (attempt {attempt+1}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(backoff ** attempt)
-            else:
-                logging.error(f"[Gemini] Error: {e}")
-                raise Exception(f"Gemini API error: {e}")
+                with tracer.span("gemini.rate_limit_wait", parent=stream_span):
+                    await limiter.acquire(prompt_tokens, key=rate_limit_key(task_id))
+                # Durasi dihitung sampai stream selesai dibaca
+                with tracer.span("gemini.attempt", {"attempt": attempt}, parent=stream_span, activate=False) as span:
+                    with metrics.upstream_attempt("gemini") as tracked:
+                        async with client.stream("POST", url, headers=headers, json=payload) as response:
+                            tracked.status = response.status_code
+                            span.set_attribute("http.status_code", response.status_code)
+                            if response.status_code == 429:
+                                limiter.report_throttled()
+                            if response.is_error:
+                                await response.aread()
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                delta = parse_gemini_stream_line(line)
+                                if delta:
+                                    received = True
+                                    yield delta
+                budget.succeeded()
+                return
+            except RateLimitExceeded as e:
+                budget.breaker.release()
+                logging.error(f"[Gemini] {e}")
+                raise
+            except Exception as e:
+                delay = budget.failed(e, attempt)
+                if received:
+                    logging.error(f"[Gemini] Stream terputus setelah output diterima: {e}")
+                    raise Exception(f"Gemini API error: {e}")
+                if delay is None:
+                    logging.error(f"[Gemini] Error: {e}")
+                    raise Exception(f"Gemini API error: {e}")
+                await budget.sleep(delay, parent=stream_span)
+                attempt += 1
+            except BaseException:
+                # Generator ditutup/dibatalkan di tengah percobaan
+                budget.breaker.release()
+                raise
+
+async def summarize_with_gemini_stream(text: str, system_prompt: str = None, content_type: str = None, task_id: str = None, on_delta: Optional[Callable[[str], None]] = None):
+    """
+    Ringkas dengan streaming: setiap potongan teks diteruskan ke `on_delta`
+    begitu diterima, lalu teks lengkap diproses seperti summarize_with_gemini_async.
+    Jika stream terputus di tengah, ringkasan diminta ulang tanpa streaming.
+    """
+    parts: List[str] = []
+    try:
+        async for delta in stream_gemini_deltas(text, system_prompt, content_type, task_id):
+            parts.append(delta)
+            if on_delta:
+                on_delta(delta)
+    except RateLimitExceeded:
+        raise
+    except Exception as e:
+        if not parts:
+            raise
+        logging.warning(f"[Gemini] Streaming gagal, memakai request biasa: {e}")
+        return await summarize_with_gemini_async(text, system_prompt, content_type, task_id)
+    return summary_from_text("".join(parts))
 
 def create_summary_metadata(text: str, summary: str, content_type: str = None) -> Dict[str, Any]:
     """
@@ -0,0 +1,133 @@
+import logging
+from typing import Any, Dict, Optional
+import httpx
+from app.config import Config
+
+SERVICES = ("whisper", "gemini")
+
+class ConnectionStats:
+    """Hitung berapa request yang memakai ulang koneksi dari pool."""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+
+    @property
+    def reused(self) -> int:
+        return self.requests - self.new_connections
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused,
+            "reuse_ratio": round(self.reused / self.requests, 3) if self.requests else None,
+        }
+
+class ReuseTrackingTransport(httpx.AsyncHTTPTransport):
+    """
+    Transport httpx yang memakai trace httpcore untuk mendeteksi apakah request
+    membuka koneksi TCP baru atau memakai ulang koneksi keep-alive dari pool.
+    """
+
+    def __init__(self, service: str, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self.service = service
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        connected = False
+        parent_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict):
+            nonlocal connected
+            if event_name == "connection.connect_tcp.started":
+                connected = True
+            if parent_trace is not None:
+                await parent_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.stats.requests += 1
+            if connected:
+                self.stats.new_connections += 1
+            logging.debug(
+                f"🔌 {self.service}: {'koneksi baru' if connected else 'koneksi dipakai ulang'} "
+                f"(reuse {self.stats.reused}/{self.stats.requests})"
+            )
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class HttpClients:
+    """
+    Client httpx berumur panjang per upstream (Whisper, Gemini) dengan pool
+    koneksi keep-alive. Dibuat di lifespan aplikasi dan ditutup saat shutdown.
+    """
+
+    def __init__(self, config: Optional[Config] = None):
+        config = config or Config()
+        http2 = config.HTTP2
+        if http2 and not http2_available():
+            logging.warning("⚠️ HTTP2=true tetapi package 'h2' tidak terpasang (pip install httpx[http2]), memakai HTTP/1.1")
+            http2 = False
+        self.config = config
+        self.limits = httpx.Limits(
+            max_connections=config.HTTP_POOL_SIZE,
+            max_keepalive_connections=config.HTTP_POOL_SIZE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_SECONDS,
+        )
+        self.http2 = http2
+        self.stats: Dict[str, ConnectionStats] = {service: ConnectionStats() for service in SERVICES}
+        self.clients: Dict[str, httpx.AsyncClient] = {service: self._create_client(service) for service in SERVICES}
+
+    def _create_client(self, service: str) -> httpx.AsyncClient:
+        read_timeouts = {"whisper": self.config.WHISPER_TIMEOUT, "gemini": self.config.GEMINI_TIMEOUT}
+        transport = ReuseTrackingTransport(service, self.stats[service], http2=self.http2, limits=self.limits)
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(read_timeouts[service], connect=self.config.HTTP_CONNECT_TIMEOUT),
+        )
+
+    def get(self, service: str) -> httpx.AsyncClient:
+        """Client untuk `service`; jika sudah ditutup, hanya client itu yang dibuat ulang."""
+        client = self.clients[service]
+        if client.is_closed:
+            client = self.clients[service] = self._create_client(service)
+        return client
+
+    def stats_dict(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            **{service: stats.as_dict() for service, stats in self.stats.items()},
+        }
+
+    async def aclose(self):
+        for client in self.clients.values():
+            await client.aclose()
+
+_http_clients: Optional[HttpClients] = None
+
+def set_http_clients(clients: Optional[HttpClients]):
+    """Pasang client bersama (dipanggil dari lifespan aplikasi)."""
+    global _http_clients
+    _http_clients = clients
+
+def get_http_client(service: str) -> httpx.AsyncClient:
+    """
+    Client pooled untuk `service`. Jika lifespan belum berjalan (skrip, test),
+    client dibuat saat pertama kali dibutuhkan.
+    """
+    global _http_clients
+    if _http_clients is None:
+        _http_clients = HttpClients()
+    return _http_clients.get(service)
+
+def get_http_stats() -> Optional[Dict[str, Any]]:
+    return _http_clients.stats_dict() if _http_clients is not None else None
@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.config import Config
+
+# Estimasi awal durasi satu job sebelum ada data historis (detik)
+DEFAULT_JOB_DURATION = 60.0
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+class QueueFull(Exception):
+    """Antrean penuh; klien sebaiknya mencoba lagi setelah `retry_after` detik."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Antrean penuh, coba lagi dalam {retry_after} detik")
+        self.retry_after = retry_after
+
+class JobQueue:
+    """
+    Antrean job dengan prioritas dan jumlah worker terbatas.
+
+    Job dengan nilai prioritas lebih kecil dijalankan lebih dulu (mis. ukuran
+    file, sehingga file pendek tidak menunggu di belakang file panjang).
+    Setiap detik menunggu mengurangi prioritas sebesar `aging` sehingga job
+    besar tetap mendapat giliran walau job kecil terus berdatangan.
+    Worker dijalankan pada event loop yang sedang aktif saat job pertama masuk.
+    Saat `stop`, job yang sedang berjalan dibatalkan (CancelledError) dan
+    `on_drop` job yang masih antre dipanggil agar status dan filenya dibereskan.
+    """
+
+    def __init__(self, workers: int, max_size: int, aging: float = 0.0, clock=time.monotonic):
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        self.aging = max(0.0, aging)
+        self.clock = clock
+        self._heap: List[Tuple[float, int, str, JobFactory, Optional[JobFactory]]] = []
+        self._counter = itertools.count()
+        self._running: Set[str] = set()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._avg_duration = DEFAULT_JOB_DURATION
+        self.completed = 0
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker_tasks:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._running.clear()
+        self._worker_tasks = [loop.create_task(self._worker(i)) for i in range(self.workers)]
+        if self._heap:
+            self._wakeup.set()
+
+    async def _worker(self, index: int):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            _, _, job_id, factory, _ = heapq.heappop(self._heap)
+            self._running.add(job_id)
+            started = time.monotonic()
+            try:
+                await factory()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"❌ Job {job_id} gagal di worker {index}: {str(e)}")
+            finally:
+                self._running.discard(job_id)
+                duration = time.monotonic() - started
+                # Exponential moving average untuk estimasi ETA
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+                self.completed += 1
+
+    def is_full(self) -> bool:
+        return len(self._heap) >= self.max_size
+
+    def free_slots(self) -> int:
+        """Jumlah job yang masih bisa masuk antrean saat ini."""
+        return max(0, self.max_size - len(self._heap))
+
+    def retry_after(self) -> int:
+        """Perkiraan detik sampai satu slot antrean kosong."""
+        return max(1, math.ceil(self._avg_duration / self.workers))
+
+    def submit(
+        self,
+        job_id: str,
+        factory: JobFactory,
+        priority: float = 0,
+        on_drop: Optional[JobFactory] = None,
+    ) -> int:
+        """
+        Masukkan job ke antrean. `factory` dipanggil oleh worker untuk membuat
+        coroutine job; `on_drop` dipanggil jika antrean dihentikan sebelum job
+        sempat berjalan. Mengembalikan posisi antrean (1 = berikutnya).
+        """
+        if self.is_full():
+            raise QueueFull(self.retry_after())
+        self._ensure_workers()
+        # Semua job menua dengan laju yang sama, jadi `priority - aging * lama menunggu`
+        # berurutan sama dengan `priority + aging * waktu masuk` dan heap tidak perlu disusun ulang
+        key = priority + self.aging * self.clock()
+        heapq.heappush(self._heap, (key, next(self._counter), job_id, factory, on_drop))
+        self._wakeup.set()
+        return self.position(job_id)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Posisi job di antrean (1-based), 0 jika sedang berjalan, None jika tidak dikenal."""
+        if job_id in self._running:
+            return 0
+        for index, entry in enumerate(sorted(self._heap), 1):
+            if entry[2] == job_id:
+                return index
+        return None
+
+    def eta(self, job_id: str) -> Optional[int]:
+        """Perkiraan detik sampai job mulai diproses."""
+        position = self.position(job_id)
+        if position is None:
+            return None
+        if position == 0:
+            return 0
+        waves = math.ceil(position / self.workers)
+        return math.ceil(waves * self._avg_duration)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_size": self.max_size,
+            "priority_aging": self.aging,
+            "queued": len(self._heap),
+            "running": len(self._running),
+            "completed": self.completed,
+            "avg_job_seconds": round(self._avg_duration, 2),
+        }
+
+    async def stop(self):
+        dropped, self._heap = self._heap, []
+        if self._loop is asyncio.get_running_loop():
+            for task in self._worker_tasks:
+                task.cancel()
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+            self._loop = None
+        self._worker_tasks = []
+        results = await asyncio.gather(*(entry[4]() for entry in dropped if entry[4] is not None), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logging.warning(f"⚠️ Gagal membereskan job yang dibatalkan: {str(result)}")
+        if dropped:
+            logging.info(f"🛑 {len(dropped)} job yang masih antre dibatalkan")
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Antrean job bersama untuk proses ini."""
+    global _job_queue
+    if _job_queue is None:
+        config = Config()
+        _job_queue = JobQueue(config.WORKER_CONCURRENCY, config.JOB_QUEUE_MAX_SIZE, config.JOB_PRIORITY_AGING)
+    return _job_queue
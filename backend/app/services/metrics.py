@@ -0,0 +1,368 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Batas bucket histogram durasi (detik): dari operasi CPU singkat sampai job panjang
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+# Real-time factor: detik proses per detik audio (< 1 berarti lebih cepat dari real-time)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} membutuhkan label {self.labelnames}, bukan {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per kombinasi label: (jumlah per bucket, total nilai, jumlah observasi)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = self.header()
+        infinity = 'le="+Inf"'
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, infinity)} {count}')
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Gauge(_Metric):
+    """
+    Gauge yang nilainya dibaca saat scrape dari `collect`, fungsi yang
+    mengembalikan daftar (nilai label, nilai). Error di `collect` membuat
+    gauge dilewati, bukan menggagalkan seluruh /metrics.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Iterable[Tuple[Sequence[str], float]]],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            samples = [(tuple(str(v) for v in key), value) for key, value in self.collect() if value is not None]
+        except Exception:
+            return []
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in samples
+        ]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} sudah terdaftar")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DURATION_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, collect, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, collect, labelnames))
+
+    def render(self) -> str:
+        """Format teks eksposisi Prometheus (versi 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class CachedValue:
+    """
+    Nilai gauge yang mahal dihitung (pemindaian folder, query task store atau
+    cache). `refresh` menghitung ulang di thread paling sering sekali per `ttl`
+    detik; `get` (dipanggil saat render) memakai nilai terakhir dan hanya
+    menghitung langsung jika belum pernah di-refresh.
+    """
+
+    def __init__(self, compute: Callable[[], object], ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.compute = compute
+        self.ttl = ttl
+        self.clock = clock
+        self._value = None
+        self._updated_at: Optional[float] = None
+
+    def _store(self, value):
+        self._value = value
+        self._updated_at = self.clock()
+        return value
+
+    def get(self):
+        if self._updated_at is None:
+            return self._store(self.compute())
+        return self._value
+
+    async def refresh(self):
+        if self._updated_at is None or self.clock() - self._updated_at >= self.ttl:
+            self._store(await asyncio.to_thread(self.compute))
+
+def directory_usage(path: str) -> Tuple[int, int]:
+    """Jumlah file dan total byte di folder (rekursif); (0, 0) jika folder belum ada."""
+    files = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                # File sementara bisa terhapus di tengah pemindaian
+                continue
+            files += 1
+    return files, size
+
+class AppMetrics:
+    """
+    Metric aplikasi. Histogram dan counter diisi langsung oleh pipeline;
+    gauge (antrean, task store, folder temp, kuota Gemini) dihitung saat scrape
+    dari komponen yang sudah ada. Gauge yang butuh I/O di-cache selama
+    METRICS_GAUGE_TTL detik dan dihitung ulang di thread lewat `refresh`.
+    """
+
+    def __init__(self):
+        from app.config import Config
+        registry = self.registry = MetricsRegistry()
+        ttl = Config().METRICS_GAUGE_TTL
+        self.cached_values = {
+            "task_store": CachedValue(_task_store_size, ttl),
+            "temp_usage": CachedValue(_temp_usage, ttl),
+            "cache_size": CachedValue(_cache_size, ttl),
+        }
+        self.stage_seconds = registry.histogram(
+            "summarizer_stage_duration_seconds",
+            "Durasi tahap pemrosesan task (uploading, queued, downloading, transcribing, content_detection, summarizing, formatting, total)",
+            ("stage",),
+        )
+        self.upstream_seconds = registry.histogram(
+            "summarizer_upstream_request_duration_seconds",
+            "Durasi satu percobaan request ke upstream (whisper, gemini)",
+            ("upstream",),
+        )
+        self.upstream_requests = registry.counter(
+            "summarizer_upstream_requests_total",
+            "Percobaan request ke upstream per status HTTP (error untuk kegagalan koneksi/timeout)",
+            ("upstream", "status"),
+        )
+        self.upstream_retries = registry.counter(
+            "summarizer_upstream_retries_total", "Request upstream yang diulang setelah gagal", ("upstream",),
+        )
+        self.upstream_throttled = registry.counter(
+            "summarizer_upstream_throttled_total", "Response 429 dari upstream", ("upstream",),
+        )
+        self.circuit_rejections = registry.counter(
+            "summarizer_circuit_rejections_total", "Request yang ditolak karena circuit breaker upstream terbuka", ("upstream",),
+        )
+        self.transcription_rtf = registry.histogram(
+            "summarizer_transcription_rtf",
+            "Real-time factor transkripsi lokal (detik proses / detik audio) per file",
+            ("backend",), buckets=RTF_BUCKETS,
+        )
+        self.cpu_seconds = registry.counter(
+            "summarizer_cpu_task_seconds_total",
+            "Waktu pekerjaan teks berat CPU di event loop (on_loop) dan di pool proses (off_loop)",
+            ("task", "placement"),
+        )
+        self.cpu_tasks = registry.counter(
+            "summarizer_cpu_tasks_total", "Pekerjaan teks berat CPU per tempat eksekusi", ("task", "placement"),
+        )
+        self.cpu_shared_memory_bytes = registry.counter(
+            "summarizer_cpu_shared_memory_bytes_total", "Teks yang dikirim ke pool proses lewat shared memory", ("task",),
+        )
+        self.cache_lookups = registry.counter(
+            "summarizer_cache_lookups_total", "Lookup cache hasil per level dan hasil (hit/miss)", ("level", "result"),
+        )
+        registry.gauge("summarizer_job_queue_depth", "Job yang menunggu di antrean", lambda: [((), _job_queue_stats()["queued"])])
+        registry.gauge("summarizer_jobs_in_flight", "Job yang sedang diproses worker", lambda: [((), _job_queue_stats()["running"])])
+        registry.gauge("summarizer_job_workers", "Jumlah worker antrean job", lambda: [((), _job_queue_stats()["workers"])])
+        registry.gauge("summarizer_task_store_tasks", "Jumlah task di task store", self.cached_values["task_store"].get)
+        registry.gauge("summarizer_event_subscribers", "Klien SSE yang sedang terhubung", _event_subscribers)
+        registry.gauge("summarizer_temp_dir_files", "Jumlah file di TEMP_FOLDER", lambda: [((), self.cached_values["temp_usage"].get()[0])])
+        registry.gauge("summarizer_temp_dir_bytes", "Total ukuran file di TEMP_FOLDER", lambda: [((), self.cached_values["temp_usage"].get()[1])])
+        registry.gauge("summarizer_cache_size_bytes", "Ukuran cache hasil", self.cached_values["cache_size"].get)
+        registry.gauge("summarizer_gemini_quota_limit", "Batas kuota Gemini (GEMINI_RPM, GEMINI_TPM, GEMINI_RPD)",
+                       lambda: _gemini_quota("limit"), ("quota",))
+        registry.gauge("summarizer_gemini_quota_used", "Pemakaian kuota Gemini pada jendela saat ini",
+                       lambda: _gemini_quota("used"), ("quota",))
+        registry.gauge("summarizer_gemini_queue_depth", "Request Gemini yang menunggu rate limiter",
+                       lambda: [((), _gemini_limiter_stats()["queue_depth"])])
+        registry.gauge("summarizer_circuit_state", "Status circuit breaker upstream (0 closed, 1 half-open, 2 open)",
+                       _circuit_states, ("upstream",))
+
+    def upstream_attempt(self, upstream: str) -> "UpstreamAttempt":
+        return UpstreamAttempt(self, upstream)
+
+    async def refresh(self):
+        """Hitung ulang gauge ber-cache yang sudah kedaluwarsa tanpa menahan event loop."""
+        # Error dibiarkan: gauge tetap memakai nilai lama atau dilewati saat render
+        await asyncio.gather(*(value.refresh() for value in self.cached_values.values()), return_exceptions=True)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+class UpstreamAttempt:
+    """
+    Context manager untuk satu percobaan request upstream: mencatat durasi,
+    status (diisi pemanggil lewat `status`; "error" jika keluar karena
+    exception sebelum response diterima) dan response 429.
+    """
+
+    def __init__(self, metrics: AppMetrics, upstream: str):
+        self.metrics = metrics
+        self.upstream = upstream
+        self.status = None
+
+    def __enter__(self) -> "UpstreamAttempt":
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        status = "error" if self.status is None else str(self.status)
+        self.metrics.upstream_seconds.observe(time.monotonic() - self.started, upstream=self.upstream)
+        self.metrics.upstream_requests.inc(upstream=self.upstream, status=status)
+        if status == "429":
+            self.metrics.upstream_throttled.inc(upstream=self.upstream)
+        return False
+
+# Import di dalam fungsi: service lain mengimpor modul ini untuk mencatat metric
+def _job_queue_stats() -> Dict:
+    from app.services.job_queue import get_job_queue
+    return get_job_queue().stats()
+
+def _task_store_size():
+    from app.services.task_store import get_task_store
+    return [((), get_task_store().count())]
+
+def _event_subscribers():
+    from app.services.events import get_event_broker
+    return [((), get_event_broker().subscriber_count())]
+
+def _temp_usage() -> Tuple[int, int]:
+    from app.config import Config
+    return directory_usage(Config().TEMP_FOLDER)
+
+def _cache_size():
+    from app.services.cache import get_result_cache
+    return [((), get_result_cache().stats()["size_bytes"])]
+
+def _gemini_limiter_stats() -> Dict:
+    from app.services.rate_limiter import get_gemini_limiter
+    return get_gemini_limiter().stats()
+
+def _gemini_quota(field: str):
+    stats = _gemini_limiter_stats()
+    rpm, tpm, rpd = stats["requests_per_minute"], stats["tokens_per_minute"], stats["requests_per_day"]
+    if field == "limit":
+        return [(("rpm",), rpm["limit"]), (("tpm",), tpm["limit"]), (("rpd",), rpd["limit"])]
+    return [
+        (("rpm",), round(max(rpm["limit"] - rpm["available"], 0), 2)),
+        (("tpm",), round(max(tpm["limit"] - tpm["available"], 0), 2)),
+        (("rpd",), rpd["used"]),
+    ]
+
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+def _circuit_states():
+    from app.services.resilience import circuit_breaker_stats
+    return [((upstream,), CIRCUIT_STATE_VALUES[stats["state"]]) for upstream, stats in circuit_breaker_stats().items()]
+
+_metrics: Optional[AppMetrics] = None
+
+def get_metrics() -> AppMetrics:
+    global _metrics
+    if _metrics is None:
+        _metrics = AppMetrics()
+    return _metrics
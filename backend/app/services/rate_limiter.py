@@ -0,0 +1,197 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Deque, Dict, Iterator, Optional
+from app.config import Config
+
+class RateLimitExceeded(Exception):
+    """Kuota harian habis; request tidak akan diantrikan sampai hari berganti."""
+
+# Grup giliran round-robin di limiter. Default tiap task satu giliran; item batch
+# berbagi satu giliran agar batch besar tidak memonopoli kuota Gemini.
+_rate_limit_group: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("rate_limit_group", default=None)
+
+@contextmanager
+def rate_limit_group(key: str) -> Iterator[None]:
+    token = _rate_limit_group.set(key)
+    try:
+        yield
+    finally:
+        _rate_limit_group.reset(token)
+
+def rate_limit_key(task_id: Optional[str] = None) -> str:
+    """Key antrean limiter untuk request Gemini milik `task_id` di context ini."""
+    return _rate_limit_group.get() or task_id or "default"
+
+def estimate_tokens(text: str) -> int:
+    """Estimasi kasar jumlah token (~4 karakter per token)."""
+    return len(text) // 4 + 1
+
+class TokenBucket:
+    """
+    Token bucket sederhana: kapasitas penuh di awal, terisi ulang secara
+    kontinu sebanyak `capacity` setiap `period` detik.
+    """
+
+    def __init__(self, capacity: int, period: float = 60.0, clock=time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.clock = clock
+        self.level = float(capacity)
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        """Detik yang dibutuhkan sampai `amount` tersedia (0 jika sudah cukup)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def drain(self):
+        """Kosongkan bucket, dipakai saat upstream tetap membalas 429."""
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+    def available(self) -> float:
+        self._refill()
+        return self.level
+
+class GeminiRateLimiter:
+    """
+    Penjadwal request Gemini yang menegakkan RPM, TPM dan RPD.
+
+    Pemanggil menunggu di antrean (bukan gagal) sampai bucket RPM dan TPM
+    cukup. Antrean dilayani round-robin per `key` (mis. task_id) agar satu
+    task dengan banyak request tidak memonopoli kuota. Kuota harian yang
+    habis langsung menghasilkan RateLimitExceeded.
+
+    Limiter hanya berlaku di satu proses: dengan N worker uvicorn, kuota
+    efektif menjadi N kali GEMINI_RPM/TPM/RPD, jadi bagi nilainya per worker.
+    """
+
+    def __init__(self, rpm: int, tpm: int, rpd: int, period: float = 60.0, clock=time.monotonic):
+        self.requests = TokenBucket(rpm, period, clock)
+        self.tokens = TokenBucket(tpm, period, clock)
+        self.rpd = rpd
+        self._day = date.today()
+        self._daily_used = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        self._active: Optional[asyncio.Future] = None
+        self._last_key: Optional[str] = None
+
+    def _check_daily_quota(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._daily_used = 0
+        if self._daily_used >= self.rpd:
+            raise RateLimitExceeded(f"Kuota harian Gemini ({self.rpd} request) sudah habis")
+
+    def _grant_next(self):
+        if self._active is not None:
+            return
+        while self._queues:
+            # Key yang baru saja dilayani mendapat giliran terakhir
+            key = next((k for k in self._queues if k != self._last_key), self._last_key)
+            queue = self._queues.pop(key)
+            waiter = queue.popleft()
+            if queue:
+                # Pindahkan key ke belakang supaya key lain mendapat giliran berikutnya
+                self._queues[key] = queue
+            # Pemanggil yang dibatalkan di tick yang sama belum sempat keluar dari antrean
+            if waiter.done():
+                continue
+            self._active = waiter
+            self._last_key = key
+            waiter.set_result(None)
+            return
+
+    async def acquire(self, tokens: int = 1, key: str = "default"):
+        """
+        Tunggu sampai satu request dengan estimasi `tokens` boleh dikirim.
+        """
+        self._check_daily_quota()
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(waiter)
+        self._grant_next()
+        try:
+            await waiter
+            while True:
+                self._check_daily_quota()
+                wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                if wait <= 0:
+                    break
+                logging.debug(f"[RateLimiter] Menunggu {wait:.2f}s untuk kuota Gemini")
+                await asyncio.sleep(wait)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self._daily_used += 1
+        finally:
+            if self._active is waiter:
+                self._active = None
+            else:
+                queue = self._queues.get(key)
+                if queue and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[key]
+            self._grant_next()
+
+    def report_throttled(self):
+        """Dipanggil saat Gemini tetap membalas 429 agar antrean menahan request berikutnya."""
+        self.requests.drain()
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values()) + (1 if self._active else 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Level bucket dan kedalaman antrean saat ini."""
+        return {
+            "requests_per_minute": {
+                "limit": self.requests.capacity,
+                "available": round(self.requests.available(), 2),
+            },
+            "tokens_per_minute": {
+                "limit": self.tokens.capacity,
+                "available": round(self.tokens.available(), 2),
+            },
+            "requests_per_day": {
+                "limit": self.rpd,
+                "used": self._daily_used,
+                "remaining": max(self.rpd - self._daily_used, 0),
+            },
+            "queue_depth": self.queue_depth(),
+            "queued_keys": len(self._queues),
+        }
+
+_gemini_limiter: Optional[GeminiRateLimiter] = None
+
+def get_gemini_limiter() -> GeminiRateLimiter:
+    """
+    Limiter bersama untuk semua pemanggilan Gemini di proses ini. Dibuat ulang
+    jika GEMINI_RPM / GEMINI_TPM / GEMINI_RPD berubah.
+    """
+    global _gemini_limiter
+    config = Config()
+    limits = (config.GEMINI_RPM, config.GEMINI_TPM, config.GEMINI_RPD)
+    if _gemini_limiter is None or (
+        _gemini_limiter.requests.capacity,
+        _gemini_limiter.tokens.capacity,
+        _gemini_limiter.rpd,
+    ) != limits:
+        _gemini_limiter = GeminiRateLimiter(*limits)
+    return _gemini_limiter
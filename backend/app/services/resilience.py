@@ -0,0 +1,263 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import httpx
+import requests
+from app.config import Config
+from app.services.metrics import get_metrics
+from app.services.tracing import Span, get_tracer
+
+T = TypeVar("T")
+
+# Status yang layak diulang: timeout, throttling dan kegagalan sementara di sisi server.
+# 4xx lain (payload salah, API key tidak valid, file terlalu besar) tidak akan berhasil diulang.
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+class CircuitOpenError(Exception):
+    """Upstream dianggap sedang gagal; request ditolak tanpa dikirim."""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Circuit {upstream} terbuka, coba lagi dalam {retry_after:.0f} detik")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff dengan full jitter: percobaan ke-n menunggu acak
+    0..min(max_delay, base_delay * 2^(n-1)). `deadline` membatasi total waktu
+    (termasuk durasi request) sejak percobaan pertama.
+    """
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    deadline: float = 600.0
+
+    @classmethod
+    def from_config(cls, config: Config) -> "RetryPolicy":
+        return cls(config.RETRY_MAX_ATTEMPTS, config.RETRY_BASE_DELAY, config.RETRY_MAX_DELAY, config.RETRY_DEADLINE)
+
+    def backoff(self, attempt: int, rng: random.Random = random) -> float:
+        return rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+def error_status(error: BaseException) -> Optional[int]:
+    """Status HTTP dari error httpx/requests, None jika tidak ada response."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) if response is not None else None
+
+def is_retryable(error: BaseException) -> bool:
+    """Kegagalan sementara (koneksi, timeout, RETRYABLE_STATUS) yang layak diulang."""
+    if isinstance(error, (httpx.HTTPStatusError, requests.HTTPError)):
+        return error_status(error) in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, requests.ConnectionError, requests.Timeout))
+
+def retry_after_seconds(error: BaseException, now: Optional[float] = None) -> Optional[float]:
+    """Nilai header Retry-After (detik atau HTTP-date) dari response error, jika ada."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None and response.headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(moment.timestamp() - (now if now is not None else time.time()), 0.0)
+
+class CircuitBreaker:
+    """
+    Circuit breaker per upstream. Setelah `failure_threshold` kegagalan sementara
+    berturut-turut circuit terbuka dan request langsung ditolak (CircuitOpenError)
+    selama `reset_timeout` detik. Setelah itu satu request percobaan dibiarkan
+    lewat (half-open): berhasil menutup circuit, gagal membukanya lagi.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, upstream: str, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Izinkan request atau lempar CircuitOpenError."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    raise self._rejected(remaining)
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise self._rejected(self.reset_timeout)
+                self._probe_in_flight = True
+
+    def _rejected(self, retry_after: float) -> CircuitOpenError:
+        get_metrics().circuit_rejections.inc(upstream=self.upstream)
+        return CircuitOpenError(self.upstream, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.info(f"✅ Circuit {self.upstream} tertutup kembali")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"🔌 Circuit {self.upstream} terbuka setelah {self.failures} kegagalan")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def release(self):
+        """Akhiri percobaan tanpa menilai kesehatan upstream (mis. request tidak terkirim)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breaker_settings: Optional[Tuple] = None
+
+def get_circuit_breaker(upstream: str) -> CircuitBreaker:
+    """Circuit breaker bersama per upstream, dibuat ulang jika konfigurasi berubah."""
+    global _breaker_settings
+    config = Config()
+    settings = (config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_TIMEOUT)
+    if settings != _breaker_settings:
+        _breakers.clear()
+        _breaker_settings = settings
+    if upstream not in _breakers:
+        _breakers[upstream] = CircuitBreaker(upstream, *settings)
+    return _breakers[upstream]
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {upstream: breaker.stats() for upstream, breaker in list(_breakers.items())}
+
+class RetryBudget:
+    """
+    Status retry untuk satu operasi ke upstream: memeriksa circuit breaker
+    sebelum setiap percobaan dan memutuskan apakah serta berapa lama menunggu
+    setelah kegagalan. Dipakai langsung oleh pemanggil yang butuh kontrol
+    penuh (mis. streaming); selebihnya lewat retry_async / retry_sync.
+    """
+
+    def __init__(self, upstream: str, policy: Optional[RetryPolicy] = None, clock=time.monotonic):
+        self.upstream = upstream
+        self.policy = policy or RetryPolicy.from_config(Config())
+        self.breaker = get_circuit_breaker(upstream)
+        self.clock = clock
+        self.started = clock()
+
+    def before_attempt(self):
+        self.breaker.before_call()
+
+    def succeeded(self):
+        self.breaker.record_success()
+
+    def failed(self, error: BaseException, attempt: int) -> Optional[float]:
+        """
+        Catat kegagalan percobaan ke-`attempt`. Mengembalikan detik tunggu sebelum
+        percobaan berikutnya, atau None jika error harus diteruskan ke pemanggil.
+        """
+        if isinstance(error, CircuitOpenError):
+            return None
+        if not is_retryable(error):
+            # Upstream menjawab (mis. 400/401): sehat, hanya request-nya yang salah
+            if error_status(error) is not None:
+                self.breaker.record_success()
+            else:
+                self.breaker.release()
+            logging.warning(f"⚠️ [{self.upstream}] Error tidak bisa diulang: {error}")
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.policy.max_attempts:
+            logging.warning(f"⚠️ [{self.upstream}] Gagal setelah {attempt} percobaan: {error}")
+            return None
+        retry_after = retry_after_seconds(error)
+        delay = retry_after if retry_after is not None else self.policy.backoff(attempt)
+        elapsed = self.clock() - self.started
+        if elapsed + delay > self.policy.deadline:
+            logging.warning(
+                f"⚠️ [{self.upstream}] Batas waktu retry ({self.policy.deadline:.0f} detik) habis "
+                f"setelah {attempt} percobaan: {error}"
+            )
+            return None
+        logging.warning(f"⚠️ [{self.upstream}] Percobaan {attempt} gagal, ulangi dalam {delay:.1f} detik: {error}")
+        get_metrics().upstream_retries.inc(upstream=self.upstream)
+        return delay
+
+    async def sleep(self, delay: float, parent: Optional[Span] = None):
+        with get_tracer().span("retry.backoff", {"upstream": self.upstream, "seconds": round(delay, 3)}, parent=parent):
+            await asyncio.sleep(delay)
+
+    def sleep_sync(self, delay: float):
+        with get_tracer().span("retry.backoff", {"upstream": self.upstream, "seconds": round(delay, 3)}):
+            time.sleep(delay)
+
+async def retry_async(upstream: str, attempt_fn: Callable[[int], Awaitable[T]], policy: Optional[RetryPolicy] = None) -> T:
+    """
+    Jalankan `attempt_fn(nomor_percobaan)` dengan retry sesuai RetryPolicy dan
+    circuit breaker upstream. Error terakhir (atau CircuitOpenError) diteruskan.
+    """
+    budget = RetryBudget(upstream, policy)
+    attempt = 1
+    while True:
+        budget.before_attempt()
+        try:
+            result = await attempt_fn(attempt)
+        except Exception as e:
+            delay = budget.failed(e, attempt)
+            if delay is None:
+                raise
+            await budget.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Dibatalkan di tengah percobaan: slot percobaan half-open dilepas
+            budget.breaker.release()
+            raise
+        budget.succeeded()
+        return result
+
+def retry_sync(upstream: str, attempt_fn: Callable[[int], T], policy: Optional[RetryPolicy] = None) -> T:
+    """Versi blocking retry_async untuk client `requests` lama."""
+    budget = RetryBudget(upstream, policy)
+    attempt = 1
+    while True:
+        budget.before_attempt()
+        try:
+            result = attempt_fn(attempt)
+        except Exception as e:
+            delay = budget.failed(e, attempt)
+            if delay is None:
+                raise
+            budget.sleep_sync(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            budget.breaker.release()
+            raise
+        budget.succeeded()
+        return result
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+from app.config import Config
+from app.services.audio import AUDIO_FORMATS, FFMPEG_TIMEOUT, MIN_PREPROCESS_BYTES, ffmpeg_available
+from app.services.transcription import transcribe_with_backend
+
+# Titik potong dicari di rentang [60%, 120%] panjang segmen target
+MIN_SEGMENT_RATIO = 0.6
+MAX_SEGMENT_RATIO = 1.2
+# Jumlah kata maksimum di ujung segmen yang dicek untuk de-duplikasi overlap
+MAX_OVERLAP_WORDS = 30
+
+DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+SILENCE_START_PATTERN = re.compile(r"silence_start:\s*(-?\d+(?:\.\d+)?)")
+SILENCE_END_PATTERN = re.compile(r"silence_end:\s*(-?\d+(?:\.\d+)?)")
+WORD_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+
+Segment = Tuple[float, float]
+# Dipanggil setiap segmen selesai: (indeks segmen, jumlah segmen, teks)
+SegmentCallback = Callable[[int, int, str], None]
+
+def parse_silencedetect(output: str) -> Tuple[Optional[float], List[Segment]]:
+    """Ambil durasi audio dan daftar interval hening dari stderr ffmpeg silencedetect."""
+    duration = None
+    match = DURATION_PATTERN.search(output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    silences = []
+    start = None
+    for line in output.splitlines():
+        start_match = SILENCE_START_PATTERN.search(line)
+        if start_match:
+            start = max(0.0, float(start_match.group(1)))
+            continue
+        end_match = SILENCE_END_PATTERN.search(line)
+        if end_match and start is not None:
+            silences.append((start, float(end_match.group(1))))
+            start = None
+    if start is not None and duration is not None:
+        silences.append((start, duration))
+    return duration, silences
+
+def plan_segments(duration: float, silences: List[Segment], target: float, overlap: float = 0.0) -> List[Segment]:
+    """
+    Tentukan batas segmen sepanjang kira-kira `target` detik. Potongan
+    diletakkan di tengah interval hening terdekat dari target; jika tidak ada
+    hening di rentang yang diizinkan, audio dipotong paksa dan segmen
+    berikutnya dimulai `overlap` detik lebih awal agar tidak ada kata hilang.
+    """
+    if target <= 0 or duration <= target * MAX_SEGMENT_RATIO:
+        return [(0.0, duration)]
+
+    midpoints = [(start + end) / 2 for start, end in silences]
+    segments = []
+    cursor = 0.0
+    start = 0.0
+    while duration - cursor > target * MAX_SEGMENT_RATIO:
+        ideal = cursor + target
+        candidates = [
+            mid for mid in midpoints
+            if cursor + target * MIN_SEGMENT_RATIO <= mid <= cursor + target * MAX_SEGMENT_RATIO
+        ]
+        if candidates:
+            cut = min(candidates, key=lambda mid: abs(mid - ideal))
+            next_start = cut
+        else:
+            cut = ideal
+            next_start = max(cursor, cut - overlap)
+        segments.append((start, cut))
+        cursor = cut
+        start = next_start
+    segments.append((start, duration))
+    return segments
+
+def _words(text: str) -> List[str]:
+    return [WORD_PATTERN.sub("", word).lower() for word in text.split()]
+
+def merge_transcripts(texts: List[str], max_overlap_words: int = MAX_OVERLAP_WORDS) -> str:
+    """
+    Gabungkan transkripsi segmen secara berurutan. Kata-kata di awal segmen
+    yang mengulang ekor segmen sebelumnya (akibat overlap) dibuang.
+    """
+    merged: List[str] = []
+    for text in texts:
+        words = text.split()
+        if not words:
+            continue
+        if merged:
+            tail = _words(" ".join(merged[-max_overlap_words:]))
+            head = _words(" ".join(words[:max_overlap_words]))
+            for size in range(min(len(tail), len(head)), 0, -1):
+                if tail[-size:] == head[:size] and any(tail[-size:]):
+                    words = words[size:]
+                    break
+        merged.extend(words)
+    return " ".join(merged)
+
+async def _run_ffmpeg(command: List[str]) -> Tuple[int, str]:
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=FFMPEG_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    return process.returncode, stderr.decode(errors="replace")
+
+async def detect_silences(path: str, config: Config) -> Tuple[Optional[float], List[Segment]]:
+    command = [
+        config.FFMPEG_PATH, "-hide_banner", "-nostats", "-i", path,
+        "-af", f"silencedetect=noise={config.SILENCE_NOISE_DB}dB:d={config.SILENCE_MIN_SECONDS}",
+        "-f", "null", "-",
+    ]
+    returncode, output = await _run_ffmpeg(command)
+    if returncode != 0:
+        raise RuntimeError(f"silencedetect gagal: {output[-300:]}")
+    return parse_silencedetect(output)
+
+async def extract_segment(path: str, start: float, end: float, output_path: str, config: Config):
+    """Potong satu segmen sekaligus downmix/resample seperti pre-processing audio."""
+    codec, _ = AUDIO_FORMATS.get(config.AUDIO_FORMAT.lower(), AUDIO_FORMATS["opus"])
+    command = [
+        config.FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{start:.3f}", "-to", f"{end:.3f}", "-i", path,
+        "-vn", "-map_metadata", "-1",
+        "-ac", "1", "-ar", str(config.AUDIO_SAMPLE_RATE),
+        "-c:a", codec, "-b:a", config.AUDIO_BITRATE,
+        output_path,
+    ]
+    returncode, output = await _run_ffmpeg(command)
+    if returncode != 0 or not os.path.exists(output_path):
+        raise RuntimeError(f"Gagal memotong segmen {start:.1f}-{end:.1f}s: {output[-300:]}")
+
+async def transcribe_segments(
+    path: str,
+    segments: List[Segment],
+    language: str,
+    transcribe: Optional[Callable[..., Awaitable[str]]] = None,
+    concurrency: int = 4,
+    on_segment: Optional[SegmentCallback] = None,
+) -> List[str]:
+    """
+    Transkripsi semua segmen secara paralel (dibatasi `concurrency`). Retry
+    upstream sudah diurus backend transkripsi, jadi segmen yang tetap gagal
+    membatalkan segmen lain yang masih berjalan atau menunggu giliran.
+    Hasil dikembalikan sesuai urutan segmen; `on_segment` menerima teks tiap
+    segmen begitu selesai (urutannya bisa acak).
+    """
+    config = Config()
+    transcribe = transcribe or transcribe_with_backend
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    _, extension = AUDIO_FORMATS.get(config.AUDIO_FORMAT.lower(), AUDIO_FORMATS["opus"])
+    base_name = os.path.splitext(path)[0]
+    total = len(segments)
+
+    async def transcribe_segment(index: int, start: float, end: float) -> str:
+        segment_path = f"{base_name}.segment{index:03d}{extension}"
+        async with semaphore:
+            try:
+                await extract_segment(path, start, end, segment_path, config)
+                text = await transcribe(segment_path, language=language)
+                logging.info(f"🧩 Segmen {index + 1}/{total} ({start:.0f}-{end:.0f}s) selesai")
+                if on_segment:
+                    on_segment(index, total, text)
+                return text
+            finally:
+                if os.path.exists(segment_path):
+                    os.remove(segment_path)
+
+    tasks = [asyncio.ensure_future(transcribe_segment(i, start, end)) for i, (start, end) in enumerate(segments)]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                logging.warning(f"⚠️ Segmen gagal, {len(pending)} segmen lain dibatalkan: {str(task.exception())}")
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        # Juga saat pemanggil dibatalkan: tunggu sampai file segmen sempat dihapus
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def transcribe_segmented(
+    path: str,
+    language: str = "en",
+    transcribe: Optional[Callable[..., Awaitable[str]]] = None,
+    on_segment: Optional[SegmentCallback] = None,
+) -> Optional[str]:
+    """
+    Transkripsi audio panjang per segmen yang dipotong di titik hening.
+    Mengembalikan None jika segmentasi tidak dipakai (dimatikan, ffmpeg tidak
+    ada, file pendek atau cukup satu segmen) sehingga pemanggil memakai jalur
+    satu request biasa.
+    """
+    config = Config()
+    if config.AUDIO_SEGMENT_SECONDS <= 0 or not ffmpeg_available(config.FFMPEG_PATH):
+        return None
+    if os.path.getsize(path) < MIN_PREPROCESS_BYTES:
+        return None
+
+    try:
+        duration, silences = await detect_silences(path, config)
+    except Exception as e:
+        logging.warning(f"⚠️ Deteksi hening gagal, segmentasi dilewati: {str(e)}")
+        return None
+    if not duration:
+        return None
+
+    segments = plan_segments(duration, silences, config.AUDIO_SEGMENT_SECONDS, config.AUDIO_SEGMENT_OVERLAP)
+    if len(segments) <= 1:
+        return None
+
+    logging.info(f"✂️ Audio {duration:.0f}s dipecah menjadi {len(segments)} segmen ({len(silences)} titik hening)")
+    started = time.perf_counter()
+    texts = await transcribe_segments(
+        path, segments, language,
+        transcribe=transcribe,
+        concurrency=config.AUDIO_SEGMENT_CONCURRENCY,
+        on_segment=on_segment,
+    )
+    logging.info(f"✅ {len(segments)} segmen ditranskripsi dalam {time.perf_counter() - started:.1f}s")
+    return merge_transcripts(texts)
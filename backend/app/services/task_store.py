@@ -0,0 +1,616 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.config import Config
+from app.services.events import TaskEvent, TaskEventBroker, get_event_broker, record_events
+from app.services.metrics import get_metrics
+from app.services.tracing import get_tracer
+
+# Status yang dianggap final dan boleh kedaluwarsa setelah TASK_TTL
+FINAL_STATUSES = ("completed", "failed")
+# Waktu tulis terakhir di JSON record Redis; tidak ikut dikembalikan ke pemanggil
+REDIS_UPDATED_FIELD = "_updated_at"
+_FINAL_SQL = "(" + ", ".join(f"'{status}'" for status in FINAL_STATUSES) + ")"
+
+def _split_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Pisahkan transkripsi (besar) dari record status (kecil)."""
+    record = dict(record)
+    transcription = record.pop("transcription", None)
+    if transcription is not None:
+        record["has_transcription"] = True
+    return record, transcription
+
+def worker_id() -> str:
+    """Identitas proses yang menjalankan job (`host:pid`), disimpan di field `worker` record task."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def worker_alive(worker: Optional[str], updated_at: Optional[float] = None, stale_after: float = 0, clock=time.time) -> bool:
+    """
+    Apakah proses pemilik task masih hidup; record tanpa pemilik dianggap
+    yatim. Proses di host lain tidak bisa diperiksa: ia dianggap hidup selama
+    record-nya ditulis dalam `stale_after` detik terakhir (0 = selalu hidup),
+    karena container yang dibuat ulang mendapat hostname baru dan pemilik
+    lamanya tidak akan pernah kembali.
+    """
+    if not worker:
+        return False
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname():
+        return not (stale_after > 0 and updated_at is not None and clock() - updated_at > stale_after)
+    if not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _log_write_error(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logging.warning(f"⚠️ Gagal menulis ke task store: {str(future.exception())}")
+
+class TaskStore(abc.ABC):
+    """
+    Antarmuka penyimpanan status task. Record status disimpan terpisah dari
+    transkripsi sehingga polling status tetap murah. Jika `events` diisi,
+    setiap perubahan record dipublikasikan sebagai event task.
+
+    Store dengan `shared_events` juga menulis event ke log bersama (tabel
+    SQLite/list Redis) sehingga stream SSE di worker lain bisa membacanya.
+
+    Kode di event loop memakai varian async (`aget`, `aset`, `aupdate`,
+    `adelete`) atau `update_nowait` untuk callback sinkron; pada store yang
+    I/O-nya memblokir, semuanya dijalankan di satu thread I/O milik store
+    sehingga urutan penulisan tetap sama dengan urutan pemanggilan.
+    """
+    # False jika operasi store cukup murah untuk dijalankan langsung di loop
+    blocking_io = True
+    # True jika event ditulis ke log yang bisa dibaca worker lain
+    shared_events = False
+
+    def __init__(self, ttl: Optional[float] = None, clock=time.time, events: Optional[TaskEventBroker] = None):
+        self.ttl = ttl
+        self.clock = clock
+        self.events = events
+        self._io: Optional[ThreadPoolExecutor] = None
+        self._io_lock = threading.Lock()
+
+    def _io_executor(self) -> ThreadPoolExecutor:
+        with self._io_lock:
+            if self._io is None:
+                # Satu thread: penulisan dari loop dan callback dieksekusi berurutan (FIFO)
+                self._io = ThreadPoolExecutor(1, thread_name_prefix="task-store")
+            return self._io
+
+    async def _call(self, func: Callable, *args, **kwargs):
+        if not self.blocking_io:
+            return func(*args, **kwargs)
+        return await asyncio.wrap_future(self._io_executor().submit(func, *args, **kwargs))
+
+    async def aget(self, task_id: str, include_transcription: bool = False) -> Optional[Dict[str, Any]]:
+        return await self._call(self.get, task_id, include_transcription)
+
+    async def aset(self, task_id: str, record: Dict[str, Any]):
+        await self._call(self.set, task_id, record)
+
+    async def aupdate(self, task_id: str, /, **fields):
+        await self._call(self.update, task_id, **fields)
+
+    async def adelete(self, task_id: str):
+        await self._call(self.delete, task_id)
+
+    async def aevents_after(self, task_id: str, after: int) -> List[TaskEvent]:
+        return await self._call(self.events_after, task_id, after)
+
+    async def alast_event_id(self, task_id: str) -> int:
+        return await self._call(self.last_event_id, task_id)
+
+    async def aowned_elsewhere(self, task_id: str) -> bool:
+        """
+        Apakah job task dijalankan proses lain, sehingga event-nya hanya bisa
+        dibaca dari log bersama. Event job di proses ini sudah dikirim broker.
+        """
+        record = await self.aget(task_id)
+        return record is None or record.get("worker") != worker_id()
+
+    def update_nowait(self, task_id: str, /, **fields):
+        """
+        `update` tanpa menunggu, untuk callback sinkron (progress, StageTimer)
+        yang berjalan di loop atau di thread lain. Kesalahan hanya dicatat.
+        """
+        if not self.blocking_io:
+            self.update(task_id, **fields)
+            return
+        self._io_executor().submit(self.update, task_id, **fields).add_done_callback(_log_write_error)
+
+    def close(self):
+        """Tunggu penulisan yang masih antre lalu lepaskan thread I/O."""
+        with self._io_lock:
+            io, self._io = self._io, None
+        if io is not None:
+            io.shutdown(wait=True)
+
+    def _expires_at(self, record: Dict[str, Any]) -> Optional[float]:
+        if self.ttl and record.get("status") in FINAL_STATUSES:
+            return self.clock() + self.ttl
+        return None
+
+    def get(self, task_id: str, include_transcription: bool = False) -> Optional[Dict[str, Any]]:
+        record = self._get_record(task_id)
+        if record is not None and include_transcription and record.get("has_transcription"):
+            record["transcription"] = self.get_transcription(task_id)
+        return record
+
+    def set(self, task_id: str, record: Dict[str, Any]):
+        self._write(task_id, record, record)
+
+    def update(self, task_id: str, /, **fields):
+        self._publish_changes(task_id, self._merge_record(task_id, fields), fields)
+
+    def _write(self, task_id: str, record: Dict[str, Any], changed: Dict[str, Any]):
+        record, transcription = _split_record(record)
+        self._set_record(task_id, record, transcription, self._expires_at(record))
+        self._publish_changes(task_id, record, changed)
+
+    def _merge_record(self, task_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Gabungkan `fields` ke record tersimpan; mengembalikan record baru tanpa transkripsi."""
+        record = self._get_record(task_id) or {}
+        record.update(fields)
+        record, transcription = _split_record(record)
+        self._set_record(task_id, record, transcription, self._expires_at(record))
+        return record
+
+    def _publish_changes(self, task_id: str, record: Dict[str, Any], changed: Dict[str, Any]):
+        if self.events is not None:
+            for event, data in record_events(record, changed):
+                self._publish_event(task_id, event, data)
+
+    def publish(self, task_id: str, event: str, data: Dict[str, Any]):
+        """
+        Publikasikan event yang tidak disimpan di record (mis. potongan
+        transkripsi), berurutan dengan penulisan record yang masih antre.
+        """
+        if self.events is None:
+            return
+        if not self.blocking_io:
+            self._publish_event(task_id, event, data)
+            return
+        self._io_executor().submit(self._publish_event, task_id, event, data).add_done_callback(_log_write_error)
+
+    def _publish_event(self, task_id: str, event: str, data: Dict[str, Any]):
+        # Id dari log bersama dipakai juga untuk pengiriman lokal agar Last-Event-ID sama di semua worker
+        self.events.publish(task_id, event, data, event_id=self._append_event(task_id, event, data))
+
+    def _append_event(self, task_id: str, event: str, data: Dict[str, Any]) -> Optional[int]:
+        """Tulis event ke log bersama; mengembalikan id event, None jika store tidak punya log."""
+        return None
+
+    def events_after(self, task_id: str, after: int) -> List[TaskEvent]:
+        """Event di log bersama dengan id lebih besar dari `after`, urut id."""
+        return []
+
+    def last_event_id(self, task_id: str) -> int:
+        return 0
+
+    @abc.abstractmethod
+    def _get_record(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Record tersimpan tanpa transkripsi, None jika tidak ada atau kedaluwarsa."""
+
+    @abc.abstractmethod
+    def _set_record(self, task_id: str, record: Dict[str, Any], transcription: Optional[str], expires_at: Optional[float]):
+        """Simpan record; transkripsi disimpan terpisah jika diisi."""
+
+    @abc.abstractmethod
+    def get_transcription(self, task_id: str) -> Optional[str]:
+        """Transkripsi lengkap task, None jika tidak ada."""
+
+    @abc.abstractmethod
+    def delete(self, task_id: str):
+        """Hapus record, transkripsi dan event task."""
+
+    def purge_expired(self) -> int:
+        return 0
+
+    @abc.abstractmethod
+    def unfinished(self) -> List[Tuple[str, Dict[str, Any], Optional[float]]]:
+        """(task_id, record, waktu tulis terakhir) semua task yang statusnya belum final."""
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        """Jumlah task yang tersimpan."""
+
+class MemoryTaskStore(TaskStore):
+    """Store in-process, hanya untuk satu worker (dan test)."""
+    blocking_io = False
+
+    def __init__(self, ttl: Optional[float] = None, clock=time.time, events: Optional[TaskEventBroker] = None):
+        super().__init__(ttl, clock, events)
+        # task_id -> (record, expires_at, updated_at)
+        self._records: Dict[str, Tuple[Dict[str, Any], Optional[float], float]] = {}
+        self._transcripts: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get_record(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._records.get(task_id)
+            if entry is None:
+                return None
+            record, expires_at, _ = entry
+            if expires_at is not None and expires_at <= self.clock():
+                self._records.pop(task_id, None)
+                self._transcripts.pop(task_id, None)
+                return None
+            return dict(record)
+
+    def _set_record(self, task_id, record, transcription, expires_at):
+        with self._lock:
+            self._records[task_id] = (record, expires_at, self.clock())
+            if transcription is not None:
+                self._transcripts[task_id] = transcription
+
+    def get_transcription(self, task_id: str) -> Optional[str]:
+        return self._transcripts.get(task_id)
+
+    def delete(self, task_id: str):
+        with self._lock:
+            self._records.pop(task_id, None)
+            self._transcripts.pop(task_id, None)
+
+    def purge_expired(self) -> int:
+        now = self.clock()
+        with self._lock:
+            expired = [k for k, (_, exp, _) in self._records.items() if exp is not None and exp <= now]
+            for task_id in expired:
+                self._records.pop(task_id, None)
+                self._transcripts.pop(task_id, None)
+        return len(expired)
+
+    def unfinished(self):
+        with self._lock:
+            return [
+                (task_id, dict(record), updated_at) for task_id, (record, _, updated_at) in self._records.items()
+                if record.get("status") not in FINAL_STATUSES
+            ]
+
+    def count(self) -> int:
+        return len(self._records)
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Store default berbasis SQLite (mode WAL), aman dipakai beberapa worker
+    uvicorn pada host yang sama dan bertahan setelah restart. Event task
+    disimpan di tabel `events` dan dihapus bersama task-nya.
+    """
+    shared_events = True
+
+    def __init__(self, path: str, ttl: Optional[float] = None, clock=time.time, events: Optional[TaskEventBroker] = None):
+        super().__init__(ttl, clock, events)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "task_id TEXT PRIMARY KEY, record TEXT NOT NULL, status TEXT, "
+                "updated_at REAL NOT NULL, expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "task_id TEXT PRIMARY KEY, transcription TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT NOT NULL, event TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_expires_at ON tasks (expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_task_id ON events (task_id, id)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Satu koneksi per store (dibuka sekali), dipakai bergantian oleh thread I/O dan loop
+        with self._lock:
+            with self._conn:
+                yield self._conn
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+    def _get_record(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT record, expires_at FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        record, expires_at = row
+        if expires_at is not None and expires_at <= self.clock():
+            self.delete(task_id)
+            return None
+        return json.loads(record)
+
+    def _set_record(self, task_id, record, transcription, expires_at):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, record, status, updated_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (task_id, json.dumps(record, ensure_ascii=False), record.get("status"), self.clock(), expires_at),
+            )
+            if transcription is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO transcripts (task_id, transcription) VALUES (?, ?)",
+                    (task_id, transcription),
+                )
+
+    def _merge_record(self, task_id, fields):
+        """
+        Merge dalam satu statement UPSERT (json_set per field, seperti dict.update)
+        tanpa membaca record ke Python lebih dulu; record yang sudah kedaluwarsa
+        dianggap kosong.
+        """
+        fields, transcription = _split_record(fields)
+        params: Dict[str, Any] = {"task_id": task_id, "now": self.clock(), "ttl": self.ttl or None}
+        paths = []
+        for index, (key, value) in enumerate(fields.items()):
+            params[f"v{index}"] = json.dumps(value, ensure_ascii=False)
+            paths.append(f"'$.\"{key}\"', json(:v{index})")
+
+        def merged(base: str) -> str:
+            return f"json_set({base}, {', '.join(paths)})" if paths else base
+
+        def expires(record: str) -> str:
+            return f"CASE WHEN :ttl IS NOT NULL AND json_extract({record}, '$.status') IN {_FINAL_SQL} THEN :now + :ttl END"
+
+        inserted = merged("'{}'")
+        updated = merged("CASE WHEN tasks.expires_at IS NOT NULL AND tasks.expires_at <= :now THEN '{}' ELSE tasks.record END")
+        with self._connect() as conn:
+            rows = conn.execute(
+                "INSERT INTO tasks (task_id, record, status, updated_at, expires_at) "
+                f"VALUES (:task_id, {inserted}, json_extract({inserted}, '$.status'), :now, {expires(inserted)}) "
+                f"ON CONFLICT (task_id) DO UPDATE SET record = {updated}, "
+                f"status = json_extract({updated}, '$.status'), updated_at = :now, expires_at = {expires(updated)} "
+                "RETURNING record",
+                params,
+            ).fetchall()
+            if transcription is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO transcripts (task_id, transcription) VALUES (?, ?)",
+                    (task_id, transcription),
+                )
+        return json.loads(rows[0][0])
+
+    def get_transcription(self, task_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT transcription FROM transcripts WHERE task_id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, task_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            conn.execute("DELETE FROM transcripts WHERE task_id = ?", (task_id,))
+            conn.execute("DELETE FROM events WHERE task_id = ?", (task_id,))
+
+    def _append_event(self, task_id, event, data):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO events (task_id, event, data) VALUES (?, ?, ?)",
+                (task_id, event, json.dumps(data, ensure_ascii=False)),
+            )
+            return cursor.lastrowid
+
+    def events_after(self, task_id: str, after: int) -> List[TaskEvent]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, event, data FROM events WHERE task_id = ? AND id > ? ORDER BY id", (task_id, after)
+            ).fetchall()
+        return [TaskEvent(event_id, event, json.loads(data)) for event_id, event, data in rows]
+
+    def last_event_id(self, task_id: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM events WHERE task_id = ?", (task_id,)).fetchone()[0]
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM tasks WHERE expires_at IS NOT NULL AND expires_at <= ?", (self.clock(),)
+            )
+            conn.execute("DELETE FROM transcripts WHERE task_id NOT IN (SELECT task_id FROM tasks)")
+            conn.execute("DELETE FROM events WHERE task_id NOT IN (SELECT task_id FROM tasks)")
+            return cursor.rowcount
+
+    def unfinished(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT task_id, record, updated_at FROM tasks WHERE status IS NULL OR status NOT IN {_FINAL_SQL}"
+            ).fetchall()
+        return [(task_id, json.loads(record), updated_at) for task_id, record, updated_at in rows]
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+class RedisTaskStore(TaskStore):
+    """
+    Store untuk deployment multi-host. `client` cukup mendukung subset API
+    redis-py: get, set(name, value, ex=None), delete, scan_iter(match=...),
+    rpush, lrange, llen dan expire, sehingga bisa diganti fake in-memory saat
+    pengembangan lokal. Kedaluwarsa ditangani Redis lewat EX. Event task
+    disimpan di list per task; posisi di list menjadi id event.
+    """
+    shared_events = True
+
+    def __init__(self, client, ttl: Optional[float] = None, prefix: str = "task:", clock=time.time, events: Optional[TaskEventBroker] = None):
+        super().__init__(ttl, clock, events)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, task_id: str, kind: str = "status") -> str:
+        return f"{self.prefix}{task_id}:{kind}"
+
+    def _get_stored(self, task_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        data = self.client.get(self._key(task_id))
+        if data is None:
+            return None, None
+        record = json.loads(data)
+        return record, record.pop(REDIS_UPDATED_FIELD, None)
+
+    def _get_record(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._get_stored(task_id)[0]
+
+    def _set_record(self, task_id, record, transcription, expires_at):
+        ex = int(self.ttl) if expires_at is not None else None
+        stored = {**record, REDIS_UPDATED_FIELD: self.clock()}
+        self.client.set(self._key(task_id), json.dumps(stored, ensure_ascii=False), ex=ex)
+        if transcription is not None:
+            self.client.set(self._key(task_id, "transcription"), transcription, ex=ex)
+
+    def get_transcription(self, task_id: str) -> Optional[str]:
+        data = self.client.get(self._key(task_id, "transcription"))
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return data
+
+    def delete(self, task_id: str):
+        self.client.delete(self._key(task_id), self._key(task_id, "transcription"), self._key(task_id, "events"))
+
+    def _append_event(self, task_id, event, data):
+        key = self._key(task_id, "events")
+        event_id = self.client.rpush(key, json.dumps({"event": event, "data": data}, ensure_ascii=False))
+        if self.ttl and event in FINAL_STATUSES:
+            # Log ikut kedaluwarsa bersama record final
+            self.client.expire(key, int(self.ttl))
+        return event_id
+
+    def events_after(self, task_id: str, after: int) -> List[TaskEvent]:
+        entries = self.client.lrange(self._key(task_id, "events"), max(0, after), -1)
+        events = []
+        for offset, entry in enumerate(entries):
+            entry = json.loads(entry)
+            events.append(TaskEvent(max(0, after) + offset + 1, entry["event"], entry["data"]))
+        return events
+
+    def last_event_id(self, task_id: str) -> int:
+        return self.client.llen(self._key(task_id, "events"))
+
+    def unfinished(self):
+        tasks = []
+        for key in self.client.scan_iter(match=f"{self.prefix}*:status"):
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            task_id = key[len(self.prefix):-len(":status")]
+            record, updated_at = self._get_stored(task_id)
+            if record is not None and record.get("status") not in FINAL_STATUSES:
+                tasks.append((task_id, record, updated_at))
+        return tasks
+
+    def count(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}*:status"))
+
+class StageTimer:
+    """
+    Catat tahap yang sedang berjalan dan durasi tiap tahap task ke field
+    `stage` dan `timings` (detik) di task store. Setiap durasi juga masuk ke
+    histogram summarizer_stage_duration_seconds dan menjadi span `stage.<nama>`.
+    """
+
+    def __init__(self, store: TaskStore, task_id: str, clock=time.monotonic):
+        self.store = store
+        self.task_id = task_id
+        self.clock = clock
+        self.started = clock()
+        self.timings: Dict[str, float] = {}
+        self._finished = False
+
+    def _store(self, name: str, seconds: float):
+        self.timings[name] = round(seconds, 3)
+        get_metrics().stage_seconds.observe(seconds, stage=name)
+
+    def record(self, name: str, seconds: float):
+        """Catat tahap yang sudah selesai (mis. waktu antre) dan berakhir sekarang."""
+        self._store(name, seconds)
+        get_tracer().record_span(f"stage.{name}", seconds, {"task_id": self.task_id})
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Ukur langkah di dalam tahap (mis. content_detection) tanpa mengubah `stage` task."""
+        started = self.clock()
+        try:
+            with get_tracer().span(f"stage.{name}", {"task_id": self.task_id}):
+                yield
+        finally:
+            self._store(name, self.clock() - started)
+
+    @contextmanager
+    def stage(self, name: str, message: Optional[str] = None) -> Iterator[None]:
+        fields: Dict[str, Any] = {"stage": name}
+        if message:
+            fields["message"] = message
+        self.store.update_nowait(self.task_id, **fields)
+        started = self.clock()
+        try:
+            with get_tracer().span(f"stage.{name}", {"task_id": self.task_id}):
+                yield
+        finally:
+            self._store(name, self.clock() - started)
+            self.store.update_nowait(self.task_id, timings=self._snapshot())
+
+    def _snapshot(self) -> Dict[str, float]:
+        return {**self.timings, "total": round(self.clock() - self.started, 3)}
+
+    def finish(self) -> Dict[str, float]:
+        """Timings final; durasi total dicatat ke histogram sekali per task."""
+        timings = self._snapshot()
+        if not self._finished:
+            self._finished = True
+            get_metrics().stage_seconds.observe(self.clock() - self.started, stage="total")
+        return timings
+
+def create_task_store(config: Config) -> TaskStore:
+    backend = config.TASK_STORE_BACKEND.lower()
+    ttl = config.TASK_TTL or None
+    # Broker mengirim event ke stream di proses ini; SQLite/Redis juga menyimpannya untuk worker lain
+    events = get_event_broker()
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("TASK_STORE_BACKEND=redis membutuhkan package 'redis' (pip install redis)")
+        return RedisTaskStore(redis.Redis.from_url(config.TASK_STORE_URL), ttl=ttl, events=events)
+    if backend == "memory":
+        return MemoryTaskStore(ttl=ttl, events=events)
+    if backend != "sqlite":
+        logging.warning(f"⚠️ TASK_STORE_BACKEND '{backend}' tidak dikenal, menggunakan sqlite")
+    return SQLiteTaskStore(config.TASK_STORE_PATH, ttl=ttl, events=events)
+
+_task_store: Optional[TaskStore] = None
+_task_store_settings: Optional[Tuple] = None
+
+def get_task_store() -> TaskStore:
+    """Task store bersama untuk proses ini, dibuat ulang jika konfigurasinya berubah."""
+    global _task_store, _task_store_settings
+    config = Config()
+    settings = (config.TASK_STORE_BACKEND, config.TASK_STORE_PATH, config.TASK_STORE_URL, config.TASK_TTL)
+    if _task_store is None or settings != _task_store_settings:
+        _task_store = create_task_store(config)
+        _task_store_settings = settings
+    return _task_store
+
+def close_task_store():
+    global _task_store, _task_store_settings
+    if _task_store is not None:
+        _task_store.close()
+    _task_store = None
+    _task_store_settings = None
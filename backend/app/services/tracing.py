@@ -0,0 +1,355 @@
+import abc
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import httpx
+from app.config import Config
+
+# Atribut yang otomatis diturunkan dari span induk ke span anak
+INHERITED_ATTRIBUTES = ("task_id",)
+# Request yang tidak dibuatkan span (scrape/health check berkala)
+UNTRACED_PATHS = ("/metrics", "/api/health")
+# Span yang menunggu diekspor; span baru dibuang jika antrean penuh
+MAX_QUEUE_SIZE = 2048
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL = 2.0
+
+class Span:
+    """Satu unit kerja dengan waktu mulai/selesai (ns epoch), atribut dan status."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "OK"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return round((self.end_ns - self.start_ns) / 1e6, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_ns": self.start_ns,
+            "end_time_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+class _NoopSpan(Span):
+    """Dikembalikan current_span() jika tidak ada span aktif; perubahan diabaikan."""
+
+    def __init__(self):
+        super().__init__("noop", trace_id="0" * 32)
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+def active_span() -> Optional[Span]:
+    """Span aktif di context ini tanpa membuat tracer (dipakai formatter log)."""
+    return _current_span.get()
+
+class SpanExporter(abc.ABC):
+    @abc.abstractmethod
+    def export(self, spans: List[Span]):
+        """Kirim satu batch span yang sudah selesai."""
+
+    def shutdown(self):
+        pass
+
+class NoopSpanExporter(SpanExporter):
+    def export(self, spans: List[Span]):
+        pass
+
+class InMemorySpanExporter(SpanExporter):
+    """Simpan span di list; dipakai untuk test."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return [span.name for span in self.spans]
+
+class ConsoleSpanExporter(SpanExporter):
+    """Satu baris JSON per span ke logger."""
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            logging.info(f"🧭 span {json.dumps(span.to_dict(), ensure_ascii=False, default=str)}")
+
+class FileSpanExporter(SpanExporter):
+    """
+    Tulis span sebagai JSON Lines. File diputar ke `<path>.1` begitu melewati
+    `max_bytes` agar tidak tumbuh tanpa batas.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n" for span in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            size = f.tell()
+        if self.max_bytes and size > self.max_bytes:
+            os.replace(self.path, f"{self.path}.1")
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Encoding OTLP/HTTP JSON (ExportTraceServiceRequest)."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "app.services.tracing"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                    "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error or ""} if span.status == "ERROR" else {"code": 1},
+                } for span in spans],
+            }],
+        }]
+    }
+
+class OTLPSpanExporter(SpanExporter):
+    """
+    Kirim span ke collector OpenTelemetry lewat OTLP/HTTP (JSON) di
+    `<endpoint>/v1/traces`. Tidak butuh package opentelemetry; berjalan di
+    thread exporter sehingga request-nya tidak memblokir event loop.
+    """
+
+    def __init__(self, endpoint: str, service_name: str, client: Optional[httpx.Client] = None, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.client = client or httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[Span]):
+        response = self.client.post(self.url, json=otlp_payload(spans, self.service_name))
+        response.raise_for_status()
+
+    def shutdown(self):
+        self.client.close()
+
+class Tracer:
+    """
+    Pembuat span. Span aktif disimpan di contextvar sehingga span yang dibuat
+    di dalamnya (termasuk di task asyncio turunan) otomatis menjadi anaknya.
+    Span selesai diekspor per batch oleh thread terpisah; dengan `batch=False`
+    langsung diekspor (dipakai test).
+    """
+
+    def __init__(self, exporter: SpanExporter, batch: bool = True, max_queue_size: int = MAX_QUEUE_SIZE):
+        self.exporter = exporter
+        self.batch = batch
+        self.dropped = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Span yang sudah diantrekan tetapi belum selesai diekspor
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+    def current_span(self) -> Span:
+        return _current_span.get() or _NoopSpan()
+
+    def _new_span(self, name: str, attributes: Optional[Dict[str, Any]], parent: Optional[Span], start_ns: Optional[int] = None) -> Span:
+        parent = parent if parent is not None else _current_span.get()
+        if parent is not None and not isinstance(parent, _NoopSpan):
+            inherited = {key: parent.attributes[key] for key in INHERITED_ATTRIBUTES if key in parent.attributes}
+            return Span(name, parent.trace_id, parent.span_id, {**inherited, **(attributes or {})}, start_ns)
+        return Span(name, secrets.token_hex(16), None, attributes, start_ns)
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[Span] = None,
+             activate: bool = True) -> Iterator[Span]:
+        """
+        Buka span selama blok `with`. Exception dicatat sebagai status ERROR lalu
+        diteruskan. `activate=False` tidak menjadikan span ini induk span lain;
+        dipakai di async generator yang bisa ditutup dari context berbeda.
+        """
+        span = self._new_span(name, attributes, parent)
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+            self.end(span)
+
+    def record_span(self, name: str, seconds: float, attributes: Optional[Dict[str, Any]] = None,
+                    parent: Optional[Span] = None) -> Span:
+        """Span untuk durasi yang sudah terjadi dan berakhir sekarang (mis. waktu antre)."""
+        end_ns = time.time_ns()
+        span = self._new_span(name, attributes, parent, start_ns=end_ns - int(seconds * 1e9))
+        self.end(span, end_ns)
+        return span
+
+    def end(self, span: Span, end_ns: Optional[int] = None):
+        span.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if isinstance(self.exporter, NoopSpanExporter):
+            return
+        if not self.batch:
+            self._export([span])
+            return
+        with self._lock:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+                return
+            self._pending += 1
+            # Thread exporter berhenti sendiri saat idle dan dijalankan lagi di sini
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _export(self, spans: List[Span]):
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            logging.warning(f"⚠️ Gagal mengekspor {len(spans)} span: {str(e)}")
+
+    def _run(self):
+        while True:
+            try:
+                spans = [self._queue.get(timeout=EXPORT_INTERVAL)]
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            while len(spans) < EXPORT_BATCH_SIZE:
+                try:
+                    spans.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._export(spans)
+            with self._idle:
+                self._pending -= len(spans)
+                self._idle.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Tunggu sampai semua span di antrean selesai diekspor."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, timeout: float = 5.0):
+        self.flush(timeout)
+        self.exporter.shutdown()
+
+def create_span_exporter(config: Config) -> SpanExporter:
+    kind = config.TRACING_EXPORTER.lower()
+    if kind == "none":
+        return NoopSpanExporter()
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "otlp":
+        return OTLPSpanExporter(config.TRACING_OTLP_ENDPOINT, config.TRACING_SERVICE_NAME)
+    if kind != "file":
+        logging.warning(f"⚠️ TRACING_EXPORTER '{kind}' tidak dikenal, menggunakan file")
+    return FileSpanExporter(config.TRACING_FILE, config.TRACING_FILE_MAX_BYTES)
+
+class TracingMiddleware:
+    """
+    Middleware ASGI: satu span per request HTTP (kecuali UNTRACED_PATHS).
+    Handler berjalan di dalam span ini, jadi span yang dibuat route, termasuk
+    job background yang mencatatnya sebagai induk, masuk ke trace yang sama.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNTRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        attributes = {"http.method": scope["method"], "http.target": scope["path"]}
+        with get_tracer().span(f"{scope['method']} {scope['path']}", attributes) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+            # Nama span memakai template route (mis. /api/summarize/status/{request_id})
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                span.name = f"{scope['method']} {route.path}"
+
+_tracer: Optional[Tracer] = None
+_tracer_settings: Optional[Tuple] = None
+
+def get_tracer() -> Tracer:
+    """Tracer bersama untuk proses ini, dibuat ulang jika konfigurasi tracing berubah."""
+    global _tracer, _tracer_settings
+    config = Config()
+    settings = (config.TRACING_EXPORTER, config.TRACING_FILE, config.TRACING_FILE_MAX_BYTES,
+                config.TRACING_OTLP_ENDPOINT, config.TRACING_SERVICE_NAME)
+    if _tracer is None or settings != _tracer_settings:
+        if _tracer is not None:
+            _tracer.shutdown()
+        _tracer = Tracer(create_span_exporter(config))
+        _tracer_settings = settings
+    return _tracer
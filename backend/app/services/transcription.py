@@ -0,0 +1,214 @@
+import abc
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+import httpx
+from app.config import Config
+from app.services.metrics import get_metrics
+from app.services.tracing import get_tracer
+from app.services.whisper import transcribe_audio_async
+
+class TranscriptionUnavailable(RuntimeError):
+    """Backend transkripsi tidak bisa dipakai di environment ini (mis. paket belum terpasang)."""
+
+class TranscriptionBackend(abc.ABC):
+    """
+    Antarmuka backend transkripsi. Implementasi menerima path file audio dan
+    mengembalikan teks; retry, batas konkurensi dan resource (client HTTP,
+    pool proses) diurus backend masing-masing.
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    async def transcribe(self, file_path: str, language: str = "id") -> str:
+        """Transkripsi satu file audio."""
+
+    def stats(self) -> Dict:
+        return {"backend": self.name}
+
+    def close(self):
+        pass
+
+class HttpWhisperBackend(TranscriptionBackend):
+    """Whisper lewat API HTTP (Groq/OpenAI-compatible) memakai client pooled dan retry bersama."""
+    name = "http"
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        # Tanpa client: client pooled "whisper" dari app.services.http_clients
+        self.client = client
+
+    async def transcribe(self, file_path: str, language: str = "id") -> str:
+        if self.client is not None:
+            return await transcribe_audio_async(file_path, language=language, client=self.client)
+        return await transcribe_audio_async(file_path, language=language)
+
+def available_cpus() -> int:
+    """Jumlah core yang boleh dipakai proses ini (menghormati CPU affinity/cgroup cpuset)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+def local_pool_size(workers: int, threads_per_worker: int, cpus: Optional[int] = None) -> int:
+    """Jumlah proses worker: `workers` jika diisi, selain itu core tersedia dibagi thread per worker."""
+    if workers > 0:
+        return workers
+    return max(1, (cpus or available_cpus()) // max(1, threads_per_worker))
+
+def faster_whisper_available() -> bool:
+    return importlib.util.find_spec("faster_whisper") is not None
+
+# Model dimuat sekali per proses worker lalu dipakai ulang oleh semua file berikutnya
+_worker_model = None
+_worker_model_settings: Optional[Tuple] = None
+
+def _load_worker_model(settings: Tuple):
+    global _worker_model, _worker_model_settings
+    if _worker_model is None or settings != _worker_model_settings:
+        from faster_whisper import WhisperModel
+        model_name, compute_type, cpu_threads, model_dir = settings
+        _worker_model = WhisperModel(
+            model_name, device="cpu", compute_type=compute_type,
+            cpu_threads=cpu_threads, download_root=model_dir or None,
+        )
+        _worker_model_settings = settings
+    return _worker_model
+
+def _transcribe_in_worker(settings: Tuple, file_path: str, language: str, beam_size: int) -> Tuple[str, float, float]:
+    """Dijalankan di proses worker. Mengembalikan (teks, durasi audio, detik proses)."""
+    started = time.perf_counter()
+    model = _load_worker_model(settings)
+    segments, info = model.transcribe(file_path, language=language, beam_size=beam_size, vad_filter=True)
+    # `segments` berupa generator: decoding baru berjalan saat diiterasi
+    text = " ".join(segment.text.strip() for segment in segments if segment.text.strip())
+    return text, float(info.duration or 0.0), time.perf_counter() - started
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Whisper offline di CPU (faster-whisper/CTranslate2, kuantisasi int8).
+    Decoding dijalankan di pool proses agar tidak menahan event loop maupun
+    GIL; tiap worker memakai `threads_per_worker` thread CTranslate2 dan
+    jumlah worker default-nya menyesuaikan core yang tersedia.
+    """
+    name = "local"
+
+    def __init__(self, model: str = "small", compute_type: str = "int8", workers: int = 0,
+                 threads_per_worker: int = 2, model_dir: str = "", beam_size: int = 1):
+        self.model = model
+        self.compute_type = compute_type
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.workers = local_pool_size(workers, self.threads_per_worker)
+        self.beam_size = max(1, beam_size)
+        self.settings = (model, compute_type, self.threads_per_worker, model_dir)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                if not faster_whisper_available():
+                    raise TranscriptionUnavailable(
+                        "TRANSCRIPTION_BACKEND=local membutuhkan paket faster-whisper (pip install faster-whisper)"
+                    )
+                # spawn: worker tidak mewarisi thread/lock proses server (aman untuk CTranslate2)
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                logging.info(
+                    f"🧠 Whisper lokal siap: model {self.model} ({self.compute_type}), "
+                    f"{self.workers} worker x {self.threads_per_worker} thread"
+                )
+            return self._executor
+
+    async def transcribe(self, file_path: str, language: str = "id") -> str:
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        with get_tracer().span("whisper.local", {"model": self.model, "compute_type": self.compute_type}) as span:
+            self.in_flight += 1
+            try:
+                text, duration, seconds = await loop.run_in_executor(
+                    executor, _transcribe_in_worker, self.settings, file_path, language, self.beam_size
+                )
+            finally:
+                self.in_flight -= 1
+            self.completed += 1
+            self.audio_seconds += duration
+            self.processing_seconds += seconds
+            rtf = seconds / duration if duration > 0 else 0.0
+            span.set_attribute("audio_seconds", round(duration, 2))
+            span.set_attribute("rtf", round(rtf, 3))
+            get_metrics().transcription_rtf.observe(rtf, backend=self.name)
+            logging.info(f"🧠 Transkripsi lokal {duration:.0f}s audio dalam {seconds:.1f}s (RTF {rtf:.2f})")
+        return text
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "compute_type": self.compute_type,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "started": self._executor is not None,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rtf": round(self.processing_seconds / self.audio_seconds, 3) if self.audio_seconds else None,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+def create_transcription_backend(config: Config) -> TranscriptionBackend:
+    backend = config.TRANSCRIPTION_BACKEND.lower()
+    if backend == "local":
+        return LocalWhisperBackend(
+            model=config.LOCAL_WHISPER_MODEL,
+            compute_type=config.LOCAL_WHISPER_COMPUTE_TYPE,
+            workers=config.LOCAL_WHISPER_WORKERS,
+            threads_per_worker=config.LOCAL_WHISPER_THREADS,
+            model_dir=config.LOCAL_WHISPER_MODEL_DIR,
+            beam_size=config.LOCAL_WHISPER_BEAM_SIZE,
+        )
+    if backend != "http":
+        logging.warning(f"⚠️ TRANSCRIPTION_BACKEND '{backend}' tidak dikenal, menggunakan http")
+    return HttpWhisperBackend()
+
+_transcription_backend: Optional[TranscriptionBackend] = None
+_transcription_backend_settings: Optional[Tuple] = None
+
+def get_transcription_backend() -> TranscriptionBackend:
+    """Backend transkripsi bersama untuk proses ini, dibuat ulang jika konfigurasinya berubah."""
+    global _transcription_backend, _transcription_backend_settings
+    config = Config()
+    settings = (
+        config.TRANSCRIPTION_BACKEND.lower(), config.LOCAL_WHISPER_MODEL, config.LOCAL_WHISPER_COMPUTE_TYPE,
+        config.LOCAL_WHISPER_WORKERS, config.LOCAL_WHISPER_THREADS, config.LOCAL_WHISPER_MODEL_DIR,
+        config.LOCAL_WHISPER_BEAM_SIZE,
+    )
+    if _transcription_backend is None or settings != _transcription_backend_settings:
+        if _transcription_backend is not None:
+            _transcription_backend.close()
+        _transcription_backend = create_transcription_backend(config)
+        _transcription_backend_settings = settings
+    return _transcription_backend
+
+def close_transcription_backend():
+    global _transcription_backend, _transcription_backend_settings
+    if _transcription_backend is not None:
+        _transcription_backend.close()
+    _transcription_backend = None
+    _transcription_backend_settings = None
+
+async def transcribe_with_backend(file_path: str, language: str = "id") -> str:
+    """Transkripsi satu file audio dengan backend dari TRANSCRIPTION_BACKEND."""
+    return await get_transcription_backend().transcribe(file_path, language=language)
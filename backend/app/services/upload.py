@@ -0,0 +1,273 @@
+import asyncio
+import codecs
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from multipart.multipart import MultipartParser, parse_options_header
+
+# Cukup beberapa byte pertama untuk mengenali header MP3
+SNIFF_BYTES = 4
+# Toleransi overhead multipart (boundary, header part) saat memeriksa Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+class UploadError(Exception):
+    """Upload ditolak; `status_code` dipakai route sebagai kode HTTP."""
+
+    status_code = 400
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        if status_code is not None:
+            self.status_code = status_code
+
+class UploadTooLarge(UploadError):
+    status_code = 413
+
+class InvalidAudioFile(UploadError):
+    status_code = 400
+
+def looks_like_mp3(header: bytes) -> bool:
+    """Kenali MP3 dari tag ID3v2 atau frame sync MPEG audio (11 bit pertama bernilai 1)."""
+    if header.startswith(b"ID3"):
+        return True
+    return len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0
+
+@dataclass
+class UploadResult:
+    filename: str
+    path: str
+    size: int
+    sha256: str
+
+class StreamingFileWriter:
+    """
+    Tulis upload ke disk per chunk sambil menghitung SHA-256, memeriksa batas
+    ukuran dan mengenali header MP3 dalam satu kali lewat.
+    """
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._header = b""
+        self._file = open(path, "wb")
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLarge(f"Ukuran file melebihi batas {self.max_size // (1024 * 1024)}MB")
+        if len(self._header) < SNIFF_BYTES:
+            self._header += data[:SNIFF_BYTES - len(self._header)]
+            if len(self._header) >= SNIFF_BYTES and not looks_like_mp3(self._header):
+                raise InvalidAudioFile("File bukan audio MP3 yang valid")
+        self._digest.update(data)
+        self._file.write(data)
+
+    def finish(self) -> str:
+        self._file.close()
+        if self.size == 0:
+            raise InvalidAudioFile("File kosong")
+        if not looks_like_mp3(self._header):
+            raise InvalidAudioFile("File bukan audio MP3 yang valid")
+        return self._digest.hexdigest()
+
+    def abort(self):
+        try:
+            self._file.close()
+        finally:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+def _content_disposition(headers: List[Tuple[bytes, bytes]]) -> Tuple[Optional[str], Optional[str]]:
+    for name, value in headers:
+        if name.lower() == b"content-disposition":
+            _, options = parse_options_header(value)
+            field = options.get(b"name")
+            filename = options.get(b"filename")
+            return (
+                field.decode("utf-8", "replace") if field is not None else None,
+                filename.decode("utf-8", "replace") if filename is not None else None,
+            )
+    return None, None
+
+@dataclass
+class MultipartForm:
+    files: List[UploadResult]
+    fields: Dict[str, List[str]]
+
+async def receive_upload(
+    content_type: str,
+    stream: AsyncIterator[bytes],
+    dest_dir: str,
+    max_size: int,
+    field_name: str = "file",
+    filename_prefix: str = "",
+    allowed_extension: str = ".mp3",
+) -> UploadResult:
+    """
+    Parse body multipart langsung dari stream request dan simpan part `field_name`
+    ke `dest_dir`. Upload dihentikan begitu ukuran melebihi `max_size` atau
+    header file bukan MP3, tanpa menunggu seluruh body diterima.
+    """
+    form = await receive_multipart(
+        content_type, stream, dest_dir, max_size,
+        file_fields=(field_name,), filename_prefix=filename_prefix, allowed_extension=allowed_extension,
+    )
+    if not form.files:
+        raise UploadError(f"Field '{field_name}' wajib berisi file", status_code=422)
+    return form.files[0]
+
+async def receive_multipart(
+    content_type: str,
+    stream: AsyncIterator[bytes],
+    dest_dir: str,
+    max_size: int,
+    file_fields: Tuple[str, ...] = ("file",),
+    max_files: int = 1,
+    text_fields: Tuple[str, ...] = (),
+    max_text_size: int = 0,
+    filename_prefix: str = "",
+    allowed_extension: str = ".mp3",
+) -> MultipartForm:
+    """
+    Versi umum receive_upload: simpan hingga `max_files` part file dari
+    `file_fields` (lebih dari itu ditolak 413) dan kumpulkan nilai part teks
+    `text_fields` di memori, masing-masing maksimal `max_text_size` byte.
+    Tanpa `text_fields`, sisa body tidak dibaca lagi setelah file terakhir dan
+    part file berlebih diabaikan.
+    Semua file yang sudah tersimpan dihapus jika request gagal.
+    """
+    mime, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if mime != b"multipart/form-data" or not boundary:
+        raise UploadError("Request harus berupa multipart/form-data", status_code=422)
+
+    # Event parser dikumpulkan lalu diproses di luar callback agar penulisan
+    # ke disk bisa dijalankan di thread tanpa memblokir event loop
+    events: List[Tuple[str, object]] = []
+    headers: List[Tuple[bytes, bytes]] = []
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        headers.append((bytes(header_field), bytes(header_value)))
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        events.append(("part", _content_disposition(headers)))
+        headers.clear()
+
+    def on_part_data(data, start, end):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(boundary, callbacks={
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    form = MultipartForm(files=[], fields={})
+    writer: Optional[StreamingFileWriter] = None
+    text_name: Optional[str] = None
+    text_value = bytearray()
+    filename = ""
+    try:
+        async for chunk in stream:
+            if len(form.files) >= max_files and not text_fields:
+                # Semua file sudah lengkap; sisa body tidak perlu diproses
+                break
+            parser.write(chunk)
+            pending: List[bytes] = []
+            for kind, payload in events:
+                if kind == "part":
+                    field, part_filename = payload
+                    text_name = field if field in text_fields and part_filename is None else None
+                    if field in file_fields and part_filename:
+                        if len(form.files) >= max_files:
+                            if not text_fields:
+                                # Mode satu file: part berikutnya diabaikan seperti sebelumnya
+                                continue
+                            raise UploadTooLarge(f"Maksimal {max_files} file per request")
+                        filename = os.path.basename(part_filename)
+                        if not filename.lower().endswith(allowed_extension):
+                            raise InvalidAudioFile(f"Hanya file {allowed_extension[1:].upper()} yang didukung")
+                        index = f"{len(form.files)}_" if max_files > 1 else ""
+                        path = os.path.join(dest_dir, f"{filename_prefix}{index}{filename}")
+                        try:
+                            writer = StreamingFileWriter(path, max_size)
+                        except Exception as e:
+                            logging.error(f"❌ Gagal menyimpan file: {str(e)}")
+                            raise UploadError("Gagal menyimpan file", status_code=500)
+                elif kind == "data" and writer is not None:
+                    pending.append(payload)
+                elif kind == "data" and text_name is not None:
+                    text_value.extend(payload)
+                    if len(text_value) > max_text_size:
+                        raise UploadTooLarge(f"Field '{text_name}' melebihi batas {max_text_size // (1024 * 1024)}MB")
+                elif kind == "end" and writer is not None:
+                    if pending:
+                        await asyncio.to_thread(writer.write, b"".join(pending))
+                        pending = []
+                    sha256 = await asyncio.to_thread(writer.finish)
+                    form.files.append(UploadResult(filename, writer.path, writer.size, sha256))
+                    writer = None
+                elif kind == "end" and text_name is not None:
+                    form.fields.setdefault(text_name, []).append(text_value.decode("utf-8", "replace"))
+                    text_value.clear()
+                    text_name = None
+            events.clear()
+            if pending:
+                await asyncio.to_thread(writer.write, b"".join(pending))
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        remove_uploads(form.files)
+        raise
+
+    if writer is not None:
+        # Body terputus di tengah part file
+        writer.abort()
+    return form
+
+def remove_uploads(files: List[UploadResult]):
+    for result in files:
+        if os.path.exists(result.path):
+            os.remove(result.path)
+
+async def receive_text(stream: AsyncIterator[bytes], max_size: int, encoding: str = "utf-8") -> str:
+    """
+    Baca body teks dari stream request per chunk tanpa menyalin seluruh body
+    ke satu buffer bytes terlebih dulu; dihentikan begitu melebihi `max_size`.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+    except LookupError:
+        raise UploadError(f"Charset '{encoding}' tidak didukung", status_code=415)
+    parts: List[str] = []
+    size = 0
+    try:
+        async for chunk in stream:
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(f"Teks melebihi batas {max_size // (1024 * 1024)}MB")
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+    except UnicodeDecodeError:
+        raise UploadError(f"Body bukan teks {encoding} yang valid", status_code=400)
+    return "".join(parts)
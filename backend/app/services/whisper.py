@@ -1,28 +1,62 @@
 import logging
+import os
+import httpx
 import requests
-import time
+from typing import Optional
 from app.config import Config
+from app.services.http_clients import get_http_client
+from app.services.metrics import get_metrics
+from app.services.resilience import retry_async, retry_sync
+from app.services.tracing import get_tracer
+from app.utils.logger import payload_field
+
+# Upload audio bisa lama untuk file besar
+WHISPER_TIMEOUT = 300
 
 def transcribe_audio(file_path: str, language: str = "en") -> str:
-    max_retries = 3
-    backoff = 2
-    for attempt in range(max_retries):
-        try:
-            logging.info(f"Sending transcription request to {Config.WHISPER_API_URL}")
-            with open(file_path, "rb") as audio_file:
-                response = requests.post(
-                    Config.WHISPER_API_URL,
-                    headers={"Authorization": f"Bearer {Config.WHISPER_API_KEY}"},
+    def attempt(number: int) -> str:
+        logging.info(f"Sending transcription request to {Config.WHISPER_API_URL}")
+        with open(file_path, "rb") as audio_file:
+            response = requests.post(
+                Config.WHISPER_API_URL,
+                headers={"Authorization": f"Bearer {Config.WHISPER_API_KEY}"},
+                files={"file": audio_file},
+                data={"model": "whisper-large-v3", "language": language},
+            )
+            # Body berisi seluruh transkrip: hanya ukuran dan cuplikan tersampel yang dicatat
+            logging.info(f"API Response Status: {response.status_code}", extra={"response_body": payload_field(response.text)})
+            response.raise_for_status()
+            return response.json().get("text", "")
+
+    return retry_sync("whisper", attempt)
+
+async def transcribe_audio_async(file_path: str, language: str = "en", client: Optional[httpx.AsyncClient] = None) -> str:
+    """
+    Versi async dari transcribe_audio. Tidak memblokir event loop selama upload
+    maupun saat menunggu backoff retry. Request memakai client pooled bersama
+    (keep-alive) sehingga retry tidak membuka koneksi TLS baru. Retry, backoff
+    dan circuit breaker diatur app.services.resilience.
+    """
+    config = Config()
+    client = client or get_http_client("whisper")
+    metrics = get_metrics()
+    tracer = get_tracer()
+
+    async def attempt(number: int) -> str:
+        logging.info(f"Sending transcription request to {config.WHISPER_API_URL}")
+        with open(file_path, "rb") as audio_file, tracer.span("whisper.attempt", {"attempt": number}) as span:
+            with metrics.upstream_attempt("whisper") as tracked:
+                response = await client.post(
+                    config.WHISPER_API_URL,
+                    headers={"Authorization": f"Bearer {config.WHISPER_API_KEY}"},
                     files={"file": audio_file},
                     data={"model": "whisper-large-v3", "language": language},
                 )
-                logging.info(f"API Response Status: {response.status_code}")
-                logging.info(f"API Response Body: {response.text}")
-                response.raise_for_status()
-                return response.json().get("text", "")
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"Whisper API request failed (attempt {attempt+1}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(backoff ** attempt)
-            else:
-                raise
+                tracked.status = response.status_code
+            span.set_attribute("http.status_code", response.status_code)
+            logging.info(f"API Response Status: {response.status_code}")
+            response.raise_for_status()
+        return response.json().get("text", "")
+
+    with tracer.span("whisper.transcribe", {"language": language, "file_bytes": os.path.getsize(file_path)}):
+        return await retry_async("whisper", attempt)
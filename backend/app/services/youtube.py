@@ -0,0 +1,284 @@
+import asyncio
+import html
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, List, Optional, Tuple
+from app.config import Config
+from app.utils.logger import truncate
+
+# Format audio yang diterima Whisper API tanpa perlu re-encode
+WHISPER_AUDIO_EXTENSIONS = ("flac", "m4a", "mp3", "mp4", "mpeg", "mpga", "oga", "ogg", "opus", "wav", "webm")
+# Audio-only yang sudah terkompresi (Opus di WebM, AAC di M4A); bitrate ~64k cukup untuk ucapan
+DEFAULT_AUDIO_FORMAT = "bestaudio[ext=webm]/bestaudio[ext=m4a]/bestaudio"
+DEFAULT_FORMAT_SORT = "abr~64"
+
+PROGRESS_PREFIX = "PROGRESS "
+FILEPATH_PREFIX = "FILEPATH "
+# Hanya ekor output yang disimpan untuk pesan error (dipotong lagi ke LOG_PAYLOAD_MAX_CHARS)
+OUTPUT_TAIL_LINES = 20
+# Jarak minimum antar callback progress (detik)
+PROGRESS_INTERVAL = 1.0
+# Format subtitle yang bisa dibersihkan tanpa ffmpeg, urut preferensi
+CAPTION_EXTENSIONS = (".vtt", ".srt")
+# Subtitle lebih pendek dari ini dianggap tidak layak (mis. hanya "[Musik]")
+MIN_CAPTION_WORDS = 20
+
+# Blok VTT yang bukan cue
+_VTT_META_BLOCKS = ("WEBVTT", "NOTE", "STYLE", "REGION")
+# Tag inline (<c>, <i>, <00:00:01.230>) dan anotasi suara ([Musik], [Tepuk tangan])
+_CAPTION_TAG = re.compile(r"<[^>]*>")
+_CAPTION_ANNOTATION = re.compile(r"\[[^\]]*\]")
+# Penanda pergantian pembicara di auto-caption YouTube
+_SPEAKER_MARK = re.compile(r"^(?:>>\s*|-\s+)")
+_WHITESPACE = re.compile(r"\s+")
+
+ProgressCallback = Callable[[Optional[float], int, Optional[int], Optional[int]], None]
+
+class YouTubeDownloadError(Exception):
+    pass
+
+def resolve_yt_dlp_path(configured: str) -> str:
+    """Pakai YT_DLP_PATH jika ada di PATH; fallback ke yt-dlp di venv Windows lama."""
+    if shutil.which(configured):
+        return configured
+    legacy = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../venv/Scripts/yt-dlp.exe"))
+    if os.path.exists(legacy):
+        return legacy
+    return configured
+
+def build_yt_dlp_command(
+    yt_dlp_path: str,
+    youtube_url: str,
+    output_dir: str,
+    audio_format: str = DEFAULT_AUDIO_FORMAT,
+    reencode: bool = False,
+) -> List[str]:
+    """
+    Susun perintah yt-dlp yang mengambil stream audio-only terkompresi langsung,
+    mencetak progress per baris dan path file akhir ke stdout.
+    """
+    command = [
+        yt_dlp_path,
+        "-f", audio_format,
+        "-S", DEFAULT_FORMAT_SORT,
+        "--no-playlist",
+        "--no-warnings",
+        "--newline",
+        "--progress",
+        "--progress-template",
+        f"download:{PROGRESS_PREFIX}%(progress.downloaded_bytes)s "
+        "%(progress.total_bytes,progress.total_bytes_estimate)s %(progress.eta)s",
+        "--print", f"after_move:{FILEPATH_PREFIX}%(filepath)s",
+        "-o", os.path.join(output_dir, "%(id)s.%(ext)s"),
+    ]
+    if reencode:
+        command += ["--extract-audio", "--audio-format", "mp3", "--audio-quality", "64K"]
+    return command + [youtube_url]
+
+def _to_int(value: str) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def parse_progress_line(line: str):
+    """Ubah baris progress template menjadi (persen, byte terunduh, total byte, eta)."""
+    parts = line[len(PROGRESS_PREFIX):].split()
+    if len(parts) < 3:
+        return None
+    downloaded, total, eta = (_to_int(part) for part in parts[:3])
+    percent = round(downloaded / total * 100, 1) if downloaded is not None and total else None
+    return percent, downloaded or 0, total, eta
+
+@dataclass
+class Captions:
+    text: str
+    language: str
+    format: str
+
+def build_yt_dlp_captions_command(yt_dlp_path: str, youtube_url: str, output_dir: str, language: str = "id") -> List[str]:
+    """
+    Perintah yt-dlp yang hanya mengambil subtitle (manual, atau auto-generated
+    jika tidak ada) untuk `language` dan variannya (mis. id-ID), tanpa video/audio.
+    """
+    return [
+        yt_dlp_path,
+        "--skip-download",
+        "--write-subs",
+        "--write-auto-subs",
+        "--sub-langs", f"{language}(-.*)?",
+        "--sub-format", "vtt/srt/best",
+        "--no-playlist",
+        "--no-warnings",
+        "-o", os.path.join(output_dir, "%(id)s.%(ext)s"),
+        youtube_url,
+    ]
+
+def clean_captions(raw: str) -> str:
+    """
+    Ubah isi VTT/SRT menjadi teks biasa: header, nomor cue, timestamp, tag
+    inline dan anotasi suara dibuang. Auto-caption YouTube mengulang baris
+    sebelumnya di setiap cue (roll-up), jadi baris yang sama dengan baris
+    terakhir dilewati.
+    """
+    lines: List[str] = []
+    # Cue dipisah baris kosong; baris berisi spasi saja (umum di auto-caption) masih bagian cue
+    for block in re.split(r"\n{2,}", raw.lstrip("\ufeff").replace("\r\n", "\n")):
+        block_lines = block.strip().split("\n")
+        if not block_lines[0] or block_lines[0].startswith(_VTT_META_BLOCKS):
+            continue
+        timing = next((index for index, line in enumerate(block_lines) if "-->" in line), None)
+        if timing is None:
+            continue
+        for line in block_lines[timing + 1:]:
+            line = html.unescape(_CAPTION_TAG.sub("", line))
+            line = _WHITESPACE.sub(" ", _SPEAKER_MARK.sub("", _CAPTION_ANNOTATION.sub("", line))).strip()
+            if line and (not lines or line != lines[-1]):
+                lines.append(line)
+    return " ".join(lines)
+
+def pick_caption_file(filenames: Iterable[str], language: str = "id") -> Optional[str]:
+    """Pilih track `<id>.<lang>.<ext>`: bahasa persis lebih dulu dari variannya, VTT lebih dulu dari SRT."""
+    candidates = []
+    for filename in filenames:
+        stem, extension = os.path.splitext(filename)
+        if extension.lower() not in CAPTION_EXTENSIONS:
+            continue
+        track_language = stem.rsplit(".", 1)[-1]
+        candidates.append((track_language != language, CAPTION_EXTENSIONS.index(extension.lower()), filename))
+    return min(candidates)[2] if candidates else None
+
+def load_captions(path: str, min_words: int = MIN_CAPTION_WORDS) -> Optional[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = clean_captions(f.read())
+    return text if len(text.split()) >= min_words else None
+
+async def fetch_youtube_captions_async(youtube_url: str, output_dir: str, language: str = "id") -> Optional[Captions]:
+    """
+    Ambil dan bersihkan subtitle YouTube. None jika tidak ada track yang layak
+    atau yt-dlp gagal, sehingga pemanggil bisa fallback ke download audio.
+    """
+    config = Config()
+    yt_dlp_path = resolve_yt_dlp_path(config.YT_DLP_PATH)
+    caption_dir = tempfile.mkdtemp(prefix="captions_", dir=output_dir)
+    command = build_yt_dlp_captions_command(yt_dlp_path, youtube_url, caption_dir, language)
+    logging.info(f"💬 Mengambil subtitle: {youtube_url}")
+    try:
+        try:
+            returncode, _, output_tail = await _exec_yt_dlp(command, config.YT_CAPTIONS_TIMEOUT, None)
+        except YouTubeDownloadError as e:
+            logging.warning(f"⚠️ Subtitle tidak bisa diambil, fallback ke audio: {str(e)}")
+            return None
+        if returncode != 0:
+            logging.warning(f"⚠️ Subtitle tidak bisa diambil (exit {returncode}), fallback ke audio: {truncate(' | '.join(output_tail))}")
+            return None
+        filename = pick_caption_file(os.listdir(caption_dir), language)
+        if filename is None:
+            logging.info(f"ℹ️ Tidak ada subtitle '{language}' untuk {youtube_url}, fallback ke audio")
+            return None
+        text = await asyncio.to_thread(load_captions, os.path.join(caption_dir, filename))
+        if text is None:
+            logging.info(f"ℹ️ Subtitle {filename} terlalu pendek, fallback ke audio")
+            return None
+        track_language = os.path.splitext(filename)[0].rsplit(".", 1)[-1]
+        logging.info(f"✅ Subtitle {filename} dipakai ({len(text)} karakter)")
+        return Captions(text, track_language, os.path.splitext(filename)[1].lstrip("."))
+    finally:
+        shutil.rmtree(caption_dir, ignore_errors=True)
+
+async def download_youtube_audio_async(
+    youtube_url: str,
+    output_dir: str,
+    on_progress: Optional[ProgressCallback] = None,
+    accepted_extensions: Iterable[str] = WHISPER_AUDIO_EXTENSIONS,
+) -> str:
+    """
+    Download audio YouTube dengan yt-dlp sebagai subprocess asyncio (tidak
+    memblokir event loop). Stream audio-only dipakai apa adanya jika formatnya
+    diterima backend transkripsi; hanya format lain yang di-re-encode ke MP3.
+    Path file diambil dari output yt-dlp, bukan dari isi folder.
+    """
+    config = Config()
+    yt_dlp_path = resolve_yt_dlp_path(config.YT_DLP_PATH)
+    command = build_yt_dlp_command(yt_dlp_path, youtube_url, output_dir)
+    logging.info(f"🎬 Downloading: {youtube_url}")
+
+    file_path = await _run_yt_dlp(command, config.YT_DLP_TIMEOUT, on_progress)
+    extension = os.path.splitext(file_path)[1].lstrip(".").lower()
+    if extension not in accepted_extensions:
+        logging.info(f"🔁 Format .{extension} tidak didukung backend transkripsi, re-encode ke MP3")
+        os.remove(file_path)
+        command = build_yt_dlp_command(yt_dlp_path, youtube_url, output_dir, reencode=True)
+        file_path = await _run_yt_dlp(command, config.YT_DLP_TIMEOUT, on_progress)
+
+    file_size = os.path.getsize(file_path) / (1024 * 1024)
+    logging.info(f"✅ Downloaded: {os.path.basename(file_path)} ({file_size:.1f} MB)")
+    return file_path
+
+async def _run_yt_dlp(command: List[str], timeout: float, on_progress: Optional[ProgressCallback]) -> str:
+    returncode, file_paths, output_tail = await _exec_yt_dlp(command, timeout, on_progress)
+    if returncode != 0 or not file_paths or not os.path.exists(file_paths[-1]):
+        details = truncate(" | ".join(output_tail))
+        logging.error(f"❌ Download error (exit {returncode}): {details}")
+        raise YouTubeDownloadError(f"Download error: yt-dlp exit code {returncode}: {details}")
+    return file_paths[-1]
+
+async def _exec_yt_dlp(
+    command: List[str], timeout: float, on_progress: Optional[ProgressCallback]
+) -> Tuple[int, List[str], Deque[str]]:
+    """Jalankan yt-dlp; mengembalikan (exit code, path dari baris FILEPATH, ekor output lain)."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise YouTubeDownloadError(f"yt-dlp tidak ditemukan: {command[0]}")
+
+    output_tail: Deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    file_paths: List[str] = []
+    last_progress = 0.0
+
+    async def read_stream(stream: asyncio.StreamReader):
+        nonlocal last_progress
+        while True:
+            raw = await stream.readline()
+            if not raw:
+                break
+            line = raw.decode(errors="replace").strip()
+            if line.startswith(PROGRESS_PREFIX):
+                progress = parse_progress_line(line)
+                now = time.monotonic()
+                finished = progress is not None and progress[0] == 100.0
+                if progress and on_progress and (finished or now - last_progress >= PROGRESS_INTERVAL):
+                    last_progress = now
+                    on_progress(*progress)
+            elif line.startswith(FILEPATH_PREFIX):
+                file_paths.append(line[len(FILEPATH_PREFIX):])
+            elif line:
+                output_tail.append(line)
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(read_stream(process.stdout), read_stream(process.stderr), process.wait()),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        logging.error("❌ Download timeout - video terlalu panjang atau koneksi lambat")
+        raise YouTubeDownloadError("Download timeout - video terlalu panjang atau koneksi lambat")
+    finally:
+        # Timeout, job dibatalkan (shutdown/cleanup) atau error lain: jangan tinggalkan yt-dlp berjalan
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    logging.info(f"🔚 yt-dlp exited with code: {process.returncode}")
+    return process.returncode, file_paths, output_tail
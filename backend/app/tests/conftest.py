@@ -0,0 +1,25 @@
+import pytest
+from app.services import cache, cpu_executor, events, http_clients, job_queue, metrics, resilience, task_store, tracing, transcription
+
+@pytest.fixture(autouse=True)
+def isolated_stores(monkeypatch, tmp_path, tmp_path_factory):
+    # Setiap test mendapat cache hasil, task store, broker event, antrean job, client HTTP, metric, tracer dan circuit breaker yang baru
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    monkeypatch.setenv("TASK_STORE_BACKEND", "sqlite")
+    monkeypatch.setenv("TASK_STORE_PATH", str(tmp_path / "tasks.sqlite3"))
+    # Test route YouTube tidak boleh memanggil yt-dlp sungguhan untuk subtitle; test subtitle menyalakannya sendiri
+    monkeypatch.setenv("YOUTUBE_CAPTIONS", "false")
+    monkeypatch.setenv("TRACING_FILE", str(tmp_path_factory.mktemp("traces") / "spans.jsonl"))
+    monkeypatch.setattr(cache, "_result_cache", None)
+    monkeypatch.setattr(task_store, "_task_store", None)
+    monkeypatch.setattr(job_queue, "_job_queue", None)
+    monkeypatch.setattr(http_clients, "_http_clients", None)
+    monkeypatch.setattr(events, "_event_broker", None)
+    monkeypatch.setattr(metrics, "_metrics", None)
+    monkeypatch.setattr(tracing, "_tracer", None)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_breaker_settings", None)
+    monkeypatch.setattr(cpu_executor, "_cpu_executor", None)
+    monkeypatch.setattr(cpu_executor, "_cpu_executor_settings", None)
+    monkeypatch.setattr(transcription, "_transcription_backend", None)
+    monkeypatch.setattr(transcription, "_transcription_backend_settings", None)
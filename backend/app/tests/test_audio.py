@@ -0,0 +1,76 @@
+import asyncio
+import os
+import stat
+import sys
+from app.services import audio
+
+def make_fake_ffmpeg(tmp_path, output_bytes=1000, exit_code=0):
+    # Pengganti ffmpeg: tulis output berukuran tetap ke argumen terakhir
+    script = tmp_path / "fake_ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"open(sys.argv[-1], 'wb').write(b'x' * {output_bytes})\n"
+        f"sys.exit({exit_code})\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+def make_input(tmp_path, size=audio.MIN_PREPROCESS_BYTES + 1):
+    path = tmp_path / "rapat.mp3"
+    path.write_bytes(b"\xff\xfb" + b"\x00" * (size - 2))
+    return str(path)
+
+def test_build_ffmpeg_command_downmix_and_resample():
+    command = audio.build_ffmpeg_command("in.mp3", "out.ogg", "opus", 16000, "24k")
+    assert command[0] == "ffmpeg"
+    assert command[command.index("-ac") + 1] == "1"
+    assert command[command.index("-ar") + 1] == "16000"
+    assert command[command.index("-c:a") + 1] == "libopus"
+    assert command[-1] == "out.ogg"
+    assert "libmp3lame" in audio.build_ffmpeg_command("in.mp3", "out.mp3", "mp3", 16000, "32k")
+
+def test_preprocess_audio_disabled(monkeypatch, tmp_path):
+    monkeypatch.setenv("AUDIO_PREPROCESS", "false")
+    result = asyncio.run(audio.preprocess_audio("tidak-ada.mp3"))
+    assert result.path == "tidak-ada.mp3"
+    assert not result.applied
+
+def test_preprocess_audio_skips_small_file(monkeypatch, tmp_path):
+    monkeypatch.setenv("FFMPEG_PATH", make_fake_ffmpeg(tmp_path))
+    path = make_input(tmp_path, size=1024)
+    result = asyncio.run(audio.preprocess_audio(path))
+    assert result.path == path
+    assert not result.applied
+
+def test_preprocess_audio_without_ffmpeg(monkeypatch, tmp_path):
+    monkeypatch.setenv("FFMPEG_PATH", str(tmp_path / "tidak-ada-ffmpeg"))
+    path = make_input(tmp_path)
+    result = asyncio.run(audio.preprocess_audio(path))
+    assert result.path == path
+    assert not result.applied
+
+def test_preprocess_audio_converts_and_reports_savings(monkeypatch, tmp_path):
+    monkeypatch.setenv("FFMPEG_PATH", make_fake_ffmpeg(tmp_path, output_bytes=1000))
+    path = make_input(tmp_path)
+    result = asyncio.run(audio.preprocess_audio(path))
+    assert result.applied
+    assert result.path.endswith("rapat.whisper.ogg")
+    assert os.path.getsize(result.path) == 1000
+    assert result.bytes_saved == os.path.getsize(path) - 1000
+
+def test_preprocess_audio_keeps_original_when_not_smaller(monkeypatch, tmp_path):
+    monkeypatch.setenv("FFMPEG_PATH", make_fake_ffmpeg(tmp_path, output_bytes=audio.MIN_PREPROCESS_BYTES * 2))
+    path = make_input(tmp_path)
+    result = asyncio.run(audio.preprocess_audio(path))
+    assert result.path == path
+    assert not result.applied
+    assert not os.path.exists(tmp_path / "rapat.whisper.ogg")
+
+def test_preprocess_audio_falls_back_on_ffmpeg_error(monkeypatch, tmp_path):
+    monkeypatch.setenv("FFMPEG_PATH", make_fake_ffmpeg(tmp_path, exit_code=1))
+    path = make_input(tmp_path)
+    result = asyncio.run(audio.preprocess_audio(path))
+    assert result.path == path
+    assert not result.applied
+    assert not os.path.exists(tmp_path / "rapat.whisper.ogg")
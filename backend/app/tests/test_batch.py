@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.rate_limiter import rate_limit_key
+from app.services.task_store import get_task_store
+
+MP3_BYTES = b"ID3\x04\x00\x00\x00\x00\x00\x00" + b"\x00" * 64
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    return tmp_path
+
+def run_batch(request_kwargs):
+    """Kirim batch, baca stream NDJSON hasilnya sampai selesai, lalu ambil status agregat."""
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            created = await client.post("/api/summarize/batch", **request_kwargs)
+            if created.status_code != 200:
+                return created, None, None
+            batch_id = created.json()["batch_id"]
+            results = await client.get(f"/api/summarize/batch/{batch_id}/results")
+            assert results.headers["content-type"] == "application/x-ndjson"
+            lines = [json.loads(line) for line in results.text.splitlines() if line]
+            status = (await client.get(f"/api/summarize/batch/{batch_id}")).json()
+            return created, lines, status
+    return asyncio.run(run())
+
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip rapat")
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_json_batch_streams_each_item_then_aggregate(mock_gemini, mock_whisper, env):
+    items = [
+        {"youtube_url": "https://youtu.be/abc123"},
+        {"text": "agenda rapat hari ini", "content_type": "meeting"},
+        {"text": "materi kuliah minggu ini"},
+    ]
+    with patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock, return_value="audio.mp3"):
+        created, lines, status = run_batch({"json": {"items": items}})
+    assert created.status_code == 200
+    body = created.json()
+    assert body["total"] == 3
+    assert [item["kind"] for item in body["items"]] == ["youtube", "text", "text"]
+    assert all(item["queue_position"] is not None for item in body["items"])
+
+    # Satu baris per item (tanpa duplikat), baris batch di akhir
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1, 2]
+    assert all(line["type"] == "item" and line["status"] == "completed" for line in lines[:-1])
+    by_index = {line["index"]: line for line in lines[:-1]}
+    assert by_index[1]["content_type"] == "meeting"
+    assert by_index[1]["processing_info"]["content_type_detected"] is False
+    assert by_index[2]["processing_info"]["content_type_detected"] is True
+    assert by_index[0]["source"] == "https://youtu.be/abc123"
+    assert lines[-1]["type"] == "batch"
+    assert lines[-1]["status"] == "completed"
+    assert lines[-1]["progress"] == {"finished": 3, "percent": 100.0}
+
+    assert status["counts"] == {"completed": 3}
+    assert [item["status"] for item in status["items"]] == ["completed"] * 3
+    # Setiap item juga task biasa
+    task = TestClient(app).get(f"/api/summarize/status/{status['items'][1]['task_id']}").json()
+    assert task["summary"] == "summary"
+
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip")
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value={"executive_summary": "ringkas"})
+def test_multipart_batch_with_files_and_transcripts(mock_gemini, mock_whisper, env):
+    files = [
+        ("files", ("a.mp3", MP3_BYTES, "audio/mpeg")),
+        ("files", ("b.mp3", MP3_BYTES + b"\x01", "audio/mpeg")),
+    ]
+    data = {"transcript": "wawancara dengan narasumber", "content_type": "interview"}
+    created, lines, status = run_batch({"files": files, "data": data})
+    assert created.status_code == 200
+    assert [(item["kind"], item["source"]) for item in created.json()["items"]] == [
+        ("upload", "a.mp3"), ("upload", "b.mp3"), ("text", None)
+    ]
+    assert status["status"] == "completed"
+    assert status["counts"] == {"completed": 3}
+    assert {line["index"]: line.get("content_type") for line in lines[:-1]}[2] == "interview"
+    # Item upload menyimpan field batch seperti item lain
+    uploads = [line for line in lines[:-1] if line["kind"] == "upload"]
+    assert all(line["batch_id"] == created.json()["batch_id"] and "worker" in line for line in uploads)
+    assert sorted(line["batch_index"] for line in uploads) == [0, 1]
+    assert uploads[0]["metadata"]["summary_length"] == len(str({"executive_summary": "ringkas"}))
+    # File audio sementara dihapus setelah diproses
+    assert [name for name in os.listdir(env) if name.endswith(".mp3")] == []
+
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, side_effect=[Exception("Gemini down"), "summary"])
+def test_failed_item_does_not_fail_batch(mock_gemini, env, monkeypatch):
+    monkeypatch.setenv("WORKER_CONCURRENCY", "1")
+    _, lines, status = run_batch({"json": {"items": [{"text": "teks pertama"}, {"text": "teks kedua"}]}})
+    assert status["status"] == "completed"
+    assert status["counts"] == {"failed": 1, "completed": 1}
+    failed = [item for item in status["items"] if item["status"] == "failed"]
+    assert failed[0]["error"] == "Gemini down"
+    assert lines[-1]["progress"]["percent"] == 100.0
+
+def test_batch_validation_errors(env, monkeypatch):
+    client = TestClient(app)
+    both = client.post("/api/summarize/batch", json={"items": [{"youtube_url": "https://youtu.be/x", "text": "t"}]})
+    assert both.status_code == 422
+    assert client.post("/api/summarize/batch", json={"items": []}).status_code == 422
+    assert client.post("/api/summarize/batch", json={"items": "bukan list"}).status_code == 422
+    invalid_url = client.post("/api/summarize/batch", json={"items": [{"text": "t"}, {"youtube_url": "https://google.com"}]})
+    assert invalid_url.status_code == 400
+    assert "Item 1" in invalid_url.json()["detail"]
+    bad_type = client.post("/api/summarize/batch", json={"items": [{"text": "t", "content_type": "resep"}]})
+    assert bad_type.status_code == 422
+    monkeypatch.setenv("BATCH_MAX_ITEMS", "2")
+    too_many = client.post("/api/summarize/batch", json={"items": [{"text": "t"}] * 3})
+    assert too_many.status_code == 413
+
+def test_batch_json_body_and_items_are_size_limited(env, monkeypatch):
+    monkeypatch.setattr("app.routes.batch.MAX_TEXT_SIZE", 100)
+    monkeypatch.setenv("BATCH_MAX_ITEMS", "3")
+    client = TestClient(app)
+    # Satu item melebihi MAX_TEXT_SIZE walau total body masih di bawah batas batch
+    too_long = client.post("/api/summarize/batch", json={"items": [{"text": "t"}, {"text": "x" * 101}]})
+    assert too_long.status_code == 413
+    assert "Item 1" in too_long.json()["detail"]
+    # Body lebih besar dari MAX_TEXT_SIZE x BATCH_MAX_ITEMS ditolak sebelum di-parse
+    huge = client.post("/api/summarize/batch", json={"items": [{"text": "x" * 90}] * 4})
+    assert huge.status_code == 413
+    chunked = client.post(
+        "/api/summarize/batch", content=iter([json.dumps({"items": [{"text": "x" * 90}] * 4}).encode()]),
+        headers={"content-type": "application/json"}
+    )
+    assert chunked.status_code == 413
+
+def test_batch_rejected_whole_when_queue_lacks_capacity(env, monkeypatch):
+    monkeypatch.setenv("JOB_QUEUE_MAX_SIZE", "1")
+    files = [("files", ("a.mp3", MP3_BYTES, "audio/mpeg")), ("files", ("b.mp3", MP3_BYTES, "audio/mpeg"))]
+    resp = TestClient(app).post("/api/summarize/batch", files=files)
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert [name for name in os.listdir(env) if name.endswith(".mp3")] == []
+
+def test_batch_completion_is_derived_from_item_records(env):
+    # Batch diterima proses lain (atau proses yang sudah restart): tidak ada penghitung di memori
+    store = get_task_store()
+    items = [{"index": i, "task_id": f"item{i}", "kind": "text", "source": None} for i in range(2)]
+    store.set("b1", {"status": "processing", "items": items, "total": 2, "created_at": 1.0})
+    store.set("item0", {"status": "completed", "summary": "s"})
+    store.set("item1", {"status": "processing"})
+    client = TestClient(app)
+    assert client.get("/api/summarize/batch/b1").json()["status"] == "processing"
+    store.set("item1", {"status": "failed", "error": "x"})
+    status = client.get("/api/summarize/batch/b1").json()
+    assert status["status"] == "completed"
+    assert status["counts"] == {"completed": 1, "failed": 1}
+    assert store.get("b1")["finished_at"] == status["finished_at"]
+    lines = [json.loads(line) for line in client.get("/api/summarize/batch/b1/results").text.splitlines() if line]
+    assert sorted(line["task_id"] for line in lines if line["type"] == "item") == ["item0", "item1"]
+    assert lines[-1]["status"] == "completed"
+
+def test_unknown_batch(env):
+    client = TestClient(app)
+    assert client.get("/api/summarize/batch/tidak-ada").json() == {"status": "not_found"}
+    lines = client.get("/api/summarize/batch/tidak-ada/results").text.splitlines()
+    assert json.loads(lines[0]) == {"type": "batch", "batch_id": "tidak-ada", "status": "not_found"}
+
+def test_batch_items_share_one_rate_limit_key(env):
+    keys = []
+
+    async def fake_summarize(text, content_type=None, task_id=None, on_delta=None):
+        keys.append(rate_limit_key(task_id))
+        return "summary"
+
+    with patch("app.routes.summarize.summarize_transcript_async", side_effect=fake_summarize):
+        created, _, _ = run_batch({"json": {"items": [{"text": "satu"}, {"text": "dua"}]}})
+    assert keys == [created.json()["batch_id"]] * 2
+    assert rate_limit_key("t1") == "t1"
@@ -0,0 +1,170 @@
+import asyncio
+import sqlite3
+import threading
+import pytest
+from app.services import cache
+from app.services.cache import CacheBackend, MemoryCache, NullCache, ResultCache, SQLiteCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    def __call__(self):
+        return self.now
+
+def test_extract_youtube_video_id():
+    assert cache.extract_youtube_video_id("https://www.youtube.com/watch?v=abc123&t=5") == "abc123"
+    assert cache.extract_youtube_video_id("https://youtu.be/abc123") == "abc123"
+    assert cache.extract_youtube_video_id("https://youtube.com/shorts/xyz789") == "xyz789"
+    assert cache.extract_youtube_video_id("https://google.com") is None
+
+def test_cache_backend_must_implement_storage():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_memory_cache_lru_size_eviction():
+    backend = MemoryCache(max_bytes=30)
+    backend.set("a", "1234567890")  # 12 byte JSON
+    backend.set("b", "1234567890")
+    assert backend.get("a") == "1234567890"  # a jadi paling baru dipakai
+    backend.set("c", "1234567890")
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+    assert backend.size_bytes() <= 30
+    backend.set("big", "x" * 100)  # lebih besar dari kapasitas, tidak disimpan
+    assert backend.get("big") is None
+    backend.delete("a")
+    assert backend.get("a") is None
+    backend.clear()
+    assert backend.size_bytes() == 0
+
+def test_memory_cache_ttl():
+    clock = FakeClock()
+    backend = MemoryCache(max_bytes=1000, clock=clock)
+    backend.set("k", {"a": 1}, ttl=10)
+    assert backend.get("k") == {"a": 1}
+    clock.now += 11
+    assert backend.get("k") is None
+    assert backend.size_bytes() == 0
+    backend.set("a", "1", ttl=5)
+    backend.set("b", "2")
+    clock.now += 6
+    assert backend.purge_expired() == 1
+    assert backend.get("b") == "2"
+
+def test_sqlite_cache_persistence_and_ttl(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "sub" / "cache.sqlite3")
+    backend = SQLiteCache(path, clock=clock)
+    backend.set("k", {"summary": "isi"}, ttl=10)
+    backend.set("forever", "x")
+    # Instance baru membaca file yang sama (mis. setelah restart)
+    reopened = SQLiteCache(path, clock=clock)
+    assert reopened.get("k") == {"summary": "isi"}
+    assert reopened.size_bytes() > 0
+    clock.now += 11
+    assert reopened.get("k") is None
+    backend.set("old", "y", ttl=1)
+    clock.now += 2
+    assert reopened.purge_expired() == 1
+    assert reopened.get("forever") == "x"
+    reopened.delete("forever")
+    assert reopened.get("forever") is None
+    reopened.set("z", "z")
+    reopened.clear()
+    assert reopened.size_bytes() == 0
+
+def test_sqlite_cache_lru_size_eviction(tmp_path):
+    clock = FakeClock()
+    backend = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=30, clock=clock)
+    backend.set("a", "1234567890")  # 12 byte JSON
+    clock.now += 1
+    backend.set("b", "1234567890")
+    clock.now += 1
+    assert backend.get("a") == "1234567890"  # a jadi paling baru dipakai
+    clock.now += 1
+    backend.set("c", "1234567890")
+    assert backend.get("b") is None
+    assert backend.get("a") == "1234567890"
+    assert backend.get("c") == "1234567890"
+    assert backend.size_bytes() == 24
+    backend.set("big", "x" * 100)  # lebih besar dari kapasitas, tidak disimpan
+    assert backend.get("big") is None
+    assert backend.size_bytes() == 24
+
+def test_sqlite_cache_migrates_table_without_last_used(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, size INTEGER NOT NULL)")
+    conn.execute("""INSERT INTO cache VALUES ('lama', '"isi"', NULL, 5)""")
+    conn.commit()
+    conn.close()
+    backend = SQLiteCache(path, max_bytes=100)
+    assert backend.get("lama") == "isi"
+    backend.set("baru", "x")
+    assert backend.size_bytes() == 8
+
+def test_result_cache_async_runs_sqlite_off_loop(tmp_path):
+    results = ResultCache(SQLiteCache(str(tmp_path / "cache.sqlite3")), ttl=60)
+    threads = []
+    original_get = results.backend.get
+
+    def tracking_get(key):
+        threads.append(threading.current_thread())
+        return original_get(key)
+    results.backend.get = tracking_get
+
+    async def run():
+        await results.aset_transcript("hash", "id", "transkrip")
+        await results.aset_summary("transkrip", "meeting", "1", {"executive_summary": "ok"})
+        return (
+            await results.aget_transcript("hash", "id"),
+            await results.aget_summary("transkrip", "meeting", "1"),
+            await results.astats(),
+        )
+
+    transcript, summary, stats = asyncio.run(run())
+    assert transcript == "transkrip"
+    assert summary == {"executive_summary": "ok"}
+    assert stats["transcript"] == {"hits": 1, "misses": 0}
+    assert threads and threading.main_thread() not in threads
+
+def test_result_cache_levels_and_counters():
+    results = ResultCache(MemoryCache(max_bytes=10_000), ttl=60)
+    assert results.get_transcript("hash", "id") is None
+    results.set_transcript("hash", "id", "transkrip")
+    assert results.get_transcript("hash", "id") == "transkrip"
+    assert results.get_transcript("hash", "en") is None
+    results.set_summary("transkrip", "meeting", "1", {"executive_summary": "ok"})
+    assert results.get_summary("transkrip", "meeting", "1") == {"executive_summary": "ok"}
+    assert results.get_summary("transkrip", "meeting", "2") is None
+    assert results.get_summary("transkrip", "lecture", "1") is None
+    stats = results.stats()
+    assert stats["transcript"] == {"hits": 1, "misses": 2}
+    assert stats["summary"] == {"hits": 1, "misses": 2}
+    assert stats["backend"] == "MemoryCache"
+
+def test_result_cache_backend_errors_are_misses():
+    class BrokenBackend(NullCache):
+        def get(self, key):
+            raise RuntimeError("disk penuh")
+        def set(self, key, value, ttl=None):
+            raise RuntimeError("disk penuh")
+    results = ResultCache(BrokenBackend())
+    results.set_transcript("hash", "id", "x")
+    assert results.get_transcript("hash", "id") is None
+    assert results.stats()["transcript"]["misses"] == 1
+
+def test_get_result_cache_follows_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "_result_cache", None)
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    first = cache.get_result_cache()
+    assert first is cache.get_result_cache()
+    assert isinstance(first.backend, MemoryCache)
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "c.sqlite3"))
+    assert isinstance(cache.get_result_cache().backend, SQLiteCache)
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    assert isinstance(cache.get_result_cache().backend, NullCache)
@@ -0,0 +1,149 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services import chunking
+
+def test_split_sentences():
+    text = "Halo semua. Apa kabar?\nBaik sekali!  Lanjut"
+    assert chunking.split_sentences(text) == ["Halo semua.", "Apa kabar?", "Baik sekali!", "Lanjut"]
+
+def test_split_text_into_chunks_respects_size_and_sentences():
+    sentences = [f"Kalimat nomor {i} berisi poin rapat." for i in range(50)]
+    text = " ".join(sentences)
+    chunks = chunking.split_text_into_chunks(text, chunk_size=200, overlap=0)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    # Tidak ada kalimat yang terpotong dan urutan tetap terjaga
+    assert " ".join(chunks) == text
+
+def test_split_text_into_chunks_overlap():
+    sentences = [f"Kalimat {i:02d}." for i in range(20)]
+    chunks = chunking.split_text_into_chunks(" ".join(sentences), chunk_size=60, overlap=25)
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        # Kalimat pembuka chunk berikutnya diambil dari ekor chunk sebelumnya
+        first_sentence = chunking.split_sentences(current)[0]
+        assert first_sentence in chunking.split_sentences(previous)[-3:]
+
+def test_split_text_into_chunks_long_sentence():
+    text = "kata " * 100
+    chunks = chunking.split_text_into_chunks(text, chunk_size=50, overlap=10)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert sum(chunk.count("kata") for chunk in chunks) >= 100
+
+def test_split_text_into_chunks_invalid_size():
+    with pytest.raises(ValueError):
+        chunking.split_text_into_chunks("teks", chunk_size=0)
+    assert chunking.split_text_into_chunks("", chunk_size=10) == []
+
+def test_summarize_transcript_short_text_single_call(monkeypatch):
+    monkeypatch.setenv("CHUNKING_THRESHOLD", "1000")
+    calls = []
+
+    async def fake_gemini(text, system_prompt=None, content_type=None, task_id=None):
+        calls.append(system_prompt)
+        return "ringkasan"
+
+    with patch("app.services.chunking.summarize_with_gemini_async", side_effect=fake_gemini):
+        result = asyncio.run(chunking.summarize_transcript_async("rapat singkat.", content_type="meeting"))
+    assert result == "ringkasan"
+    assert calls == [None]
+
+def test_summarize_transcript_map_reduce_parallel(monkeypatch):
+    monkeypatch.setenv("CHUNKING_THRESHOLD", "100")
+    monkeypatch.setenv("MAX_CHUNK_SIZE", "200")
+    monkeypatch.setenv("CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("MAX_SUMMARY_SIZE", "10000")
+    monkeypatch.setenv("CHUNK_FANOUT", "3")
+    text = " ".join(f"Kalimat nomor {i} berisi poin rapat." for i in range(50))
+    in_flight = 0
+    peak = 0
+    prompts = []
+
+    async def fake_gemini(text, system_prompt=None, content_type=None, task_id=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        prompts.append(system_prompt)
+        return "ringkasan akhir" if "RINGKASAN PER BAGIAN" in system_prompt else {"executive_summary": "x"}
+
+    with patch("app.services.chunking.summarize_with_gemini_async", side_effect=fake_gemini):
+        result = asyncio.run(chunking.summarize_transcript_async(text, content_type="meeting", task_id="t1"))
+    assert result == "ringkasan akhir"
+    assert peak == 3
+    assert "RINGKASAN PER BAGIAN" in prompts[-1]
+    assert '"executive_summary"' in prompts[-1]
+    assert len(prompts) == len(chunking.split_text_into_chunks(text, 200, 0)) + 1
+
+def test_failed_chunk_cancels_other_chunks(monkeypatch):
+    monkeypatch.setenv("CHUNKING_THRESHOLD", "100")
+    monkeypatch.setenv("MAX_CHUNK_SIZE", "200")
+    monkeypatch.setenv("CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("CHUNK_FANOUT", "2")
+    text = " ".join(f"Kalimat nomor {i} berisi poin rapat." for i in range(50))
+    started = []
+    cancelled = []
+
+    async def fake_gemini(text, system_prompt=None, content_type=None, task_id=None):
+        started.append(text)
+        if len(started) == 1:
+            raise RuntimeError("gemini gagal")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(text)
+            raise
+
+    with patch("app.services.chunking.summarize_with_gemini_async", side_effect=fake_gemini):
+        with pytest.raises(RuntimeError, match="gemini gagal"):
+            asyncio.run(chunking.summarize_transcript_async(text, content_type="meeting", task_id="t1"))
+    # Chunk yang sedang berjalan dibatalkan, sisanya tidak pernah dikirim ke Gemini
+    assert sorted(cancelled) == sorted(started[1:])
+    assert len(started) < len(chunking.split_text_into_chunks(text, 200, 0))
+
+def test_summarize_transcript_hierarchical_reduce(monkeypatch):
+    monkeypatch.setenv("CHUNKING_THRESHOLD", "100")
+    monkeypatch.setenv("MAX_CHUNK_SIZE", "200")
+    monkeypatch.setenv("CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("MAX_SUMMARY_SIZE", "150")
+    text = " ".join(f"Kalimat nomor {i} berisi poin rapat." for i in range(100))
+    levels = []
+
+    async def fake_gemini(text, system_prompt=None, content_type=None, task_id=None):
+        if "RINGKASAN PER BAGIAN" in system_prompt:
+            return "final"
+        levels.append(len(text))
+        return "Ringkasan bagian."
+
+    with patch("app.services.chunking.summarize_with_gemini_async", side_effect=fake_gemini):
+        result = asyncio.run(chunking.summarize_transcript_async(text, content_type="meeting"))
+    assert result == "final"
+    first_level = len(chunking.split_text_into_chunks(text, 200, 0))
+    # Ada pemanggilan map tambahan di atas level pertama
+    assert len(levels) > first_level
+
+def test_summarize_transcript_streams_only_final_request(monkeypatch):
+    monkeypatch.setenv("CHUNKING_THRESHOLD", "100")
+    monkeypatch.setenv("MAX_CHUNK_SIZE", "200")
+    monkeypatch.setenv("CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("MAX_SUMMARY_SIZE", "10000")
+    text = " ".join(f"Kalimat nomor {i} berisi poin rapat." for i in range(50))
+    deltas = []
+
+    async def fake_gemini(text, system_prompt=None, content_type=None, task_id=None):
+        return "ringkasan bagian"
+
+    async def fake_stream(text, system_prompt=None, content_type=None, task_id=None, on_delta=None):
+        assert "RINGKASAN PER BAGIAN" in system_prompt
+        for delta in ("ringkasan ", "akhir"):
+            on_delta(delta)
+        return "ringkasan akhir"
+
+    with patch("app.services.chunking.summarize_with_gemini_async", side_effect=fake_gemini) as mock_gemini, \
+         patch("app.services.chunking.summarize_with_gemini_stream", side_effect=fake_stream):
+        result = asyncio.run(chunking.summarize_transcript_async(text, content_type="meeting", on_delta=deltas.append))
+    assert result == "ringkasan akhir"
+    assert deltas == ["ringkasan ", "akhir"]
+    assert mock_gemini.call_count == len(chunking.split_text_into_chunks(text, 200, 0))
@@ -1,5 +1,6 @@
 import os
 import pytest
+from unittest.mock import patch
 from app.config import Config
 
 def test_config_getters(monkeypatch):
@@ -15,6 +16,57 @@ def test_config_getters(monkeypatch):
     assert isinstance(config.GEMINI_RPM, int)
     assert isinstance(config.GEMINI_TPM, int)
     assert isinstance(config.GEMINI_RPD, int)
+    assert config.CHUNK_OVERLAP < config.MAX_CHUNK_SIZE
+    assert config.CHUNKING_THRESHOLD > 0
+    assert config.MAX_SUMMARY_SIZE > 0
+    assert config.CHUNK_FANOUT > 0
+    assert config.CACHE_BACKEND == "memory"
+    assert config.CACHE_MAX_BYTES > 0
+    assert config.CACHE_TTL > 0
+    assert config.TASK_STORE_BACKEND == "sqlite"
+    assert config.TASK_STORE_PATH.endswith(".sqlite3")
+    assert config.TASK_TTL > 0
+    assert config.TASK_PURGE_INTERVAL > 0
+    assert config.TASK_STALE_SECONDS >= 0
+    assert config.SSE_HEARTBEAT_SECONDS > 0
+    assert config.SSE_POLL_INTERVAL > 0
+    assert config.GEMINI_STREAM is True
+    assert config.CONTENT_TYPE_SAMPLE_CHARS == 0
+    assert config.WORKER_CONCURRENCY > 0
+    assert config.JOB_QUEUE_MAX_SIZE > 0
+    assert config.JOB_PRIORITY_AGING >= 0
+    assert config.BATCH_MAX_ITEMS > 0
+    assert isinstance(config.AUDIO_PREPROCESS, bool)
+    assert config.AUDIO_SAMPLE_RATE > 0
+    assert config.AUDIO_SEGMENT_OVERLAP < config.AUDIO_SEGMENT_SECONDS
+    assert config.AUDIO_SEGMENT_CONCURRENCY > 0
+    assert config.SILENCE_MIN_SECONDS > 0
+    assert config.HTTP_POOL_SIZE > 0
+    assert config.HTTP_CONNECT_TIMEOUT < config.WHISPER_TIMEOUT
+    assert config.HTTP2 is False
+    assert config.YT_DLP_PATH
+    assert config.YT_DLP_TIMEOUT > 0
+    assert isinstance(config.YOUTUBE_CAPTIONS, bool)
+    assert config.YT_CAPTIONS_TIMEOUT > 0
+    assert config.CPU_POOL_WORKERS >= 0
+    assert config.CPU_INLINE_THRESHOLD < config.CPU_SHARED_MEMORY_THRESHOLD
+    assert config.TRANSCRIPTION_BACKEND == "http"
+    assert config.LOCAL_WHISPER_COMPUTE_TYPE == "int8"
+    assert config.LOCAL_WHISPER_WORKERS >= 0
+    assert config.LOCAL_WHISPER_THREADS > 0
+    assert config.LOCAL_WHISPER_BEAM_SIZE >= 1
+    assert config.TRACING_EXPORTER == "file"
+    assert config.TRACING_FILE.endswith(".jsonl")
+    assert config.TRACING_FILE_MAX_BYTES > 0
+    assert config.TRACING_OTLP_ENDPOINT.startswith("http")
+    assert config.METRICS_GAUGE_TTL > 0
+    assert config.LOG_FORMAT == "json"
+    assert config.RETRY_MAX_ATTEMPTS >= 1
+    assert config.RETRY_BASE_DELAY <= config.RETRY_MAX_DELAY < config.RETRY_DEADLINE
+    assert config.CIRCUIT_FAILURE_THRESHOLD > 0
+    assert config.CIRCUIT_RESET_TIMEOUT > 0
+    assert config.LOG_PAYLOAD_MAX_CHARS > 0
+    assert 0 <= config.LOG_PAYLOAD_SAMPLE_RATE <= 1
 
 def test_validate_config_success(monkeypatch):
     monkeypatch.setenv("WHISPER_API_KEY", "abc")
@@ -27,6 +79,16 @@ def test_validate_config_missing_whisper(monkeypatch):
     with pytest.raises(ValueError):
         Config.validate_config()
 
+def test_validate_config_local_backend_needs_no_whisper_key(monkeypatch):
+    monkeypatch.delenv("WHISPER_API_KEY", raising=False)
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TRANSCRIPTION_BACKEND", "local")
+    with patch("app.config.importlib.util.find_spec", return_value=object()):
+        Config.validate_config()
+    with patch("app.config.importlib.util.find_spec", return_value=None):
+        with pytest.raises(ValueError, match="faster-whisper"):
+            Config.validate_config()
+
 def test_validate_config_missing_gemini(monkeypatch, capsys):
     monkeypatch.setenv("WHISPER_API_KEY", "abc")
     monkeypatch.delenv("GEMINI_API_KEY", raising=False)
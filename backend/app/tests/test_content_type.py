@@ -0,0 +1,60 @@
+import random
+import re
+from unittest.mock import patch
+from app.services import content_type
+from app.services.content_type import CONTENT_KEYWORDS, ContentTypeClassifier, build_trie_pattern, sample_text
+from benchmarks.content_type import generate_transcript, legacy_detect_content_type
+
+def test_build_trie_pattern_prefers_longest_token():
+    pattern = re.compile(build_trie_pattern(["view", "interview", "interviewer", "stream", "streamer"]))
+    assert pattern.pattern.count("interview") == 1
+    assert [m.group() for m in pattern.finditer("interviewer streams")] == ["interviewer", "stream"]
+
+def test_scores_count_overlapping_keywords():
+    scores = ContentTypeClassifier().scores("Interviewer membuat review")
+    # interviewer, interview; review, view
+    assert scores["interview"] == 2
+    assert scores["youtube"] == 2
+
+def test_sequence_rules_stay_on_one_line():
+    classifier = ContentTypeClassifier()
+    assert classifier.scores("selamat pagi semua")["meeting"] == 3
+    assert classifier.scores("pagi, selamat datang")["meeting"] == 0
+    assert classifier.scores("selamat\npagi")["meeting"] == 0
+
+def test_number_rules():
+    classifier = ContentTypeClassifier()
+    assert classifier.scores("pertanyaan nomor 3")["interview"] == 3
+    assert classifier.scores("pertanyaan\n3")["interview"] == 1
+    assert classifier.scores("bab 2 membahas")["document"] == 2
+    assert classifier.scores("bab dua")["document"] == 0
+
+def test_matches_legacy_detector_on_random_texts():
+    pieces = [keyword for words in CONTENT_KEYWORDS.values() for keyword in words] + [
+        "selamat", "hello", "hi", "pagi", "malam", "welcome", "don't forget", "jangan lupa",
+        "subscribe", "share", "thanks", "terima kasih", "menonton", "pertanyaan", "question",
+        "bab", "chapter", "section", "3", " ", "\n", "\t", "this", "SLIDE", "x",
+    ]
+    rng = random.Random(0)
+    classifier = ContentTypeClassifier()
+    for _ in range(3000):
+        text = rng.choice(["", " "]).join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        assert classifier.classify(text) == legacy_detect_content_type(text), repr(text)
+    transcript = generate_transcript(50_000, seed=1)
+    assert classifier.classify(transcript) == legacy_detect_content_type(transcript)
+
+def test_sample_text_is_bounded_and_spread():
+    text = "a" * 1000 + "b" * 1000 + "c" * 1000
+    sample = sample_text(text, 300, windows=3)
+    assert len(sample) <= 302
+    assert sample.split("\n") == ["a" * 100, "b" * 100, "c" * 100]
+    assert sample_text(text, 0) is text
+
+def test_classify_content_type_is_cached_per_transcript(monkeypatch):
+    monkeypatch.setattr(content_type, "_cache", content_type.OrderedDict())
+    transcript = "rapat " * 1000
+    with patch.object(ContentTypeClassifier, "classify", return_value="meeting") as mock_classify:
+        assert content_type.classify_content_type(transcript) == "meeting"
+        assert content_type.classify_content_type("".join(["rapat "] * 1000)) == "meeting"
+        content_type.classify_content_type(transcript, sample_chars=100)
+    assert mock_classify.call_count == 2
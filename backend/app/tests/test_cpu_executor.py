@@ -0,0 +1,134 @@
+import asyncio
+import time
+import pytest
+from multiprocessing.shared_memory import SharedMemory
+from unittest.mock import patch
+from app.services import cpu_executor, gemini
+from app.services.chunking import split_text_into_chunks
+from app.services.content_type import cached_content_type, classify_content_type
+from app.services.cpu_executor import CpuExecutor, get_cpu_executor, load_shared_text, share_text
+from app.services.metrics import get_metrics
+
+def test_small_text_stays_on_loop():
+    executor = CpuExecutor(workers=2, inline_threshold=1000)
+    assert asyncio.run(executor.run("content_detection", classify_content_type, "rapat agenda", 0)) == "meeting"
+    metrics = get_metrics()
+    assert metrics.cpu_tasks.value(task="content_detection", placement="on_loop") == 1
+    assert metrics.cpu_tasks.value(task="content_detection", placement="off_loop") == 0
+    # Pool proses tidak dibuat untuk pekerjaan kecil
+    assert executor.stats()["started"] is False
+
+def test_disabled_pool_runs_everything_inline(monkeypatch):
+    monkeypatch.setenv("CPU_POOL_WORKERS", "0")
+    monkeypatch.setenv("CPU_INLINE_THRESHOLD", "1")
+    text = "kalimat pertama. kalimat kedua."
+    assert asyncio.run(cpu_executor.run_cpu_bound("chunking", split_text_into_chunks, text, 20, 0)) == [
+        "kalimat pertama.", "kalimat kedua."
+    ]
+    assert get_cpu_executor().stats()["started"] is False
+
+def test_shared_text_roundtrip_and_unlink():
+    text = "rapat membahas anggaran 🚀 " * 10
+    ref, segment = share_text(text)
+    try:
+        assert ref.size == len(text.encode("utf-8"))
+        assert load_shared_text(ref) == text
+    finally:
+        segment.close()
+        segment.unlink()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=ref.name)
+
+def test_large_text_runs_off_loop_through_shared_memory():
+    executor = CpuExecutor(workers=1, inline_threshold=100, shared_memory_threshold=500)
+    medium = "Agenda rapat hari ini. " * 10
+    large = "Peserta rapat membahas keputusan. " * 50
+    shared = []
+
+    def tracking_share(text):
+        ref, segment = share_text(text)
+        shared.append(ref)
+        return ref, segment
+
+    async def run():
+        with patch("app.services.cpu_executor.share_text", side_effect=tracking_share):
+            return (
+                await executor.run("content_detection", classify_content_type, medium, 0),
+                await executor.run("chunking", split_text_into_chunks, large, 200, 0),
+            )
+
+    try:
+        content_type, chunks = asyncio.run(run())
+    finally:
+        executor.close()
+    assert content_type == "meeting"
+    assert chunks == split_text_into_chunks(large, 200, 0)
+    # Hanya teks di atas ambang shared memory yang tidak di-pickle, dan segmennya dilepas setelah selesai
+    assert [ref.size for ref in shared] == [len(large)]
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=shared[0].name)
+    metrics = get_metrics()
+    assert metrics.cpu_tasks.value(task="chunking", placement="off_loop") == 1
+    assert metrics.cpu_tasks.value(task="content_detection", placement="off_loop") == 1
+    assert metrics.cpu_seconds.value(task="chunking", placement="off_loop") > 0
+    assert metrics.cpu_shared_memory_bytes.value(task="chunking") == len(large)
+    assert 'summarizer_cpu_task_seconds_total{task="chunking",placement="on_loop"}' in metrics.render()
+
+def test_cancelled_caller_keeps_shared_memory_until_worker_finishes():
+    executor = CpuExecutor(workers=1, inline_threshold=10, shared_memory_threshold=10)
+    text = "Peserta rapat membahas keputusan. " * 10
+    shared = []
+
+    def tracking_share(text):
+        ref, segment = share_text(text)
+        shared.append(ref)
+        return ref, segment
+
+    async def run():
+        # Worker sibuk sehingga job kedua sudah dikirim ke pool tetapi belum membaca teksnya
+        busy = asyncio.create_task(executor.run("warmup", time.sleep, 0.5, size=100))
+        with patch("app.services.cpu_executor.share_text", side_effect=tracking_share):
+            job = asyncio.create_task(executor.run("chunking", len, text))
+            await asyncio.sleep(0.1)
+        job.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await job
+        # Segmen masih ada untuk worker yang akan membacanya
+        SharedMemory(name=shared[0].name).close()
+        await busy
+        for _ in range(100):
+            try:
+                SharedMemory(name=shared[0].name).close()
+            except FileNotFoundError:
+                return True
+            await asyncio.sleep(0.05)
+        return False
+
+    try:
+        released = asyncio.run(run())
+    finally:
+        executor.close()
+    assert released
+
+def test_async_helpers_keep_parent_cache_and_size_formatting_by_summary(monkeypatch):
+    monkeypatch.setenv("CPU_INLINE_THRESHOLD", "50")
+    transcript = "wawancara dengan narasumber tentang pertanyaan nomor 3\n" * 5
+
+    async def run():
+        with patch("app.services.gemini.run_cpu_bound", wraps=cpu_executor.run_cpu_bound) as mock_run:
+            content_type = await gemini.detect_content_type_async(transcript)
+            formatted = await gemini.format_summary_async({"executive_summary": "Ringkas"}, transcript, content_type)
+        return content_type, formatted, mock_run
+
+    try:
+        content_type, formatted, mock_run = asyncio.run(run())
+    finally:
+        get_cpu_executor().close()
+    assert content_type == "interview"
+    assert cached_content_type(transcript) == "interview"
+    assert "RINGKASAN WAWANCARA" in formatted
+    # Formatting diukur dari ukuran ringkasan, bukan transkripsi, jadi tetap di loop
+    assert mock_run.call_args_list[1].kwargs["size"] < 50
+    metrics = get_metrics()
+    assert metrics.cpu_tasks.value(task="content_detection", placement="off_loop") == 1
+    assert metrics.cpu_tasks.value(task="formatting", placement="on_loop") == 1
@@ -0,0 +1,188 @@
+import asyncio
+from app.services.events import TaskEvent, TaskEventBroker, record_events
+from app.services.task_store import MemoryTaskStore, SQLiteTaskStore, worker_id
+
+def collect(broker, task_id, snapshot, last_event_id=None, heartbeat=5.0, publish=None, limit=20):
+    """Jalankan stream sampai selesai; `publish` dipanggil setelah subscriber terdaftar."""
+    async def run():
+        received = []
+        async for event in broker.stream(task_id, snapshot, last_event_id=last_event_id, heartbeat=heartbeat):
+            received.append(event)
+            if publish and len(received) == 1:
+                publish()
+            if len(received) >= limit:
+                break
+        return received
+    return asyncio.run(run())
+
+def test_task_event_encodes_sse_frame():
+    frame = TaskEvent(3, "stage", {"stage": "transcribing"}).encode()
+    assert frame == 'id: 3\nevent: stage\ndata: {"stage": "transcribing"}\n\n'
+
+def test_record_events_maps_fields_to_events():
+    record = {"status": "processing", "stage": "downloading", "message": "Mengunduh", "progress": {"percent": 50.0}}
+    assert [name for name, _ in record_events(record, {"stage": "downloading"})] == ["stage"]
+    assert record_events(record, {"progress": record["progress"]}) == [("progress", {"stage": "downloading", "percent": 50.0})]
+    assert record_events(record, {"status": "processing"}) == [("status", {"status": "processing", "message": "Mengunduh"})]
+    assert record_events(record, {"timings": {}}) == []
+    completed = {"status": "completed", "summary": "ringkasan"}
+    assert record_events(completed, completed) == [("completed", completed)]
+
+def test_replay_returns_missed_events_or_none_for_gaps():
+    broker = TaskEventBroker(history=3)
+    for i in range(5):
+        broker.publish("t1", "progress", {"percent": i})
+    assert broker.last_event_id("t1") == 5
+    assert [e.id for e in broker.replay("t1", 3)] == [4, 5]
+    assert broker.replay("t1", 5) == []
+    # Event 2 sudah keluar dari riwayat
+    assert broker.replay("t1", 1) is None
+    # Id lebih besar dari urutan saat ini (mis. server restart)
+    assert broker.replay("t1", 9) is None
+
+def test_broker_evicts_oldest_idle_tasks():
+    broker = TaskEventBroker(max_tasks=2)
+    for task_id in ("a", "b", "c"):
+        broker.publish(task_id, "status", {})
+    assert broker.last_event_id("a") == 0
+    assert broker.last_event_id("c") == 1
+
+def test_stream_starts_with_snapshot_and_ends_on_final_event():
+    broker = TaskEventBroker()
+    broker.publish("t1", "stage", {"stage": "queued"})
+
+    def publish():
+        broker.publish("t1", "stage", {"stage": "transcribing"})
+        broker.publish("t1", "completed", {"status": "completed", "summary": "ringkasan"})
+
+    events = collect(broker, "t1", lambda: {"status": "queued"}, publish=publish)
+    assert [(e.id, e.event) for e in events] == [(1, "status"), (2, "stage"), (3, "completed")]
+    assert events[0].data == {"status": "queued"}
+    assert broker.subscriber_count() == 0
+
+def test_stream_resumes_from_last_event_id():
+    broker = TaskEventBroker()
+    broker.publish("t1", "stage", {"stage": "transcribing"})
+    broker.publish("t1", "transcript", {"segment": 0, "text": "halo"})
+    broker.publish("t1", "completed", {"status": "completed"})
+    events = collect(broker, "t1", lambda: {"status": "completed"}, last_event_id=1)
+    assert [e.event for e in events] == ["transcript", "completed"]
+
+def test_stream_sends_snapshot_when_history_is_gone():
+    broker = TaskEventBroker()
+    events = collect(broker, "t1", lambda: {"status": "completed", "summary": "ringkasan"}, last_event_id=7)
+    assert [e.event for e in events] == ["status"]
+    assert events[0].data["summary"] == "ringkasan"
+
+def test_stream_reports_unknown_task():
+    events = collect(TaskEventBroker(), "t1", lambda: None)
+    assert [e.event for e in events] == ["not_found"]
+
+def test_stream_yields_heartbeat_when_idle():
+    broker = TaskEventBroker()
+    events = collect(broker, "t1", lambda: {"status": "processing"}, heartbeat=0.01, limit=3)
+    assert events[0].event == "status"
+    assert events[1:] == [None, None]
+
+def test_task_store_publishes_record_changes():
+    broker = TaskEventBroker()
+    store = MemoryTaskStore(events=broker)
+    store.set("t1", {"status": "queued", "stage": "queued"})
+    store.update("t1", status="processing")
+    store.update("t1", stage="downloading", message="Mengunduh")
+    store.update("t1", progress={"percent": 42.0})
+    store.publish("t1", "transcript", {"segment": 0, "text": "halo"})
+    store.update("t1", status="completed", summary="ringkasan", transcription="teks panjang")
+    events = broker.replay("t1", 0)
+    assert [e.event for e in events] == ["stage", "status", "stage", "progress", "transcript", "completed"]
+    # Transkripsi lengkap tidak ikut dikirim di event
+    assert "transcription" not in events[-1].data
+    assert events[-1].data["has_transcription"] is True
+    assert events[-1].data["summary"] == "ringkasan"
+
+def test_stream_follows_job_running_in_another_worker(tmp_path):
+    path = str(tmp_path / "tasks.sqlite3")
+    # Worker A menjalankan job, worker B melayani stream; masing-masing punya broker sendiri
+    worker_a = SQLiteTaskStore(path, events=TaskEventBroker())
+    worker_b = SQLiteTaskStore(path, events=TaskEventBroker())
+    worker_a.set("t1", {"status": "processing", "stage": "queued"})
+
+    def publish():
+        worker_a.update("t1", stage="transcribing", message="Transkripsi")
+        worker_a.publish("t1", "transcript", {"segment": 0, "text": "halo"})
+        worker_a.update("t1", status="completed", summary="ringkasan")
+
+    async def run(last_event_id=None):
+        received = []
+        events = worker_b.events.stream(
+            "t1", lambda: worker_b.aget("t1"), last_event_id=last_event_id,
+            heartbeat=5.0, log=worker_b, poll_interval=0.01,
+        )
+        async for event in events:
+            received.append(event)
+            if len(received) == 1 and last_event_id is None:
+                await asyncio.to_thread(publish)
+        return received
+
+    try:
+        events = asyncio.run(run())
+        assert [e.event for e in events] == ["status", "stage", "transcript", "completed"]
+        assert events[-1].data["summary"] == "ringkasan"
+        # Resume di worker B memakai id dari log bersama
+        resumed = asyncio.run(run(last_event_id=events[1].id))
+        assert [e.event for e in resumed] == ["transcript", "completed"]
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+def test_stream_ends_when_heartbeat_snapshot_is_final():
+    broker = TaskEventBroker()
+    records = iter([{"status": "processing"}, {"status": "failed", "error": "x"}])
+    # Event final tidak pernah sampai ke broker ini; snapshot saat heartbeat menutup stream
+    events = collect(broker, "t1", lambda: next(records), heartbeat=0.01)
+    assert [e and e.event for e in events] == ["status", None, "failed"]
+    assert events[-1].data["error"] == "x"
+
+def test_streams_share_one_poller_and_skip_local_jobs(tmp_path):
+    path = str(tmp_path / "tasks.sqlite3")
+    worker_a = SQLiteTaskStore(path, events=TaskEventBroker())
+    worker_b = SQLiteTaskStore(path, events=TaskEventBroker())
+    worker_a.set("remote", {"status": "processing", "worker": "host-lain:1"})
+    worker_b.set("local", {"status": "processing", "worker": worker_id()})
+    polled = []
+    events_after = worker_b.events_after
+
+    def counting_events_after(task_id, after):
+        polled.append(task_id)
+        return events_after(task_id, after)
+    worker_b.events_after = counting_events_after
+
+    async def follow(task_id, received):
+        events = worker_b.events.stream(
+            task_id, lambda: worker_b.aget(task_id), heartbeat=5.0, log=worker_b, poll_interval=0.01,
+        )
+        async for event in events:
+            received.append(event.event)
+
+    async def run():
+        remote = [[], [], []]
+        local = []
+        streams = [asyncio.create_task(follow("remote", received)) for received in remote]
+        streams.append(asyncio.create_task(follow("local", local)))
+        await asyncio.sleep(0.1)
+        # Tiga stream task yang sama di proses ini: paling banyak satu query per interval
+        assert 0 < polled.count("remote") <= 12
+        assert "local" not in polled
+        await asyncio.to_thread(worker_a.update, "remote", status="completed")
+        worker_b.update("local", status="completed")
+        await asyncio.wait_for(asyncio.gather(*streams), timeout=5)
+        assert worker_b.events._pollers == {}
+        return remote, local
+
+    try:
+        remote, local = asyncio.run(run())
+    finally:
+        worker_a.close()
+        worker_b.close()
+    assert remote == [["status", "completed"]] * 3
+    assert local == ["status", "completed"]
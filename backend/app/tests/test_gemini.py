@@ -1,6 +1,9 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import httpx
 from app.services import gemini
+import json
 import os
 from datetime import datetime
 
@@ -136,4 +139,134 @@ def test_summarize_with_gemini_all_branches(mock_post, monkeypatch):
     # API error
     mock_post.side_effect = Exception('fail')
     with pytest.raises(Exception):
-        gemini.summarize_with_gemini('teks', content_type='meeting') 
\ No newline at end of file
+        gemini.summarize_with_gemini('teks', content_type='meeting')
+
+def _gemini_response(text, status_code=200):
+    return httpx.Response(
+        status_code,
+        json={"candidates": [{"content": {"parts": [{"text": text}]}}]},
+        request=httpx.Request("POST", "http://fake"),
+    )
+
+def test_summarize_with_gemini_async_all_branches(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("GEMINI_API_URL", "http://fake")
+    with patch("app.services.gemini.httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post, \
+         patch("app.services.resilience.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        # Sukses JSON
+        mock_post.return_value = _gemini_response('{"executive_summary": "ok"}')
+        result = asyncio.run(gemini.summarize_with_gemini_async('teks', content_type='meeting'))
+        assert result == {"executive_summary": "ok"}
+        # Sukses fallback string
+        mock_post.return_value = _gemini_response('plain text')
+        result = asyncio.run(gemini.summarize_with_gemini_async('teks', content_type='meeting'))
+        assert result == 'plain text'
+        # API error setelah semua retry
+        mock_post.return_value = _gemini_response('x', status_code=500)
+        with pytest.raises(Exception):
+            asyncio.run(gemini.summarize_with_gemini_async('teks', content_type='meeting'))
+        # Full jitter: percobaan ke-n menunggu acak 0..RETRY_BASE_DELAY * 2^(n-1)
+        delays = [c.args[0] for c in mock_sleep.await_args_list]
+        assert len(delays) == 2 and 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+
+def test_summarize_with_gemini_async_missing_key(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(Exception):
+        asyncio.run(gemini.summarize_with_gemini_async('teks'))
+
+def test_summarize_with_gemini_async_uses_rate_limiter(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("GEMINI_API_URL", "http://fake")
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock()
+    with patch("app.services.gemini.get_gemini_limiter", return_value=limiter), \
+         patch("app.services.gemini.httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post, \
+         patch("app.services.resilience.asyncio.sleep", new_callable=AsyncMock):
+        mock_post.side_effect = [_gemini_response('x', status_code=429), _gemini_response('ok')]
+        result = asyncio.run(gemini.summarize_with_gemini_async('teks', content_type='meeting', task_id='t1'))
+    assert result == 'ok'
+    assert limiter.acquire.await_count == 2
+    assert limiter.acquire.await_args.kwargs["key"] == 't1'
+    limiter.report_throttled.assert_called_once()
+
+def test_summarize_with_gemini_async_daily_quota_not_retried(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock(side_effect=gemini.RateLimitExceeded("habis"))
+    with patch("app.services.gemini.get_gemini_limiter", return_value=limiter):
+        with pytest.raises(gemini.RateLimitExceeded):
+            asyncio.run(gemini.summarize_with_gemini_async('teks', content_type='meeting'))
+    assert limiter.acquire.await_count == 1
+
+def _sse_lines(*texts):
+    lines = [f'data: {{"candidates": [{{"content": {{"parts": [{{"text": {json.dumps(t)}}}]}}}}]}}\r\n\r\n' for t in texts]
+    # Chunk terakhir Gemini hanya berisi finishReason tanpa teks
+    lines.append('data: {"candidates": [{"finishReason": "STOP"}]}\r\n\r\n')
+    return "".join(lines)
+
+def _stream_client(responses):
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(str(request.url))
+        status, body = responses.pop(0)
+        return httpx.Response(status, text=body, headers={"Content-Type": "text/event-stream"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requests_seen
+
+def test_gemini_stream_url():
+    url = "https://host/v1beta/models/gemini-2.0-flash:generateContent"
+    assert gemini.gemini_stream_url(url) == "https://host/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse"
+
+def test_parse_gemini_stream_line():
+    assert gemini.parse_gemini_stream_line('data: {"candidates": [{"content": {"parts": [{"text": "ha"}, {"text": "lo"}]}}]}') == "halo"
+    assert gemini.parse_gemini_stream_line('data: {"candidates": [{"finishReason": "STOP"}]}') is None
+    assert gemini.parse_gemini_stream_line("") is None
+
+def test_stream_gemini_deltas_retries_before_first_delta(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("GEMINI_API_URL", "http://fake/models/m:generateContent")
+
+    async def run():
+        client, seen = _stream_client([(500, "error"), (200, _sse_lines('{"executive', '_summary": "ok"}'))])
+        async with client:
+            deltas = [d async for d in gemini.stream_gemini_deltas("teks", content_type="meeting", client=client)]
+        return deltas, seen
+
+    with patch("app.services.resilience.asyncio.sleep", new_callable=AsyncMock):
+        deltas, seen = asyncio.run(run())
+    assert deltas == ['{"executive', '_summary": "ok"}']
+    assert len(seen) == 2
+    assert seen[-1] == "http://fake/models/m:streamGenerateContent?alt=sse&key=def"
+
+def test_summarize_with_gemini_stream_parses_final_text(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    received = []
+
+    async def fake_deltas(*args, **kwargs):
+        for delta in ('{"executive', '_summary": "ok"}'):
+            yield delta
+
+    with patch("app.services.gemini.stream_gemini_deltas", side_effect=fake_deltas):
+        result = asyncio.run(gemini.summarize_with_gemini_stream("teks", content_type="meeting", on_delta=received.append))
+    assert result == {"executive_summary": "ok"}
+    assert received == ['{"executive', '_summary": "ok"}']
+
+def test_summarize_with_gemini_stream_falls_back_after_broken_stream(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+
+    async def broken_deltas(*args, **kwargs):
+        yield "sebagian"
+        raise Exception("koneksi terputus")
+
+    with patch("app.services.gemini.stream_gemini_deltas", side_effect=broken_deltas), \
+         patch("app.services.gemini.summarize_with_gemini_async", new_callable=AsyncMock, return_value="lengkap") as mock_async:
+        result = asyncio.run(gemini.summarize_with_gemini_stream("teks", content_type="meeting"))
+    assert result == "lengkap"
+    mock_async.assert_awaited_once()
+
+def test_format_summary_uses_content_specific_output():
+    formatted = gemini.format_summary({"executive_summary": "Rapat membahas anggaran"}, "transkrip", "meeting")
+    assert "RINGKASAN MEETING" in formatted
+    assert "Rapat membahas anggaran" in formatted
+    assert gemini.format_summary("teks biasa", "transkrip", "meeting") == "teks biasa"
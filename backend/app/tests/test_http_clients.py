@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from app.config import Config
+from app.services import http_clients
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = b'{"text": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_pooled_client_reuses_connections(local_server):
+    async def scenario():
+        clients = http_clients.HttpClients()
+        try:
+            for _ in range(3):
+                response = await clients.get("whisper").post(local_server, json={"a": 1})
+                assert response.json() == {"text": "ok"}
+            return clients.stats_dict()
+        finally:
+            await clients.aclose()
+
+    stats = asyncio.run(scenario())
+    assert stats["whisper"] == {"requests": 3, "new_connections": 1, "reused_connections": 2, "reuse_ratio": 0.667}
+    assert stats["gemini"]["requests"] == 0
+
+def test_clients_use_configured_timeouts(monkeypatch):
+    monkeypatch.setenv("HTTP_CONNECT_TIMEOUT", "3")
+    monkeypatch.setenv("GEMINI_TIMEOUT", "45")
+    clients = http_clients.HttpClients(Config())
+    timeout = clients.get("gemini").timeout
+    assert timeout.connect == 3
+    assert timeout.read == 45
+    asyncio.run(clients.aclose())
+    assert all(client.is_closed for client in clients.clients.values())
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    monkeypatch.setenv("HTTP2", "true")
+    with patch("app.services.http_clients.http2_available", return_value=False):
+        clients = http_clients.HttpClients()
+    assert clients.http2 is False
+    asyncio.run(clients.aclose())
+
+def test_get_http_client_lazy_and_injected(monkeypatch):
+    monkeypatch.setattr(http_clients, "_http_clients", None)
+    assert http_clients.get_http_stats() is None
+    client = http_clients.get_http_client("gemini")
+    assert http_clients.get_http_client("gemini") is client
+    injected = http_clients.HttpClients()
+    http_clients.set_http_clients(injected)
+    assert http_clients.get_http_client("whisper") is injected.get("whisper")
+    gemini = injected.get("gemini")
+    asyncio.run(injected.get("whisper").aclose())
+    # Hanya client yang sudah ditutup yang diganti baru, client lain tetap dipakai
+    assert not http_clients.get_http_client("whisper").is_closed
+    assert http_clients.get_http_client("gemini") is gemini
+    assert http_clients.get_http_stats()["whisper"] is not None
+    asyncio.run(injected.aclose())
+    monkeypatch.setattr(http_clients, "_http_clients", None)
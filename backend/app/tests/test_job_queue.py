@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+from app.services.job_queue import JobQueue, QueueFull
+
+def test_job_queue_runs_smallest_priority_first():
+    order = []
+
+    async def scenario():
+        queue = JobQueue(workers=1, max_size=10)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        def make_job(name):
+            async def job():
+                order.append(name)
+            return job
+
+        queue.submit("blocker", blocker)
+        await asyncio.sleep(0)
+        queue.submit("besar", make_job("besar"), priority=3000)
+        queue.submit("kecil", make_job("kecil"), priority=10)
+        queue.submit("sedang", make_job("sedang"), priority=500)
+        assert queue.position("blocker") == 0
+        assert queue.position("kecil") == 1
+        assert queue.position("besar") == 3
+        gate.set()
+        while queue.stats()["completed"] < 4:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert order == ["kecil", "sedang", "besar"]
+
+def test_job_queue_limits_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def job():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    async def scenario():
+        queue = JobQueue(workers=3, max_size=20)
+        for i in range(10):
+            queue.submit(f"job-{i}", job)
+        while queue.stats()["completed"] < 10:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert peak == 3
+
+def test_job_queue_full_raises_with_retry_after():
+    async def scenario():
+        queue = JobQueue(workers=2, max_size=2)
+        gate = asyncio.Event()
+
+        async def job():
+            await gate.wait()
+
+        # Dua job langsung diambil worker, dua berikutnya mengisi antrean
+        for i in range(2):
+            queue.submit(f"running-{i}", job)
+        await asyncio.sleep(0)
+        queue.submit("queued-0", job)
+        queue.submit("queued-1", job)
+        assert queue.is_full()
+        with pytest.raises(QueueFull) as exc_info:
+            queue.submit("ditolak", job)
+        assert exc_info.value.retry_after >= 1
+        assert queue.eta("queued-1") > 0
+        assert queue.eta("running-0") == 0
+        assert queue.eta("tidak-ada") is None
+        gate.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+def test_job_queue_survives_failing_job():
+    done = []
+
+    async def failing():
+        raise RuntimeError("gagal")
+
+    async def ok():
+        done.append(True)
+
+    async def scenario():
+        queue = JobQueue(workers=1, max_size=5)
+        queue.submit("gagal", failing)
+        queue.submit("ok", ok)
+        while queue.stats()["completed"] < 2:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert done == [True]
+
+def test_job_queue_stop_cancels_running_and_drops_queued():
+    events = []
+
+    async def scenario():
+        queue = JobQueue(workers=1, max_size=10)
+
+        async def running():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                events.append("running cancelled")
+                raise
+
+        async def queued():
+            events.append("queued ran")
+
+        async def on_drop():
+            events.append("queued dropped")
+
+        queue.submit("running", running)
+        await asyncio.sleep(0)
+        queue.submit("queued", queued, on_drop=on_drop)
+        await queue.stop()
+        assert queue.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+    assert events == ["running cancelled", "queued dropped"]
+
+def test_job_queue_ages_waiting_jobs():
+    order = []
+    now = [0.0]
+
+    async def scenario():
+        # 1 unit prioritas per detik menunggu
+        queue = JobQueue(workers=1, max_size=10, aging=1.0, clock=lambda: now[0])
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        def make_job(name):
+            async def job():
+                order.append(name)
+            return job
+
+        queue.submit("blocker", blocker)
+        await asyncio.sleep(0)
+        queue.submit("youtube", make_job("youtube"), priority=100)
+        now[0] = 60.0
+        queue.submit("kecil-baru", make_job("kecil-baru"), priority=50)
+        now[0] = 120.0
+        # Setelah 120 detik menunggu, job besar setara prioritas -20 dan mendahului job kecil yang baru masuk
+        queue.submit("kecil-terbaru", make_job("kecil-terbaru"), priority=0)
+        assert queue.position("youtube") == 1
+        gate.set()
+        while queue.stats()["completed"] < 4:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert order == ["youtube", "kecil-baru", "kecil-terbaru"]
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from unittest.mock import AsyncMock, patch
 from fastapi import Request, Response
@@ -12,7 +13,8 @@ def test_log_request_multipart_logs_file_upload(caplog):
         import asyncio; asyncio.run(log_request(mock_request))
     assert "File Upload Detected" in caplog.text
 
-def test_log_request_normal_logs_body(caplog):
+def test_log_request_normal_logs_body(caplog, monkeypatch):
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
     mock_request = AsyncMock(spec=Request)
     mock_request.headers = {"content-type": "application/json"}
     mock_request.method = "POST"
@@ -22,7 +24,8 @@ def test_log_request_normal_logs_body(caplog):
         import asyncio; asyncio.run(log_request(mock_request))
     assert 'Body: {"foo": "bar"}' in caplog.text
 
-def test_log_request_exception_logs_error(caplog):
+def test_log_request_exception_logs_error(caplog, monkeypatch):
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
     mock_request = AsyncMock(spec=Request)
     mock_request.headers = {"content-type": "application/json"}
     mock_request.method = "POST"
@@ -45,4 +48,98 @@ def test_log_response_exception_logs_error(caplog):
     with patch("logging.info", side_effect=Exception("fail log")):
         with caplog.at_level(logging.ERROR):
             import asyncio; asyncio.run(log_response(mock_response))
-    assert "Gagal mencatat response" in caplog.text 
\ No newline at end of file
+    assert "Gagal mencatat response" in caplog.text 
+def test_payload_field_caps_and_samples(monkeypatch):
+    from app.utils.logger import payload_field, truncate
+    monkeypatch.setenv("LOG_PAYLOAD_MAX_CHARS", "5")
+    assert truncate("abcdefgh") == "abcde… [+3 karakter]"
+    assert truncate("abc") == "abc"
+    assert payload_field("abcdefgh", sample=False) == {"chars": 8}
+    assert payload_field(b"abcdefgh", sample=True) == {"bytes": 8, "preview": "abcde… [+3 karakter]"}
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "0")
+    assert "preview" not in payload_field("abcdefgh")
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
+    assert "preview" in payload_field("abcdefgh")
+
+def test_json_formatter_includes_extra_and_context_fields():
+    import json
+    from app.services.tracing import InMemorySpanExporter, Tracer
+    from app.utils.logger import ContextFilter, JsonFormatter, correlation_scope
+    tracer = Tracer(InMemorySpanExporter(), batch=False)
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, "halo %s", ("dunia",), None)
+    record.http_status = 200
+    with correlation_scope("req-1"), tracer.span("job", {"task_id": "t1"}) as span:
+        ContextFilter().filter(record)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "halo dunia"
+    assert entry["level"] == "INFO"
+    assert (entry["correlation_id"], entry["trace_id"], entry["task_id"]) == ("req-1", span.trace_id, "t1")
+    assert entry["http_status"] == 200
+
+def test_queue_handler_keeps_traceback_and_drops_when_full():
+    import queue
+    from app.utils.logger import NonBlockingQueueHandler
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    try:
+        raise ValueError("rusak")
+    except ValueError:
+        import sys
+        record = logging.LogRecord("app", logging.ERROR, __file__, 1, "gagal %d", (1,), sys.exc_info())
+    handler.emit(record)
+    handler.emit(record)
+    assert handler.dropped == 1
+    prepared = handler.queue.get_nowait()
+    assert prepared.getMessage() == "gagal 1"
+    assert prepared.exc_info is None
+    assert "ValueError: rusak" in prepared.exc_text
+
+def test_configure_logging_writes_json_lines_from_listener_thread(monkeypatch):
+    import io
+    import json
+    from app.utils import logger
+    root = logging.getLogger()
+    # Handler root dan listener asli dipulihkan setelah test
+    monkeypatch.setattr(root, "handlers", list(root.handlers))
+    monkeypatch.setattr(root, "level", root.level)
+    monkeypatch.setattr(logger, "_listener", None)
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    stream = io.StringIO()
+    logger.configure_logging(stream=stream)
+    with logger.correlation_scope("req-9"):
+        logging.getLogger("app.test").warning("peringatan", extra={"task_id": "t9"})
+    logger.stop_logging()
+    [line] = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert line["message"] == "peringatan"
+    assert line["correlation_id"] == "req-9"
+    assert line["task_id"] == "t9"
+
+def test_request_logging_middleware_sets_correlation_id(caplog, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
+    client = TestClient(app)
+    with caplog.at_level(logging.INFO):
+        resp = client.post("/api/summarize/youtube/test", json={"youtube_url": "https://youtu.be/abc123"}, headers={"X-Request-ID": "abc-123"})
+        generated = client.get("/api/health", headers={"X-Request-ID": "bad id\n"})
+    assert resp.status_code == 200
+    assert resp.headers["x-request-id"] == "abc-123"
+    assert generated.headers["x-request-id"] != "bad id\n"
+    assert len(generated.headers["x-request-id"]) == 16
+    [record] = [r for r in caplog.records if getattr(r, "http_path", None) == "/api/summarize/youtube/test"]
+    assert record.http_status == 200
+    assert record.request_bytes > 0
+    assert "youtu.be/abc123" in record.request_body["preview"]
+
+def test_background_job_keeps_request_correlation_id():
+    from app.routes.summarize import traced_job
+    from app.utils.logger import correlation_scope, get_correlation_id
+    seen = []
+
+    async def job():
+        seen.append(get_correlation_id())
+
+    with correlation_scope("req-7"):
+        run = traced_job("t1", "upload", job)
+    asyncio.run(run())
+    assert seen == ["req-7"]
+    assert get_correlation_id() is None
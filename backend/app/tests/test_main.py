@@ -23,4 +23,24 @@ def test_startup_config_error(monkeypatch):
     monkeypatch.delenv("WHISPER_API_KEY", raising=False)
     with pytest.raises(Exception):
         with TestClient(app) as client:
-            pass 
\ No newline at end of file
+            pass 
+def test_purge_loop_purges_tasks_and_cache(monkeypatch, tmp_path):
+    import asyncio
+    from app.main import purge_expired_entries
+    from app.services.cache import get_result_cache
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setenv("CACHE_TTL", "1")
+    results = get_result_cache()
+    clock = results.backend.clock
+    monkeypatch.setattr(results.backend, "clock", lambda: clock() - 10)
+    results.set_transcript("hash", "id", "transkrip")
+    monkeypatch.setattr(results.backend, "clock", clock)
+
+    async def run():
+        loop_task = asyncio.create_task(purge_expired_entries(60))
+        await asyncio.sleep(0.2)
+        loop_task.cancel()
+
+    asyncio.run(run())
+    assert results.backend.size_bytes() == 0
@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.metrics import CachedValue, MetricsRegistry, directory_usage, get_metrics
+from app.services.task_store import MemoryTaskStore, StageTimer
+
+def test_counter_renders_labels_and_escapes_values():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Jumlah request", ("path",))
+    counter.inc(path="/a")
+    counter.inc(2, path='/b"c')
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Jumlah request",
+        "# TYPE requests_total counter",
+        'requests_total{path="/a"} 1',
+        'requests_total{path="/b\\"c"} 2',
+    ]
+    with pytest.raises(ValueError):
+        counter.inc(method="GET")
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latensi", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="x")
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'latency_seconds_bucket{stage="x",le="0.1"} 1',
+        'latency_seconds_bucket{stage="x",le="1"} 3',
+        'latency_seconds_bucket{stage="x",le="+Inf"} 4',
+        'latency_seconds_sum{stage="x"} 4.25',
+        'latency_seconds_count{stage="x"} 4',
+    ]
+
+def test_gauge_is_collected_on_scrape_and_skipped_on_error():
+    registry = MetricsRegistry()
+    values = {"depth": 3}
+    registry.gauge("queue_depth", "Antrean", lambda: [((), values["depth"])])
+    registry.gauge("broken", "Selalu gagal", lambda: 1 / 0)
+    assert "queue_depth 3" in registry.render()
+    values["depth"] = 5
+    body = registry.render()
+    assert "queue_depth 5" in body
+    assert "broken" not in body
+
+def test_upstream_attempt_records_status_and_throttling():
+    metrics = get_metrics()
+    with metrics.upstream_attempt("gemini") as tracked:
+        tracked.status = 429
+    with pytest.raises(ConnectionError):
+        with metrics.upstream_attempt("gemini"):
+            raise ConnectionError("putus")
+    assert metrics.upstream_requests.value(upstream="gemini", status="429") == 1
+    assert metrics.upstream_requests.value(upstream="gemini", status="error") == 1
+    assert metrics.upstream_throttled.value(upstream="gemini") == 1
+    assert metrics.upstream_seconds.count(upstream="gemini") == 2
+
+def test_stage_timer_observes_each_stage_and_total_once():
+    clock = itertools.count().__next__
+    timer = StageTimer(MemoryTaskStore(), "t1", clock=clock)
+    with timer.stage("transcribing"):
+        pass
+    with timer.measure("formatting"):
+        pass
+    timer.finish()
+    timer.finish()
+    stages = get_metrics().stage_seconds
+    assert stages.count(stage="transcribing") == 1
+    assert stages.count(stage="formatting") == 1
+    assert stages.count(stage="total") == 1
+
+def test_directory_usage(tmp_path):
+    (tmp_path / "a.mp3").write_bytes(b"x" * 10)
+    (tmp_path / "yt_1").mkdir()
+    (tmp_path / "yt_1" / "b.webm").write_bytes(b"x" * 5)
+    assert directory_usage(str(tmp_path)) == (2, 15)
+    assert directory_usage(str(tmp_path / "tidak-ada")) == (0, 0)
+
+def test_cached_value_refreshes_off_loop_after_ttl():
+    now = [0.0]
+    threads = []
+
+    def compute():
+        threads.append(threading.current_thread())
+        return len(threads)
+
+    value = CachedValue(compute, ttl=5, clock=lambda: now[0])
+    # Render tanpa refresh sebelumnya tetap mendapat nilai
+    assert value.get() == 1
+    asyncio.run(value.refresh())
+    assert value.get() == 1
+    now[0] = 5.0
+    asyncio.run(value.refresh())
+    assert value.get() == 2
+    assert threads[1] is not threading.main_thread()
+
+def test_metrics_endpoint_exposes_gauges(monkeypatch, tmp_path):
+    temp_folder = tmp_path / "temp"
+    temp_folder.mkdir()
+    (temp_folder / "upload.mp3").write_bytes(b"x" * 100)
+    monkeypatch.setenv("TEMP_FOLDER", str(temp_folder))
+    # Nilai unik agar limiter bersama dibuat ulang tanpa pemakaian dari test lain
+    monkeypatch.setenv("GEMINI_RPD", "123")
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "summarizer_job_queue_depth 0" in body
+    assert "summarizer_jobs_in_flight 0" in body
+    assert "summarizer_temp_dir_bytes 100" in body
+    assert 'summarizer_gemini_quota_limit{quota="rpd"} 123' in body
+    assert 'summarizer_gemini_quota_used{quota="rpd"} 0' in body
+    # Pemakaian folder temp dipakai ulang selama METRICS_GAUGE_TTL
+    (temp_folder / "lain.mp3").write_bytes(b"x" * 50)
+    assert "summarizer_temp_dir_bytes 100" in TestClient(app).get("/metrics").text
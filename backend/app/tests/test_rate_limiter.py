@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from app.services import rate_limiter
+from app.services.rate_limiter import GeminiRateLimiter, RateLimitExceeded, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_estimate_tokens():
+    assert rate_limiter.estimate_tokens("") == 1
+    assert rate_limiter.estimate_tokens("a" * 400) == 101
+
+def test_token_bucket_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(60, period=60.0, clock=clock)
+    assert bucket.time_until(60) == 0
+    bucket.consume(60)
+    assert bucket.time_until(1) == pytest.approx(1.0)
+    clock.now = 30.0
+    assert bucket.available() == pytest.approx(30.0)
+    clock.now = 1000.0
+    assert bucket.available() == 60
+    bucket.drain()
+    assert bucket.available() == 0
+
+def test_token_bucket_caps_oversized_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(10, clock=clock)
+    # Request lebih besar dari kapasitas tidak boleh menunggu selamanya
+    assert bucket.time_until(50) == 0
+
+def test_limiter_waits_instead_of_failing():
+    limiter = GeminiRateLimiter(rpm=2, tpm=1000, rpd=100, period=0.2)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(4):
+            await limiter.acquire(10)
+        return loop.time() - start
+
+    elapsed = asyncio.run(run())
+    # 2 request pertama langsung, 2 berikutnya menunggu refill (~0.1s per request)
+    assert elapsed >= 0.15
+    assert limiter.stats()["requests_per_day"]["used"] == 4
+
+def test_limiter_tpm_limits_large_prompts():
+    limiter = GeminiRateLimiter(rpm=100, tpm=100, rpd=100, period=0.2)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire(100)
+        await limiter.acquire(50)
+        return loop.time() - start
+
+    assert asyncio.run(run()) >= 0.08
+
+def test_limiter_round_robin_across_keys():
+    limiter = GeminiRateLimiter(rpm=1, tpm=1000, rpd=100, period=0.05)
+    order = []
+
+    async def call(key):
+        await limiter.acquire(1, key=key)
+        order.append(key)
+
+    async def run():
+        # Habiskan bucket dulu supaya semua pemanggil benar-benar mengantre
+        await limiter.acquire(1, key="primer")
+        await asyncio.gather(call("a"), call("a"), call("a"), call("b"))
+
+    asyncio.run(run())
+    assert order == ["a", "b", "a", "a"]
+    assert limiter.queue_depth() == 0
+
+def test_limiter_cancelled_waiter_leaves_queue():
+    limiter = GeminiRateLimiter(rpm=1, tpm=1000, rpd=100, period=0.5)
+
+    async def run():
+        await limiter.acquire(1)
+        waiter = asyncio.create_task(limiter.acquire(1, key="x"))
+        queued = asyncio.create_task(limiter.acquire(1, key="y"))
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queue_depth"] == 2
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await queued
+        assert limiter.queue_depth() == 0
+
+    asyncio.run(run())
+
+def test_limiter_skips_waiter_cancelled_in_same_tick():
+    limiter = GeminiRateLimiter(rpm=10, tpm=1000, rpd=100)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        cancelled, alive = loop.create_future(), loop.create_future()
+        # Pemanggil dibatalkan setelah masuk antrean, sebelum `finally`-nya sempat berjalan
+        cancelled.cancel()
+        limiter._queues = {"x": rate_limiter.deque([cancelled]), "y": rate_limiter.deque([alive])}
+        limiter._grant_next()
+        assert limiter._active is alive and alive.done()
+        limiter._active = None
+        only_cancelled = loop.create_future()
+        only_cancelled.cancel()
+        limiter._queues = {"x": rate_limiter.deque([only_cancelled])}
+        limiter._grant_next()
+        assert limiter._active is None
+        assert limiter.queue_depth() == 0
+
+    asyncio.run(run())
+
+def test_limiter_daily_quota_exhausted():
+    limiter = GeminiRateLimiter(rpm=10, tpm=1000, rpd=1)
+
+    async def run():
+        await limiter.acquire(1)
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire(1)
+
+    asyncio.run(run())
+    assert limiter.stats()["requests_per_day"]["remaining"] == 0
+
+def test_get_gemini_limiter_follows_config(monkeypatch):
+    monkeypatch.setenv("GEMINI_RPM", "7")
+    first = rate_limiter.get_gemini_limiter()
+    assert first is rate_limiter.get_gemini_limiter()
+    assert first.stats()["requests_per_minute"]["limit"] == 7
+    monkeypatch.setenv("GEMINI_RPM", "8")
+    assert rate_limiter.get_gemini_limiter().stats()["requests_per_minute"]["limit"] == 8
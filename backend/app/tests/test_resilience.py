@@ -0,0 +1,142 @@
+import asyncio
+import random
+import httpx
+import pytest
+import requests
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services import gemini
+from app.services.metrics import get_metrics
+from app.services.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, get_circuit_breaker, is_retryable, retry_after_seconds, retry_async,
+)
+
+def status_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://fake")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"status {status}", request=request, response=response)
+
+def run_with_retry(errors, policy=None, upstream="whisper"):
+    """Jalankan retry_async dengan percobaan yang melempar `errors` berurutan lalu berhasil."""
+    calls = []
+
+    async def attempt(number):
+        calls.append(number)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    with patch("app.services.resilience.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        try:
+            result = asyncio.run(retry_async(upstream, attempt, policy))
+        except Exception as e:
+            result = e
+    return result, calls, [c.args[0] for c in mock_sleep.await_args_list]
+
+def test_backoff_uses_full_jitter_with_cap():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    rng = random.Random(1)
+    for attempt, ceiling in ((1, 1.0), (2, 2.0), (3, 4.0), (6, 5.0)):
+        delays = [policy.backoff(attempt, rng) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling * 0.8
+
+def test_errors_are_classified_as_retryable_or_fatal():
+    for status in (408, 429, 500, 502, 503, 504):
+        assert is_retryable(status_error(status))
+    for status in (400, 401, 403, 404, 413, 422):
+        assert not is_retryable(status_error(status))
+    assert is_retryable(httpx.ConnectError("putus"))
+    assert is_retryable(httpx.ReadTimeout("lambat"))
+    assert is_retryable(requests.ConnectionError("putus"))
+    response = requests.Response()
+    response.status_code = 401
+    assert not is_retryable(requests.HTTPError(response=response))
+    assert not is_retryable(ValueError("body bukan JSON"))
+
+def test_retry_after_header_in_seconds_and_http_date():
+    assert retry_after_seconds(status_error(429, {"Retry-After": "7"})) == 7.0
+    http_date = status_error(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:10 GMT"})
+    assert retry_after_seconds(http_date, now=1445412480.0) == 10.0
+    assert retry_after_seconds(status_error(503, {"Retry-After": "nanti"})) is None
+    assert retry_after_seconds(status_error(503)) is None
+    assert retry_after_seconds(ValueError()) is None
+
+def test_fatal_error_is_not_retried():
+    result, calls, delays = run_with_retry([status_error(400)])
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert calls == [1]
+    assert delays == []
+
+def test_retry_after_overrides_backoff():
+    result, calls, delays = run_with_retry([status_error(429, {"Retry-After": "7"})])
+    assert result == "ok"
+    assert calls == [1, 2]
+    assert delays == [7.0]
+    assert get_metrics().upstream_retries.value(upstream="whisper") == 1
+
+def test_retry_stops_when_deadline_budget_is_exhausted():
+    policy = RetryPolicy(max_attempts=5, deadline=5.0)
+    result, calls, delays = run_with_retry([status_error(503, {"Retry-After": "60"}), status_error(503)], policy)
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert calls == [1]
+    assert delays == []
+
+def test_circuit_breaker_opens_and_probes_once():
+    now = [0.0]
+    breaker = CircuitBreaker("gemini", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == 10
+    now[0] = 10.0
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    # Hanya satu request percobaan yang boleh lewat
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] = 20.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.stats() == {"state": "closed", "consecutive_failures": 0}
+    assert get_metrics().circuit_rejections.value(upstream="gemini") == 2
+
+def test_open_circuit_fails_fast_without_calling_upstream(monkeypatch):
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "2")
+    policy = RetryPolicy(max_attempts=2)
+    result, calls, _ = run_with_retry([status_error(503), status_error(503)], policy)
+    assert isinstance(result, httpx.HTTPStatusError)
+    assert get_circuit_breaker("whisper").state == "open"
+    result, calls, _ = run_with_retry([], policy)
+    assert isinstance(result, CircuitOpenError)
+    assert calls == []
+    # Upstream lain tidak terpengaruh
+    assert run_with_retry([], policy, upstream="gemini")[0] == "ok"
+
+def test_fatal_response_does_not_count_as_circuit_failure(monkeypatch):
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "1")
+    run_with_retry([status_error(401)])
+    assert get_circuit_breaker("whisper").state == "closed"
+
+def test_summarize_with_gemini_sends_one_request_per_attempt(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    with patch("app.services.gemini.requests.post") as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+        mock_post.return_value.json.side_effect = ValueError("body bukan JSON")
+        with pytest.raises(Exception, match="Gemini API error"):
+            gemini.summarize_with_gemini("teks", content_type="meeting")
+    # Body rusak tidak memicu request fallback kedua maupun retry
+    assert mock_post.call_count == 1
+
+def test_stats_endpoint_reports_circuit_breakers():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    get_circuit_breaker("gemini").record_failure()
+    stats = TestClient(app).get("/api/summarize/stats").json()
+    assert stats["circuit_breakers"]["gemini"] == {"state": "closed", "consecutive_failures": 1}
+    body = TestClient(app).get("/metrics").text
+    assert 'summarizer_circuit_state{upstream="gemini"} 0' in body
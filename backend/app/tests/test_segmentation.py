@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services import segmentation
+
+SILENCEDETECT_OUTPUT = """
+Input #0, mp3, from 'rapat.mp3':
+  Duration: 00:20:00.50, start: 0.025057, bitrate: 320 kb/s
+[silencedetect @ 0x1] silence_start: 295.2
+[silencedetect @ 0x1] silence_end: 296.0 | silence_duration: 0.8
+[silencedetect @ 0x1] silence_start: 610.5
+[silencedetect @ 0x1] silence_end: 611.5 | silence_duration: 1.0
+[silencedetect @ 0x1] silence_start: 1199.0
+"""
+
+def test_parse_silencedetect():
+    duration, silences = segmentation.parse_silencedetect(SILENCEDETECT_OUTPUT)
+    assert duration == pytest.approx(1200.5)
+    # Hening yang belum berakhir ditutup di akhir audio
+    assert silences == [(295.2, 296.0), (610.5, 611.5), (1199.0, 1200.5)]
+
+def test_plan_segments_short_audio_single_segment():
+    assert segmentation.plan_segments(500, [], target=600) == [(0.0, 500)]
+
+def test_plan_segments_cuts_at_nearest_silence():
+    silences = [(100, 101), (580, 582), (640, 641), (1250, 1252)]
+    segments = segmentation.plan_segments(1800, silences, target=600, overlap=2)
+    assert segments == [(0.0, 581.0), (581.0, 1251.0), (1251.0, 1800)]
+
+def test_plan_segments_hard_cut_with_overlap():
+    segments = segmentation.plan_segments(1500, [], target=600, overlap=2)
+    assert segments == [(0.0, 600), (598, 1200), (1198, 1500)]
+
+def test_merge_transcripts_removes_overlap():
+    texts = [
+        "Rapat dimulai jam sembilan. Agenda pertama adalah",
+        "agenda pertama adalah anggaran, lalu jadwal.",
+        "",
+        "Sesi ditutup.",
+    ]
+    assert segmentation.merge_transcripts(texts) == (
+        "Rapat dimulai jam sembilan. Agenda pertama adalah anggaran, lalu jadwal. Sesi ditutup."
+    )
+
+def test_merge_transcripts_without_overlap_keeps_all_words():
+    assert segmentation.merge_transcripts(["satu dua", "tiga empat"]) == "satu dua tiga empat"
+
+async def fake_extract(path, start, end, output_path, config):
+    with open(output_path, "w") as f:
+        f.write(f"{start}-{end}")
+
+def test_transcribe_segments_parallel_ordered_and_bounded(tmp_path):
+    in_flight = 0
+    peak = 0
+
+    async def fake_transcribe(path, language="en"):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        with open(path) as f:
+            label = f.read()
+        # Segmen awal selesai paling akhir, urutan hasil harus tetap terjaga
+        await asyncio.sleep(0.05 if label.startswith("0.0") else 0.01)
+        in_flight -= 1
+        return label
+
+    segments = [(0.0, 10.0), (10.0, 20.0), (20.0, 30.0), (30.0, 40.0), (40.0, 50.0)]
+    with patch("app.services.segmentation.extract_segment", side_effect=fake_extract):
+        texts = asyncio.run(segmentation.transcribe_segments(
+            str(tmp_path / "rapat.mp3"), segments, "id", transcribe=fake_transcribe, concurrency=2
+        ))
+    assert texts == [f"{start}-{end}" for start, end in segments]
+    assert peak == 2
+    # File segmen dihapus setelah ditranskripsi
+    assert list(tmp_path.iterdir()) == []
+
+def test_transcribe_segments_failure_cancels_other_segments(tmp_path):
+    started = []
+    cancelled = []
+
+    async def transcribe(path, language="en"):
+        started.append(path[-7:-4])
+        if path.endswith("segment000.ogg"):
+            raise RuntimeError("gagal")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(path[-7:-4])
+            raise
+
+    segments = [(0.0, 10.0), (10.0, 20.0), (20.0, 30.0), (30.0, 40.0)]
+    with patch("app.services.segmentation.extract_segment", side_effect=fake_extract):
+        with pytest.raises(RuntimeError, match="gagal"):
+            asyncio.run(segmentation.transcribe_segments(
+                str(tmp_path / "rapat.mp3"), segments, "id", transcribe=transcribe, concurrency=2
+            ))
+    # Segmen yang sedang berjalan dibatalkan, sisanya tidak pernah dimulai
+    assert sorted(cancelled) == sorted(started)[1:]
+    assert "003" not in started
+    assert list(tmp_path.iterdir()) == []
+
+def test_transcribe_segments_cancelled_caller_cleans_up(tmp_path):
+    async def slow_transcribe(path, language="en"):
+        await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(segmentation.transcribe_segments(
+            str(tmp_path / "rapat.mp3"), [(0.0, 10.0), (10.0, 20.0)], "id", transcribe=slow_transcribe
+        ))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with patch("app.services.segmentation.extract_segment", side_effect=fake_extract):
+        asyncio.run(run())
+    assert list(tmp_path.iterdir()) == []
+
+def test_transcribe_segmented_end_to_end(monkeypatch, tmp_path):
+    monkeypatch.setenv("AUDIO_SEGMENT_SECONDS", "600")
+    audio_path = tmp_path / "rapat.mp3"
+    audio_path.write_bytes(b"\x00" * segmentation.MIN_PREPROCESS_BYTES)
+    duration, silences = segmentation.parse_silencedetect(SILENCEDETECT_OUTPUT)
+
+    async def fake_detect(path, config):
+        return duration, silences
+
+    async def fake_transcribe(path, language="en"):
+        return {"000": "bagian satu", "001": "bagian dua"}[path[-7:-4]]
+
+    with patch("app.services.segmentation.ffmpeg_available", return_value=True), \
+         patch("app.services.segmentation.detect_silences", side_effect=fake_detect), \
+         patch("app.services.segmentation.extract_segment", side_effect=fake_extract):
+        partials = []
+        result = asyncio.run(segmentation.transcribe_segmented(
+            str(audio_path), "id", transcribe=fake_transcribe,
+            on_segment=lambda index, total, text: partials.append((index, total, text))
+        ))
+    assert result == "bagian satu bagian dua"
+    assert sorted(partials) == [(0, 2, "bagian satu"), (1, 2, "bagian dua")]
+
+def test_transcribe_segmented_disabled(monkeypatch, tmp_path):
+    monkeypatch.setenv("AUDIO_SEGMENT_SECONDS", "0")
+    assert asyncio.run(segmentation.transcribe_segmented(str(tmp_path / "rapat.mp3"))) is None
@@ -2,8 +2,18 @@ import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.routes import summarize
-from unittest.mock import patch, MagicMock
+from app.services import cache
+from app.services.audio import PreprocessResult
+from app.services.task_store import get_task_store
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import httpx
 import os
+import socket
+import time
+
+# Header ID3v2 minimal agar lolos validasi MP3 saat upload
+MP3_BYTES = b"ID3\x04\x00\x00\x00\x00\x00\x00" + b"\x00" * 64
 
 def test_validate_youtube_url_all_patterns():
     valid_urls = [
@@ -20,49 +30,6 @@ def test_validate_youtube_url_all_patterns():
     for url in invalid_urls:
         assert not summarize.validate_youtube_url(url)
 
-def test_download_youtube_audio_success(monkeypatch, tmp_path):
-    # Simulasi file mp3 berhasil di-download
-    monkeypatch.setattr(summarize, "subprocess", __import__("subprocess"))
-    class Result:
-        returncode = 0
-        stdout = ""
-        stderr = ""
-    monkeypatch.setattr(summarize.subprocess, "run", lambda *a, **k: Result())
-    monkeypatch.setattr(os, "listdir", lambda d: ["abc.mp3"])
-    monkeypatch.setattr(os.path, "getsize", lambda f: 1024*1024)
-    monkeypatch.setattr(os.path, "join", lambda a, b: f"{a}/{b}")
-    monkeypatch.setattr(os.path, "exists", lambda f: True)
-    monkeypatch.setattr(os, "remove", lambda f: None)
-    path = summarize.download_youtube_audio("https://youtu.be/abc123", str(tmp_path))
-    assert path.endswith(".mp3")
-
-def test_download_youtube_audio_no_file(monkeypatch, tmp_path):
-    monkeypatch.setattr(summarize, "subprocess", __import__("subprocess"))
-    class Result:
-        returncode = 0
-        stdout = ""
-        stderr = ""
-    monkeypatch.setattr(summarize.subprocess, "run", lambda *a, **k: Result())
-    monkeypatch.setattr(os, "listdir", lambda d: ["abc.txt"])
-    with pytest.raises(Exception):
-        summarize.download_youtube_audio("https://youtu.be/abc123", str(tmp_path))
-
-def test_download_youtube_audio_timeout(monkeypatch, tmp_path):
-    def raise_timeout(*a, **k):
-        raise summarize.subprocess.TimeoutExpired(cmd="yt-dlp", timeout=180)
-    monkeypatch.setattr(summarize, "subprocess", __import__("subprocess"))
-    monkeypatch.setattr(summarize.subprocess, "run", raise_timeout)
-    with pytest.raises(Exception):
-        summarize.download_youtube_audio("https://youtu.be/abc123", str(tmp_path))
-
-def test_download_youtube_audio_other_error(monkeypatch, tmp_path):
-    def raise_error(*a, **k):
-        raise Exception("fail")
-    monkeypatch.setattr(summarize, "subprocess", __import__("subprocess"))
-    monkeypatch.setattr(summarize.subprocess, "run", raise_error)
-    with pytest.raises(Exception):
-        summarize.download_youtube_audio("https://youtu.be/abc123", str(tmp_path))
-
 def test_youtube_test_endpoint():
     client = TestClient(app)
     resp = client.post("/api/summarize/youtube/test", json={"youtube_url": "https://youtu.be/abc123"})
@@ -77,33 +44,90 @@ def test_health_check_endpoint():
     assert resp.status_code == 200
     assert resp.json()["status"] == "healthy"
 
+def test_stats_endpoint():
+    client = TestClient(app)
+    resp = client.get("/api/summarize/stats")
+    assert resp.status_code == 200
+    limits = resp.json()["gemini_rate_limit"]
+    assert "queue_depth" in limits
+    assert limits["requests_per_minute"]["limit"] > 0
+
 def test_status_endpoint():
     client = TestClient(app)
     resp = client.get("/api/summarize/status/unknown")
     assert resp.status_code == 200
     assert resp.json()["status"] == "not_found"
 
-@patch("app.routes.summarize.transcribe_audio", return_value="transkrip")
-@patch("app.routes.summarize.summarize_with_gemini", return_value="summary")
-def test_summarize_youtube_success(mock_gemini, mock_whisper, monkeypatch):
+def run_youtube_job(youtube_url="https://youtu.be/abc123"):
+    # Kirim link YouTube lalu polling status sampai job background selesai
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            resp = await client.post("/api/summarize/youtube/", json={"youtube_url": youtube_url})
+            assert resp.status_code == 200
+            task_id = resp.json()["task_id"]
+            for _ in range(100):
+                status = (await client.get(f"/api/summarize/status/{task_id}")).json()
+                if status["status"] in ("completed", "failed"):
+                    break
+                await asyncio.sleep(0.01)
+            return resp.json(), status
+    return asyncio.run(run())
+
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip")
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_summarize_youtube_success(mock_gemini, mock_whisper, monkeypatch, tmp_path):
     monkeypatch.setenv("WHISPER_API_KEY", "abc")
     monkeypatch.setenv("GEMINI_API_KEY", "def")
-    client = TestClient(app)
-    with patch("app.routes.summarize.download_youtube_audio", return_value="audio.mp3"), \
-         patch("os.remove"), patch("shutil.rmtree"):
-        resp = client.post("/api/summarize/youtube/", json={"youtube_url": "https://youtu.be/abc123"})
-        assert resp.status_code == 200 or resp.status_code == 500 or resp.status_code == 400
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    with patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock, return_value="audio.mp3"):
+        created, status = run_youtube_job()
+    # Route langsung mengembalikan task id, pemrosesan berjalan di background
+    assert created["status"] == "queued"
+    assert status["status"] == "completed"
+    assert status["summary"] == "summary"
+    assert status["processing_info"]["cache_hit"] == {"transcription": False, "summary": False}
+    assert set(status["timings"]) == {
+        "queued", "downloading", "transcribing", "content_detection", "summarizing", "formatting", "total"
+    }
+    assert "transcription" not in status
+    # Folder temp job dibersihkan
+    assert [name for name in os.listdir(tmp_path) if not name.startswith("tasks.")] == []
 
-@patch("app.routes.summarize.transcribe_audio", return_value="")
-@patch("app.routes.summarize.summarize_with_gemini", return_value="summary")
-def test_summarize_youtube_empty_transcription(mock_gemini, mock_whisper, monkeypatch):
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip")
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_job_stages_are_exported_as_metrics(mock_gemini, mock_whisper, monkeypatch, tmp_path):
     monkeypatch.setenv("WHISPER_API_KEY", "abc")
     monkeypatch.setenv("GEMINI_API_KEY", "def")
-    client = TestClient(app)
-    with patch("app.routes.summarize.download_youtube_audio", return_value="audio.mp3"), \
-         patch("os.remove"), patch("shutil.rmtree"):
-        resp = client.post("/api/summarize/youtube/", json={"youtube_url": "https://youtu.be/abc123"})
-        assert resp.status_code == 400
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    with patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock, return_value="audio.mp3"):
+        run_youtube_job()
+    body = TestClient(app).get("/metrics").text
+    for stage in ("queued", "downloading", "transcribing", "content_detection", "summarizing", "formatting", "total"):
+        assert f'summarizer_stage_duration_seconds_count{{stage="{stage}"}} 1' in body
+    assert 'summarizer_cache_lookups_total{level="summary",result="miss"} 1' in body
+    assert "summarizer_task_store_tasks 1" in body
+
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="")
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_summarize_youtube_empty_transcription(mock_gemini, mock_whisper, monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    with patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock, return_value="audio.mp3"):
+        _, status = run_youtube_job()
+    assert status["status"] == "failed"
+    assert "Transkripsi kosong" in status["error"]
+    mock_gemini.assert_not_called()
+
+def test_summarize_youtube_download_error(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    with patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock, side_effect=Exception("Video unavailable")):
+        _, status = run_youtube_job()
+    assert status["status"] == "failed"
+    assert "Video unavailable" in status["error"]
+    assert "downloading" in status["timings"]
 
 def test_summarize_youtube_invalid_url():
     client = TestClient(app)
@@ -119,19 +143,69 @@ def test_summarize_youtube_config_error(monkeypatch):
 def test_summarize_upload_file_success(monkeypatch, tmp_path):
     monkeypatch.setenv("WHISPER_API_KEY", "abc")
     monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
     client = TestClient(app)
-    class DummyFile:
-        filename = "test.mp3"
-        file = MagicMock()
-    with patch("builtins.open", create=True) as mock_open, \
-         patch("shutil.copyfileobj") as mock_copy, \
-         patch("os.makedirs"):
-        mock_open.return_value.__enter__.return_value = MagicMock()
-        resp = client.post("/api/summarize/", files={"file": ("test.mp3", b"data", "audio/mp3")})
+    with patch("app.routes.summarize.get_job_queue") as mock_queue:
+        mock_queue.return_value.is_full.return_value = False
+        mock_queue.return_value.submit.return_value = 1
+        resp = client.post("/api/summarize/", files={"file": ("test.mp3", MP3_BYTES, "audio/mp3")})
         assert resp.status_code == 200
         assert "task_id" in resp.json()
+        assert resp.json()["status"] == "queued"
+        assert resp.json()["queue_position"] == 1
+    task_id = resp.json()["task_id"]
+    saved = tmp_path / f"{task_id}_test.mp3"
+    # File ditulis utuh dan ukurannya dipakai sebagai prioritas antrean
+    assert saved.read_bytes() == MP3_BYTES
+    assert mock_queue.return_value.submit.call_args.kwargs["priority"] == len(MP3_BYTES)
+
+def test_summarize_upload_file_queue_full(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("JOB_QUEUE_MAX_SIZE", "0")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    client = TestClient(app)
+    resp = client.post("/api/summarize/", files={"file": ("test.mp3", MP3_BYTES, "audio/mp3")})
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    # File tidak disimpan saat antrean penuh
+    assert [name for name in os.listdir(tmp_path) if not name.startswith("tasks.")] == []
+
+def test_summarize_upload_file_too_large(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    monkeypatch.setattr(summarize, "MAX_FILE_SIZE", 1024)
+    client = TestClient(app)
+    resp = client.post("/api/summarize/", files={"file": ("test.mp3", MP3_BYTES + b"\x00" * 2048, "audio/mp3")})
+    assert resp.status_code == 413
+    assert [name for name in os.listdir(tmp_path) if not name.startswith("tasks.")] == []
+
+def test_summarize_upload_file_rejects_declared_oversize(monkeypatch):
+    monkeypatch.setattr(summarize, "MAX_FILE_SIZE", 1024)
+    client = TestClient(app)
+    resp = client.post(
+        "/api/summarize/",
+        content=b"x",
+        headers={
+            "content-type": "multipart/form-data; boundary=abc",
+            "content-length": str(10 * 1024 * 1024)
+        }
+    )
+    assert resp.status_code == 413
+
+def test_summarize_upload_file_not_mp3(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    client = TestClient(app)
+    resp = client.post("/api/summarize/", files={"file": ("test.mp3", b"<html>bukan audio</html>", "audio/mp3")})
+    assert resp.status_code == 400
+    assert [name for name in os.listdir(tmp_path) if not name.startswith("tasks.")] == []
 
 def test_summarize_upload_file_invalid(monkeypatch):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
     client = TestClient(app)
     resp = client.post("/api/summarize/", files={"file": ("", b"data", "audio/mp3")})
     assert resp.status_code == 422
@@ -144,23 +218,33 @@ def test_summarize_upload_file_save_error(monkeypatch):
     client = TestClient(app)
     with patch("builtins.open", side_effect=Exception("fail")), \
          patch("os.makedirs"):
-        resp = client.post("/api/summarize/", files={"file": ("test.mp3", b"data", "audio/mp3")})
+        resp = client.post("/api/summarize/", files={"file": ("test.mp3", MP3_BYTES, "audio/mp3")})
         assert resp.status_code == 500
 
 def test_summarize_upload_file_config_error(monkeypatch):
     monkeypatch.delenv("WHISPER_API_KEY", raising=False)
     client = TestClient(app)
-    resp = client.post("/api/summarize/", files={"file": ("test.mp3", b"data", "audio/mp3")})
+    resp = client.post("/api/summarize/", files={"file": ("test.mp3", MP3_BYTES, "audio/mp3")})
     assert resp.status_code == 500
 
 def test_status_endpoint_task_exists(monkeypatch):
-    from app.routes.summarize import tasks
+    from app.services.task_store import get_task_store
     client = TestClient(app)
-    tasks["abc"] = {"status": "completed"}
+    get_task_store().set("abc", {"status": "completed"})
     resp = client.get("/api/summarize/status/abc")
     assert resp.status_code == 200
     assert resp.json()["status"] == "completed"
-    tasks.pop("abc")
+    get_task_store().delete("abc")
+
+def test_status_endpoint_transcription_opt_in(monkeypatch):
+    from app.services.task_store import get_task_store
+    client = TestClient(app)
+    get_task_store().set("abc", {"status": "completed", "summary": "s", "transcription": "transkrip panjang"})
+    resp = client.get("/api/summarize/status/abc")
+    assert "transcription" not in resp.json()
+    assert resp.json()["has_transcription"] is True
+    resp = client.get("/api/summarize/status/abc?include_transcription=true")
+    assert resp.json()["transcription"] == "transkrip panjang"
 
 def test_process_task_error(monkeypatch):
     # Test error path di async process_task
@@ -168,10 +252,323 @@ def test_process_task_error(monkeypatch):
     monkeypatch.setenv("GEMINI_API_KEY", "def")
     client = TestClient(app)
     with patch("builtins.open", create=True) as mock_open, \
-         patch("shutil.copyfileobj") as mock_copy, \
          patch("os.makedirs"), \
-         patch("app.routes.summarize.transcribe_audio", side_effect=Exception("fail")):
-        mock_open.return_value.__enter__.return_value = MagicMock()
-        resp = client.post("/api/summarize/", files={"file": ("test.mp3", b"data", "audio/mp3")})
+         patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, side_effect=Exception("fail")):
+        resp = client.post("/api/summarize/", files={"file": ("test.mp3", MP3_BYTES, "audio/mp3")})
         assert resp.status_code == 200
-        # Tunggu task async selesai (opsional, bisa dicek status task jika ingin lebih detail) 
\ No newline at end of file
+        # Tunggu task async selesai (opsional, bisa dicek status task jika ingin lebih detail)
+
+def test_status_polls_stay_responsive_during_transcriptions(monkeypatch, tmp_path):
+    # Load test: N transkripsi berjalan bersamaan tidak boleh membekukan endpoint status/health
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    n_uploads = 10
+    monkeypatch.setenv("WORKER_CONCURRENCY", str(n_uploads))
+    transcription_time = 0.5
+
+    async def slow_transcribe(*a, **k):
+        await asyncio.sleep(transcription_time)
+        return "transkrip rapat"
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            task_ids = []
+            for i in range(n_uploads):
+                resp = await client.post("/api/summarize/", files={"file": (f"t{i}.mp3", MP3_BYTES, "audio/mp3")})
+                assert resp.status_code == 200
+                task_ids.append(resp.json()["task_id"])
+            latencies = []
+            for _ in range(20):
+                start = time.perf_counter()
+                status = await client.get(f"/api/summarize/status/{task_ids[0]}")
+                health = await client.get("/api/health")
+                latencies.append(time.perf_counter() - start)
+                assert status.status_code == 200
+                assert health.status_code == 200
+            await asyncio.sleep(transcription_time * 2)
+            statuses = [(await client.get(f"/api/summarize/status/{t}")).json()["status"] for t in task_ids]
+            return latencies, statuses
+
+    with patch("app.routes.summarize.transcribe_with_backend", side_effect=slow_transcribe), \
+         patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary"):
+        latencies, statuses = asyncio.run(run())
+    assert max(latencies) < transcription_time / 2
+    assert statuses == ["completed"] * n_uploads
+
+def test_duplicate_upload_uses_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            results = []
+            for name in ["a.mp3", "b.mp3"]:
+                resp = await client.post("/api/summarize/", files={"file": (name, MP3_BYTES, "audio/mp3")})
+                task_id = resp.json()["task_id"]
+                for _ in range(50):
+                    status = (await client.get(f"/api/summarize/status/{task_id}")).json()
+                    if status["status"] not in ("queued", "processing"):
+                        break
+                    await asyncio.sleep(0.01)
+                results.append(status)
+            stats = (await client.get("/api/summarize/stats")).json()["cache"]
+            return results, stats
+
+    with patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip rapat") as mock_whisper, \
+         patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary") as mock_gemini:
+        (first, second), stats = asyncio.run(run())
+    assert mock_whisper.await_count == 1
+    assert mock_gemini.await_count == 1
+    assert first["metadata"]["cache_hit"] == {"transcription": False, "summary": False}
+    assert second["metadata"]["cache_hit"] == {"transcription": True, "summary": True}
+    assert second["summary"] == "summary"
+    assert stats["transcript"] == {"hits": 1, "misses": 1}
+
+def test_summarize_youtube_cached_transcript_skips_download(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    cache.get_result_cache().set_transcript("youtube:abc123", "id", "transkrip video")
+    with patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock) as mock_download, \
+         patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary"):
+        _, status = run_youtube_job()
+    assert status["status"] == "completed"
+    assert status["processing_info"]["cache_hit"]["transcription"] is True
+    assert "downloading" not in status["timings"]
+    mock_download.assert_not_called()
+
+def test_transcribe_with_cache_uses_preprocessed_audio(tmp_path):
+    processed = tmp_path / "rapat.whisper.ogg"
+    processed.write_bytes(b"x" * 10)
+    prepared = PreprocessResult(str(processed), 1000, 10, 0.1, True)
+    with patch("app.routes.summarize.preprocess_audio", new_callable=AsyncMock, return_value=prepared), \
+         patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip") as mock_whisper:
+        transcription, cached = asyncio.run(summarize.transcribe_with_cache(str(tmp_path / "rapat.mp3"), "hash-audio"))
+    assert (transcription, cached) == ("transkrip", False)
+    assert mock_whisper.await_args.args[0] == str(processed)
+    # File hasil pre-processing dihapus setelah transkripsi
+    assert not processed.exists()
+
+def test_summarize_youtube_records_download_progress(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+
+    async def fake_download(url, output_dir, on_progress=None):
+        on_progress(50.0, 512, 1024, 1)
+        return os.path.join(output_dir, "abc123.webm")
+
+    with patch("app.routes.summarize.download_youtube_audio_async", side_effect=fake_download), \
+         patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip video"), \
+         patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary"):
+        _, status = run_youtube_job()
+    assert status["status"] == "completed"
+    assert status["progress"] == {"percent": 50.0, "downloaded_bytes": 512, "total_bytes": 1024, "eta_seconds": 1}
+
+def test_summarize_youtube_queue_full(monkeypatch):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("JOB_QUEUE_MAX_SIZE", "0")
+    client = TestClient(app)
+    resp = client.post("/api/summarize/youtube/", json={"youtube_url": "https://youtu.be/abc123"})
+    assert resp.status_code == 503
+    assert "Retry-After" in resp.headers
+
+def test_stream_events_sends_snapshot_for_finished_task():
+    task_store = summarize.get_task_store()
+    task_store.set("t1", {"status": "completed", "stage": "completed", "summary": "ringkasan", "transcription": "teks"})
+    client = TestClient(app)
+    resp = client.get("/api/summarize/events/t1")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.text.startswith("retry: ")
+    assert "event: status" in resp.text
+    assert '"summary": "ringkasan"' in resp.text
+    assert '"teks"' not in resp.text
+
+def test_stream_events_resumes_with_last_event_id():
+    task_store = summarize.get_task_store()
+    task_store.set("t1", {"status": "processing", "stage": "transcribing"})
+    summarize.partial_transcript_publisher(task_store, "t1")(1, 2, "bagian dua")
+    task_store.update("t1", stage="summarizing")
+    task_store.update("t1", status="completed", summary="ringkasan")
+    client = TestClient(app)
+    resp = client.get("/api/summarize/events/t1", headers={"Last-Event-ID": "1"})
+    frames = [frame for frame in resp.text.split("\n\n") if frame.startswith("id: ")]
+    assert [frame.splitlines()[1] for frame in frames] == ["event: transcript", "event: stage", "event: completed"]
+    assert '"percent": 50.0' in frames[0]
+    assert frames[-1].startswith("id: 4")
+
+def test_stream_events_follows_youtube_job(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+
+    async def slow_download(url, output_dir, on_progress=None):
+        await asyncio.sleep(0.05)
+        on_progress(100.0, 1024, 1024, 0)
+        return os.path.join(output_dir, "abc123.webm")
+
+    async def streaming_summary(text, content_type=None, task_id=None, on_delta=None):
+        on_delta("ringkasan ")
+        on_delta("video")
+        return "ringkasan video"
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            task_id = (await client.post("/api/summarize/youtube/", json={"youtube_url": "https://youtu.be/abc123"})).json()["task_id"]
+            # Response SSE selesai setelah event final dikirim
+            return (await client.get(f"/api/summarize/events/{task_id}")).text
+
+    with patch("app.routes.summarize.download_youtube_audio_async", side_effect=slow_download), \
+         patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip video"), \
+         patch("app.routes.summarize.summarize_transcript_async", side_effect=streaming_summary):
+        body = asyncio.run(run())
+    events = [line[len("event: "):] for line in body.splitlines() if line.startswith("event: ")]
+    assert events[0] == "status"
+    assert "progress" in events
+    assert events[-4:] == ["stage", "summary_delta", "summary_delta", "completed"]
+    assert '"stage": "summarizing"' in body
+    assert '"formatted_summary": "ringkasan video"' in body
+
+def run_text_job(**request_kwargs):
+    # Kirim transkrip lalu polling status sampai job background selesai
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            resp = await client.post("/api/summarize/text", **request_kwargs)
+            if resp.status_code != 200:
+                return resp, None
+            task_id = resp.json()["task_id"]
+            for _ in range(100):
+                status = (await client.get(f"/api/summarize/status/{task_id}", params={"include_transcription": True})).json()
+                if status["status"] in ("completed", "failed"):
+                    break
+                await asyncio.sleep(0.01)
+            return resp, status
+    return asyncio.run(run())
+
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock)
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_summarize_text_streamed_plain_body(mock_gemini, mock_whisper):
+    text = "Rapat dimulai. Agenda hari ini: anggaran ✓. " * 20000
+
+    async def body():
+        data = text.encode()
+        # Potong di tengah karakter multi-byte untuk memastikan decode per chunk benar
+        for start in range(0, len(data), 65537):
+            yield data[start:start + 65537]
+
+    resp, status = run_text_job(content=body(), headers={"Content-Type": "text/plain; charset=utf-8"})
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "queued"
+    assert status["status"] == "completed"
+    assert status["transcription"] == text
+    assert status["content_type"] == "meeting"
+    assert status["processing_info"]["content_type_detected"] is True
+    assert "transcribing" not in status["timings"]
+    mock_whisper.assert_not_called()
+    assert mock_gemini.await_args.args[0] == text
+
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_summarize_text_with_given_content_type(mock_gemini):
+    _, status = run_text_job(content="teks bebas", params={"content_type": "lecture"})
+    assert status["content_type"] == "lecture"
+    assert status["processing_info"]["content_type_detected"] is False
+    _, status = run_text_job(json={"text": "teks bebas", "content_type": "interview"})
+    assert status["content_type"] == "interview"
+    assert mock_gemini.await_args.kwargs["content_type"] == "interview"
+
+def test_summarize_text_rejects_invalid_input(monkeypatch):
+    client = TestClient(app)
+    assert client.post("/api/summarize/text", content="  ").status_code == 422
+    assert client.post("/api/summarize/text", content="teks", params={"content_type": "resep"}).status_code == 422
+    assert client.post("/api/summarize/text", json={"isi": "teks"}).status_code == 422
+    assert client.post("/api/summarize/text", content=b"\xff\xfe", headers={"Content-Type": "text/plain"}).status_code == 400
+    assert client.post("/api/summarize/text", content=b"teks", headers={"Content-Type": "application/pdf"}).status_code == 415
+    monkeypatch.setattr(summarize, "MAX_TEXT_SIZE", 10)
+    assert client.post("/api/summarize/text", content="x" * 11).status_code == 413
+
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip audio")
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_youtube_uses_captions_before_audio(mock_gemini, mock_whisper, monkeypatch, tmp_path):
+    from app.services.youtube import Captions
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    monkeypatch.setenv("YOUTUBE_CAPTIONS", "true")
+    captions = Captions("teks dari subtitle", "id", "vtt")
+    with patch("app.routes.summarize.fetch_youtube_captions_async", new_callable=AsyncMock, return_value=captions), \
+         patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock) as mock_download:
+        _, status = run_youtube_job()
+    assert status["status"] == "completed"
+    assert status["processing_info"]["transcript_source"] == "captions"
+    assert status["processing_info"]["captions"] == {"language": "id", "format": "vtt"}
+    assert "captions" in status["timings"] and "downloading" not in status["timings"]
+    mock_download.assert_not_called()
+    mock_whisper.assert_not_called()
+    assert mock_gemini.await_args.args[0] == "teks dari subtitle"
+
+    # Tanpa subtitle yang layak: fallback ke download audio + Whisper
+    with patch("app.routes.summarize.fetch_youtube_captions_async", new_callable=AsyncMock, return_value=None), \
+         patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock, return_value="audio.mp3"):
+        _, status = run_youtube_job("https://youtu.be/lain456")
+    assert status["processing_info"]["transcript_source"] == "audio"
+    assert status["processing_info"]["captions"] is None
+    assert {"captions", "downloading", "transcribing"} <= set(status["timings"])
+    # Subtitle disimpan di cache transkripsi seperti hasil Whisper
+    _, status = run_youtube_job()
+    assert status["processing_info"]["transcript_source"] == "cache"
+
+def test_cancelled_and_dropped_jobs_are_marked_failed(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    monkeypatch.setenv("WORKER_CONCURRENCY", "1")
+    started = asyncio.Event()
+
+    async def hanging_transcribe(*a, **k):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            running, queued = [
+                (await client.post("/api/summarize/", files={"file": (f"t{i}.mp3", MP3_BYTES, "audio/mp3")})).json()["task_id"]
+                for i in range(2)
+            ]
+            await started.wait()
+            # Shutdown: job berjalan dibatalkan, job antre tidak pernah dijalankan
+            await summarize.get_job_queue().stop()
+            return [(await client.get(f"/api/summarize/status/{t}")).json() for t in (running, queued)]
+
+    with patch("app.routes.summarize.transcribe_with_backend", side_effect=hanging_transcribe):
+        statuses = asyncio.run(run())
+    assert [s["status"] for s in statuses] == ["failed", "failed"]
+    assert all(s["error"] == summarize.INTERRUPTED_ERROR for s in statuses)
+    # File upload kedua job ikut dihapus
+    assert [name for name in os.listdir(tmp_path) if not name.startswith("tasks.")] == []
+
+def test_startup_fails_tasks_of_dead_workers(monkeypatch, tmp_path):
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    store = get_task_store()
+    host = socket.gethostname()
+    store.set("own", {"status": "processing", "worker": f"{host}:{os.getpid()}"})
+    store.set("legacy", {"status": "queued"})
+    store.set("remote", {"status": "processing", "worker": "host-lain:1"})
+    monkeypatch.setattr(store, "clock", lambda: time.time() - 7200)
+    store.set("stale", {"status": "processing", "worker": "host-lama:1"})
+    monkeypatch.setattr(store, "clock", time.time)
+    store.set("done", {"status": "completed", "worker": f"{host}:{os.getpid()}"})
+    (tmp_path / "own_audio.mp3").write_bytes(b"x")
+    (tmp_path / "yt_legacy_abc").mkdir()
+    (tmp_path / "remote_audio.mp3").write_bytes(b"x")
+    assert summarize.fail_interrupted_tasks() == 3
+    assert store.get("own")["status"] == store.get("legacy")["status"] == "failed"
+    # Record host lain yang tidak ditulis selama TASK_STALE_SECONDS dianggap mati
+    assert store.get("stale")["status"] == "failed"
+    assert store.get("own")["error"] == summarize.INTERRUPTED_ERROR
+    # Worker di host lain tidak bisa diperiksa, jadi task-nya dibiarkan
+    assert store.get("remote")["status"] == "processing"
+    assert sorted(name for name in os.listdir(tmp_path) if not name.startswith("tasks.")) == ["remote_audio.mp3"]
@@ -0,0 +1,238 @@
+import asyncio
+import fnmatch
+import threading
+import pytest
+from app.services import task_store
+from app.services.events import TaskEventBroker
+from app.services.task_store import MemoryTaskStore, RedisTaskStore, SQLiteTaskStore, StageTimer, TaskStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    def __call__(self):
+        return self.now
+
+class FakeRedis:
+    """Subset API redis-py yang dipakai RedisTaskStore, dengan EX berbasis clock."""
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+    def get(self, name):
+        entry = self.data.get(name)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self.data[name]
+            return None
+        return value.encode("utf-8")
+    def set(self, name, value, ex=None):
+        self.data[name] = (value, self.clock() + ex if ex else None)
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+    def scan_iter(self, match="*"):
+        return [k for k in list(self.data) if fnmatch.fnmatch(k, match) and self.get(k) is not None]
+    def _list(self, name):
+        entry = self.data.get(name)
+        if entry is None or (entry[1] is not None and entry[1] <= self.clock()):
+            self.data.pop(name, None)
+            return []
+        return entry[0]
+    def rpush(self, name, value):
+        items = self._list(name)
+        self.data[name] = (items + [value.encode("utf-8")], self.data.get(name, (None, None))[1])
+        return len(items) + 1
+    def lrange(self, name, start, end):
+        items = self._list(name)
+        return items[start:] if end == -1 else items[start:end + 1]
+    def llen(self, name):
+        return len(self._list(name))
+    def expire(self, name, seconds):
+        if name in self.data:
+            self.data[name] = (self.data[name][0], self.clock() + seconds)
+
+def make_stores(tmp_path, clock):
+    return [
+        MemoryTaskStore(ttl=60, clock=clock),
+        SQLiteTaskStore(str(tmp_path / "tasks.sqlite3"), ttl=60, clock=clock),
+        RedisTaskStore(FakeRedis(clock), ttl=60, clock=clock),
+    ]
+
+@pytest.mark.parametrize("index", [0, 1, 2])
+def test_task_store_roundtrip_and_transcript_split(tmp_path, index):
+    clock = FakeClock()
+    store = make_stores(tmp_path, clock)[index]
+    assert store.get("t1") is None
+    store.set("t1", {"status": "processing", "message": "mulai"})
+    store.update("t1", message="lanjut")
+    assert store.get("t1") == {"status": "processing", "message": "lanjut"}
+    store.set("t1", {"status": "completed", "summary": "s", "transcription": "x" * 10_000})
+    record = store.get("t1")
+    assert "transcription" not in record
+    assert record["has_transcription"] is True
+    assert store.get("t1", include_transcription=True)["transcription"] == "x" * 10_000
+    assert store.count() == 1
+    store.delete("t1")
+    assert store.get("t1") is None
+    assert store.get_transcription("t1") is None
+
+@pytest.mark.parametrize("index", [0, 1, 2])
+def test_task_store_ttl_only_for_final_tasks(tmp_path, index):
+    clock = FakeClock()
+    store = make_stores(tmp_path, clock)[index]
+    store.set("running", {"status": "processing"})
+    store.set("done", {"status": "completed", "transcription": "t"})
+    clock.now += 61
+    assert store.get("running") == {"status": "processing"}
+    assert store.get("done") is None
+    assert store.get_transcription("done") is None
+
+@pytest.mark.parametrize("index", [0, 1, 2])
+def test_task_store_unfinished_reports_last_write_time(tmp_path, index):
+    clock = FakeClock()
+    store = make_stores(tmp_path, clock)[index]
+    store.set("running", {"status": "processing", "worker": "host-lain:1"})
+    store.set("done", {"status": "completed"})
+    clock.now += 30
+    store.update("running", progress=50)
+    store.set("queued", {"status": "queued"})
+    assert sorted(store.unfinished()) == [
+        ("queued", {"status": "queued"}, 1030.0),
+        ("running", {"status": "processing", "worker": "host-lain:1", "progress": 50}, 1030.0),
+    ]
+    # Waktu tulis tidak ikut muncul di record
+    assert store.get("running") == {"status": "processing", "worker": "host-lain:1", "progress": 50}
+
+def test_worker_alive_bounds_foreign_hosts_by_staleness():
+    clock = FakeClock()
+    assert task_store.worker_alive("host-lain:1")
+    assert task_store.worker_alive("host-lain:1", clock.now - 100, 3600, clock)
+    assert not task_store.worker_alive("host-lain:1", clock.now - 3601, 3600, clock)
+    # 0 menonaktifkan batas, task host lain selalu dianggap hidup
+    assert task_store.worker_alive("host-lain:1", clock.now - 10**6, 0, clock)
+    assert not task_store.worker_alive(None)
+
+def test_task_store_backends_must_implement_storage():
+    class Incomplete(TaskStore):
+        def _get_record(self, task_id):
+            return None
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_sqlite_task_store_shared_between_instances(tmp_path):
+    path = str(tmp_path / "tasks.sqlite3")
+    # Dua instance = dua worker yang berbagi file yang sama
+    worker_a = SQLiteTaskStore(path)
+    worker_b = SQLiteTaskStore(path)
+    worker_a.set("t1", {"status": "completed", "transcription": "halo"})
+    assert worker_b.get("t1", include_transcription=True)["transcription"] == "halo"
+
+@pytest.mark.parametrize("index", [0, 1, 2])
+def test_task_store_update_merges_like_dict_update(tmp_path, index):
+    clock = FakeClock()
+    store = make_stores(tmp_path, clock)[index]
+    store.update("new", status="queued", progress={"percent": 10})
+    assert store.get("new") == {"status": "queued", "progress": {"percent": 10}}
+    # Nilai None tetap disimpan dan dict bersarang diganti utuh, bukan di-merge
+    store.update("new", progress={"eta_seconds": 3}, error=None, message="ok 🚀")
+    assert store.get("new") == {"status": "queued", "progress": {"eta_seconds": 3}, "error": None, "message": "ok 🚀"}
+    store.update("new", status="completed", transcription="isi")
+    assert store.get("new", include_transcription=True)["transcription"] == "isi"
+    clock.now += 61
+    assert store.get("new") is None
+    # Record kedaluwarsa dianggap kosong saat di-update
+    store.set("old", {"status": "failed", "error": "x"})
+    clock.now += 61
+    store.update("old", message="baru")
+    assert store.get("old") == {"message": "baru"}
+
+def test_sqlite_task_store_update_is_one_statement_on_one_connection(tmp_path):
+    clock = FakeClock()
+    store = SQLiteTaskStore(str(tmp_path / "tasks.sqlite3"), ttl=60, clock=clock)
+    store.set("t1", {"status": "processing", "stage": "transcribing"})
+    statements = []
+    store._conn.set_trace_callback(statements.append)
+    store.update("t1", status="completed")
+    assert [sql for sql in statements if not sql.startswith(("BEGIN", "COMMIT"))] == [statements[1]]
+    assert "RETURNING" in statements[1]
+    # Kolom status dan expires_at ikut diperbarui di statement yang sama
+    status, expires_at = store._conn.execute("SELECT status, expires_at FROM tasks WHERE task_id = 't1'").fetchone()
+    assert (status, expires_at) == ("completed", clock.now + 60)
+
+def test_async_writes_run_in_order_on_io_thread(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / "tasks.sqlite3"))
+    threads = set()
+    update = store.update
+
+    def tracking_update(task_id, **fields):
+        threads.add(threading.current_thread().name)
+        update(task_id, **fields)
+
+    store.update = tracking_update
+
+    async def run():
+        await store.aset("t1", {"status": "queued"})
+        for percent in range(20):
+            store.update_nowait("t1", progress={"percent": percent})
+        await store.aupdate("t1", status="processing")
+        return await store.aget("t1")
+
+    try:
+        record = asyncio.run(run())
+    finally:
+        store.close()
+    assert record == {"status": "processing", "progress": {"percent": 19}}
+    assert len(threads) == 1 and threads.pop().startswith("task-store")
+
+@pytest.mark.parametrize("index", [1, 2])
+def test_shared_event_log_is_readable_by_other_instances(tmp_path, index):
+    clock = FakeClock()
+    store = make_stores(tmp_path, clock)[index]
+    store.events = TaskEventBroker()
+    store.set("t1", {"status": "queued", "stage": "queued"})
+    store.update("t1", stage="transcribing", message="Transkripsi")
+    store.publish("t1", "transcript", {"segment": 0, "text": "halo"})
+    store.update("t1", status="completed", summary="ringkasan")
+    events = store.events_after("t1", 0)
+    assert [e.event for e in events] == ["stage", "stage", "transcript", "completed"]
+    assert events[-1].data["summary"] == "ringkasan"
+    # Id event lokal sama dengan id di log, sehingga Last-Event-ID berlaku di semua worker
+    assert store.events.last_event_id("t1") == store.last_event_id("t1") == events[-1].id
+    assert [e.event for e in store.events_after("t1", events[1].id)] == ["transcript", "completed"]
+    clock.now += 61
+    store.purge_expired()
+    assert store.get("t1") is None
+    assert store.events_after("t1", 0) == []
+
+def test_sqlite_task_store_purge_expired(tmp_path):
+    clock = FakeClock()
+    store = SQLiteTaskStore(str(tmp_path / "tasks.sqlite3"), ttl=10, clock=clock)
+    store.set("a", {"status": "completed", "transcription": "t"})
+    store.set("b", {"status": "failed"})
+    store.set("c", {"status": "processing"})
+    clock.now += 11
+    assert store.purge_expired() == 2
+    assert store.count() == 1
+    assert store.get_transcription("a") is None
+
+def test_create_task_store_backends(monkeypatch, tmp_path):
+    monkeypatch.setenv("TASK_STORE_BACKEND", "memory")
+    assert isinstance(task_store.get_task_store(), MemoryTaskStore)
+    monkeypatch.setenv("TASK_STORE_BACKEND", "sqlite")
+    store = task_store.get_task_store()
+    assert isinstance(store, SQLiteTaskStore)
+    assert store is task_store.get_task_store()
+
+def test_stage_timer_records_stage_and_timings():
+    clock = FakeClock()
+    store = MemoryTaskStore(ttl=60, clock=clock)
+    store.set("t1", {"status": "processing"})
+    timer = StageTimer(store, "t1", clock=clock)
+    timer.record("uploading", 0.5)
+    with timer.stage("transcribing", "Mentranskripsi audio..."):
+        assert store.get("t1")["stage"] == "transcribing"
+        assert store.get("t1")["message"] == "Mentranskripsi audio..."
+        clock.now += 2.0
+    assert store.get("t1")["timings"] == {"uploading": 0.5, "transcribing": 2.0, "total": 2.0}
+    assert timer.finish()["total"] == 2.0
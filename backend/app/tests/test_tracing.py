@@ -0,0 +1,186 @@
+import asyncio
+import json
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import gemini, tracing
+from app.services.tracing import FileSpanExporter, InMemorySpanExporter, OTLPSpanExporter, SpanExporter, Tracer, otlp_payload
+from app.services.whisper import transcribe_audio_async
+
+@pytest.fixture
+def exporter(monkeypatch):
+    # Tracer bersama diganti setelah dibuat agar settings-nya tetap cocok
+    tracing.get_tracer()
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracing, "_tracer", Tracer(exporter, batch=False))
+    return exporter
+
+def by_name(exporter, name):
+    return [span for span in exporter.spans if span.name == name]
+
+def test_child_spans_inherit_trace_and_task_id():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, batch=False)
+    with tracer.span("job", {"task_id": "t1"}) as parent:
+        with tracer.span("child", {"attempt": 1}) as child:
+            assert tracer.current_span() is child
+        tracer.record_span("queued", 0.5)
+    assert tracer.current_span().name == "noop"
+    assert exporter.names() == ["child", "queued", "job"]
+    for span in exporter.spans[:2]:
+        assert (span.trace_id, span.parent_id) == (parent.trace_id, parent.span_id)
+        assert span.attributes["task_id"] == "t1"
+    assert child.attributes["attempt"] == 1
+    assert 499 <= exporter.spans[1].duration_ms <= 501
+
+def test_span_records_error_and_reraises():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, batch=False)
+    with pytest.raises(ValueError):
+        with tracer.span("gagal"):
+            raise ValueError("rusak")
+    assert exporter.spans[0].status == "ERROR"
+    assert exporter.spans[0].error == "ValueError: rusak"
+
+def test_inactive_span_is_not_a_parent():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, batch=False)
+    with tracer.span("stream", activate=False) as stream:
+        with tracer.span("lepas") as detached:
+            pass
+        with tracer.span("anak", parent=stream) as child:
+            pass
+    assert detached.trace_id != stream.trace_id
+    assert child.parent_id == stream.span_id
+
+def test_batched_spans_are_written_on_flush(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(FileSpanExporter(str(path)))
+    for index in range(3):
+        with tracer.span("kerja", {"index": index}):
+            pass
+    assert tracer.flush(timeout=5)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["attributes"]["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["duration_ms"] >= 0
+
+def test_file_exporter_rotates(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = FileSpanExporter(str(path), max_bytes=200)
+    tracer = Tracer(exporter, batch=False)
+    for _ in range(5):
+        with tracer.span("kerja"):
+            pass
+    rotated = tmp_path / "spans.jsonl.1"
+    assert rotated.exists()
+    assert rotated.stat().st_size < 1000
+    assert not path.exists() or path.stat().st_size <= 200
+
+def test_otlp_exporter_posts_json_payload():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    exporter = OTLPSpanExporter("http://collector:4318/", "svc", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    tracer = Tracer(exporter, batch=False)
+    with pytest.raises(RuntimeError):
+        with tracer.span("kerja", {"task_id": "t1", "attempt": 2, "ok": True}):
+            raise RuntimeError("x")
+    assert str(requests[0].url) == "http://collector:4318/v1/traces"
+    body = json.loads(requests[0].content)
+    resource = body["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0] == {"key": "service.name", "value": {"stringValue": "svc"}}
+    span = resource["scopeSpans"][0]["spans"][0]
+    assert span["name"] == "kerja"
+    assert span["status"]["code"] == 2
+    assert {"key": "attempt", "value": {"intValue": "2"}} in span["attributes"]
+    assert otlp_payload([], "svc")["resourceSpans"][0]["scopeSpans"][0]["spans"] == []
+
+def test_middleware_names_span_after_route(exporter):
+    client = TestClient(app)
+    client.get("/api/summarize/status/abc")
+    client.get("/api/health")
+    [span] = exporter.spans
+    assert span.name == "GET /api/summarize/status/{request_id}"
+    assert span.attributes["http.status_code"] == 200
+    assert span.attributes["http.target"] == "/api/summarize/status/abc"
+
+def test_whisper_attempts_are_traced(exporter, monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_URL", "http://fake/transcribe")
+    audio = tmp_path / "a.mp3"
+    audio.write_bytes(b"ID3abc")
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json={"text": "halo"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            with tracing._tracer.span("job", {"task_id": "t1"}):
+                return await transcribe_audio_async(str(audio), language="id", client=client)
+
+    with patch("app.services.resilience.asyncio.sleep", new_callable=AsyncMock):
+        assert asyncio.run(run()) == "halo"
+    attempts = by_name(exporter, "whisper.attempt")
+    assert [span.attributes["http.status_code"] for span in attempts] == [503, 200]
+    assert attempts[0].status == "ERROR"
+    [transcribe] = by_name(exporter, "whisper.transcribe")
+    assert all(span.parent_id == transcribe.span_id for span in attempts)
+    [backoff] = by_name(exporter, "retry.backoff")
+    assert backoff.attributes["upstream"] == "whisper"
+    assert all(span.attributes["task_id"] == "t1" for span in exporter.spans)
+
+def test_gemini_stream_spans_carry_task_id(exporter, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("GEMINI_API_URL", "http://fake/models/m:generateContent")
+    body = 'data: {"candidates": [{"content": {"parts": [{"text": "{}"}]}}]}\r\n\r\n'
+    statuses = [500, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), text=body)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return [d async for d in gemini.stream_gemini_deltas("teks", content_type="meeting", task_id="t9", client=client)]
+
+    with patch("app.services.resilience.asyncio.sleep", new_callable=AsyncMock):
+        assert asyncio.run(run()) == ["{}"]
+    [stream] = by_name(exporter, "gemini.stream")
+    attempts = by_name(exporter, "gemini.attempt")
+    assert [span.attributes["http.status_code"] for span in attempts] == [500, 200]
+    children = attempts + by_name(exporter, "gemini.rate_limit_wait") + by_name(exporter, "retry.backoff")
+    assert all(span.parent_id == stream.span_id for span in children)
+    assert all(span.attributes["task_id"] == "t9" for span in exporter.spans)
+
+@patch("app.routes.summarize.transcribe_with_backend", new_callable=AsyncMock, return_value="transkrip")
+@patch("app.routes.summarize.summarize_transcript_async", new_callable=AsyncMock, return_value="summary")
+def test_job_spans_join_request_trace(mock_gemini, mock_whisper, exporter, monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("GEMINI_API_KEY", "def")
+    monkeypatch.setenv("TEMP_FOLDER", str(tmp_path))
+    # Loop TestClient tetap hidup sampai job background selesai
+    with TestClient(app) as client, \
+         patch("app.routes.summarize.download_youtube_audio_async", new_callable=AsyncMock, return_value="audio.mp3"):
+        task_id = client.post("/api/summarize/youtube/", json={"youtube_url": "https://youtu.be/abc123"}).json()["task_id"]
+        for _ in range(100):
+            if by_name(exporter, "summarize.job"):
+                break
+            asyncio.run(asyncio.sleep(0.01))
+    [request] = by_name(exporter, "POST /api/summarize/youtube/")
+    [job] = by_name(exporter, "summarize.job")
+    assert request.attributes["task_id"] == task_id
+    assert (job.trace_id, job.parent_id) == (request.trace_id, request.span_id)
+    assert job.attributes["source"] == "youtube"
+    stages = [span for span in exporter.spans if span.name.startswith("stage.")]
+    assert {span.name for span in stages} >= {"stage.queued", "stage.downloading", "stage.transcribing", "stage.summarizing"}
+    assert all(span.trace_id == job.trace_id and span.attributes["task_id"] == task_id for span in stages)
+
+def test_span_exporter_must_implement_export():
+    class Incomplete(SpanExporter):
+        pass
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.metrics import get_metrics
+from app.services.transcription import (
+    HttpWhisperBackend, LocalWhisperBackend, TranscriptionBackend, TranscriptionUnavailable, get_transcription_backend, local_pool_size,
+    transcribe_with_backend,
+)
+
+# Pengganti faster-whisper: dimuat oleh proses worker (spawn) lewat sys.path
+FAKE_FASTER_WHISPER = '''
+LOADS = 0
+
+class Segment:
+    def __init__(self, text):
+        self.text = text
+
+class Info:
+    duration = 10.0
+
+class WhisperModel:
+    def __init__(self, name, device, compute_type, cpu_threads, download_root=None):
+        global LOADS
+        LOADS += 1
+        self.args = (name, device, compute_type, cpu_threads)
+
+    def transcribe(self, path, language, beam_size, vad_filter):
+        with open(path) as f:
+            content = f.read()
+        name, device, compute_type, cpu_threads = self.args
+        return iter([Segment(f" {content} "), Segment(" "), Segment(f"{name}/{device}/{compute_type} muat {LOADS}")]), Info()
+'''
+
+def test_backend_selected_from_config(monkeypatch, caplog):
+    assert isinstance(get_transcription_backend(), HttpWhisperBackend)
+    monkeypatch.setenv("TRANSCRIPTION_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_WHISPER_WORKERS", "3")
+    local = get_transcription_backend()
+    assert isinstance(local, LocalWhisperBackend)
+    assert get_transcription_backend() is local
+    assert local.stats()["workers"] == 3
+    assert local.stats()["started"] is False
+    monkeypatch.setenv("TRANSCRIPTION_BACKEND", "whisper.cpp")
+    with caplog.at_level(logging.WARNING):
+        assert isinstance(get_transcription_backend(), HttpWhisperBackend)
+    assert "tidak dikenal" in caplog.text
+
+def test_backend_must_implement_transcribe():
+    class Incomplete(TranscriptionBackend):
+        name = "incomplete"
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_pool_sized_to_available_cores():
+    assert local_pool_size(0, 2, cpus=8) == 4
+    assert local_pool_size(0, 4, cpus=2) == 1
+    assert local_pool_size(5, 2, cpus=8) == 5
+    with patch("app.services.transcription.os.sched_getaffinity", return_value={0, 1, 2, 3, 4, 5}):
+        assert LocalWhisperBackend(threads_per_worker=3).workers == 2
+
+def test_http_backend_uses_whisper_api(tmp_path):
+    with patch("app.services.transcription.transcribe_audio_async", new_callable=AsyncMock, return_value="halo") as mock_whisper:
+        assert asyncio.run(transcribe_with_backend(str(tmp_path / "a.mp3"), language="id")) == "halo"
+    mock_whisper.assert_awaited_once_with(str(tmp_path / "a.mp3"), language="id")
+
+def test_local_backend_without_faster_whisper_fails_clearly(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRANSCRIPTION_BACKEND", "local")
+    with patch("app.services.transcription.importlib.util.find_spec", return_value=None):
+        with pytest.raises(TranscriptionUnavailable, match="pip install faster-whisper"):
+            asyncio.run(transcribe_with_backend(str(tmp_path / "a.mp3")))
+
+def test_local_backend_runs_in_process_pool_and_loads_model_once(monkeypatch, tmp_path):
+    package_dir = tmp_path / "site"
+    package_dir.mkdir()
+    (package_dir / "faster_whisper.py").write_text(FAKE_FASTER_WHISPER)
+    monkeypatch.syspath_prepend(str(package_dir))
+    audio = tmp_path / "a.wav"
+    audio.write_text("selamat pagi")
+    backend = LocalWhisperBackend(model="tiny", workers=1, threads_per_worker=1)
+
+    async def run():
+        return [await backend.transcribe(str(audio), language="id") for _ in range(2)]
+
+    try:
+        texts = asyncio.run(run())
+    finally:
+        backend.close()
+    # Model dimuat sekali di worker, di CPU dengan kuantisasi int8; segmen kosong dibuang
+    assert texts == ["selamat pagi tiny/cpu/int8 muat 1"] * 2
+    stats = backend.stats()
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["rtf"] is not None and stats["rtf"] < 1
+    assert stats["started"] is False
+    assert get_metrics().transcription_rtf.count(backend="local") == 2
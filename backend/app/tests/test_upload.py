@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from app.services import upload
+
+BOUNDARY = "batas123"
+MP3_HEADER = b"ID3\x04\x00\x00\x00\x00\x00\x00"
+
+def multipart_body(filename: str, content: bytes, field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="note"\r\n\r\n'
+        f"catatan\r\n"
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: audio/mpeg\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+async def chunked(data: bytes, size: int, consumed: list = None):
+    for start in range(0, len(data), size):
+        if consumed is not None:
+            consumed.append(start)
+        yield data[start:start + size]
+
+def receive(body: bytes, tmp_path, max_size=1024 * 1024, chunk_size=7, consumed=None):
+    return asyncio.run(upload.receive_upload(
+        f"multipart/form-data; boundary={BOUNDARY}",
+        chunked(body, chunk_size, consumed),
+        str(tmp_path),
+        max_size,
+        filename_prefix="task_",
+    ))
+
+def test_looks_like_mp3():
+    assert upload.looks_like_mp3(b"ID3\x03")
+    assert upload.looks_like_mp3(b"\xff\xfb\x90\x64")
+    assert not upload.looks_like_mp3(b"RIFF")
+    assert not upload.looks_like_mp3(b"\xff\x00")
+
+def test_receive_upload_streams_hash_and_size(tmp_path):
+    content = MP3_HEADER + os.urandom(5000)
+    result = receive(multipart_body("rapat.mp3", content), tmp_path)
+    assert result.filename == "rapat.mp3"
+    assert result.path == str(tmp_path / "task_rapat.mp3")
+    assert result.size == len(content)
+    assert result.sha256 == hashlib.sha256(content).hexdigest()
+    with open(result.path, "rb") as f:
+        assert f.read() == content
+
+def test_receive_upload_aborts_early_when_too_large(tmp_path):
+    content = MP3_HEADER + b"\x00" * 100_000
+    consumed = []
+    with pytest.raises(upload.UploadTooLarge):
+        receive(multipart_body("besar.mp3", content), tmp_path, max_size=1000, chunk_size=512, consumed=consumed)
+    # Upload dihentikan jauh sebelum seluruh body dibaca dan file parsial dihapus
+    assert len(consumed) * 512 < 4000
+    assert os.listdir(tmp_path) == []
+
+def test_receive_upload_rejects_non_mp3_content(tmp_path):
+    with pytest.raises(upload.InvalidAudioFile):
+        receive(multipart_body("palsu.mp3", b"<html></html>" * 10), tmp_path)
+    assert os.listdir(tmp_path) == []
+
+def test_receive_upload_rejects_extension_and_missing_file(tmp_path):
+    with pytest.raises(upload.InvalidAudioFile):
+        receive(multipart_body("catatan.txt", MP3_HEADER), tmp_path)
+    with pytest.raises(upload.UploadError) as exc_info:
+        receive(multipart_body("rapat.mp3", MP3_HEADER, field="lain"), tmp_path)
+    assert exc_info.value.status_code == 422
+    with pytest.raises(upload.UploadError) as exc_info:
+        asyncio.run(upload.receive_upload("application/json", chunked(b"{}", 2), str(tmp_path), 100))
+    assert exc_info.value.status_code == 422
+
+def test_receive_multipart_collects_files_and_text_fields(tmp_path):
+    body = b"".join(
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{name}\"{extra}\r\n\r\n".encode() + value + b"\r\n"
+        for name, extra, value in (
+            ("files", '; filename="a.mp3"', MP3_HEADER + b"a"),
+            ("transcript", "", "teks rapat ✓".encode()),
+            ("files", '; filename="b.mp3"', MP3_HEADER + b"b"),
+            ("transcript", "", b"teks kedua"),
+        )
+    ) + f"--{BOUNDARY}--\r\n".encode()
+
+    def parse(max_files=5, max_text_size=1024):
+        return asyncio.run(upload.receive_multipart(
+            f"multipart/form-data; boundary={BOUNDARY}", chunked(body, 5), str(tmp_path), 1024,
+            file_fields=("files",), max_files=max_files, text_fields=("transcript",),
+            max_text_size=max_text_size, filename_prefix="batch_",
+        ))
+
+    form = parse()
+    assert [(f.filename, os.path.basename(f.path)) for f in form.files] == [("a.mp3", "batch_0_a.mp3"), ("b.mp3", "batch_1_b.mp3")]
+    assert form.fields == {"transcript": ["teks rapat ✓", "teks kedua"]}
+    upload.remove_uploads(form.files)
+    # File berlebih atau field teks terlalu besar menolak seluruh form dan menghapus file yang sudah tersimpan
+    for kwargs in ({"max_files": 1}, {"max_text_size": 5}):
+        with pytest.raises(upload.UploadTooLarge):
+            parse(**kwargs)
+        assert os.listdir(tmp_path) == []
+
+def test_receive_text_decodes_split_characters_and_limits_size():
+    data = "héllo ✓ dunia".encode()
+    assert asyncio.run(upload.receive_text(chunked(data, 1), 100)) == "héllo ✓ dunia"
+    assert asyncio.run(upload.receive_text(chunked("abc".encode("utf-16"), 3), 100, encoding="utf-16")) == "abc"
+    consumed = []
+    with pytest.raises(upload.UploadTooLarge):
+        asyncio.run(upload.receive_text(chunked(b"x" * 10000, 100, consumed), 500))
+    assert len(consumed) == 6
+    with pytest.raises(upload.UploadError) as exc_info:
+        asyncio.run(upload.receive_text(chunked(b"\xff", 1), 100))
+    assert exc_info.value.status_code == 400
@@ -1,5 +1,8 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import httpx
+import logging
 from app.services import whisper
 import os
 
@@ -13,6 +16,25 @@ def test_transcribe_audio_success(monkeypatch):
         result = whisper.transcribe_audio('file.mp3', language='id')
         assert result == 'transkrip'
 
+def test_transcribe_audio_logs_only_capped_response_body(monkeypatch, caplog):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    monkeypatch.setenv("LOG_PAYLOAD_MAX_CHARS", "20")
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
+    transcript = "kata " * 1000
+    with patch('app.services.whisper.requests.post') as mock_post, \
+         patch('builtins.open', create=True) as mock_open, \
+         caplog.at_level(logging.INFO):
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.text = transcript
+        mock_post.return_value.json.return_value = {'text': transcript}
+        mock_open.return_value.__enter__.return_value = MagicMock()
+        whisper.transcribe_audio('file.mp3', language='id')
+    [record] = [r for r in caplog.records if hasattr(r, "response_body")]
+    assert record.response_body["chars"] == len(transcript)
+    assert record.response_body["preview"].startswith("kata kata")
+    assert len(record.response_body["preview"]) < 50
+    assert transcript not in caplog.text
+
 def test_transcribe_audio_error(monkeypatch):
     monkeypatch.setenv("WHISPER_API_KEY", "abc")
     with patch('app.services.whisper.requests.post') as mock_post, \
@@ -22,4 +44,28 @@ def test_transcribe_audio_error(monkeypatch):
         mock_post.return_value.text = 'fail'
         mock_open.return_value.__enter__.return_value = MagicMock()
         with pytest.raises(Exception):
-            whisper.transcribe_audio('file.mp3', language='id') 
\ No newline at end of file
+            whisper.transcribe_audio('file.mp3', language='id')
+
+def test_transcribe_audio_async_success(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    audio = tmp_path / "file.mp3"
+    audio.write_bytes(b"data")
+    response = httpx.Response(200, json={"text": "transkrip"}, request=httpx.Request("POST", "http://fake"))
+    with patch("app.services.whisper.httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response):
+        result = asyncio.run(whisper.transcribe_audio_async(str(audio), language="id"))
+    assert result == "transkrip"
+
+def test_transcribe_audio_async_retries_without_blocking(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPER_API_KEY", "abc")
+    audio = tmp_path / "file.mp3"
+    audio.write_bytes(b"data")
+    response = httpx.Response(500, text="fail", request=httpx.Request("POST", "http://fake"))
+    with patch("app.services.whisper.httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response) as mock_post, \
+         patch("app.services.resilience.asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+         patch("app.services.resilience.time.sleep", side_effect=AssertionError("blocking sleep")):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(whisper.transcribe_audio_async(str(audio), language="id"))
+    assert mock_post.call_count == 3
+    # Full jitter: percobaan ke-n menunggu acak 0..RETRY_BASE_DELAY * 2^(n-1)
+    delays = [c.args[0] for c in mock_sleep.await_args_list]
+    assert len(delays) == 2 and 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
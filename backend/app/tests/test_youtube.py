@@ -0,0 +1,193 @@
+import asyncio
+import os
+import stat
+import sys
+import pytest
+from app.services import youtube
+
+CAPTIONS_FIXTURE = os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks", "fixtures", "captions.id.vtt")
+
+FAKE_YT_DLP = """#!{python}
+import os, sys, time
+args = sys.argv[1:]
+mode = {mode!r}
+output_template = args[args.index("-o") + 1]
+reencode = "--extract-audio" in args
+ext = "mp3" if reencode else ("mkv" if mode == "unsupported" else "webm")
+if mode == "fail":
+    print("ERROR: [youtube] abc123: Video unavailable", file=sys.stderr)
+    sys.exit(1)
+if "--skip-download" in args:
+    # Mode subtitle: salin track dari FAKE_CAPTIONS (mis. captions.id.vtt -> abc123.id.vtt)
+    captions = os.environ.get("FAKE_CAPTIONS")
+    if captions:
+        import shutil
+        suffix = os.path.basename(captions).split(".", 1)[1]
+        shutil.copy(captions, output_template.replace("%(id)s.%(ext)s", "abc123." + suffix))
+    sys.exit(0)
+if mode == "slow":
+    time.sleep(5)
+for downloaded in (0, 512, 1024):
+    print(f"PROGRESS {{downloaded}} 1024 {{(1024 - downloaded) // 512}}", flush=True)
+print("[download] Destination: diabaikan", file=sys.stderr)
+path = output_template.replace("%(id)s", "abc123").replace("%(ext)s", ext)
+with open(path, "wb") as f:
+    f.write(b"audio")
+print(f"FILEPATH {{path}}", flush=True)
+"""
+
+def make_fake_yt_dlp(tmp_path, monkeypatch, mode="ok"):
+    script = tmp_path / "fake-yt-dlp"
+    script.write_text(FAKE_YT_DLP.format(python=sys.executable, mode=mode))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("YT_DLP_PATH", str(script))
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    return str(out_dir)
+
+def test_build_yt_dlp_command_selects_audio_only_without_reencode():
+    command = youtube.build_yt_dlp_command("yt-dlp", "https://youtu.be/abc123", "/tmp/out")
+    assert command[command.index("-f") + 1] == youtube.DEFAULT_AUDIO_FORMAT
+    assert "--extract-audio" not in command
+    assert any(arg.startswith("after_move:FILEPATH") for arg in command)
+    assert command[-1] == "https://youtu.be/abc123"
+    reencode = youtube.build_yt_dlp_command("yt-dlp", "https://youtu.be/abc123", "/tmp/out", reencode=True)
+    assert "--extract-audio" in reencode
+
+def test_parse_progress_line():
+    assert youtube.parse_progress_line("PROGRESS 512 1024 3") == (50.0, 512, 1024, 3)
+    assert youtube.parse_progress_line("PROGRESS 512 NA NA") == (None, 512, None, None)
+    assert youtube.parse_progress_line("PROGRESS rusak") is None
+
+def test_download_uses_filename_from_yt_dlp_and_reports_progress(tmp_path, monkeypatch):
+    out_dir = make_fake_yt_dlp(tmp_path, monkeypatch)
+    # File lain di folder output tidak boleh ikut terpilih
+    (tmp_path / "out" / "lain.mp3").write_bytes(b"x")
+    progress = []
+    path = asyncio.run(youtube.download_youtube_audio_async(
+        "https://youtu.be/abc123", out_dir, on_progress=lambda *p: progress.append(p)
+    ))
+    assert path == os.path.join(out_dir, "abc123.webm")
+    # Progress pertama dan 100% selalu dilaporkan, sisanya di-throttle
+    assert progress[0] == (0.0, 0, 1024, 2)
+    assert progress[-1] == (100.0, 1024, 1024, 0)
+
+def test_download_reencodes_only_unsupported_format(tmp_path, monkeypatch):
+    out_dir = make_fake_yt_dlp(tmp_path, monkeypatch, mode="unsupported")
+    path = asyncio.run(youtube.download_youtube_audio_async("https://youtu.be/abc123", out_dir))
+    assert path.endswith("abc123.mp3")
+    assert os.listdir(out_dir) == ["abc123.mp3"]
+
+def test_download_error_includes_output_tail(tmp_path, monkeypatch):
+    out_dir = make_fake_yt_dlp(tmp_path, monkeypatch, mode="fail")
+    with pytest.raises(youtube.YouTubeDownloadError) as exc_info:
+        asyncio.run(youtube.download_youtube_audio_async("https://youtu.be/abc123", out_dir))
+    assert "Video unavailable" in str(exc_info.value)
+
+def test_download_timeout(tmp_path, monkeypatch):
+    out_dir = make_fake_yt_dlp(tmp_path, monkeypatch, mode="slow")
+    monkeypatch.setenv("YT_DLP_TIMEOUT", "1")
+    with pytest.raises(youtube.YouTubeDownloadError, match="timeout"):
+        asyncio.run(youtube.download_youtube_audio_async("https://youtu.be/abc123", out_dir))
+
+def test_download_cancelled_kills_yt_dlp(tmp_path, monkeypatch):
+    out_dir = make_fake_yt_dlp(tmp_path, monkeypatch, mode="slow")
+    processes = []
+    create = asyncio.create_subprocess_exec
+
+    async def tracking_create(*args, **kwargs):
+        process = await create(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    async def run():
+        task = asyncio.create_task(youtube.download_youtube_audio_async("https://youtu.be/abc123", out_dir))
+        while not processes:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    monkeypatch.setattr(youtube.asyncio, "create_subprocess_exec", tracking_create)
+    asyncio.run(run())
+    # Proses sudah dimatikan dan ditunggu sebelum pembatalan diteruskan
+    assert processes[0].returncode is not None
+
+def test_download_missing_binary(tmp_path, monkeypatch):
+    monkeypatch.setenv("YT_DLP_PATH", str(tmp_path / "tidak-ada"))
+    with pytest.raises(youtube.YouTubeDownloadError):
+        asyncio.run(youtube.download_youtube_audio_async("https://youtu.be/abc123", str(tmp_path)))
+
+AUTO_VTT = """WEBVTT
+Kind: captions
+Language: id
+
+00:00:00.000 --> 00:00:01.200 align:start position:0%
+ 
+selamat<00:00:00.400><c> pagi</c><00:00:00.800><c> semua</c>
+
+00:00:01.200 --> 00:00:01.210 align:start position:0%
+selamat pagi semua
+ 
+
+00:00:01.210 --> 00:00:02.400 align:start position:0%
+selamat pagi semua
+[Musik] rapat<00:00:01.600><c> &amp;</c><00:00:02.000><c> diskusi</c>
+
+NOTE komentar yang diabaikan
+
+00:00:02.400 --> 00:00:03.000
+>> kita mulai
+"""
+
+SRT = """1
+00:00:00,000 --> 00:00:01,000
+<i>Halo</i> semua
+
+2
+00:00:01,000 --> 00:00:02,500
+- Apa kabar?
+- Baik.
+"""
+
+def test_clean_captions_removes_markup_and_rollup_repeats():
+    assert youtube.clean_captions(AUTO_VTT) == "selamat pagi semua rapat & diskusi kita mulai"
+    assert youtube.clean_captions(SRT.replace("\n", "\r\n")) == "Halo semua Apa kabar? Baik."
+    with open(CAPTIONS_FIXTURE, encoding="utf-8") as f:
+        text = youtube.clean_captions(f.read())
+    assert "<" not in text and "-->" not in text and "[Musik]" not in text
+    assert len(text.split()) == 726
+
+def test_pick_caption_file_prefers_exact_language_and_vtt():
+    files = ["abc.id-ID.vtt", "abc.id.srt", "abc.id.vtt", "abc.webm"]
+    assert youtube.pick_caption_file(files, "id") == "abc.id.vtt"
+    assert youtube.pick_caption_file(files[:2], "id") == "abc.id.srt"
+    assert youtube.pick_caption_file(["abc.webm"], "id") is None
+
+def test_build_captions_command_skips_media_download():
+    command = youtube.build_yt_dlp_captions_command("yt-dlp", "https://youtu.be/abc123", "/tmp/out", "id")
+    assert {"--skip-download", "--write-subs", "--write-auto-subs"} <= set(command)
+    assert command[command.index("--sub-langs") + 1] == "id(-.*)?"
+
+def test_fetch_captions_returns_cleaned_track(tmp_path, monkeypatch):
+    out_dir = make_fake_yt_dlp(tmp_path, monkeypatch)
+    monkeypatch.setenv("FAKE_CAPTIONS", CAPTIONS_FIXTURE)
+    captions = asyncio.run(youtube.fetch_youtube_captions_async("https://youtu.be/abc123", out_dir, language="id"))
+    assert (captions.language, captions.format) == ("id", "vtt")
+    assert captions.text.startswith("dari sisi produk")
+    # Folder subtitle sementara dihapus
+    assert os.listdir(out_dir) == []
+
+def test_fetch_captions_falls_back_when_missing_short_or_failing(tmp_path, monkeypatch):
+    out_dir = make_fake_yt_dlp(tmp_path, monkeypatch)
+    assert asyncio.run(youtube.fetch_youtube_captions_async("https://youtu.be/abc123", out_dir)) is None
+    short = tmp_path / "short.id.vtt"
+    short.write_text("WEBVTT\n\n00:00:00.000 --> 00:00:01.000\n[Musik]\n")
+    monkeypatch.setenv("FAKE_CAPTIONS", str(short))
+    assert asyncio.run(youtube.fetch_youtube_captions_async("https://youtu.be/abc123", out_dir)) is None
+    failing = tmp_path / "gagal"
+    failing.mkdir()
+    failing_dir = make_fake_yt_dlp(failing, monkeypatch, mode="fail")
+    assert asyncio.run(youtube.fetch_youtube_captions_async("https://youtu.be/abc123", failing_dir)) is None
+    monkeypatch.setenv("YT_DLP_PATH", str(tmp_path / "tidak-ada"))
+    assert asyncio.run(youtube.fetch_youtube_captions_async("https://youtu.be/abc123", out_dir)) is None
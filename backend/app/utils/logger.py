@@ -1,25 +1,258 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Iterator, Optional, Union
 from fastapi import Request, Response
+from app.config import Config
+from app.services.tracing import active_span
 
-# Konfigurasi logging
-logging.basicConfig(
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+# Record yang menunggu ditulis; jika penuh (penulis tertinggal) record baru dibuang
+# agar pemanggil tidak pernah menunggu I/O log
+LOG_QUEUE_SIZE = 10000
+# Batas panjang pesan log tunggal, payload dibatasi terpisah lewat Config
+MAX_MESSAGE_CHARS = 8192
+REQUEST_ID_HEADER = b"x-request-id"
+# Correlation id dari client hanya dipakai jika aman ditulis ke log/header
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# Atribut bawaan LogRecord; atribut lain (dari `extra=`) menjadi field JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+def get_correlation_id() -> Optional[str]:
+    return _correlation_id.get()
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+@contextmanager
+def correlation_scope(correlation_id: Optional[str]) -> Iterator[None]:
+    """Jalankan blok dengan correlation id tertentu (mis. job background milik sebuah request)."""
+    token = _correlation_id.set(correlation_id)
+    try:
+        yield
+    finally:
+        _correlation_id.reset(token)
+
+def truncate(value: str, limit: Optional[int] = None) -> str:
+    limit = Config().LOG_PAYLOAD_MAX_CHARS if limit is None else limit
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}… [+{len(value) - limit} karakter]"
+
+def should_sample_payload(sample_rate: Optional[float] = None) -> bool:
+    rate = Config().LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+    return rate > 0 and random.random() < rate
+
+def payload_field(value: Union[str, bytes], sample: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Ringkasan payload untuk field log: ukurannya selalu dicatat, isinya (dipotong
+    ke LOG_PAYLOAD_MAX_CHARS) hanya untuk sebagian log sesuai LOG_PAYLOAD_SAMPLE_RATE.
+    """
+    field: Dict[str, Any] = {"bytes" if isinstance(value, bytes) else "chars": len(value)}
+    if sample if sample is not None else should_sample_payload():
+        limit = Config().LOG_PAYLOAD_MAX_CHARS
+        if isinstance(value, bytes):
+            # Hanya bagian awal yang di-decode, payload besar tidak disalin utuh
+            field["preview"] = truncate(value[:limit * 4].decode(errors="replace"), limit)
+        else:
+            field["preview"] = truncate(value, limit)
+    return field
+
+class ContextFilter(logging.Filter):
+    """
+    Tambahkan correlation id, trace id dan task id dari context pemanggil.
+    Dipasang di QueueHandler karena thread penulis tidak melihat contextvar pemanggil.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "correlation_id", None) is None:
+            record.correlation_id = _correlation_id.get()
+        span = active_span()
+        if span is not None:
+            if getattr(record, "trace_id", None) is None:
+                record.trace_id = span.trace_id
+            if getattr(record, "task_id", None) is None and "task_id" in span.attributes:
+                record.task_id = span.attributes["task_id"]
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON per baris; field dari `extra=` ikut disertakan."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage(), MAX_MESSAGE_CHARS),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Format teks lama, ditambah correlation id jika ada."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        correlation_id = getattr(record, "correlation_id", None)
+        return f"{line} [{correlation_id}]" if correlation_id else line
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler yang membuang record saat antrean penuh (dihitung di `dropped`)
+    dan mempertahankan traceback sebagai `exc_text` untuk formatter di thread penulis.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = truncate(record.getMessage(), MAX_MESSAGE_CHARS)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(config: Optional[Config] = None, stream: Optional[IO[str]] = None) -> logging.handlers.QueueListener:
+    """
+    Pasang logging root: pemanggil hanya memasukkan record ke antrean, penulisan
+    ke `stream` (default stderr; JSON atau teks sesuai LOG_FORMAT) dilakukan
+    QueueListener di thread sendiri.
+    """
+    global _listener
+    config = config or Config()
+    if _listener is not None:
+        _listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        # Handler basicConfig dan handler antrean sebelumnya diganti; handler lain (mis. test) dibiarkan
+        if type(handler) is logging.StreamHandler or isinstance(handler, NonBlockingQueueHandler):
+            root.removeHandler(handler)
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter() if config.LOG_FORMAT.lower() == "json" else TextFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL)
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """Tulis sisa record di antrean lalu hentikan thread penulis."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
+
+class RequestLoggingMiddleware:
+    """
+    Middleware ASGI: beri setiap request correlation id (dari header X-Request-ID
+    atau dibuat baru, dikembalikan di response) dan catat satu baris saat selesai.
+    Body tidak dibaca sendiri; hanya bagian awal yang lewat ke handler yang
+    disalin, dan hanya untuk request yang tersampel.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        requested_id = headers.get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        correlation_id = requested_id if _VALID_REQUEST_ID.match(requested_id) else new_correlation_id()
+        span = active_span()
+        if span is not None:
+            span.set_attribute("correlation_id", correlation_id)
+
+        limit = Config().LOG_PAYLOAD_MAX_CHARS
+        is_upload = b"multipart/form-data" in headers.get(b"content-type", b"")
+        captured = bytearray() if not is_upload and should_sample_payload() else None
+        response = {"status": 500, "bytes": 0}
+        start = time.perf_counter()
+
+        async def receive_with_capture():
+            message = await receive()
+            if captured is not None and message["type"] == "http.request" and len(captured) < limit * 4:
+                captured.extend(message.get("body", b"")[:limit * 4 - len(captured)])
+            return message
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, correlation_id.encode())]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        with correlation_scope(correlation_id):
+            try:
+                await self.app(scope, receive_with_capture, send_with_id)
+            finally:
+                fields: Dict[str, Any] = {
+                    "http_method": scope["method"],
+                    "http_path": scope["path"],
+                    "http_status": response["status"],
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                    "request_bytes": int(headers.get(b"content-length", b"0") or 0),
+                    "response_bytes": response["bytes"],
+                }
+                if captured:
+                    fields["request_body"] = payload_field(bytes(captured), sample=True)
+                level = logging.WARNING if response["status"] >= 500 else logging.INFO
+                logging.log(level, f"📨 {scope['method']} {scope['path']} {response['status']}", extra=fields)
 
 async def log_request(request: Request):
     """
     Mencatat request masuk, menghindari error decoding pada file upload.
+    Body hanya dibaca untuk request yang tersampel dan dipotong ke LOG_PAYLOAD_MAX_CHARS.
     """
     try:
         content_type = request.headers.get("content-type", "")
-        
+
         if "multipart/form-data" in content_type:
             logging.info(f"📥 Request: {request.method} {request.url} - Body: [File Upload Detected]")
-        else:
+        elif should_sample_payload():
             body = await request.body()
-            logging.info(f"📥 Request: {request.method} {request.url} - Body: {body.decode(errors='ignore')}")
-    
+            logging.info(f"📥 Request: {request.method} {request.url} - Body: {payload_field(body, sample=True)['preview']}")
+        else:
+            logging.info(f"📥 Request: {request.method} {request.url}")
+
     except Exception as e:
         logging.error(f"❌ Gagal mencatat request: {str(e)}")
 
@@ -29,6 +262,6 @@ async def log_response(response: Response):
     """
     try:
         logging.info(f"✅ Response: Status {response.status_code}")
-    
+
     except Exception as e:
         logging.error(f"❌ Gagal mencatat response: {str(e)}")
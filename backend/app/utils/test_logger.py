@@ -12,7 +12,8 @@ def test_log_request_multipart_logs_file_upload(caplog):
         import asyncio; asyncio.run(log_request(mock_request))
     assert "File Upload Detected" in caplog.text
 
-def test_log_request_normal_logs_body(caplog):
+def test_log_request_normal_logs_body(caplog, monkeypatch):
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
     mock_request = AsyncMock(spec=Request)
     mock_request.headers = {"content-type": "application/json"}
     mock_request.method = "POST"
@@ -22,7 +23,8 @@ def test_log_request_normal_logs_body(caplog):
         import asyncio; asyncio.run(log_request(mock_request))
     assert 'Body: {"foo": "bar"}' in caplog.text
 
-def test_log_request_exception_logs_error(caplog):
+def test_log_request_exception_logs_error(caplog, monkeypatch):
+    monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "1")
     mock_request = AsyncMock(spec=Request)
     mock_request.headers = {"content-type": "application/json"}
     mock_request.method = "POST"
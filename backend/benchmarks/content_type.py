@@ -0,0 +1,119 @@
+"""
+Micro-benchmark deteksi jenis konten transkripsi.
+
+Contoh (dari folder backend):
+    python -m benchmarks.content_type
+    python -m benchmarks.content_type --sizes 100000 1000000 5000000 --repeat 5
+    python -m benchmarks.content_type --sample-chars 200000 --output hasil.json
+
+Membandingkan classifier satu-lewat (regex trie) dengan implementasi lama
+(satu pemindaian `in` per keyword ditambah pola `.*`) pada transkripsi
+sintetis berbagai ukuran, dan memastikan keduanya memberi hasil yang sama.
+Implementasi lama dilewati di atas --legacy-max-bytes karena pola `.*`-nya
+bisa berjalan kuadratik pada transkripsi satu baris.
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from app.services.content_type import CONTENT_KEYWORDS, ContentTypeClassifier, sample_text
+
+FILLER_WORDS = (
+    "jadi kita akan membahas anggaran proyek untuk kuartal berikutnya dan tim sudah "
+    "menyiapkan ringkasan penjualan yang naik cukup baik dibanding tahun lalu kemudian "
+    "ada beberapa catatan dari bagian keuangan soal biaya operasional yang perlu dicek"
+).split()
+
+def legacy_detect_content_type(text: str) -> str:
+    """Implementasi lama detect_content_type, hanya untuk pembanding."""
+    text_lower = text.lower()
+    scores = {
+        category: sum(1 for keyword in keywords if keyword in text_lower)
+        for category, keywords in CONTENT_KEYWORDS.items()
+    }
+    if re.search(r'(selamat|good|hello|hi).*(pagi|siang|sore|malam)', text_lower):
+        scores['meeting'] += 3
+    if re.search(r'(pertanyaan|question).*\d+', text_lower):
+        scores['interview'] += 2
+    if re.search(r'(slide|slide\s+\d+)', text_lower):
+        scores['presentation'] += 3
+    if re.search(r'(bab|chapter|section)\s+\d+', text_lower):
+        scores['document'] += 2
+    if re.search(r'(subscribe|like|comment|share)', text_lower):
+        scores['youtube'] += 3
+    if re.search(r'(welcome|hello|hi).*(channel|video)', text_lower):
+        scores['youtube'] += 2
+    if re.search(r'(don\'t forget|jangan lupa).*(subscribe|like)', text_lower):
+        scores['youtube'] += 3
+    if re.search(r'(thanks|terima kasih).*(watching|menonton)', text_lower):
+        scores['youtube'] += 2
+    content_type = max(scores, key=scores.get)
+    return content_type if scores[content_type] > 0 else 'general'
+
+def generate_transcript(size: int, seed: int = 0, keyword_rate: float = 0.01) -> str:
+    """Transkripsi sintetis satu baris (seperti output Whisper) dengan keyword acak."""
+    rng = random.Random(seed)
+    keywords = [keyword for words in CONTENT_KEYWORDS.values() for keyword in words]
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+def timed(function, text: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def benchmark_size(size: int, repeat: int, sample_chars: int, legacy_max_bytes: int, classifier: ContentTypeClassifier) -> dict:
+    text = generate_transcript(size, seed=size)
+    seconds = timed(classifier.classify, text, repeat)
+    report = {
+        "bytes": len(text.encode("utf-8")),
+        "content_type": classifier.classify(text),
+        "single_pass_ms": round(seconds * 1000, 2),
+        "single_pass_mb_per_second": round(size / seconds / 1024 / 1024, 1),
+    }
+    if sample_chars:
+        sampled = lambda t: classifier.classify(sample_text(t, sample_chars))
+        report["sampled_ms"] = round(timed(sampled, text, repeat) * 1000, 2)
+        report["sampled_content_type"] = sampled(text)
+    if size <= legacy_max_bytes:
+        legacy_seconds = timed(legacy_detect_content_type, text, 1)
+        report["legacy_ms"] = round(legacy_seconds * 1000, 2)
+        report["speedup"] = round(legacy_seconds / seconds, 1)
+        report["same_result"] = legacy_detect_content_type(text) == report["content_type"]
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000],
+                        help="Ukuran transkripsi (karakter)")
+    parser.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan per ukuran (median)")
+    parser.add_argument("--sample-chars", type=int, default=0, help="Ukur juga klasifikasi dari sampel sebesar ini")
+    parser.add_argument("--legacy-max-bytes", type=int, default=1_000_000,
+                        help="Ukuran maksimum yang juga diukur dengan implementasi lama")
+    parser.add_argument("--output", help="Simpan hasil JSON ke file ini")
+    args = parser.parse_args(argv)
+
+    classifier = ContentTypeClassifier()
+    reports = [
+        benchmark_size(size, args.repeat, args.sample_chars, args.legacy_max_bytes, classifier)
+        for size in args.sizes
+    ]
+    for report in reports:
+        print(json.dumps(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+if __name__ == "__main__":
+    main()
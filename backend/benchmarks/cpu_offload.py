@@ -0,0 +1,116 @@
+"""
+Benchmark pemrosesan teks berat CPU di event loop vs di pool proses.
+
+Contoh (dari folder backend):
+    python -m benchmarks.cpu_offload
+    python -m benchmarks.cpu_offload --size 5000000 --jobs 4 --workers 4
+    python -m benchmarks.cpu_offload --shared-memory-threshold 0 --output hasil.json
+
+Setiap job menjalankan deteksi content type dan chunking pada transkripsi
+sintetis berbeda (tidak kena cache) berukuran `--size` karakter, `--jobs`
+job bersamaan, sekali dengan CPU_POOL_WORKERS=0 (semua di loop) dan sekali
+dengan pool `--workers` proses. Selama itu event-loop lag diukur; lag tinggi
+berarti request lain (status, SSE, upload) ikut tertahan. Waktu di loop dan
+di pool diambil dari metric summarizer_cpu_task_seconds_total. Pool dipanaskan
+dulu sehingga waktu start proses worker tidak ikut diukur.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List
+from benchmarks.content_type import generate_transcript
+from benchmarks.load import LoopMonitor
+
+TASKS = ("content_detection", "chunking")
+
+async def run_job(text: str):
+    from app.config import Config
+    from app.services.chunking import split_text_into_chunks
+    from app.services.cpu_executor import run_cpu_bound
+    from app.services.gemini import detect_content_type_async
+    config = Config()
+    await detect_content_type_async(text)
+    await run_cpu_bound("chunking", split_text_into_chunks, text, config.MAX_CHUNK_SIZE, config.CHUNK_OVERLAP)
+
+async def run_mode(texts: List[str], workers: int) -> Dict:
+    from app.services import metrics
+    from app.services.cpu_executor import close_cpu_executor, get_cpu_executor
+    os.environ["CPU_POOL_WORKERS"] = str(workers)
+    executor = get_cpu_executor()
+    warmup = 0.0
+    if workers:
+        # Satu job kecil per worker agar semua proses sudah hidup sebelum diukur
+        started = time.perf_counter()
+        warm_text = "rapat agenda. " * (executor.inline_threshold // 10)
+        await asyncio.gather(*(executor.run("warmup", len, warm_text) for _ in range(workers)))
+        warmup = time.perf_counter() - started
+    metrics._metrics = None
+
+    monitor = LoopMonitor(interval=0.005)
+    monitor_task = asyncio.create_task(monitor.run())
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_job(text) for text in texts))
+        wall = time.perf_counter() - started
+        # Beri monitor kesempatan mencatat lag terakhir (di mode inline loop tertahan sampai semua job selesai)
+        await asyncio.sleep(monitor.interval * 2)
+    finally:
+        monitor_task.cancel()
+        close_cpu_executor()
+
+    registry = metrics.get_metrics()
+    report = {"wall_seconds": round(wall, 3), "warmup_seconds": round(warmup, 3), **monitor.report()}
+    report.pop("peak_rss_mb")
+    for placement in ("on_loop", "off_loop"):
+        report[f"{placement}_seconds"] = {
+            task: round(registry.cpu_seconds.value(task=task, placement=placement), 3) for task in TASKS
+        }
+    report["shared_memory_bytes"] = sum(registry.cpu_shared_memory_bytes.value(task=task) for task in TASKS)
+    return report
+
+async def benchmark(args) -> Dict:
+    os.environ.update({
+        "LOG_LEVEL": "WARNING",
+        "CPU_INLINE_THRESHOLD": str(args.inline_threshold),
+        "CPU_SHARED_MEMORY_THRESHOLD": str(args.shared_memory_threshold),
+    })
+    # Kedua mode memakai transkripsi berbeda agar cache content type tidak terpakai
+    inline_texts = [generate_transcript(args.size, seed=index) for index in range(args.jobs)]
+    pool_texts = [generate_transcript(args.size, seed=args.jobs + index) for index in range(args.jobs)]
+    inline = await run_mode(inline_texts, 0)
+    pool = await run_mode(pool_texts, args.workers)
+    return {
+        "settings": {
+            "size": args.size,
+            "jobs": args.jobs,
+            "workers": args.workers,
+            "inline_threshold": args.inline_threshold,
+            "shared_memory_threshold": args.shared_memory_threshold,
+        },
+        "inline": inline,
+        "pool": pool,
+        "max_lag_reduction": round(inline["loop_lag"]["max_ms"] / max(pool["loop_lag"]["max_ms"], 0.001), 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2_000_000, help="Panjang tiap transkripsi (karakter)")
+    parser.add_argument("--jobs", type=int, default=2, help="Job yang berjalan bersamaan")
+    parser.add_argument("--workers", type=int, default=2, help="Proses di pool CPU")
+    parser.add_argument("--inline-threshold", type=int, default=100_000)
+    parser.add_argument("--shared-memory-threshold", type=int, default=1_000_000)
+    parser.add_argument("--output", help="Simpan hasil JSON ke file ini")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(benchmark(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return results
+
+if __name__ == "__main__":
+    main()
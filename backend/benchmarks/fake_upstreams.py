@@ -0,0 +1,265 @@
+"""
+Server tiruan Whisper dan Gemini untuk benchmark dan pengujian beban lokal.
+
+Latensi, jitter, persentase 429 (dengan header Retry-After) dan error 5xx bisa
+diatur per upstream, sehingga pipeline bisa diukur tanpa kuota API sungguhan.
+Endpoint yang ditiru:
+
+    POST /openai/v1/audio/transcriptions                    -> {"text": ...}
+    POST /v1beta/models/<model>:generateContent             -> response Gemini
+    POST /v1beta/models/<model>:streamGenerateContent?alt=sse -> stream SSE Gemini
+
+Contoh (dari folder backend):
+    python -m benchmarks.fake_upstreams --port 8081 --latency 0.3 --rate-limit-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WHISPER_PATH = "/openai/v1/audio/transcriptions"
+GEMINI_PATH = "/v1beta/models/{target}"
+GEMINI_MODEL = "gemini-2.0-flash"
+
+TRANSCRIPT_WORDS = (
+    "selamat pagi semua rapat hari ini membahas anggaran proyek kuartal berikutnya "
+    "tim keuangan sudah menyiapkan laporan penjualan dan beberapa keputusan perlu "
+    "diambil sebelum deadline minggu depan jadi mari kita mulai dari agenda pertama"
+).split()
+
+@dataclass
+class UpstreamProfile:
+    """Perilaku satu upstream tiruan."""
+    latency: float = 0.2
+    jitter: float = 0.0
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: int = 1
+    # Panjang transkripsi (Whisper) atau ringkasan (Gemini) dalam karakter
+    text_chars: int = 2000
+    # Jumlah potongan pada streamGenerateContent
+    stream_chunks: int = 8
+
+@dataclass
+class UpstreamStats:
+    requests: int = 0
+    ok: int = 0
+    throttled: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    bytes_received: int = 0
+
+def fake_text(chars: int, rng: random.Random) -> str:
+    words: List[str] = []
+    length = 0
+    while length < chars:
+        word = rng.choice(TRANSCRIPT_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+def gemini_body(text: str) -> Dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+class FakeUpstreams:
+    """
+    Aplikasi ASGI berisi endpoint tiruan. `profiles` dan `stats` dibaca/diubah
+    langsung oleh benchmark (mis. profil berbeda per skenario).
+    """
+
+    def __init__(self, whisper: Optional[UpstreamProfile] = None, gemini: Optional[UpstreamProfile] = None, seed: int = 0):
+        self.profiles: Dict[str, UpstreamProfile] = {
+            "whisper": whisper or UpstreamProfile(),
+            "gemini": gemini or UpstreamProfile(text_chars=600),
+        }
+        self.stats: Dict[str, UpstreamStats] = {name: UpstreamStats() for name in self.profiles}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.app = self._build_app()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {name: UpstreamStats() for name in self.profiles}
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: asdict(stats) for name, stats in self.stats.items()}
+
+    def _begin(self, name: str, size: int) -> Optional[JSONResponse]:
+        """Catat request masuk; kembalikan response gagal jika request ini disimulasikan gagal."""
+        profile = self.profiles[name]
+        with self._lock:
+            stats = self.stats[name]
+            stats.requests += 1
+            stats.bytes_received += size
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+            roll = self._rng.random()
+        if roll < profile.rate_limit_rate:
+            return JSONResponse(
+                {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}},
+                status_code=429,
+                headers={"Retry-After": str(profile.retry_after)},
+            )
+        if roll < profile.rate_limit_rate + profile.error_rate:
+            return JSONResponse({"error": {"code": 500, "message": "Internal error", "status": "INTERNAL"}}, status_code=500)
+        return None
+
+    def _end(self, name: str, status_code: int):
+        with self._lock:
+            stats = self.stats[name]
+            stats.in_flight -= 1
+            if status_code == 429:
+                stats.throttled += 1
+            elif status_code >= 400:
+                stats.errors += 1
+            else:
+                stats.ok += 1
+
+    def _delay(self, name: str) -> float:
+        profile = self.profiles[name]
+        with self._lock:
+            jitter = self._rng.uniform(-profile.jitter, profile.jitter) if profile.jitter else 0.0
+        return max(0.0, profile.latency + jitter)
+
+    def _text(self, name: str) -> str:
+        with self._lock:
+            return fake_text(self.profiles[name].text_chars, self._rng)
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake upstreams")
+
+        @app.post(WHISPER_PATH)
+        async def transcriptions(request: Request):
+            body = await request.body()
+            failure = self._begin("whisper", len(body))
+            await asyncio.sleep(self._delay("whisper"))
+            response = failure or JSONResponse({"text": self._text("whisper")})
+            self._end("whisper", response.status_code)
+            return response
+
+        @app.post(GEMINI_PATH)
+        async def gemini(target: str, request: Request):
+            body = await request.body()
+            failure = self._begin("gemini", len(body))
+            await asyncio.sleep(self._delay("gemini"))
+            if failure is not None:
+                self._end("gemini", failure.status_code)
+                return failure
+            if target.endswith(":streamGenerateContent"):
+                return StreamingResponse(self._stream(self._text("gemini")), media_type="text/event-stream")
+            self._end("gemini", 200)
+            return JSONResponse(gemini_body(self._text("gemini")))
+
+        return app
+
+    async def _stream(self, text: str):
+        """Potongan ringkasan dalam format SSE Gemini; jeda antar potongan ~jitter profil."""
+        profile = self.profiles["gemini"]
+        chunks = max(1, profile.stream_chunks)
+        size = max(1, -(-len(text) // chunks))
+        try:
+            for start in range(0, len(text), size):
+                if start:
+                    await asyncio.sleep(profile.jitter / chunks)
+                yield f"data: {json.dumps(gemini_body(text[start:start + size]))}\r\n\r\n"
+        finally:
+            self._end("gemini", 200)
+
+class BackgroundServer:
+    """
+    Jalankan aplikasi ASGI dengan uvicorn di thread dan event loop sendiri.
+    `background` berisi coroutine function yang ikut dijalankan di loop yang
+    sama (mis. pengukur event-loop lag).
+    """
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0,
+                 background: Optional[List[Callable]] = None, lifespan: str = "auto"):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.background = background or []
+        self.server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan=lifespan, access_log=False))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._socket: Optional[socket.socket] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 30.0) -> "BackgroundServer":
+        # proto eksplisit: asyncio hanya memasang TCP_NODELAY untuk socket IPPROTO_TCP,
+        # tanpanya response keep-alive tertahan Nagle + delayed ACK (~40 ms)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self.port = self._socket.getsockname()[1]
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server {self.url} gagal dijalankan")
+            time.sleep(0.01)
+        return self
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        tasks = [asyncio.create_task(function()) for function in self.background]
+        try:
+            await self.server.serve(sockets=[self._socket])
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stop(self, timeout: float = 30.0):
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.2, help="Latensi dasar upstream (detik)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Variasi latensi +/- (detik)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Proporsi request yang dibalas 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporsi request yang dibalas 500")
+    parser.add_argument("--retry-after", type=int, default=1, help="Nilai header Retry-After pada 429 (detik)")
+    parser.add_argument("--transcript-chars", type=int, default=5000, help="Panjang transkripsi Whisper tiruan")
+    parser.add_argument("--summary-chars", type=int, default=600, help="Panjang ringkasan Gemini tiruan")
+
+def profiles_from_args(args) -> Dict[str, UpstreamProfile]:
+    common = dict(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit_rate,
+                  error_rate=args.error_rate, retry_after=args.retry_after)
+    return {
+        "whisper": UpstreamProfile(text_chars=args.transcript_chars, **common),
+        "gemini": UpstreamProfile(text_chars=args.summary_chars, **common),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    upstreams = FakeUpstreams(**profiles_from_args(args))
+    print(f"WHISPER_API_URL=http://{args.host}:{args.port}{WHISPER_PATH}")
+    print(f"GEMINI_API_URL=http://{args.host}:{args.port}/v1beta/models/{GEMINI_MODEL}:generateContent")
+    uvicorn.run(upstreams.app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
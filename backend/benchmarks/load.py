@@ -0,0 +1,331 @@
+"""
+Benchmark beban pipeline lengkap terhadap upstream Whisper/Gemini tiruan.
+
+Contoh (dari folder backend):
+    python -m benchmarks.load
+    python -m benchmarks.load --scenarios uploads --jobs 100 --clients 25 --latency 0.5
+    python -m benchmarks.load --rate-limit-rate 0.1 --error-rate 0.02 --output hasil.json
+    python -m benchmarks.load --env WORKER_CONCURRENCY=8 --env JOB_QUEUE_MAX_SIZE=100
+
+Aplikasi dijalankan dengan uvicorn di thread sendiri (port lokal acak) dan
+diarahkan ke server tiruan dari benchmarks.fake_upstreams; beban dikirim lewat
+HTTP dari thread lain. Skenario:
+
+    uploads           upload MP3 bersamaan lalu polling status sampai selesai
+    long-transcripts  sama, dengan transkripsi panjang (chunking map-reduce)
+    status-storm      banyak klien polling endpoint status tanpa jeda
+
+Per skenario dilaporkan p50/p95/p99 latensi request dan job, RPS, event-loop
+lag aplikasi (diukur di loop uvicorn), RSS puncak proses, hitungan 429/error
+upstream dan waktu per tahap dari record task. Semua komponen berbagi satu
+proses Python, jadi angka paling berguna untuk membandingkan sebelum/sesudah
+perubahan, bukan sebagai kapasitas absolut.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+import httpx
+from benchmarks.fake_upstreams import (
+    GEMINI_MODEL, WHISPER_PATH, BackgroundServer, FakeUpstreams, add_profile_arguments, profiles_from_args,
+)
+
+SCENARIOS = ("uploads", "long-transcripts", "status-storm")
+FINAL_STATUSES = ("completed", "failed")
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Persentil dengan interpolasi linear; None untuk data kosong."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def latency_summary(seconds: List[float]) -> Dict:
+    """Ringkasan latensi dalam milidetik."""
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+    return {
+        "count": len(seconds),
+        "mean_ms": ms(statistics.fmean(seconds) if seconds else None),
+        "p50_ms": ms(percentile(seconds, 50)),
+        "p95_ms": ms(percentile(seconds, 95)),
+        "p99_ms": ms(percentile(seconds, 99)),
+        "max_ms": ms(max(seconds) if seconds else None),
+    }
+
+def current_rss_mb() -> Optional[float]:
+    """RSS proses saat ini (Linux, dari /proc); None di platform lain."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def max_rss_mb() -> Optional[float]:
+    """RSS maksimum sepanjang umur proses (getrusage)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS melaporkan byte, Linux kilobyte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class LoopMonitor:
+    """
+    Ukur event-loop lag (keterlambatan bangun dari sleep) dan RSS puncak.
+    `run` dijalankan sebagai task di loop yang diukur.
+    """
+
+    def __init__(self, interval: float = 0.01, rss_interval: float = 0.1):
+        self.interval = interval
+        self.rss_interval = rss_interval
+        self.reset()
+
+    def reset(self):
+        self.lags: List[float] = []
+        self.peak_rss_mb = current_rss_mb()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        last_rss = loop.time()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self.lags.append(max(0.0, now - expected))
+            if now - last_rss >= self.rss_interval:
+                last_rss = now
+                rss = current_rss_mb()
+                if rss is not None and (self.peak_rss_mb is None or rss > self.peak_rss_mb):
+                    self.peak_rss_mb = rss
+
+    def report(self) -> Dict:
+        lags = list(self.lags)
+        summary = latency_summary(lags)
+        return {
+            "loop_lag": {key: value for key, value in summary.items() if key != "count"},
+            "loop_lag_samples": summary["count"],
+            "peak_rss_mb": None if self.peak_rss_mb is None else round(self.peak_rss_mb, 1),
+        }
+
+def fake_mp3(size: int, rng: random.Random) -> bytes:
+    """Byte acak berheader ID3 (lolos validasi upload, isi unik agar tidak kena cache)."""
+    return b"ID3\x03\x00\x00\x00\x00\x00\x00" + rng.randbytes(max(0, size - 10))
+
+def benchmark_env(upstreams_url: str, work_dir: str, overrides: Dict[str, str]) -> Dict[str, str]:
+    """Environment aplikasi: upstream tiruan, store lokal di folder sementara, kuota Gemini longgar."""
+    env = {
+        "WHISPER_API_URL": f"{upstreams_url}{WHISPER_PATH}",
+        "WHISPER_API_KEY": "benchmark",
+        "GEMINI_API_URL": f"{upstreams_url}/v1beta/models/{GEMINI_MODEL}:generateContent",
+        "GEMINI_API_KEY": "benchmark",
+        "GEMINI_RPM": "100000",
+        "GEMINI_TPM": str(10 ** 9),
+        "GEMINI_RPD": str(10 ** 7),
+        "TEMP_FOLDER": os.path.join(work_dir, "temp"),
+        "CACHE_BACKEND": "memory",
+        "TASK_STORE_BACKEND": "sqlite",
+        "TASK_STORE_PATH": os.path.join(work_dir, "tasks.sqlite3"),
+        # Byte acak bukan audio; ffmpeg hanya akan gagal lalu fallback
+        "AUDIO_PREPROCESS": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    env.update(overrides)
+    return env
+
+class LoadRunner:
+    def __init__(self, base_url: str, args, rng: random.Random):
+        self.base_url = base_url
+        self.args = args
+        self.rng = rng
+        self.request_times: Dict[str, List[float]] = {}
+        self.status_codes: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, name: str, seconds: float, status_code: int):
+        self.request_times.setdefault(name, []).append(seconds)
+        codes = self.status_codes.setdefault(name, {})
+        codes[str(status_code)] = codes.get(str(status_code), 0) + 1
+
+    async def _request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._record(name, time.perf_counter() - started, 0)
+            return None
+        self._record(name, time.perf_counter() - started, response.status_code)
+        return response
+
+    async def upload_job(self, client: httpx.AsyncClient, file_bytes: bytes) -> Dict:
+        """Upload satu file lalu polling status sampai final."""
+        started = time.perf_counter()
+        response = await self._request(
+            client, "upload", "POST", "/api/summarize/",
+            files={"file": ("rapat.mp3", file_bytes, "audio/mpeg")},
+        )
+        if response is None or response.status_code != 200:
+            status = "rejected" if response is not None and response.status_code == 503 else "upload_error"
+            return {"status": status}
+        task_id = response.json()["task_id"]
+        deadline = started + self.args.job_timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(self.args.poll_interval)
+            response = await self._request(client, "status", "GET", f"/api/summarize/status/{task_id}")
+            if response is None or response.status_code != 200:
+                continue
+            record = response.json()
+            if record.get("status") in FINAL_STATUSES:
+                return {
+                    "status": record["status"],
+                    "task_id": task_id,
+                    "seconds": time.perf_counter() - started,
+                    "timings": record.get("timings") or {},
+                }
+        return {"status": "timeout", "task_id": task_id}
+
+    async def run_uploads(self, client: httpx.AsyncClient) -> List[Dict]:
+        semaphore = asyncio.Semaphore(self.args.clients)
+        size = self.args.file_kb * 1024
+
+        async def one():
+            async with semaphore:
+                return await self.upload_job(client, fake_mp3(size, self.rng))
+
+        return await asyncio.gather(*(one() for _ in range(self.args.jobs)))
+
+    async def run_status_storm(self, client: httpx.AsyncClient, task_ids: List[str]):
+        deadline = time.perf_counter() + self.args.duration
+
+        async def poller(index: int):
+            while time.perf_counter() < deadline:
+                task_id = task_ids[index % len(task_ids)] if task_ids else "tidak-ada"
+                index += 1
+                await self._request(client, "status", "GET", f"/api/summarize/status/{task_id}")
+
+        await asyncio.gather(*(poller(i) for i in range(self.args.clients)))
+
+def job_report(jobs: List[Dict]) -> Dict:
+    counts: Dict[str, int] = {}
+    for job in jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    finished = [job for job in jobs if "seconds" in job]
+    stages: Dict[str, List[float]] = {}
+    for job in finished:
+        for stage, seconds in job["timings"].items():
+            if isinstance(seconds, (int, float)):
+                stages.setdefault(stage, []).append(seconds)
+    return {
+        "counts": counts,
+        "latency": latency_summary([job["seconds"] for job in finished]),
+        "stage_p50_ms": {stage: round(percentile(values, 50) * 1000, 2) for stage, values in stages.items()},
+        "stage_p95_ms": {stage: round(percentile(values, 95) * 1000, 2) for stage, values in stages.items()},
+    }
+
+async def run_scenario(name: str, app_url: str, args, upstreams: FakeUpstreams, monitor: LoopMonitor, rng: random.Random) -> Dict:
+    runner = LoadRunner(app_url, args, rng)
+    limits = httpx.Limits(max_connections=args.clients * 2, max_keepalive_connections=args.clients * 2)
+    timeout = httpx.Timeout(args.job_timeout)
+    profiles = profiles_from_args(args)
+    if name == "long-transcripts":
+        profiles["whisper"].text_chars = args.long_transcript_chars
+    upstreams.profiles.update(profiles)
+
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=timeout) as client:
+        seed_ids: List[str] = []
+        if name == "status-storm":
+            # Task yang dipolling dibuat dulu, di luar pengukuran
+            seeds = await runner.run_uploads(client)
+            seed_ids = [job["task_id"] for job in seeds if "task_id" in job]
+            runner.request_times.clear()
+            runner.status_codes.clear()
+
+        upstreams.reset_stats()
+        monitor.reset()
+        started = time.perf_counter()
+        if name == "status-storm":
+            await runner.run_status_storm(client, seed_ids)
+            jobs = None
+        else:
+            jobs = await runner.run_uploads(client)
+        elapsed = time.perf_counter() - started
+
+    total_requests = sum(len(times) for times in runner.request_times.values())
+    report = {
+        "scenario": name,
+        "seconds": round(elapsed, 3),
+        "requests": {
+            request: {**latency_summary(times), "status_codes": runner.status_codes.get(request, {})}
+            for request, times in runner.request_times.items()
+        },
+        "rps": round(total_requests / elapsed, 1) if elapsed else None,
+        "upstreams": upstreams.snapshot(),
+        **monitor.report(),
+        "max_rss_mb": None if max_rss_mb() is None else round(max_rss_mb(), 1),
+    }
+    if jobs is not None:
+        report["jobs"] = job_report(jobs)
+        report["jobs_per_second"] = round(len([job for job in jobs if "seconds" in job]) / elapsed, 2) if elapsed else None
+    return report
+
+def parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, separator, value = pair.partition("=")
+        if not separator:
+            raise SystemExit(f"--env harus berbentuk KEY=VALUE: {pair}")
+        env[key] = value
+    return env
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--jobs", type=int, default=20, help="Jumlah upload per skenario upload")
+    parser.add_argument("--clients", type=int, default=10, help="Klien bersamaan")
+    parser.add_argument("--file-kb", type=int, default=256, help="Ukuran file upload (KB)")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="Jeda polling status per job (detik)")
+    parser.add_argument("--job-timeout", type=float, default=300, help="Batas waktu satu job (detik)")
+    parser.add_argument("--duration", type=float, default=10, help="Lama skenario status-storm (detik)")
+    parser.add_argument("--long-transcript-chars", type=int, default=200_000,
+                        help="Panjang transkripsi pada skenario long-transcripts")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override environment aplikasi (boleh diulang)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Simpan hasil JSON ke file ini")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    upstreams = FakeUpstreams(**profiles_from_args(args), seed=args.seed)
+    monitor = LoopMonitor()
+    # Satu generator untuk semua skenario agar isi upload tidak berulang (cache hasil)
+    rng = random.Random(args.seed)
+    reports = []
+    with tempfile.TemporaryDirectory() as work_dir, BackgroundServer(upstreams.app, lifespan="off") as upstream_server:
+        os.environ.update(benchmark_env(upstream_server.url, work_dir, parse_env(args.env)))
+        # Diimpor setelah environment diset: sebagian konstanta dibaca saat import
+        from app.main import app
+        # Modul aplikasi memasang logging INFO saat import; log per request akan mendominasi output
+        logging.getLogger().setLevel(os.environ["LOG_LEVEL"])
+        with BackgroundServer(app, background=[monitor.run]) as app_server:
+            for name in args.scenarios:
+                report = asyncio.run(run_scenario(name, app_server.url, args, upstreams, monitor, rng))
+                print(json.dumps(report))
+                reports.append(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+if __name__ == "__main__":
+    main()
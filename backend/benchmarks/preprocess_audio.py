@@ -0,0 +1,110 @@
+"""
+Benchmark pre-processing audio (ffmpeg) sebelum upload ke Whisper.
+
+Contoh (dari folder backend):
+    python -m benchmarks.preprocess_audio sample1.mp3 sample2.mp3
+    python -m benchmarks.preprocess_audio --generate 600 --bandwidth-mbps 5
+    python -m benchmarks.preprocess_audio rapat.mp3 --whisper   # panggil Whisper sungguhan
+
+Untuk tiap file dilaporkan ukuran sebelum/sesudah, waktu pre-processing, dan
+perubahan latensi end-to-end: estimasi waktu upload pada bandwidth tertentu,
+atau latensi Whisper terukur jika --whisper dipakai.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from app.config import Config
+from app.services.audio import ffmpeg_available, preprocess_audio
+
+def generate_sample(path: str, seconds: int, ffmpeg_path: str):
+    """Buat sampel MP3 stereo 44.1 kHz 320 kbps (kasus terburuk upload pengguna)."""
+    subprocess.run(
+        [
+            ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+            "-f", "lavfi", "-i", f"anoisesrc=duration={seconds}:amplitude=0.05",
+            "-filter_complex", "[0:a][1:a]amerge=inputs=2[a]", "-map", "[a]",
+            "-ac", "2", "-ar", "44100", "-c:a", "libmp3lame", "-b:a", "320k", path,
+        ],
+        check=True,
+    )
+
+async def timed_transcribe(path: str) -> float:
+    from app.services.whisper import transcribe_audio_async
+    started = time.perf_counter()
+    await transcribe_audio_async(path, language="id")
+    return time.perf_counter() - started
+
+async def benchmark_file(path: str, bandwidth_mbps: float, use_whisper: bool, output_dir: str) -> dict:
+    result = await preprocess_audio(path, output_dir=output_dir)
+    bytes_per_second = bandwidth_mbps * 1024 * 1024 / 8
+    upload_before = result.original_bytes / bytes_per_second
+    upload_after = result.processed_bytes / bytes_per_second
+    report = {
+        "file": os.path.basename(path),
+        "applied": result.applied,
+        "original_bytes": result.original_bytes,
+        "processed_bytes": result.processed_bytes,
+        "bytes_saved": result.bytes_saved,
+        "saved_percent": round(result.bytes_saved / result.original_bytes * 100, 1) if result.original_bytes else 0,
+        "preprocess_seconds": round(result.seconds, 3),
+        "estimated_upload_seconds_before": round(upload_before, 3),
+        "estimated_upload_seconds_after": round(upload_after, 3),
+        "estimated_latency_change_seconds": round(result.seconds + upload_after - upload_before, 3),
+    }
+    if use_whisper:
+        whisper_before = await timed_transcribe(path)
+        whisper_after = await timed_transcribe(result.path)
+        report["whisper_seconds_before"] = round(whisper_before, 3)
+        report["whisper_seconds_after"] = round(result.seconds + whisper_after, 3)
+        report["measured_latency_change_seconds"] = round(result.seconds + whisper_after - whisper_before, 3)
+    if result.applied:
+        os.remove(result.path)
+    return report
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="File audio sampel")
+    parser.add_argument("--generate", type=int, default=0, metavar="DETIK",
+                        help="Buat sampel sintetis dengan durasi ini jika tidak ada file")
+    parser.add_argument("--bandwidth-mbps", type=float, default=10.0, help="Bandwidth upload untuk estimasi")
+    parser.add_argument("--whisper", action="store_true", help="Ukur latensi Whisper sungguhan (butuh API key)")
+    parser.add_argument("--output", help="Simpan hasil JSON ke file ini")
+    args = parser.parse_args(argv)
+
+    config = Config()
+    if not ffmpeg_available(config.FFMPEG_PATH):
+        sys.exit("ffmpeg tidak ditemukan; set FFMPEG_PATH")
+    os.environ["AUDIO_PREPROCESS"] = "true"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        files = list(args.files)
+        if not files:
+            sample = os.path.join(workdir, "sample_stereo_320k.mp3")
+            generate_sample(sample, args.generate or 300, config.FFMPEG_PATH)
+            files = [sample]
+        reports = [await benchmark_file(f, args.bandwidth_mbps, args.whisper, workdir) for f in files]
+
+    results = {
+        "settings": {
+            "format": config.AUDIO_FORMAT,
+            "sample_rate": config.AUDIO_SAMPLE_RATE,
+            "bitrate": config.AUDIO_BITRATE,
+            "bandwidth_mbps": args.bandwidth_mbps,
+        },
+        "files": reports,
+        "total_bytes_saved": sum(r["bytes_saved"] for r in reports),
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    asyncio.run(main())
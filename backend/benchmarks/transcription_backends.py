@@ -0,0 +1,162 @@
+"""
+Benchmark real-time factor (RTF) backend transkripsi: Whisper API (http) vs
+Whisper lokal di CPU (local, faster-whisper int8 di pool proses).
+
+Contoh (dari folder backend):
+    python -m benchmarks.transcription_backends
+    python -m benchmarks.transcription_backends --audio rapat.wav --files 4 --model small
+    python -m benchmarks.transcription_backends --whisper-rtf 0.05 --upload-mbps 5 --output hasil.json
+
+RTF = detik proses / detik audio; di bawah 1 berarti lebih cepat dari
+real-time. `--files` salinan audio ditranskripsi bersamaan, sehingga RTF
+throughput (waktu total / total audio) juga menunjukkan skala pool proses.
+Backend http dikirim ke Whisper tiruan dari benchmarks.fake_upstreams dengan
+latensi estimasi upload (`--upload-mbps`) ditambah durasi audio x
+`--whisper-rtf`. Backend local menjalankan model sungguhan dan butuh
+`pip install faster-whisper` (model diunduh saat pertama dipakai); waktu
+memuat model di tiap worker dilaporkan terpisah sebagai `warmup_seconds`.
+Tanpa `--audio`, dipakai WAV sintetis (nada + jeda) sepanjang `--seconds`:
+cukup untuk mengukur kecepatan, tetapi teksnya tidak bermakna.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import statistics
+import struct
+import tempfile
+import time
+import wave
+from typing import Dict, List
+import httpx
+from benchmarks.fake_upstreams import WHISPER_PATH, FakeUpstreams, UpstreamProfile
+
+SAMPLE_RATE = 16000
+
+def write_synthetic_wav(path: str, seconds: float):
+    """WAV mono 16 kHz: nada 220 Hz bergantian dengan jeda setiap detik."""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        frames = bytearray()
+        for i in range(int(seconds * SAMPLE_RATE)):
+            voiced = (i // SAMPLE_RATE) % 2 == 0
+            value = int(8000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) if voiced else 0
+            frames += struct.pack("<h", value)
+        f.writeframes(bytes(frames))
+
+def wav_duration(path: str) -> float:
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+async def run_backend(backend, paths: List[str], audio_seconds: float) -> Dict:
+    async def one(path: str) -> float:
+        started = time.perf_counter()
+        await backend.transcribe(path, language="id")
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    seconds = await asyncio.gather(*(one(path) for path in paths))
+    wall = time.perf_counter() - started
+    return {
+        "wall_seconds": round(wall, 3),
+        "median_file_seconds": round(statistics.median(seconds), 3),
+        "file_rtf": round(statistics.median(seconds) / audio_seconds, 3),
+        "throughput_rtf": round(wall / (audio_seconds * len(paths)), 3),
+    }
+
+async def benchmark_http(args, paths: List[str], audio_seconds: float) -> Dict:
+    from app.services.transcription import HttpWhisperBackend
+    upload_seconds = os.path.getsize(paths[0]) / (args.upload_mbps * 1024 * 1024 / 8)
+    latency = upload_seconds + audio_seconds * args.whisper_rtf
+    upstreams = FakeUpstreams(whisper=UpstreamProfile(latency=latency, text_chars=int(audio_seconds * 15)))
+    os.environ.update({"WHISPER_API_URL": f"http://fake{WHISPER_PATH}", "WHISPER_API_KEY": "benchmark"})
+    async with httpx.AsyncClient(app=upstreams.app, timeout=None) as client:
+        report = await run_backend(HttpWhisperBackend(client), paths, audio_seconds)
+    report["simulated_latency"] = round(latency, 3)
+    return report
+
+async def benchmark_local(args, paths: List[str], audio_seconds: float) -> Dict:
+    from app.services.transcription import LocalWhisperBackend, faster_whisper_available
+    if not faster_whisper_available():
+        return {"error": "faster-whisper tidak terpasang (pip install faster-whisper)"}
+    backend = LocalWhisperBackend(
+        model=args.model, compute_type=args.compute_type, workers=args.workers, threads_per_worker=args.threads,
+    )
+    try:
+        # Satu file per worker agar setiap proses sudah memuat model sebelum diukur
+        started = time.perf_counter()
+        await asyncio.gather(*(backend.transcribe(paths[0], language="id") for _ in range(backend.workers)))
+        warmup = time.perf_counter() - started
+        report = await run_backend(backend, paths, audio_seconds)
+    finally:
+        backend.close()
+    report.update({"warmup_seconds": round(warmup, 3), "workers": backend.workers, "threads_per_worker": backend.threads_per_worker})
+    return report
+
+async def benchmark(args) -> Dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = args.audio
+        if not source:
+            source = os.path.join(work_dir, "synthetic.wav")
+            write_synthetic_wav(source, args.seconds)
+        audio_seconds = args.audio_seconds or wav_duration(source)
+        extension = os.path.splitext(source)[1]
+        paths = []
+        for index in range(args.files):
+            path = os.path.join(work_dir, f"audio{index}{extension}")
+            shutil.copy(source, path)
+            paths.append(path)
+
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        results = {}
+        if "http" in args.backends:
+            results["http"] = await benchmark_http(args, paths, audio_seconds)
+        if "local" in args.backends:
+            results["local"] = await benchmark_local(args, paths, audio_seconds)
+
+    return {
+        "settings": {
+            "audio": os.path.basename(args.audio) if args.audio else "synthetic.wav",
+            "audio_seconds": round(audio_seconds, 1),
+            "files": args.files,
+            "model": args.model,
+            "compute_type": args.compute_type,
+            "whisper_rtf": args.whisper_rtf,
+            "upload_mbps": args.upload_mbps,
+        },
+        **results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="File audio yang diukur (default: WAV sintetis)")
+    parser.add_argument("--audio-seconds", type=float, default=0, help="Durasi --audio jika bukan WAV (detik)")
+    parser.add_argument("--seconds", type=float, default=60, help="Durasi WAV sintetis (detik)")
+    parser.add_argument("--files", type=int, default=2, help="Jumlah file yang ditranskripsi bersamaan")
+    parser.add_argument("--backends", nargs="+", default=["http", "local"], choices=["http", "local"])
+    parser.add_argument("--model", default="small", help="Model faster-whisper (tiny, base, small, medium, ...)")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--workers", type=int, default=0, help="Proses worker lokal (0 = core tersedia / --threads)")
+    parser.add_argument("--threads", type=int, default=2, help="Thread CTranslate2 per worker")
+    parser.add_argument("--whisper-rtf", type=float, default=0.02,
+                        help="Real-time factor Whisper API tiruan (detik proses per detik audio)")
+    parser.add_argument("--upload-mbps", type=float, default=10.0, help="Bandwidth upload ke Whisper API")
+    parser.add_argument("--output", help="Simpan hasil JSON ke file ini")
+    args = parser.parse_args(argv)
+    if args.audio and not args.audio_seconds and not args.audio.lower().endswith(".wav"):
+        parser.error("--audio-seconds wajib untuk audio selain WAV")
+
+    results = asyncio.run(benchmark(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark jalur subtitle YouTube dibanding download audio + Whisper.
+
+Contoh (dari folder backend):
+    python -m benchmarks.youtube_captions
+    python -m benchmarks.youtube_captions --captions rapat.id.vtt --download-mbps 5 --whisper-rtf 0.1
+    python -m benchmarks.youtube_captions --repeat 3 --output hasil.json
+
+Tidak ada request ke YouTube maupun Whisper sungguhan. yt-dlp diganti script
+tiruan yang, setelah jeda ekstraksi metadata `--metadata-latency`, menyalin
+track subtitle fixture (default benchmarks/fixtures/captions.id.vtt) atau
+menulis audio sepanjang durasi fixture pada `--audio-kbps`, dengan waktu
+download sesuai `--download-mbps`. Transkripsi dikirim ke Whisper tiruan dari
+benchmarks.fake_upstreams dengan latensi estimasi upload (`--upload-mbps`)
+ditambah durasi audio x `--whisper-rtf`. Kedua jalur memakai fungsi aplikasi
+yang sama dengan route /summarize/youtube/.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+import httpx
+from benchmarks.fake_upstreams import WHISPER_PATH, FakeUpstreams, UpstreamProfile
+
+DEFAULT_CAPTIONS = os.path.join(os.path.dirname(__file__), "fixtures", "captions.id.vtt")
+VIDEO_ID = "fixture01"
+
+FAKE_YT_DLP = """#!{python}
+import os, shutil, sys, time
+args = sys.argv[1:]
+output_template = args[args.index("-o") + 1]
+time.sleep({metadata_latency!r})
+if "--skip-download" in args:
+    suffix = os.path.basename({captions!r}).split(".", 1)[1]
+    shutil.copy({captions!r}, output_template.replace("%(id)s.%(ext)s", {video_id!r} + "." + suffix))
+    sys.exit(0)
+time.sleep({download_seconds!r})
+path = output_template.replace("%(id)s", {video_id!r}).replace("%(ext)s", "webm")
+with open(path, "wb") as f:
+    f.write(b"\\x1aE\\xdf\\xa3" + b"\\x00" * ({audio_bytes!r} - 4))
+print("FILEPATH " + path, flush=True)
+"""
+
+_TIMESTAMP = re.compile(r"(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s*$")
+
+def captions_duration(path: str) -> float:
+    """Durasi video menurut timestamp akhir cue terakhir (detik)."""
+    duration = 0.0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if "-->" not in line:
+                continue
+            match = _TIMESTAMP.search(line.split("-->")[1].split(" align")[0])
+            if match:
+                hours, minutes, seconds, millis = (int(part or 0) for part in match.groups())
+                duration = max(duration, hours * 3600 + minutes * 60 + seconds + millis / 1000)
+    return duration
+
+def write_fake_yt_dlp(path: str, captions: str, metadata_latency: float, download_seconds: float, audio_bytes: int):
+    with open(path, "w") as f:
+        f.write(FAKE_YT_DLP.format(
+            python=sys.executable, captions=os.path.abspath(captions), video_id=VIDEO_ID,
+            metadata_latency=metadata_latency, download_seconds=download_seconds, audio_bytes=audio_bytes,
+        ))
+    os.chmod(path, 0o755)
+
+async def run_captions_path(url: str, work_dir: str) -> Dict:
+    from app.services.youtube import fetch_youtube_captions_async
+    started = time.perf_counter()
+    captions = await fetch_youtube_captions_async(url, work_dir, language="id")
+    if captions is None:
+        raise RuntimeError("Fixture subtitle tidak menghasilkan teks yang layak")
+    return {"seconds": time.perf_counter() - started, "chars": len(captions.text), "words": len(captions.text.split())}
+
+async def run_audio_path(url: str, work_dir: str, client: httpx.AsyncClient) -> Dict:
+    from app.services.whisper import transcribe_audio_async
+    from app.services.youtube import download_youtube_audio_async
+    started = time.perf_counter()
+    audio_path = await download_youtube_audio_async(url, work_dir)
+    downloaded = time.perf_counter()
+    text = await transcribe_audio_async(audio_path, language="id", client=client)
+    finished = time.perf_counter()
+    os.remove(audio_path)
+    return {
+        "seconds": finished - started,
+        "download_seconds": downloaded - started,
+        "transcribe_seconds": finished - downloaded,
+        "chars": len(text),
+    }
+
+def summarize_runs(runs: List[Dict]) -> Dict:
+    seconds = [run["seconds"] for run in runs]
+    report = {key: value for key, value in runs[-1].items() if key not in ("seconds", "download_seconds", "transcribe_seconds")}
+    report["median_seconds"] = round(statistics.median(seconds), 3)
+    report["min_seconds"] = round(min(seconds), 3)
+    for key in ("download_seconds", "transcribe_seconds"):
+        if key in runs[-1]:
+            report[f"median_{key}"] = round(statistics.median(run[key] for run in runs), 3)
+    return report
+
+async def benchmark(args) -> Dict:
+    duration = captions_duration(args.captions)
+    audio_bytes = max(1024, int(duration * args.audio_kbps * 1000 / 8))
+    download_seconds = audio_bytes / (args.download_mbps * 1024 * 1024 / 8)
+    upload_seconds = audio_bytes / (args.upload_mbps * 1024 * 1024 / 8)
+    whisper_latency = upload_seconds + duration * args.whisper_rtf
+    upstreams = FakeUpstreams(whisper=UpstreamProfile(latency=whisper_latency, text_chars=int(duration * 15)))
+    url = f"https://youtu.be/{VIDEO_ID}"
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        script = os.path.join(work_dir, "fake-yt-dlp")
+        write_fake_yt_dlp(script, args.captions, args.metadata_latency, download_seconds, audio_bytes)
+        os.environ.update({
+            "YT_DLP_PATH": script,
+            "WHISPER_API_URL": f"http://fake{WHISPER_PATH}",
+            "WHISPER_API_KEY": "benchmark",
+            "LOG_LEVEL": "WARNING",
+        })
+        captions_runs, audio_runs = [], []
+        async with httpx.AsyncClient(app=upstreams.app, timeout=None) as client:
+            for _ in range(args.repeat):
+                captions_runs.append(await run_captions_path(url, work_dir))
+                audio_runs.append(await run_audio_path(url, work_dir, client))
+
+    captions_report = summarize_runs(captions_runs)
+    audio_report = summarize_runs(audio_runs)
+    return {
+        "settings": {
+            "captions": os.path.basename(args.captions),
+            "video_seconds": round(duration, 1),
+            "audio_bytes": audio_bytes,
+            "metadata_latency": args.metadata_latency,
+            "download_mbps": args.download_mbps,
+            "upload_mbps": args.upload_mbps,
+            "whisper_rtf": args.whisper_rtf,
+            "repeat": args.repeat,
+        },
+        "captions": captions_report,
+        "audio": audio_report,
+        "speedup": round(audio_report["median_seconds"] / captions_report["median_seconds"], 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--captions", default=DEFAULT_CAPTIONS, help="Fixture subtitle VTT/SRT (<nama>.<bahasa>.<ext>)")
+    parser.add_argument("--metadata-latency", type=float, default=0.5,
+                        help="Jeda ekstraksi info video oleh yt-dlp, dibayar kedua jalur (detik)")
+    parser.add_argument("--audio-kbps", type=float, default=64, help="Bitrate stream audio-only yang diunduh")
+    parser.add_argument("--download-mbps", type=float, default=20.0, help="Bandwidth download dari YouTube")
+    parser.add_argument("--upload-mbps", type=float, default=10.0, help="Bandwidth upload ke Whisper")
+    parser.add_argument("--whisper-rtf", type=float, default=0.02,
+                        help="Real-time factor Whisper (detik proses per detik audio)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Simpan hasil JSON ke file ini")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(benchmark(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return results
+
+if __name__ == "__main__":
+    main()